@@ -1,7 +1,14 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from __future__ import annotations
+
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox, simpledialog
+except ImportError:
+    # Python sans Tk (serveur) : seul le mode ligne de commande est utilisable
+    tk = ttk = messagebox = simpledialog = None
 from pathlib import Path
 import json
+import sys
 
 # Fichiers de données
 import os
@@ -23,46 +30,138 @@ SST_EMAILS_FILE = DATA_DIR / "sst_emails.json"
 ANNOUNCEMENT_CONFIG_FILE = DATA_DIR / "announcement_config.json"
 ANNOUNCEMENT_HISTORY_FILE = DATA_DIR / "announcement_history.json"
 
+# Référentiels surveillés par le rafraîchissement automatique :
+# clé -> (fichier, attribut de l'application, valeur par défaut, vues dépendantes)
+# Un nom de fichier seul est relatif au dossier _data de l'application.
+# Seules les vues listées sont rafraîchies quand le fichier change.
+REFERENCE_FILES = {
+    "voyages": (VOYAGES_FILE, "voyages", [], ("planning", "voyages", "finance", "summary")),
+    "chauffeurs": (CHAUFFEURS_FILE, "chauffeurs", [], ("chauffeurs", "drivers", "summary")),
+    "dispos": ("dispo_chauffeurs.json", "dispos", [], ("drivers", "summary")),
+    "sst": ("sst.json", "sst_list", [], ("finance", "sst_combos")),
+    "tarifs_sst": (TARIFS_SST_FILE, "tarifs_sst", {}, ("finance",)),
+    "revenus": (REVENUS_FILE, "revenus_palettes", {}, ("finance",)),
+}
+
 from datetime import date, datetime, timedelta
 import uuid
 import getpass
 import os
 
-# Imports optionnels pour l'export
-try:
-    import openpyxl
-    EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
+import importlib
+import importlib.util
+import time as time_module
+import threading
+import functools
+import shutil
+import queue
+import bisect
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib import colors
-    from reportlab.lib.units import cm
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+# =============================================================================
+# IMPORTS DIFFÉRÉS - Bibliothèques lourdes chargées au premier usage
+# =============================================================================
+# matplotlib, reportlab, openpyxl et win32com coûtent plusieurs secondes au
+# démarrage : on se contente de vérifier leur présence (find_spec, sans import)
+# et on ne les importe réellement qu'au moment où une fonction en a besoin.
 
-# Import matplotlib pour les graphiques
-try:
-    import matplotlib
-    matplotlib.use('TkAgg')
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-    from matplotlib.figure import Figure
-    import matplotlib.dates as mdates
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
+_STARTUP_T0 = time_module.perf_counter()
+_startup_timings = []   # [(libellé, durée en secondes)]
+_lazy_modules = {}
 
-# Import Outlook (Windows uniquement)
-try:
-    import win32com.client
-    OUTLOOK_AVAILABLE = True
-except ImportError:
-    OUTLOOK_AVAILABLE = False
+
+def record_startup_timing(label, started_at):
+    """Mémoriser la durée d'une étape (started_at = time_module.perf_counter())"""
+    _startup_timings.append((label, time_module.perf_counter() - started_at))
+
+
+def print_startup_report():
+    """Afficher le rapport de temps de démarrage dans la console"""
+    total = time_module.perf_counter() - _STARTUP_T0
+    print("⏱ Temps de démarrage :")
+    for label, duration in _startup_timings:
+        print(f"   {label:<45} {duration * 1000:8.1f} ms")
+    print(f"   {'TOTAL (jusqu’à l’affichage de la fenêtre)':<45} {total * 1000:8.1f} ms")
+
+
+def _module_available(module_name):
+    """Vérifier qu'un module est installé sans l'importer"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def lazy_import(module_name):
+    """Importer un module au premier usage (résultat mis en cache).
+
+    Lève ImportError si le module n'est pas installé, comme un import classique.
+    """
+    module = _lazy_modules.get(module_name)
+    if module is None:
+        started = time_module.perf_counter()
+        module = importlib.import_module(module_name)
+        _lazy_modules[module_name] = module
+        record_startup_timing(f"import {module_name}", started)
+    return module
+
+
+EXCEL_AVAILABLE = _module_available("openpyxl")
+PDF_AVAILABLE = _module_available("reportlab")
+MATPLOTLIB_AVAILABLE = _module_available("matplotlib")
+OUTLOOK_AVAILABLE = _module_available("win32com")
+
+# Noms matplotlib / Outlook renseignés par ensure_matplotlib() / ensure_outlook()
+plt = None
+FigureCanvasTkAgg = None
+NavigationToolbar2Tk = None
+Figure = None
+mdates = None
+win32com = None
+
+
+def ensure_matplotlib():
+    """Charger matplotlib (backend TkAgg) au premier usage.
+
+    Renseigne les noms globaux plt, Figure, FigureCanvasTkAgg, NavigationToolbar2Tk
+    et mdates. Retourne False si matplotlib n'est pas utilisable.
+    """
+    global MATPLOTLIB_AVAILABLE, plt, FigureCanvasTkAgg, NavigationToolbar2Tk, Figure, mdates
+    if not MATPLOTLIB_AVAILABLE:
+        return False
+    if Figure is not None:
+        return True
+    try:
+        matplotlib = lazy_import("matplotlib")
+        matplotlib.use('TkAgg')
+        plt = lazy_import("matplotlib.pyplot")
+        backend = lazy_import("matplotlib.backends.backend_tkagg")
+        FigureCanvasTkAgg = backend.FigureCanvasTkAgg
+        NavigationToolbar2Tk = backend.NavigationToolbar2Tk
+        Figure = lazy_import("matplotlib.figure").Figure
+        mdates = lazy_import("matplotlib.dates")
+    except ImportError:
+        MATPLOTLIB_AVAILABLE = False
+        return False
+    return True
+
+
+def ensure_outlook():
+    """Charger win32com.client au premier usage (Windows uniquement)"""
+    global OUTLOOK_AVAILABLE, win32com
+    if not OUTLOOK_AVAILABLE:
+        return False
+    if win32com is not None:
+        return True
+    try:
+        lazy_import("win32com.client")
+        win32com = lazy_import("win32com")
+    except ImportError:
+        OUTLOOK_AVAILABLE = False
+        return False
+    return True
 
 # Configuration
 COMPANY_OD_FOLDER = "OneDrive - STEF"
@@ -72,10 +171,19 @@ SUBPATH = Path("O_BEL_transport_tubize - Documents Service Transport") / "[09] P
 # SYSTÈME SAURON - Logging et surveillance des activités utilisateurs
 # =============================================================================
 
+
 class ActivityLogger:
     """
     Système de logging des activités utilisateurs.
-    Enregistre toutes les actions dans des fichiers JSON par utilisateur.
+    Chaque utilisateur a son journal `_logs/<USER>.jsonl` : une action JSON par
+    ligne, ajoutée en fin de fichier (l'ancien format `<USER>.json`, réécrit
+    à chaque action, est converti à la première connexion).
+    La lecture (onglet Sauron) est incrémentale : `poll()` ne lit que les
+    lignes ajoutées depuis l'appel précédent, grâce à un offset par journal.
+    À la connexion, les mois terminés depuis plus de 31 jours sont archivés dans
+    `_logs/_archives/<USER>/<AAAA-MM>.jsonl.gz` et résumés (sessions, durée,
+    actions par type) dans `summary.json` : les statistiques lisent ce résumé
+    et le mois courant, les archives ne sont ouvertes qu'à la demande.
     """
     
     _instance = None
@@ -95,6 +203,8 @@ class ActivityLogger:
         self.session_id = None
         self.session_start = None
         self.user_log_file = None
+        self._lock = threading.Lock()
+        self._users = {}  # {utilisateur: état de lecture et statistiques}
         
     def initialize(self, root_dir, username):
         """Initialiser le logger avec le dossier racine et l'utilisateur"""
@@ -103,16 +213,10 @@ class ActivityLogger:
         self.current_user = username.upper()
         self.session_id = str(uuid.uuid4())[:8]
         self.session_start = datetime.now()
-        self.user_log_file = self.logs_dir / f"{self.current_user}.json"
-        
-        # Créer le fichier de log utilisateur si inexistant
-        if not self.user_log_file.exists():
-            self._save_user_logs({
-                "user": self.current_user,
-                "created": datetime.now().isoformat(),
-                "sessions": [],
-                "actions": []
-            })
+        self.user_log_file = self.logs_dir / f"{self.current_user}.jsonl"
+        
+        self._migrate_legacy_log()
+        self._rotate_user_log()
         
         # Enregistrer le début de session
         self.log_action("SESSION_START", {
@@ -120,27 +224,193 @@ class ActivityLogger:
             "timestamp": self.session_start.isoformat()
         })
     
-    def _load_user_logs(self):
-        """Charger les logs de l'utilisateur courant"""
+    def _migrate_legacy_log(self):
+        """Convertir l'ancien fichier <USER>.json de l'utilisateur courant en journal"""
+        legacy = self.logs_dir / f"{self.current_user}.json"
+        if not legacy.exists():
+            return
         try:
-            if self.user_log_file and self.user_log_file.exists():
+            with open(legacy, "r", encoding="utf-8") as f:
+                actions = json.load(f).get("actions", [])
+            lines = [json.dumps(a, ensure_ascii=False) + "\n" for a in actions]
+            if self.user_log_file.exists():
                 with open(self.user_log_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                    lines.extend(f.readlines())
+            tmp = self.user_log_file.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+            os.replace(tmp, self.user_log_file)
+            os.replace(legacy, legacy.with_suffix(".json.migrated"))
+            print(f"[Sauron] {len(actions)} action(s) converties vers {self.user_log_file.name}")
         except Exception as e:
-            print(f"Erreur chargement logs: {e}")
-        return {
-            "user": self.current_user,
-            "created": datetime.now().isoformat(),
-            "sessions": [],
-            "actions": []
-        }
+            print(f"Erreur conversion logs: {e}")
+    
+    def _archive_dir(self, username):
+        return self.logs_dir / "_archives" / username
+    
+    # Jours d'historique toujours gardés dans le journal : les périodes relatives
+    # de l'onglet Sauron (Hier, 7/30 derniers jours) n'ont pas à ouvrir d'archive
+    LIVE_DAYS = 31
+    # Verrou du journal (ajouts / remplacement par la rotation) ; au-delà, il est
+    # considéré comme abandonné (processus arrêté en cours de rotation)
+    LOCK_STALE_SECONDS = 60
+    
+    def _lock_journal(self, timeout):
+        """
+        Prendre le verrou exclusif `<USER>.jsonl.lock` (création atomique, partagée
+        entre postes) ; retourne False si le délai `timeout` (secondes) est dépassé.
+        """
+        lock = self.user_log_file.with_name(self.user_log_file.name + ".lock")
+        deadline = time_module.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, f"{self.current_user} {os.getpid()}".encode("utf-8"))
+                os.close(fd)
+                return True
+            except FileExistsError:
+                try:
+                    if time_module.time() - lock.stat().st_mtime > self.LOCK_STALE_SECONDS:
+                        lock.unlink(missing_ok=True)
+                        continue
+                except OSError:
+                    continue
+            if time_module.monotonic() >= deadline:
+                return False
+            time_module.sleep(0.05)
+    
+    def _unlock_journal(self):
+        self.user_log_file.with_name(self.user_log_file.name + ".lock").unlink(missing_ok=True)
+    
+    def _rotate_user_log(self):
+        """Archiver les mois du journal terminés depuis plus de LIVE_DAYS jours"""
+        import gzip
+        
+        journal = self.user_log_file
+        # Premier mois conservé : celui d'il y a LIVE_DAYS jours (les précédents sont tous plus anciens)
+        first_kept_month = (datetime.now() - timedelta(days=self.LIVE_DAYS)).strftime("%Y-%m")
+        try:
+            if not journal.exists():
+                return
+            with open(journal, "rb") as f:
+                # Journal chronologique : si la 1re ligne est d'un mois conservé, rien à archiver
+                first = f.readline()
+                try:
+                    if json.loads(first).get("timestamp", "")[:7] >= first_kept_month:
+                        return
+                except ValueError:
+                    pass
+                f.seek(0)
+                lines = f.readlines()
+                size = f.tell()
+            
+            archived, kept = {}, []
+            for line in lines:
+                if not line.strip():
+                    continue
+                if not line.endswith(b"\n"):
+                    line += b"\n"
+                try:
+                    month = json.loads(line).get("timestamp", "")[:7]
+                except ValueError:
+                    month = ""
+                if month and month < first_kept_month:
+                    archived.setdefault(month, []).append(line)
+                else:
+                    kept.append(line)
+            if not archived:
+                return
+            
+            archive_dir = self._archive_dir(self.current_user)
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            summary_file = archive_dir / "summary.json"
+            summary = {"user": self.current_user, "months": {}}
+            if summary_file.exists():
+                with open(summary_file, "r", encoding="utf-8") as f:
+                    summary = json.load(f)
+            
+            # Chaque mois est reconstruit (archive + résumé) à partir du contenu déjà
+            # archivé et des nouvelles lignes, dédoublonnés par id d'action : une
+            # rotation interrompue (journal non remplacé) ou lancée deux fois en
+            # parallèle ne compte jamais une action deux fois.
+            tag = f"{os.getpid()}.{threading.get_ident()}"
+            for month, month_lines in sorted(archived.items()):
+                archive = archive_dir / f"{month}.jsonl.gz"
+                merged, seen = [], set()
+                existing = []
+                if archive.exists():
+                    with gzip.open(archive, "rb") as f:
+                        existing = f.readlines()
+                for line in existing + month_lines:
+                    if not line.strip():
+                        continue
+                    if not line.endswith(b"\n"):
+                        line += b"\n"
+                    try:
+                        key = json.loads(line).get("id") or line
+                    except ValueError:
+                        continue
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    merged.append(line)
+                
+                state = self._new_user_state()
+                self._ingest(state, [json.loads(line) for line in merged])
+                summary["months"][month] = {
+                    "actions": len(merged),
+                    "action_counts": state["action_counts"],
+                    "sessions": len(state["sessions"]),
+                    "total_seconds": sum(s.get("duration_seconds", 0) for s in state["sessions"]),
+                    "last_login": max([s.get("start") for s in state["sessions"] if s.get("start")],
+                                      default=None),
+                }
+                
+                tmp = archive.with_name(f"{archive.name}.{tag}.tmp")
+                with gzip.open(tmp, "wb") as f:
+                    f.writelines(merged)
+                os.replace(tmp, archive)
+            
+            tmp = summary_file.with_name(f"summary.json.{tag}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, summary_file)
+            
+            # Copie et remplacement sous verrou : aucun ajout (_append, autre poste
+            # ou autre processus) ne peut tomber entre la lecture de la fin du
+            # journal et son remplacement. Sans verrou, on réessaiera plus tard ;
+            # les archives déjà écrites sont dédoublonnées.
+            if not self._lock_journal(timeout=5):
+                print("[Sauron] Journal verrouillé : archivage reporté")
+                return
+            try:
+                tmp = journal.with_name(f"{journal.name}.{tag}.tmp")
+                with open(tmp, "wb") as f:
+                    f.writelines(kept)
+                    # Lignes ajoutées depuis la lecture du journal
+                    with open(journal, "rb") as src:
+                        src.seek(size)
+                        f.write(src.read())
+                os.replace(tmp, journal)
+            finally:
+                self._unlock_journal()
+            print(f"[Sauron] {sum(len(v) for v in archived.values())} action(s) archivée(s) "
+                  f"({', '.join(sorted(archived))})")
+        except Exception as e:
+            print(f"Erreur archivage logs: {e}")
     
-    def _save_user_logs(self, data):
-        """Sauvegarder les logs de l'utilisateur courant"""
+    def _append(self, entry):
+        """Ajouter une ligne au journal de l'utilisateur courant (une seule écriture)"""
         try:
             if self.user_log_file:
-                with open(self.user_log_file, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                # Attendre une rotation en cours (verrou) ; au pire, écrire quand même
+                locked = self._lock_journal(timeout=2)
+                try:
+                    with open(self.user_log_file, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                finally:
+                    if locked:
+                        self._unlock_journal()
         except Exception as e:
             print(f"Erreur sauvegarde logs: {e}")
     
@@ -158,8 +428,6 @@ class ActivityLogger:
             return
         
         try:
-            logs = self._load_user_logs()
-            
             action_entry = {
                 "id": str(uuid.uuid4())[:12],
                 "session_id": self.session_id,
@@ -173,15 +441,13 @@ class ActivityLogger:
             if after_state is not None:
                 action_entry["after"] = after_state
             
-            logs["actions"].append(action_entry)
-            
-            self._save_user_logs(logs)
+            self._append(action_entry)
             
         except Exception as e:
             print(f"Erreur log_action: {e}")
     
     def log_session_end(self):
-        """Enregistrer la fin de session"""
+        """Enregistrer la fin de session (la session est déduite de cette action)"""
         if not self.logs_dir or not self.session_start:
             return
         
@@ -190,22 +456,10 @@ class ActivityLogger:
         
         self.log_action("SESSION_END", {
             "session_id": self.session_id,
+            "start": self.session_start.isoformat(),
             "duration_seconds": int(duration_seconds),
             "duration_formatted": self._format_duration(duration_seconds)
         })
-        
-        # Mettre à jour les statistiques de session
-        try:
-            logs = self._load_user_logs()
-            logs["sessions"].append({
-                "session_id": self.session_id,
-                "start": self.session_start.isoformat(),
-                "end": session_end.isoformat(),
-                "duration_seconds": int(duration_seconds)
-            })
-            self._save_user_logs(logs)
-        except Exception as e:
-            print(f"Erreur log_session_end: {e}")
     
     def _format_duration(self, seconds):
         """Formater une durée en heures:minutes:secondes"""
@@ -214,37 +468,183 @@ class ActivityLogger:
         secs = int(seconds % 60)
         return f"{hours:02d}:{minutes:02d}:{secs:02d}"
     
-    def get_all_users_logs(self):
-        """Récupérer les logs de tous les utilisateurs"""
+    # ----- Lecture incrémentale -----
+    
+    @staticmethod
+    def _new_user_state():
+        return {
+            "legacy_sig": None, "legacy_actions": [],
+            "offset": 0, "head": b"", "journal_actions": [],
+            "sessions": [], "action_counts": {},
+            "summary_sig": None, "summary": {},
+        }
+    
+    @staticmethod
+    def _ingest(state, actions):
+        """Mettre à jour les compteurs et sessions d'un utilisateur avec de nouvelles actions"""
+        counts = state["action_counts"]
+        for action in actions:
+            action_type = action.get("type", "UNKNOWN")
+            counts[action_type] = counts.get(action_type, 0) + 1
+            if action_type == "SESSION_END":
+                details = action.get("details", {})
+                duration = details.get("duration_seconds", 0)
+                start = details.get("start")
+                if not start:
+                    try:
+                        start = (datetime.fromisoformat(action["timestamp"])
+                                 - timedelta(seconds=duration)).isoformat()
+                    except Exception:
+                        start = action.get("timestamp")
+                state["sessions"].append({
+                    "session_id": details.get("session_id", action.get("session_id")),
+                    "start": start,
+                    "end": action.get("timestamp"),
+                    "duration_seconds": duration,
+                })
+    
+    @staticmethod
+    def _read_journal(path, state):
+        """
+        Lignes ajoutées au journal depuis l'offset mémorisé (lignes complètes
+        uniquement). Retourne (réécrit, actions) ; réécrit = le fichier ne
+        prolonge plus ce qui a déjà été lu (rotation, copie) : il est relu en entier.
+        """
+        with open(path, "rb") as f:
+            head = f.read(64)
+            size = f.seek(0, 2)
+            rewritten = size < state["offset"] or not head.startswith(state["head"])
+            offset = 0 if rewritten else state["offset"]
+            if size == offset:
+                return rewritten, []
+            f.seek(offset)
+            chunk = f.read(size - offset)
+        end = chunk.rfind(b"\n") + 1  # Dernière ligne incomplète : écriture en cours
+        state["offset"] = offset + end
+        state["head"] = head if end else state["head"]
+        actions = []
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                try:
+                    actions.append(json.loads(line))
+                except ValueError:
+                    print(f"Ligne de log illisible ignorée ({path.name})")
+        return rewritten, actions
+    
+    def poll(self):
+        """
+        Lire les actions ajoutées depuis l'appel précédent, pour tous les utilisateurs.
+        Retourne {utilisateur: (relu, nouvelles actions)} pour les seuls
+        utilisateurs modifiés ; relu = True si tout l'historique a été relu
+        (premier appel, fichier réécrit) et doit remplacer l'affichage.
+        """
         if not self.logs_dir or not self.logs_dir.exists():
             return {}
         
-        all_logs = {}
-        try:
-            for log_file in self.logs_dir.glob("*.json"):
+        changes = {}
+        with self._lock:
+            files = {}
+            for log_file in self.logs_dir.glob("*.json*"):
+                if log_file.suffix in (".json", ".jsonl"):
+                    files.setdefault(log_file.stem, {})[log_file.suffix] = log_file
+            
+            for username in set(self._users) - set(files):
+                del self._users[username]
+                changes[username] = (True, [])
+            
+            for username, paths in files.items():
+                state = self._users.get(username)
+                is_new = state is None
+                if is_new:
+                    state = self._users[username] = self._new_user_state()
+                reset = is_new
+                
+                # Ancien format (utilisateur pas encore reconnecté) : relu s'il change
+                legacy = paths.get(".json")
                 try:
-                    with open(log_file, "r", encoding="utf-8") as f:
-                        user_logs = json.load(f)
-                        username = log_file.stem
-                        all_logs[username] = user_logs
+                    legacy_sig = (legacy.stat().st_mtime, legacy.stat().st_size) if legacy else None
+                    if legacy_sig != state["legacy_sig"]:
+                        state["legacy_sig"] = legacy_sig
+                        state["legacy_actions"] = []
+                        if legacy:
+                            with open(legacy, "r", encoding="utf-8") as f:
+                                state["legacy_actions"] = json.load(f).get("actions", [])
+                        reset = True
                 except Exception as e:
-                    print(f"Erreur lecture {log_file}: {e}")
-        except Exception as e:
-            print(f"Erreur get_all_users_logs: {e}")
-        
-        return all_logs
+                    print(f"Erreur lecture {legacy}: {e}")
+                
+                # Résumé des mois archivés (réécrit seulement lors d'une rotation)
+                summary_file = self._archive_dir(username) / "summary.json"
+                try:
+                    summary_sig = ((summary_file.stat().st_mtime, summary_file.stat().st_size)
+                                   if summary_file.exists() else None)
+                    if summary_sig != state["summary_sig"]:
+                        state["summary_sig"] = summary_sig
+                        state["summary"] = {}
+                        if summary_sig:
+                            with open(summary_file, "r", encoding="utf-8") as f:
+                                state["summary"] = json.load(f)
+                        reset = True
+                except Exception as e:
+                    print(f"Erreur lecture {summary_file}: {e}")
+                
+                new_actions = []
+                journal = paths.get(".jsonl")
+                if journal:
+                    try:
+                        rewritten, new_actions = self._read_journal(journal, state)
+                        if rewritten:
+                            state["journal_actions"] = []
+                            reset = True
+                    except Exception as e:
+                        print(f"Erreur lecture {journal}: {e}")
+                elif state["journal_actions"]:
+                    state.update(offset=0, head=b"", journal_actions=[])
+                    reset = True
+                state["journal_actions"].extend(new_actions)
+                
+                if reset:
+                    state["sessions"], state["action_counts"] = [], {}
+                    self._ingest(state, state["legacy_actions"])
+                    self._ingest(state, state["journal_actions"])
+                    changes[username] = (True, state["legacy_actions"] + state["journal_actions"])
+                elif new_actions:
+                    self._ingest(state, new_actions)
+                    changes[username] = (False, new_actions)
+        return changes
+    
+    def get_user_actions(self, username):
+        """Actions connues d'un utilisateur (ordre chronologique), sans relire les fichiers"""
+        with self._lock:
+            state = self._users.get(username)
+            return state["legacy_actions"] + state["journal_actions"] if state else []
+    
+    def get_all_users_logs(self):
+        """Logs de tous les utilisateurs, tels que lus par le dernier poll()"""
+        with self._lock:
+            return {
+                username: {
+                    "user": username,
+                    "sessions": list(state["sessions"]),
+                    "actions": state["legacy_actions"] + state["journal_actions"],
+                    "archives": state["summary"].get("months", {}),
+                }
+                for username, state in self._users.items()
+            }
     
     def get_active_sessions(self):
         """
         Déterminer les utilisateurs potentiellement actifs
         (sessions démarrées mais pas terminées dans les dernières 24h)
         """
-        all_logs = self.get_all_users_logs()
         active_users = []
         now = datetime.now()
         
-        for username, logs in all_logs.items():
-            actions = logs.get("actions", [])
+        with self._lock:
+            recent = {username: (state["legacy_actions"] + state["journal_actions"])[-50:]
+                      for username, state in self._users.items()}
+        
+        for username, actions in recent.items():
             if not actions:
                 continue
             
@@ -260,7 +660,7 @@ class ActivityLogger:
                     session_id = last_action.get("session_id")
                     is_ended = any(
                         a.get("type") == "SESSION_END" and a.get("session_id") == session_id
-                        for a in actions[-50:]  # Vérifier les 50 dernières actions
+                        for a in actions  # Vérifier les 50 dernières actions
                     )
                     if not is_ended:
                         active_users.append({
@@ -274,40 +674,61 @@ class ActivityLogger:
         return active_users
     
     def get_user_stats(self, username):
-        """Calculer les statistiques d'un utilisateur"""
-        all_logs = self.get_all_users_logs()
-        if username not in all_logs:
-            return None
-        
-        logs = all_logs[username]
-        sessions = logs.get("sessions", [])
-        actions = logs.get("actions", [])
-        
-        # Calculer le temps total de connexion
-        total_seconds = sum(s.get("duration_seconds", 0) for s in sessions)
-        
-        # Compter les actions par type
-        action_counts = {}
-        for action in actions:
-            action_type = action.get("type", "UNKNOWN")
-            action_counts[action_type] = action_counts.get(action_type, 0) + 1
-        
-        # Dernière connexion
-        last_session = sessions[-1] if sessions else None
-        last_login = last_session.get("start") if last_session else None
+        """Statistiques d'un utilisateur : résumé des archives + journal courant"""
+        with self._lock:
+            state = self._users.get(username)
+            if state is None:
+                return None
+            sessions = state["sessions"]
+            action_counts = dict(state["action_counts"])
+            months = state["summary"].get("months", {})
+            
+            # Temps total de connexion et dernière connexion
+            total_sessions = len(sessions)
+            total_seconds = sum(s.get("duration_seconds", 0) for s in sessions)
+            last_login = sessions[-1].get("start") if sessions else None
+            for month in months.values():
+                total_sessions += month.get("sessions", 0)
+                total_seconds += month.get("total_seconds", 0)
+                for action_type, count in month.get("action_counts", {}).items():
+                    action_counts[action_type] = action_counts.get(action_type, 0) + count
+                if not sessions and month.get("last_login"):
+                    last_login = max([v for v in (last_login, month["last_login"]) if v])
+            
+            return {
+                "total_sessions": total_sessions,
+                "total_time_seconds": total_seconds,
+                "total_time_formatted": self._format_duration(total_seconds),
+                "total_actions": sum(action_counts.values()),
+                "action_counts": action_counts,
+                "last_login": last_login,
+                "archived_months": sorted(months, reverse=True)
+            }
+    
+    def get_archived_actions(self, username, month):
+        """Actions d'un mois archivé (AAAA-MM) : lecture de l'archive à la demande"""
+        import gzip
         
-        return {
-            "total_sessions": len(sessions),
-            "total_time_seconds": total_seconds,
-            "total_time_formatted": self._format_duration(total_seconds),
-            "total_actions": len(actions),
-            "action_counts": action_counts,
-            "last_login": last_login
-        }
+        archive = self._archive_dir(username) / f"{month}.jsonl.gz"
+        if not self.logs_dir or not archive.exists():
+            return []
+        actions = []
+        try:
+            with gzip.open(archive, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        actions.append(json.loads(line))
+        except Exception as e:
+            print(f"Erreur lecture archive {archive.name}: {e}")
+        return actions
 
 
 # Instance globale du logger
 activity_logger = ActivityLogger()
+
+# Périodes du filtre d'historique de l'onglet Sauron ("Tout" = journal non archivé,
+# soit au moins les 31 derniers jours : voir ActivityLogger.LIVE_DAYS)
+SAURON_PERIODS = ["Aujourd'hui", "Hier", "7 derniers jours", "30 derniers jours", "Tout"]
 EU_COUNTRIES = [
     "Belgique","Allemagne","France","Luxembourg","Pays-Bas",
 ]
@@ -580,6 +1001,60 @@ def init_default_data():
         }
         save_json(rights_path, default_rights)
 
+def resolve_user_rights(data_dir: Path, username: str) -> dict:
+    """Permissions d'un utilisateur d'après users_rights.json (union des droits de ses rôles)"""
+    rights = load_json(data_dir / "users_rights.json", {})
+    roles_def = rights.get("roles", {})
+    users_def = rights.get("users", {})
+
+    user_roles = users_def.get(username, ["viewer"])
+
+    permissions = {
+        "view_planning": False,
+        "edit_planning": False,
+        "view_drivers": False,
+        "manage_drivers": False,
+        "edit_driver_planning": False,
+        "manage_rights": False,
+        "manage_voyages": False,
+        "generate_planning": False,
+        "edit_past_planning": False,
+        "edit_past_planning_advanced": False,
+        "view_finance": False,
+        "manage_finance": False,
+        "view_analyse": False,
+        "view_sauron": False,
+        "send_announcements": False,
+        "manage_announcements_config": False,
+    }
+
+    for role_name in user_roles:
+        role = roles_def.get(role_name, {})
+        for k, v in role.items():
+            if v:
+                permissions[k] = True
+
+    return {"roles_def": roles_def, "users_def": users_def, "permissions": permissions}
+
+def load_voyages(data_dir: Path) -> list:
+    """Charger voyages.json en complétant les champs manquants (anciens formats inclus)"""
+    raw = load_json(data_dir / "voyages.json", [])
+    voyages = []
+    for v in raw:
+        if isinstance(v, str):
+            voyages.append({"code": v, "type": "LIVRAISON", "actif": True, "country": "Belgique", "duree": 60})
+        elif isinstance(v, dict):
+            voyages.append(
+                {
+                    "code": v.get("code", ""),
+                    "type": v.get("type", "LIVRAISON"),
+                    "actif": v.get("actif", True),
+                    "country": v.get("country", "Belgique"),
+                    "duree": v.get("duree", 60),
+                }
+            )
+    return voyages
+
 def get_week_folder(d: date) -> str:
     week = d.isocalendar()[1]
     return f"Semaine_{week:02d}"
@@ -640,11 +1115,23 @@ def parse_date_input(s: str) -> date:
 def format_date_internal(d: date) -> str:
     return d.strftime("%Y-%m-%d")
 
+_COUNTRY_ALIASES = {
+    "pays-bas": "Pays-Bas", "paysbas": "Pays-Bas", "pays bas": "Pays-Bas", "netherlands": "Pays-Bas",
+    "belgique": "Belgique", "belgium": "Belgique", "be": "Belgique",
+    "luxembourg": "Luxembourg", "lux": "Luxembourg", "lu": "Luxembourg",
+    "france": "France", "fr": "France",
+}
+
+def normalize_country(country: str) -> str:
+    """Nom de pays normalisé (Belgique, Pays-Bas, Luxembourg, France) ; inchangé si inconnu"""
+    return _COUNTRY_ALIASES.get((country or "").lower(), country)
+
 TIME_CHOICES = generate_time_choices()
 
 # ---------- Paramètres locaux ----------
 APP_NAME = "PTT"
-DEFAULT_SETTINGS = {"auto_refresh_enabled": True, "auto_refresh_seconds": 10}
+DEFAULT_SETTINGS = {"auto_refresh_enabled": True, "auto_refresh_seconds": 10,
+                    "perf_monitoring_enabled": True}
 
 def _settings_path() -> Path:
     base = os.getenv("LOCALAPPDATA") or os.getenv("APPDATA") or str(Path.home())
@@ -666,12 +1153,147 @@ def save_local_settings(data: dict) -> None:
     _settings_path().write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
 
 # =============================================================================
-# SYSTÈME DE CACHE LOCAL - Pré-téléchargement des plannings
+# MESURE DES PERFORMANCES - Temps et compteurs des chemins critiques
 # =============================================================================
 
-import threading
-import shutil
-import time as time_module
+class PerfMonitor:
+    """
+    Mesure légère des temps d'exécution (décorateur @timed ou bloc `with measure()`).
+    Conserve, par nom de mesure, le nombre d'appels et les durées cumulées/max,
+    ainsi que les N dernières mesures. Désactivé, le coût se limite à un test booléen.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.enabled = bool(load_local_settings().get("perf_monitoring_enabled", True))
+        self._lock = threading.Lock()
+        self.stats = {}                  # {nom: {"count", "total", "max", "last"}}
+        self.recent = deque(maxlen=200)  # [(datetime, nom, durée en secondes)]
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+        settings = load_local_settings()
+        settings["perf_monitoring_enabled"] = self.enabled
+        save_local_settings(settings)
+
+    def record(self, name, duration):
+        """Enregistrer une durée (en secondes) pour une mesure"""
+        with self._lock:
+            st = self.stats.get(name)
+            if st is None:
+                st = self.stats[name] = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+            st["count"] += 1
+            st["total"] += duration
+            st["last"] = duration
+            if duration > st["max"]:
+                st["max"] = duration
+            self.recent.append((datetime.now(), name, duration))
+
+    def measure(self, name):
+        """Context manager : `with perf_monitor.measure("nom"): ...`"""
+        return _PerfTimer(self, name)
+
+    def timed(self, name=None):
+        """Décorateur mesurant chaque appel de la fonction"""
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time_module.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(label, time_module.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def get_recent(self, n=30):
+        """Les n dernières mesures, la plus récente en premier"""
+        with self._lock:
+            return list(self.recent)[-n:][::-1]
+
+    def format_report(self, n_recent=50):
+        """Rapport texte : temps de démarrage, agrégats par mesure, dernières mesures"""
+        lines = [f"Rapport de performances PTT - {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}",
+                 f"Utilisateur : {getpass.getuser().upper()} | Mesure active : {'Oui' if self.enabled else 'Non'}",
+                 ""]
+
+        if _startup_timings:
+            lines.append("DÉMARRAGE")
+            lines.append("-" * 70)
+            for label, duration in _startup_timings:
+                lines.append(f"  {label:<50} {duration * 1000:10.1f} ms")
+            lines.append("")
+
+        lines.append("PAR MESURE")
+        lines.append("-" * 70)
+        lines.append(f"  {'Nom':<40} {'Appels':>7} {'Moy. ms':>9} {'Max ms':>9} {'Total ms':>10}")
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda x: x[1]["total"], reverse=True)
+            for name, st in items:
+                avg = st["total"] / st["count"] if st["count"] else 0
+                lines.append(f"  {name[:40]:<40} {st['count']:>7} {avg * 1000:>9.1f} "
+                             f"{st['max'] * 1000:>9.1f} {st['total'] * 1000:>10.1f}")
+        if not items:
+            lines.append("  (aucune mesure)")
+        lines.append("")
+
+        lines.append(f"DERNIÈRES MESURES ({n_recent})")
+        lines.append("-" * 70)
+        for when, name, duration in self.get_recent(n_recent):
+            lines.append(f"  {when.strftime('%H:%M:%S')}  {name[:45]:<45} {duration * 1000:10.1f} ms")
+        return "\n".join(lines)
+
+    def dump_report(self, path=None):
+        """Écrire le rapport dans un fichier (par défaut à côté des paramètres locaux)"""
+        if path is None:
+            path = _settings_path().parent / f"perf_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        path = Path(path)
+        path.write_text(self.format_report(n_recent=200), encoding="utf-8")
+        return path
+
+
+class _PerfTimer:
+    """Bloc mesuré par PerfMonitor.measure()"""
+
+    __slots__ = ("monitor", "name", "started")
+
+    def __init__(self, monitor, name):
+        self.monitor = monitor
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        if self.monitor.enabled:
+            self.started = time_module.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.started is not None:
+            self.monitor.record(self.name, time_module.perf_counter() - self.started)
+        return False
+
+
+# Instance globale
+perf_monitor = PerfMonitor()
+timed = perf_monitor.timed
+
+# =============================================================================
+# SYSTÈME DE CACHE LOCAL - Pré-téléchargement des plannings
+# =============================================================================
 
 class PlanningCache:
     """
@@ -718,6 +1340,9 @@ class PlanningCache:
         # Callback pour notifier l'UI
         self._on_cache_updated = None
 
+        # Ordonnanceur de l'application (remplace le thread si renseigné)
+        self._scheduler = None
+
     def _load_meta(self) -> dict:
         """Charger les métadonnées du cache"""
         try:
@@ -765,105 +1390,92 @@ class PlanningCache:
                             self._save_meta()
                 return False
 
-            # Calculer le timestamp le plus récent des fichiers source
-            source_files = list(source_dir.glob("*.json"))
-            if not source_files:
+            # Signatures des fichiers missions (voir scan_planning_day), prises AVANT la copie
+            signatures = scan_planning_day(d)
+            if not signatures:
                 return False
+            stored = {path: [mtime, size] for path, (mtime, size) in signatures.items()}
 
-            latest_source_mtime = max(f.stat().st_mtime for f in source_files)
-
-            # Vérifier si le cache est à jour
+            # Vérifier si le cache est à jour (mêmes fichiers, mêmes dates et tailles)
             with self._lock:
                 cached_info = self.cache_meta["dates"].get(date_str, {})
-                cached_mtime = cached_info.get("source_mtime", 0)
-
-                if cache_path.exists() and cached_mtime >= latest_source_mtime:
+                if cache_path.exists() and cached_info.get("signatures") == stored:
                     # Cache déjà à jour
                     return False
 
             # Créer/mettre à jour le cache
             cache_path.mkdir(parents=True, exist_ok=True)
 
-            # Copier tous les fichiers JSON
-            for src_file in source_files:
-                dst_file = cache_path / src_file.name
-                shutil.copy2(src_file, dst_file)
+            # Copier les fichiers missions et retirer ceux supprimés à la source
+            names = set()
+            for src in signatures:
+                src_file = Path(src)
+                names.add(src_file.name)
+                shutil.copy2(src_file, cache_path / src_file.name)
+            for cached_file in cache_path.glob("*.json"):
+                if cached_file.name not in names:
+                    cached_file.unlink()
 
             # Mettre à jour les métadonnées
             with self._lock:
                 self.cache_meta["dates"][date_str] = {
-                    "source_mtime": latest_source_mtime,
+                    "signatures": stored,
                     "cached_at": datetime.now().isoformat(),
-                    "file_count": len(source_files)
+                    "file_count": len(names)
                 }
                 self._save_meta()
 
-            print(f"[Cache] Date {date_str} mise en cache ({len(source_files)} fichiers)")
+            print(f"[Cache] Date {date_str} mise en cache ({len(names)} fichiers)")
             return True
 
         except Exception as e:
             print(f"[Cache] Erreur mise en cache {date_str}: {e}")
             return False
 
-    def get_cached_planning(self, d: date) -> list:
+    def get_cached_planning(self, d: date, signatures=None) -> list:
         """
         Récupérer le planning depuis le cache.
         Retourne None si pas en cache ou si les fichiers source ont changé.
-        Vérifie TOUJOURS les timestamps source pour détecter les modifications
-        faites par d'autres utilisateurs.
+        Vérifie TOUJOURS les signatures des fichiers source (scan_planning_day,
+        ou `signatures` si l'appelant vient de les prendre) : un fichier ajouté,
+        modifié ou supprimé par un autre utilisateur invalide le cache.
+        Seuls les fichiers de ces signatures sont lus.
         """
         cache_path = self._get_cache_path(d)
         date_str = d.strftime("%Y-%m-%d")
-        source_dir = self._get_source_path(d)
 
         with self._lock:
             if date_str not in self.cache_meta["dates"]:
                 return None
             if not cache_path.exists():
                 return None
-            cached_info = self.cache_meta["dates"].get(date_str, {})
-            cached_mtime = cached_info.get("source_mtime", 0)
+            stored = self.cache_meta["dates"][date_str].get("signatures")
 
         # IMPORTANT: Vérifier si les fichiers source ont changé
         # (détecte les modifications faites par d'autres utilisateurs)
-        try:
-            if source_dir.exists():
-                source_files = list(source_dir.glob("*.json"))
-                if source_files:
-                    latest_source_mtime = max(f.stat().st_mtime for f in source_files)
-                    # Si les fichiers source ont été modifiés depuis la mise en cache
-                    if latest_source_mtime > cached_mtime:
-                        print(f"[Cache] Fichiers source modifiés pour {date_str}, invalidation du cache")
-                        # Invalider le cache et forcer la mise à jour
-                        with self._lock:
-                            if date_str in self.cache_meta["dates"]:
-                                del self.cache_meta["dates"][date_str]
-                                self._save_meta()
-                        self.prioritize_date(d)
-                        return None  # Forcer rechargement depuis source
-
-                    # Vérifier aussi si le nombre de fichiers a changé
-                    cached_file_count = cached_info.get("file_count", 0)
-                    if len(source_files) != cached_file_count:
-                        print(f"[Cache] Nombre de fichiers changé pour {date_str}, invalidation du cache")
-                        with self._lock:
-                            if date_str in self.cache_meta["dates"]:
-                                del self.cache_meta["dates"][date_str]
-                                self._save_meta()
-                        self.prioritize_date(d)
-                        return None
-        except Exception as e:
-            print(f"[Cache] Erreur vérification source {date_str}: {e}")
-            # En cas d'erreur, on utilise quand même le cache
-            pass
+        if signatures is None:
+            signatures = scan_planning_day(d)
+        current = {path: [mtime, size] for path, (mtime, size) in signatures.items()}
+        if current != stored:
+            print(f"[Cache] Fichiers source modifiés pour {date_str}, invalidation du cache")
+            # Invalider le cache et forcer la mise à jour
+            with self._lock:
+                if date_str in self.cache_meta["dates"]:
+                    del self.cache_meta["dates"][date_str]
+                    self._save_meta()
+            self.prioritize_date(d)
+            return None  # Forcer rechargement depuis source
 
         try:
             missions = []
-            for file in cache_path.glob("*.json"):
-                data = load_json(file, None)
+            for source in current:
+                source_path = Path(source)
+                cached_file = cache_path / source_path.name
+                if not cached_file.exists():
+                    return None  # Copie locale manquante : relire la source
+                data = load_json(cached_file, None)
                 if data:
                     # Stocker le chemin original (pas le cache)
-                    source_path = self._get_source_path(d) / file.name
                     data["_path"] = source_path.as_posix()
                     missions.append(data)
             return missions
@@ -882,6 +1494,8 @@ class PlanningCache:
         with self._lock:
             if d not in self._priority_dates:
                 self._priority_dates.insert(0, d)
+        if self._scheduler is not None:
+            self._scheduler.trigger("cache")
 
     def _get_dates_to_cache(self) -> list:
         """Obtenir la liste des dates à mettre en cache"""
@@ -902,33 +1516,54 @@ class PlanningCache:
 
         return dates
 
+    def run_cycle(self) -> bool:
+        """
+        Un cycle de mise en cache (dates prioritaires puis dates proches).
+        Retourne True si au moins une date a été mise à jour.
+        Appelé par le thread de fond ou par le RefreshScheduler (hors thread Tk).
+        """
+        updated = False
+        try:
+            for d in self._get_dates_to_cache():
+                if self._stop_event.is_set():
+                    break
+
+                if self._cache_date(d):
+                    updated = True
+                    # Petite pause entre chaque date pour ne pas surcharger
+                    time_module.sleep(0.5)
+        except Exception as e:
+            print(f"[Cache] Erreur cycle cache: {e}")
+        return updated
+
+    def attach_to_scheduler(self, scheduler, on_cache_updated=None):
+        """
+        Confier les cycles de cache à l'ordonnanceur de l'application au lieu
+        d'un thread dédié. on_cache_updated est appelé sur le thread Tk.
+        """
+        self._scheduler = scheduler
+        self._stop_event.clear()
+        scheduler.add_job(
+            "cache", self.refresh_interval,
+            check=self.run_cycle,
+            apply=(lambda _updated: on_cache_updated()) if on_cache_updated else None,
+            respect_editing=False,
+        )
+        print("[Cache] Système de cache confié à l'ordonnanceur")
+
     def _background_cache_loop(self):
         """Boucle de fond pour mettre en cache les plannings"""
         print("[Cache] Thread de cache démarré")
 
         while not self._stop_event.is_set():
-            try:
-                dates_to_cache = self._get_dates_to_cache()
-                updated = False
-
-                for d in dates_to_cache:
-                    if self._stop_event.is_set():
-                        break
-
-                    if self._cache_date(d):
-                        updated = True
-                        # Petite pause entre chaque date pour ne pas surcharger
-                        time_module.sleep(0.5)
+            updated = self.run_cycle()
 
-                # Notifier l'UI si du nouveau contenu est disponible
-                if updated and self._on_cache_updated:
-                    try:
-                        self._on_cache_updated()
-                    except Exception:
-                        pass
-
-            except Exception as e:
-                print(f"[Cache] Erreur boucle cache: {e}")
+            # Notifier l'UI si du nouveau contenu est disponible
+            if updated and self._on_cache_updated:
+                try:
+                    self._on_cache_updated()
+                except Exception:
+                    pass
 
             # Attendre avant le prochain cycle
             self._stop_event.wait(self.refresh_interval)
@@ -949,6 +1584,8 @@ class PlanningCache:
     def stop(self):
         """Arrêter le système de cache"""
         self._stop_event.set()
+        if self._scheduler is not None:
+            self._scheduler.set_enabled("cache", False)
         if self._cache_thread is not None:
             self._cache_thread.join(timeout=2)
         print("[Cache] Système de cache arrêté")
@@ -984,6 +1621,14 @@ class PlanningCache:
             except Exception as e:
                 print(f"[Cache] Erreur suppression cache: {e}")
 
+    def rebuild(self, dates) -> int:
+        """Remettre en cache une liste de dates (mode ligne de commande) ; retourne le nombre mis à jour"""
+        updated = 0
+        for d in dates:
+            if self._cache_date(d):
+                updated += 1
+        return updated
+
     def get_cache_status(self) -> dict:
         """Obtenir le statut du cache pour l'affichage"""
         with self._lock:
@@ -991,7 +1636,8 @@ class PlanningCache:
                 "cached_dates": len(self.cache_meta["dates"]),
                 "dates": list(self.cache_meta["dates"].keys()),
                 "cache_dir": str(self.cache_dir),
-                "running": self._cache_thread is not None and self._cache_thread.is_alive()
+                "running": (self._cache_thread is not None and self._cache_thread.is_alive())
+                           or (self._scheduler is not None and not self._stop_event.is_set())
             }
 
     def clear_old_cache(self, max_age_days: int = 30):
@@ -1023,56 +1669,1788 @@ class PlanningCache:
 planning_cache = PlanningCache()
 
 
-class _AutoRefresher:
-    def __init__(self, root: tk.Misc, refresh_callable):
-        self.root = root
-        self.refresh_callable = refresh_callable
-        self.settings = load_local_settings()
-        self._after_id = None
-        self.is_user_active = False
-        self.last_activity = datetime.now()
-        self.start()
+class PlanningLoadCancelled(Exception):
+    """Chargement de journée abandonné car remplacé par une demande plus récente"""
 
-    def start(self):
-        self.cancel()
-        if self.settings.get("auto_refresh_enabled", True):
-            delay_ms = max(1, int(self.settings.get("auto_refresh_seconds", 10))) * 1000
-            self._after_id = self.root.after(delay_ms, self._tick)
 
-    def cancel(self):
-        if self._after_id is not None:
-            try:
-                self.root.after_cancel(self._after_id)
-            except Exception:
-                pass
-            self._after_id = None
+def scan_planning_day(d: date) -> dict:
+    """
+    Signatures des fichiers missions d'une journée : {chemin: (mtime_ns, taille)}.
+    Les fichiers de métadonnées (commençant par _) sont ignorés.
+    """
+    signatures = {}
+    day_dir = get_planning_day_dir(d)
+    try:
+        with os.scandir(day_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json") or entry.name.startswith("_"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                signatures[Path(entry.path).as_posix()] = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        pass
+    return signatures
 
-    def _tick(self):
-        try:
-            if not self.is_user_active:
-                self.refresh_callable()
-        finally:
-            self.start()
 
-    def force_now(self):
-        self.refresh_callable()
+def read_planning_day(d: date, force_source=False, is_cancelled=None):
+    """
+    Lire les missions d'une journée (cache local puis OneDrive), sans aucune
+    opération Tk : peut être exécuté dans un thread de travail.
+
+    Retourne un dict {"missions": [...], "source": "cache" | "source" | "absent",
+    "signatures": {...}} ; les signatures (voir scan_planning_day) sont prises
+    AVANT la lecture, pour qu'une modification concurrente soit détectée au
+    prochain rafraîchissement.
+    `is_cancelled()` est consulté entre les fichiers ; s'il renvoie True, la
+    lecture est abandonnée (PlanningLoadCancelled).
+    """
+    is_cancelled = is_cancelled or (lambda: False)
+    signatures = scan_planning_day(d)
+
+    # 1. Essayer d'abord le cache local (rapide)
+    if not force_source:
+        # Le cache n'est servi que s'il correspond exactement à ces signatures
+        cached_missions = planning_cache.get_cached_planning(d, signatures)
+        if cached_missions is not None:
+            missions = [m for m in cached_missions if m and isinstance(m, dict) and "id" in m]
+            return {"missions": missions, "source": "cache", "signatures": signatures}
+
+    # 2. Charger depuis la source (OneDrive)
+    day_dir = get_planning_day_dir(d)
+    if not day_dir.exists():
+        return {"missions": [], "source": "absent", "signatures": {}}
+
+    missions = []
+    for file in day_dir.glob("*.json"):
+        if is_cancelled():
+            raise PlanningLoadCancelled(d)
+        # Ignorer les fichiers de métadonnées (commençant par _)
+        if file.name.startswith("_"):
+            continue
+        data = load_json(file, None)
+        if not data or not isinstance(data, dict) or "id" not in data:
+            continue
+        data["_path"] = file.as_posix()
+        missions.append(data)
+    return {"missions": missions, "source": "source", "signatures": signatures}
 
-    def set_user_active(self, active: bool):
-        self.is_user_active = active
-        if active:
-            self.last_activity = datetime.now()
 
-    def apply(self, enabled: bool, seconds: int):
-        self.settings["auto_refresh_enabled"] = bool(enabled)
-        self.settings["auto_refresh_seconds"] = max(1, int(seconds))
-        save_local_settings(self.settings)
-        self.start()
+# =============================================================================
+# INDEX D'INTERVALLES DU JOUR - Doublons de livraison et chevauchements chauffeur
+# =============================================================================
 
-def install_setup_menu(root: tk.Tk, menubar: tk.Menu, refresh_callable):
-    refresher = _AutoRefresher(root, refresh_callable)
 
-    setup_menu = tk.Menu(menubar, tearoff=0)
-    menubar.add_cascade(label="Setup", menu=setup_menu)
+def heure_to_minutes(heure, default=None):
+    """Convertir "HH:MM" en minutes depuis minuit (default si illisible)"""
+    try:
+        h, m = map(int, str(heure).split(":"))
+        return h * 60 + m
+    except (ValueError, AttributeError):
+        return default
+
+
+class DayIntervalIndex:
+    """
+    Index des missions d'une journée, trié par minute de début :
+      - par voyage (livraisons uniquement) : détection des doublons ;
+      - par chauffeur, avec la durée du voyage : détection des chevauchements.
+
+    Les requêtes se font par dichotomie (bisect) ; l'index est reconstruit au
+    chargement du jour et mis à jour mission par mission à chaque sauvegarde.
+    """
+
+    DEFAULT_DURATION = 60  # minutes, comme le Gantt quand le voyage n'a pas de durée
+
+    def __init__(self, missions=(), voyages=()):
+        self.date = None          # Journée indexée (renseignée par l'appelant)
+        self.voyages = voyages
+        self.durations = {v.get("code"): v.get("duree", self.DEFAULT_DURATION) for v in voyages}
+        self._by_voyage = {}      # {voyage: [(début, id)]}
+        self._by_driver = {}      # {chauffeur: [(début, fin, id)]}
+        self._max_duration = {}   # {chauffeur: durée max} pour borner la recherche
+        self._missions = {}       # {id: (mission, début, fin)} tel qu'indexé
+        for m in missions:
+            self.add(m)
+
+    # ----- Construction -----
+
+    def _interval(self, mission):
+        start = heure_to_minutes(mission.get("heure"))
+        if start is None:
+            return None
+        try:
+            duration = int(self.durations.get(mission.get("voyage", ""), self.DEFAULT_DURATION) or 0)
+        except (TypeError, ValueError):
+            duration = self.DEFAULT_DURATION
+        return start, start + max(duration, 1)
+
+    @staticmethod
+    def driver_key(mission):
+        """Chauffeur de la mission (None si sans chauffeur)"""
+        if mission.get("sans_chauffeur", False):
+            return None
+        return mission.get("chauffeur_nom") or None
+
+    def add(self, mission):
+        mid = mission.get("id")
+        if not mid:
+            return
+        if mid in self._missions:
+            self.remove(mid)
+        interval = self._interval(mission)
+        if interval is None:
+            return
+        start, end = interval
+        self._missions[mid] = (mission, start, end)
+
+        if mission.get("type") == "LIVRAISON" and mission.get("voyage"):
+            bisect.insort(self._by_voyage.setdefault(mission["voyage"], []), (start, mid))
+
+        driver = self.driver_key(mission)
+        if driver:
+            bisect.insort(self._by_driver.setdefault(driver, []), (start, end, mid))
+            self._max_duration[driver] = max(self._max_duration.get(driver, 0), end - start)
+
+    def remove(self, mission_id):
+        indexed = self._missions.pop(mission_id, None)
+        if indexed is None:
+            return
+        mission, start, end = indexed
+        for entries, key in ((self._by_voyage.get(mission.get("voyage")), (start, mission_id)),
+                             (self._by_driver.get(self.driver_key(mission)), (start, end, mission_id))):
+            if entries:
+                pos = bisect.bisect_left(entries, key)
+                if pos < len(entries) and entries[pos] == key:
+                    entries.pop(pos)
+
+    # ----- Requêtes -----
+
+    def nearest_delivery(self, voyage_code, minute, window=120, exclude_id=None):
+        """Livraison du même voyage la plus proche de `minute`, à moins de `window`
+        minutes ; retourne (mission, écart en minutes) ou None."""
+        entries = self._by_voyage.get(voyage_code, [])
+        lo = bisect.bisect_left(entries, (minute - window + 1, ""))
+        hi = bisect.bisect_left(entries, (minute + window, ""))
+        best = None
+        for start, mid in entries[lo:hi]:
+            if mid == exclude_id:
+                continue
+            gap = abs(start - minute)
+            if best is None or gap < best[1]:
+                best = (self._missions[mid][0], gap)
+        return best
+
+    def driver_overlaps(self, driver, start, end, exclude_id=None):
+        """Missions du chauffeur dont l'intervalle [début, fin[ chevauche [start, end["""
+        entries = self._by_driver.get(driver, [])
+        # Seules les missions commencées avant `end` et après `start - durée max` peuvent chevaucher
+        lo = bisect.bisect_left(entries, (start - self._max_duration.get(driver, 0),))
+        hi = bisect.bisect_left(entries, (end,))
+        return [self._missions[mid][0] for s, e, mid in entries[lo:hi]
+                if e > start and mid != exclude_id]
+
+    def mission_overlaps(self, mission, exclude_self=True):
+        """Chevauchements du chauffeur d'une mission (indexée ou non)"""
+        driver = self.driver_key(mission)
+        interval = self._interval(mission)
+        if not driver or interval is None:
+            return []
+        return self.driver_overlaps(driver, interval[0], interval[1],
+                                    exclude_id=mission.get("id") if exclude_self else None)
+
+    def conflicting_ids(self):
+        """Ids de toutes les missions impliquées dans un chevauchement chauffeur"""
+        conflicts = set()
+        for entries in self._by_driver.values():
+            running_end, running_id = None, None
+            for start, end, mid in entries:
+                if running_end is not None and start < running_end:
+                    conflicts.add(mid)
+                    conflicts.add(running_id)
+                if running_end is None or end > running_end:
+                    running_end, running_id = end, mid
+        return conflicts
+
+
+# =============================================================================
+# INDEX DE PRÉFIXES - Autocomplétion des listes (voyages, chauffeurs, SST)
+# =============================================================================
+
+
+def fold_text(text) -> str:
+    """Majuscules sans accents, pour comparer les saisies ("é" == "E")"""
+    text = unicodedata.normalize("NFKD", str(text).upper())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+class PrefixIndex:
+    """
+    Index de préfixes sur une liste de valeurs : clés pré-calculées (majuscules,
+    accents repliés) triées une fois, puis recherche par dichotomie.
+    Les résultats conservent l'ordre de la liste d'origine.
+    """
+
+    def __init__(self, values, fold_accents=True):
+        self.values = values
+        self.fold = fold_text if fold_accents else (lambda v: str(v).upper())
+        self._keys = sorted((self.fold(v), pos) for pos, v in enumerate(values))
+
+    def search(self, prefix, limit=None):
+        """Valeurs commençant par `prefix` (au plus `limit`)"""
+        if not prefix:
+            return list(self.values[:limit] if limit else self.values)
+        key = self.fold(prefix)
+        lo = bisect.bisect_left(self._keys, (key,))
+        hi = bisect.bisect_left(self._keys, (key + "\uffff",))
+        positions = sorted(pos for _, pos in self._keys[lo:hi])
+        if limit:
+            positions = positions[:limit]
+        return [self.values[pos] for pos in positions]
+
+
+# =============================================================================
+# MOTEUR FINANCIER - Forfaits SST et revenus palettes sur une période
+# =============================================================================
+
+class DayMissionStore:
+    """
+    Missions par journée, gardées en mémoire et partagées entre la finance,
+    l'analyse et la ligne de commande. Une journée n'est relue que si ses
+    fichiers ont changé (signatures de scan_planning_day).
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._lock = threading.Lock()
+        self._days = {}  # {date: (signatures, missions)}
+
+    def get(self, d: date) -> list:
+        """Missions de la journée `d` (liste partagée : ne pas la modifier)"""
+        signatures = scan_planning_day(d)
+        with self._lock:
+            cached = self._days.get(d)
+        if cached is not None and cached[0] == signatures:
+            return cached[1]
+        missions = read_planning_day(d, force_source=True)["missions"] if signatures else []
+        with self._lock:
+            self._days[d] = (signatures, missions)
+        return missions
+
+    def invalidate(self, d: date = None):
+        with self._lock:
+            if d is None:
+                self._days.clear()
+            else:
+                self._days.pop(d, None)
+
+
+day_store = DayMissionStore()
+
+
+def mission_country(voyage_code, v_by_code) -> str:
+    """Pays d'une mission : celui du voyage (normalisé), sinon deviné d'après le code"""
+    voyage = v_by_code.get(voyage_code)
+    if voyage:
+        return normalize_country(voyage.get("country", "Belgique"))
+    code = (voyage_code or "").upper()
+    if code.startswith("P-B"):
+        return "Pays-Bas"
+    if code.startswith("RES") or code.startswith("ALV"):
+        return "Luxembourg"
+    return "Belgique"
+
+
+def _nb_pal(mission) -> int:
+    try:
+        return int(mission.get("nb_pal", 0) or 0)
+    except (ValueError, TypeError):
+        return 0
+
+
+class FinanceEngine:
+    """
+    Calcul financier d'une journée ou d'une période :
+      - revenus = palettes livrées/ramassées × revenu par palette du pays ;
+      - coûts   = 1 forfait par chauffeur et par jour et par SST, au tarif le
+                  plus élevé des pays où il a roulé ce jour-là.
+    Les tarifs et revenus "en vigueur" (dernière date <= jour) sont recherchés
+    par dichotomie puis mémorisés. Les résultats sont des dicts, utilisables
+    par l'interface, les exports et la ligne de commande.
+    """
+
+    def __init__(self, voyages, tarifs_sst, revenus_palettes):
+        self.v_by_code = {v.get("code", ""): v for v in voyages}
+        self.tarifs_sst = tarifs_sst or {}
+        self.revenus = revenus_palettes or {}
+        self._revenus_dates = sorted(self.revenus.keys())
+        self._tarif_dates = {}
+        self._memo = {}
+
+    # ----- Barèmes -----
+
+    def tarif(self, sst, country, date_str) -> float:
+        """Forfait journalier d'un chauffeur du SST dans ce pays"""
+        key = ("tarif", sst, country, date_str)
+        if key not in self._memo:
+            tarifs = self.tarifs_sst.get(sst, {}).get(country)
+            value = 0
+            if tarifs:
+                value = tarifs.get(date_str, 0)
+                if value == 0:
+                    dates = self._tarif_dates.get((sst, country))
+                    if dates is None:
+                        dates = self._tarif_dates[(sst, country)] = sorted(tarifs.keys())
+                    pos = bisect.bisect_right(dates, date_str)
+                    if pos:
+                        value = tarifs[dates[pos - 1]]
+            self._memo[key] = value
+        return self._memo[key]
+
+    def _rates_at(self, entry, country):
+        if country in entry:
+            return entry[country].get("livraison", 0), entry[country].get("ramasse", 0)
+        if "livraison" in entry:  # Ancien format : mêmes revenus pour tous les pays
+            return entry.get("livraison", 0), entry.get("ramasse", 0)
+        return 0, 0
+
+    def revenue_rates(self, country, date_str):
+        """(revenu par palette livrée, par palette ramassée) en vigueur ce jour"""
+        key = ("revenus", country, date_str)
+        if key not in self._memo:
+            rates = self._rates_at(self.revenus.get(date_str, {}), country)
+            if rates == (0, 0):
+                # Dernière date antérieure ayant des revenus non nuls pour ce pays
+                pos = bisect.bisect_right(self._revenus_dates, date_str)
+                for dt in reversed(self._revenus_dates[:pos]):
+                    candidate = self._rates_at(self.revenus[dt], country)
+                    if candidate[0] > 0 or candidate[1] > 0:
+                        rates = candidate
+                        break
+            self._memo[key] = rates
+        return self._memo[key]
+
+    # ----- Calculs -----
+
+    def compute_day(self, d: date, missions) -> dict:
+        date_str = format_date_internal(d)
+        pal_by_country = {}
+        sst_drivers_by_country = {}  # {sst: {pays: set(chauffeurs)}}
+        unique_drivers = set()
+        missions_with_sst = 0
+
+        for mission in missions:
+            country = mission_country(mission.get("voyage", ""), self.v_by_code)
+            pal = pal_by_country.setdefault(country, {"pal_liv": 0, "pal_ram": 0})
+            if mission.get("type") == "LIVRAISON":
+                pal["pal_liv"] += _nb_pal(mission)
+            else:
+                pal["pal_ram"] += _nb_pal(mission)
+
+            sst = (mission.get("sst") or "").strip()
+            chauffeur = (mission.get("chauffeur_nom", mission.get("chauffeur", "")) or "").strip()
+            if chauffeur:
+                unique_drivers.add(chauffeur)
+            if sst:
+                missions_with_sst += 1
+                drivers = sst_drivers_by_country.setdefault(sst, {}).setdefault(country, set())
+                # Un chauffeur = 1 forfait, même s'il fait plusieurs missions ;
+                # les missions sans chauffeur ne coûtent rien
+                if chauffeur:
+                    drivers.add(chauffeur)
+
+        revenue_by_country = {}
+        total_revenus = 0
+        for country, pal in pal_by_country.items():
+            rev_liv, rev_ram = self.revenue_rates(country, date_str)
+            detail = {
+                "pal_liv": pal["pal_liv"], "pal_ram": pal["pal_ram"],
+                "rev_liv": rev_liv, "rev_ram": rev_ram,
+                "rev_liv_total": pal["pal_liv"] * rev_liv,
+                "rev_ram_total": pal["pal_ram"] * rev_ram,
+            }
+            detail["total"] = detail["rev_liv_total"] + detail["rev_ram_total"]
+            revenue_by_country[country] = detail
+            total_revenus += detail["total"]
+
+        sst_costs = {}
+        total_costs = 0
+        total_drivers = 0
+        for sst in sorted(sst_drivers_by_country.keys()):
+            # Chaque chauffeur est compté une fois, au tarif max parmi ses pays du jour
+            driver_max_tarif = {}
+            for country, drivers in sst_drivers_by_country[sst].items():
+                tarif = self.tarif(sst, country, date_str)
+                for driver in drivers:
+                    if driver not in driver_max_tarif or tarif > driver_max_tarif[driver][1]:
+                        driver_max_tarif[driver] = (country, tarif)
+            if not driver_max_tarif:
+                continue
+
+            countries = {}
+            for driver, (country, tarif) in driver_max_tarif.items():
+                entry = countries.setdefault(country, {"drivers": [], "tarif": tarif, "cost": 0})
+                entry["drivers"].append(driver)
+                entry["cost"] += tarif
+            for entry in countries.values():
+                entry["drivers"].sort()
+
+            cost = sum(entry["cost"] for entry in countries.values())
+            sst_costs[sst] = {
+                "countries": dict(sorted(countries.items())),
+                "total_drivers": len(driver_max_tarif),
+                "total_cost": cost,
+            }
+            total_costs += cost
+            total_drivers += len(driver_max_tarif)
+
+        return {
+            "date": d,
+            "missions": len(missions),
+            "missions_with_sst": missions_with_sst,
+            "unique_drivers": len(unique_drivers),
+            "has_sst_missions": bool(sst_drivers_by_country),
+            "revenue_by_country": revenue_by_country,
+            "total_revenus": total_revenus,
+            "sst": sst_costs,
+            "total_costs": total_costs,
+            "total_drivers": total_drivers,
+            "marge": total_revenus - total_costs,
+        }
+
+    def compute_range(self, start: date, end: date, load_day=None) -> dict:
+        """
+        Calcul sur [start, end] en une passe. `load_day(d)` fournit les missions
+        d'une journée (par défaut les résumés mensuels planning_rollups, qui ne
+        relisent que les journées modifiées).
+        Retourne {"days": [résultats par jour], "totals": {...}}.
+        """
+        if load_day is None:
+            planning_rollups.refresh([start + timedelta(days=i) for i in range((end - start).days + 1)])
+            load_day = lambda d: planning_rollups.day_missions(d, validate=False)
+        days = []
+        totals = {
+            "start": start, "end": end, "days_with_missions": 0, "missions": 0,
+            "total_revenus": 0, "total_costs": 0, "marge": 0,
+            "revenue_by_country": {},
+            "sst": {},  # {sst: {"driver_days", "total_cost", "countries": {pays: {"driver_days", "cost"}}}}
+        }
+        d = start
+        while d <= end:
+            missions = load_day(d)
+            if missions:
+                day = self.compute_day(d, missions)
+                days.append(day)
+                totals["days_with_missions"] += 1
+                totals["missions"] += day["missions"]
+                totals["total_revenus"] += day["total_revenus"]
+                totals["total_costs"] += day["total_costs"]
+                for country, detail in day["revenue_by_country"].items():
+                    acc = totals["revenue_by_country"].setdefault(
+                        country, {"pal_liv": 0, "pal_ram": 0, "rev_liv_total": 0, "rev_ram_total": 0, "total": 0})
+                    for k in acc:
+                        acc[k] += detail[k]
+                for sst, detail in day["sst"].items():
+                    acc = totals["sst"].setdefault(sst, {"driver_days": 0, "total_cost": 0, "countries": {}})
+                    acc["driver_days"] += detail["total_drivers"]
+                    acc["total_cost"] += detail["total_cost"]
+                    for country, entry in detail["countries"].items():
+                        c_acc = acc["countries"].setdefault(country, {"driver_days": 0, "cost": 0})
+                        c_acc["driver_days"] += len(entry["drivers"])
+                        c_acc["cost"] += entry["cost"]
+            d += timedelta(days=1)
+        totals["marge"] = totals["total_revenus"] - totals["total_costs"]
+        return {"days": days, "totals": totals}
+
+
+def format_finance_day(result) -> str:
+    """Rapport texte d'une journée (onglet Finance, ligne de commande)"""
+    d = result["date"]
+    text = f"📊 ANALYSE FINANCIÈRE - {format_date_display(d)}\n"
+    text += "=" * 70 + "\n"
+    text += f"Missions totales: {result['missions']} | "
+    text += f"Avec SST: {result['missions_with_sst']} | "
+    text += f"Chauffeurs uniques: {result['unique_drivers']}\n\n"
+
+    for country, detail in result["revenue_by_country"].items():
+        text += f"\n{country}:\n"
+        text += f"  Livraisons : {detail['pal_liv']} pal × {detail['rev_liv']:.2f} € = {detail['rev_liv_total']:,.2f} €\n"
+        text += f"  Ramasses   : {detail['pal_ram']} pal × {detail['rev_ram']:.2f} € = {detail['rev_ram_total']:,.2f} €\n"
+        text += f"  Sous-total : {detail['total']:,.2f} €\n"
+    text += f"\nTOTAL REVENUS : {result['total_revenus']:,.2f} €\n\n"
+
+    text += "💶 COÛTS SST:\n"
+    text += "-" * 70 + "\n"
+    if result["sst"]:
+        for sst, data in result["sst"].items():
+            text += f"\nSST: {sst}\n"
+            for country, entry in data["countries"].items():
+                nb = len(entry["drivers"])
+                text += f"  {country}: {nb} chauffeur(s) × {entry['tarif']:.2f} € = {entry['cost']:,.2f} €\n"
+                text += f"    → {', '.join(entry['drivers'])}\n"
+            text += f"  Total SST {sst}: {data['total_drivers']} chauffeur(s) = {data['total_cost']:,.2f} €\n"
+        text += "\n" + "=" * 70 + "\n"
+        text += f"TOTAL: {len(result['sst'])} SST utilisé(s), {result['total_drivers']} chauffeur(s) utilisé(s)\n"
+        text += f"TOTAL COÛTS : {result['total_costs']:,.2f} €\n\n"
+    elif result["has_sst_missions"]:
+        text += "\n  Aucun chauffeur assigné pour cette date\n"
+        text += "  Vérifiez que:\n"
+        text += "  • Les missions ont un SST défini\n"
+        text += "  • Les chauffeurs sont assignés aux missions\n"
+        text += "  • Les tarifs SST sont définis\n\n"
+    else:
+        text += "\n  Aucune mission avec SST pour cette date\n\n"
+
+    text += "📈 RÉSULTAT:\n"
+    text += "-" * 70 + "\n"
+    marge = result["marge"]
+    pct = (marge / result["total_revenus"] * 100) if result["total_revenus"] > 0 else 0
+    if marge >= 0:
+        text += f"MARGE : +{marge:,.2f} € ({pct:.1f}%)\n"
+    else:
+        text += f"PERTE : {marge:,.2f} € ({pct:.1f}%)\n"
+    return text
+
+
+def format_finance_range(result) -> str:
+    """Rapport texte d'une période : une ligne par jour puis les totaux"""
+    totals = result["totals"]
+    text = (f"📊 FINANCE du {format_date_display(totals['start'])} au {format_date_display(totals['end'])}\n"
+            + "=" * 70 + "\n")
+    for day in result["days"]:
+        text += (f"{format_date_display(day['date'])}  {day['missions']:>4} missions  "
+                 f"revenus {day['total_revenus']:>11,.2f} €  coûts {day['total_costs']:>11,.2f} €  "
+                 f"marge {day['marge']:>11,.2f} €\n")
+    text += "\n💶 COÛTS SST (jours-chauffeur):\n" + "-" * 70 + "\n"
+    for sst in sorted(totals["sst"]):
+        data = totals["sst"][sst]
+        text += f"{sst}: {data['driver_days']} jour(s)-chauffeur = {data['total_cost']:,.2f} €\n"
+        for country, entry in sorted(data["countries"].items()):
+            text += f"    {country}: {entry['driver_days']} jour(s)-chauffeur = {entry['cost']:,.2f} €\n"
+    text += "\n💰 REVENUS PAR PAYS:\n" + "-" * 70 + "\n"
+    for country, entry in sorted(totals["revenue_by_country"].items()):
+        text += (f"{country}: {entry['pal_liv']} pal liv. + {entry['pal_ram']} pal ram. "
+                 f"= {entry['total']:,.2f} €\n")
+    text += "\n" + "=" * 70 + "\n"
+    text += (f"{totals['days_with_missions']} jour(s), {totals['missions']} mission(s) | "
+             f"REVENUS {totals['total_revenus']:,.2f} € | COÛTS {totals['total_costs']:,.2f} € | "
+             f"MARGE {totals['marge']:,.2f} €\n")
+    return text
+
+
+class AnalyticsPipeline:
+    """
+    Données d'analyse partagées par l'onglet Analyse, l'Analyse avancée et leurs
+    exports : chaque journée est lue une fois (résumés mensuels planning_rollups)
+    puis convertie en lignes "mission enrichie" avec les règles du moteur financier :
+      - pays du voyage (mission_country), revenus = palettes × revenu en vigueur ;
+      - coût = 1 forfait par chauffeur, jour et SST au tarif le plus élevé de ses
+        pays du jour, réparti à parts égales entre ses missions.
+    Les lignes sont mémorisées par journée tant que ses fichiers et les
+    référentiels (voyages, tarifs, revenus) sont inchangés.
+    """
+
+    MAX_RESULTS = 8  # Agrégats mémorisés (période × filtres)
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._lock = threading.Lock()
+        self._ref_key = None
+        self.engine = FinanceEngine([], {}, {})
+        self._days = {}     # {date: (missions de planning_rollups, lignes)}
+        self._results = {}  # {(début, fin, filtres): (missions des jours, données)}
+
+    def configure(self, voyages, tarifs_sst, revenus_palettes):
+        """Référentiels courants ; les caches sont vidés s'ils ont changé"""
+        ref_key = hash(json.dumps([[(v.get("code"), v.get("country")) for v in voyages],
+                                   tarifs_sst, revenus_palettes], sort_keys=True, default=str))
+        with self._lock:
+            if ref_key != self._ref_key:
+                self._ref_key = ref_key
+                self.engine = FinanceEngine(voyages, tarifs_sst, revenus_palettes)
+                self._days.clear()
+                self._results.clear()
+        return self
+
+    # ----- Journées -----
+
+    def day_rows(self, d: date, validate=True) -> list:
+        """Missions enrichies de la journée `d` (liste partagée : ne pas la modifier)"""
+        missions = planning_rollups.day_missions(d, validate=validate)
+        cached = self._days.get(d)
+        if cached is not None and cached[0] is missions:
+            return cached[1]
+
+        engine = self.engine
+        date_str = format_date_internal(d)
+        rows = []
+        driver_rows = {}  # {(sst, chauffeur): [lignes]}
+        for mission in missions:
+            # Même règle que FinanceEngine.compute_day : tout ce qui n'est pas une livraison est une ramasse
+            m_type = "LIVRAISON" if mission.get("type") == "LIVRAISON" else "RAMASSE"
+            voyage_code = mission.get("voyage", "")
+            country = mission_country(voyage_code, engine.v_by_code)
+            nb_pal = _nb_pal(mission)
+            rev_liv, rev_ram = engine.revenue_rates(country, date_str)
+            revenus = nb_pal * (rev_liv if m_type == "LIVRAISON" else rev_ram)
+            sst = (mission.get("sst") or "").strip()
+            chauffeur = (mission.get("chauffeur_nom", mission.get("chauffeur", "")) or "").strip()
+            row = {
+                'date': d, 'voyage': voyage_code, 'pays': country, 'type': m_type,
+                'sst': sst, 'chauffeur': chauffeur, 'palettes': nb_pal,
+                'revenus': revenus, 'couts': 0, 'marge': revenus,
+            }
+            rows.append(row)
+            if sst and chauffeur:
+                driver_rows.setdefault((sst, chauffeur), []).append(row)
+
+        for (sst, _chauffeur), d_rows in driver_rows.items():
+            forfait = max(engine.tarif(sst, row['pays'], date_str) for row in d_rows)
+            share = forfait / len(d_rows)
+            for row in d_rows:
+                row['couts'] = share
+                row['marge'] = row['revenus'] - share
+
+        with self._lock:
+            self._days[d] = (missions, rows)
+        return rows
+
+    def prefetch(self, dates):
+        """Valider les journées (résumés mensuels, relecture parallèle des journées modifiées)"""
+        dates = sorted(dates)
+        planning_rollups.refresh(dates)
+        for d in dates:
+            self.day_rows(d, validate=False)
+
+    # ----- Agrégats -----
+
+    @staticmethod
+    def _filters_key(filters):
+        if not filters:
+            return None
+        return tuple((k, tuple(sorted(filters.get(k) or ()))) for k in ('countries', 'sst', 'voyages', 'types'))
+
+    @staticmethod
+    def _keep(row, filters):
+        if row['type'] not in filters['types'] or row['pays'] not in filters['countries']:
+            return False
+        if filters['voyages'] and row['voyage'] not in filters['voyages']:
+            return False
+        if filters['sst'] and row['sst'] not in filters['sst']:
+            return False
+        return True
+
+    def collect(self, start: date, end: date, filters=None) -> dict:
+        """
+        Agrégats de [start, end] : séries quotidiennes, répartitions par voyage,
+        SST (avec jours-chauffeur), chauffeur, pays, type, jour de semaine,
+        semaine et mois, et la liste des missions retenues.
+        `filters` ({'countries', 'sst', 'voyages', 'types'}) : None = tout.
+        """
+        dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        self.prefetch(dates)
+        key = (start, end, self._filters_key(filters))
+        sources = tuple(self._days[d][0] for d in dates)
+        cached = self._results.get(key)
+        if cached is not None and len(cached[0]) == len(sources) \
+                and all(a is b for a, b in zip(cached[0], sources)):
+            return cached[1]
+
+        if filters:
+            filters = {k: set(filters.get(k) or ()) for k in ('countries', 'sst', 'voyages', 'types')}
+
+        def bucket():
+            return {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}
+
+        data = {
+            'dates': [], 'revenus': [], 'couts': [], 'marges': [],
+            'missions_count': [], 'palettes_liv': [], 'palettes_ram': [],
+            'by_voyage': {}, 'by_sst': {}, 'by_driver': {}, 'by_country': {},
+            'by_type': {'LIVRAISON': bucket(), 'RAMASSE': bucket()},
+            'by_weekday': {i: {'revenus': 0, 'couts': 0, 'missions': 0} for i in range(7)},
+            'by_week': {}, 'by_month': {},
+            'missions_list': [],
+            'start_date': start, 'end_date': end, 'filters': filters,
+        }
+        for d in dates:
+            rows = self._days[d][1]
+            if filters:
+                rows = [row for row in rows if self._keep(row, filters)]
+            revenus = sum(row['revenus'] for row in rows)
+            couts = sum(row['couts'] for row in rows)
+            pal_liv = sum(row['palettes'] for row in rows if row['type'] == "LIVRAISON")
+            pal_ram = sum(row['palettes'] for row in rows) - pal_liv
+
+            data['dates'].append(d)
+            data['revenus'].append(revenus)
+            data['couts'].append(couts)
+            data['marges'].append(revenus - couts)
+            data['missions_count'].append(len(rows))
+            data['palettes_liv'].append(pal_liv)
+            data['palettes_ram'].append(pal_ram)
+
+            weekday = data['by_weekday'][d.weekday()]
+            weekday['revenus'] += revenus
+            weekday['couts'] += couts
+            weekday['missions'] += len(rows)
+            for group, group_key in (('by_week', f"{d.year}-W{d.isocalendar()[1]:02d}"),
+                                     ('by_month', f"{d.year}-{d.month:02d}")):
+                acc = data[group].setdefault(group_key, bucket())
+                acc['revenus'] += revenus
+                acc['couts'] += couts
+                acc['missions'] += len(rows)
+                acc['palettes'] += pal_liv + pal_ram
+
+            day_drivers = set()
+            for row in rows:
+                for group, entity in (('by_voyage', row['voyage']), ('by_sst', row['sst']),
+                                      ('by_driver', row['chauffeur']), ('by_country', row['pays']),
+                                      ('by_type', row['type'])):
+                    if not entity:
+                        continue
+                    acc = data[group].get(entity)
+                    if acc is None:
+                        acc = data[group][entity] = bucket()
+                        if group == 'by_sst':
+                            acc['chauffeurs'] = 0
+                    acc['revenus'] += row['revenus']
+                    acc['couts'] += row['couts']
+                    acc['missions'] += 1
+                    acc['palettes'] += row['palettes']
+                if row['sst'] and row['chauffeur'] and (row['sst'], row['chauffeur']) not in day_drivers:
+                    day_drivers.add((row['sst'], row['chauffeur']))
+                    data['by_sst'][row['sst']]['chauffeurs'] += 1
+            data['missions_list'].extend(dict(row) for row in rows)
+
+        with self._lock:
+            if len(self._results) >= self.MAX_RESULTS:
+                self._results.clear()
+            self._results[key] = (sources, data)
+        return data
+
+
+analytics_pipeline = AnalyticsPipeline()
+
+
+# =============================================================================
+# AGRÉGATS HEBDOMADAIRES ET MENSUELS - _planning/AAAA/MM/_rollup.json
+# =============================================================================
+
+class PlanningRollups:
+    """
+    Résumé par mois stocké à côté du planning (`_planning/AAAA/MM/_rollup.json`) :
+      - par jour : signature des fichiers missions et missions réduites aux
+        champs utiles aux calculs (type, voyage, palettes, SST, chauffeur) ;
+      - par semaine (dossiers Semaine_XX du mois) et pour le mois : missions,
+        palettes, jours-chauffeur, répartition par SST et par voyage.
+    Le contenu ne dépend pas des référentiels (tarifs, revenus, pays des
+    voyages) : la finance et l'analyse lisent un fichier par mois au lieu d'un
+    fichier par mission et appliquent les barèmes en vigueur. Chaque journée
+    est revalidée par sa signature (un listage de son dossier) : une journée
+    modifiée ailleurs (autre poste, ancienne version) est relue et le résumé
+    du mois réécrit.
+    """
+
+    FILE_NAME = "_rollup.json"
+    VERSION = 2  # 2 : type de mission conservé tel quel (null si absent)
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._months = {}   # {(année, mois): (signature du fichier, contenu)}
+        self._days = {}     # {date: (signature, missions réduites)}
+        self._pending = set()
+        self._executor = None
+
+    # ----- Fichiers -----
+
+    @staticmethod
+    def month_dir(year, month) -> Path:
+        return get_planning_day_dir(date(year, month, 1)).parent.parent
+
+    @staticmethod
+    def day_signature(d: date):
+        """
+        Empreinte des fichiers missions de la journée (None si aucun) : nom,
+        taille et date de modification à la seconde, la précision de mtime
+        n'étant pas conservée d'un poste synchronisé à l'autre.
+        """
+        import hashlib
+        signatures = scan_planning_day(d)
+        if not signatures:
+            return None
+        items = sorted((Path(p).name, size, mtime // 1_000_000_000) for p, (mtime, size) in signatures.items())
+        return hashlib.md5(json.dumps(items).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _file_signature(path):
+        try:
+            st = path.stat()
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _load_month(self, year, month) -> dict:
+        path = self.month_dir(year, month) / self.FILE_NAME
+        file_sig = self._file_signature(path)
+        with self._lock:
+            cached = self._months.get((year, month))
+        if cached is not None and cached[0] == file_sig:
+            return cached[1]
+
+        content = {"version": self.VERSION, "month": f"{year:04d}-{month:02d}",
+                   "days": {}, "weeks": {}, "total": self._aggregate([])}
+        if file_sig is not None:
+            data = load_json(path, None)
+            if isinstance(data, dict) and data.get("version") == self.VERSION:
+                content = data
+        with self._lock:
+            self._months[(year, month)] = (file_sig, content)
+        return content
+
+    def _write_month(self, year, month, content):
+        path = self.month_dir(year, month) / self.FILE_NAME
+        with self._lock:
+            cached = self._months.get((year, month))
+        if cached is not None and cached[1] == content:
+            # Contenu identique (ex. même journée revalidée sur un autre poste) : pas de réécriture
+            return
+        with self._write_lock:
+            if not content["days"]:
+                # Plus aucune journée planifiée ce mois-ci
+                if path.exists():
+                    path.unlink()
+                file_sig = None
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Nom temporaire propre au processus et au thread (autres postes synchronisés)
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                try:
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        json.dump(content, f, ensure_ascii=False, separators=(",", ":"))
+                    os.replace(tmp, path)
+                finally:
+                    tmp.unlink(missing_ok=True)
+                file_sig = self._file_signature(path)
+        with self._lock:
+            self._months[(year, month)] = (file_sig, content)
+
+    # ----- Contenu -----
+
+    @staticmethod
+    def _compact(missions) -> list:
+        # Type conservé tel quel : chaque consommateur applique son défaut, comme sur les fichiers missions
+        return [[m.get("type"), m.get("voyage", ""), _nb_pal(m),
+                 (m.get("sst") or "").strip(),
+                 (m.get("chauffeur_nom", m.get("chauffeur", "")) or "").strip()]
+                for m in missions]
+
+    @staticmethod
+    def _aggregate(days_rows) -> dict:
+        """Agrégat d'une liste de journées (missions réduites), mêmes règles que FinanceEngine"""
+        agg = {"days": 0, "missions": 0, "pal_liv": 0, "pal_ram": 0, "driver_days": 0,
+               "by_sst": {}, "by_voyage": {}}
+        for rows in days_rows:
+            if not rows:
+                continue
+            agg["days"] += 1
+            drivers = set()  # Un jour-chauffeur par (SST, chauffeur)
+            for m_type, voyage, pal, sst, chauffeur in rows:
+                agg["missions"] += 1
+                agg["pal_liv" if m_type == "LIVRAISON" else "pal_ram"] += pal
+                v = agg["by_voyage"].setdefault(voyage, {"missions": 0, "palettes": 0})
+                v["missions"] += 1
+                v["palettes"] += pal
+                if sst:
+                    s = agg["by_sst"].setdefault(sst, {"missions": 0, "palettes": 0, "driver_days": 0})
+                    s["missions"] += 1
+                    s["palettes"] += pal
+                    if chauffeur and (sst, chauffeur) not in drivers:
+                        drivers.add((sst, chauffeur))
+                        s["driver_days"] += 1
+            agg["driver_days"] += len(drivers)
+        return agg
+
+    @staticmethod
+    def _merge(a, b) -> dict:
+        """Somme de deux agrégats"""
+        merged = json.loads(json.dumps(a))
+        for key in ("days", "missions", "pal_liv", "pal_ram", "driver_days"):
+            merged[key] += b[key]
+        for group in ("by_sst", "by_voyage"):
+            for name, values in b[group].items():
+                acc = merged[group].setdefault(name, dict.fromkeys(values, 0))
+                for k, v in values.items():
+                    acc[k] += v
+        return merged
+
+    def _remember(self, d, sig, rows):
+        with self._lock:
+            cached = self._days.get(d)
+            if cached is None or cached[0] != sig:
+                missions = []
+                for t, v, p, s, c in rows:
+                    mission = {"voyage": v, "nb_pal": p, "sst": s, "chauffeur_nom": c}
+                    if t is not None:
+                        mission["type"] = t
+                    missions.append(mission)
+                self._days[d] = (sig, missions)
+
+    # ----- Lecture et mise à jour -----
+
+    def refresh(self, dates):
+        """
+        Valider les journées `dates` contre le résumé de leur mois ; celles qui
+        ont changé sont relues (en parallèle) et chaque mois concerné n'est
+        réécrit qu'une fois.
+        """
+        by_month = {}
+        for d in dates:
+            by_month.setdefault((d.year, d.month), []).append(d)
+
+        stale = {}  # {(année, mois): [(date, signature)]}
+        for (year, month), days in by_month.items():
+            content = self._load_month(year, month)
+            for d in days:
+                sig = self.day_signature(d)
+                entry = content["days"].get(format_date_internal(d))
+                if entry is None and sig is None:
+                    self._remember(d, None, [])
+                elif entry is None or entry.get("sig") != sig:
+                    stale.setdefault((year, month), []).append((d, sig))
+                else:
+                    self._remember(d, sig, entry["missions"])
+        if not stale:
+            return
+
+        def read(item):
+            d, sig = item
+            return d, sig, self._compact(day_store.get(d)) if sig else []
+
+        items = [item for month_items in stale.values() for item in month_items]
+        if len(items) == 1:
+            results = [read(items[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(8, len(items)), thread_name_prefix="ptt-rollup") as executor:
+                results = list(executor.map(read, items))
+
+        updates = {}
+        for d, sig, rows in results:
+            updates.setdefault((d.year, d.month), []).append((d, sig, rows))
+            self._remember(d, sig, rows)
+
+        for (year, month), day_updates in updates.items():
+            content = dict(self._load_month(year, month))
+            days = dict(content["days"])
+            for d, sig, rows in day_updates:
+                if sig is None:
+                    days.pop(format_date_internal(d), None)
+                else:
+                    days[format_date_internal(d)] = {"sig": sig, "missions": rows}
+            weeks = {}
+            for date_str in sorted(days):
+                weeks.setdefault(get_week_folder(date.fromisoformat(date_str)), []).append(days[date_str]["missions"])
+            content["days"] = days
+            content["weeks"] = {week: self._aggregate(week_days) for week, week_days in weeks.items()}
+            content["total"] = self._aggregate(day["missions"] for day in days.values())
+            try:
+                self._write_month(year, month, content)
+            except OSError as e:
+                print(f"[Rollup] Écriture impossible pour {year:04d}-{month:02d}: {e}")
+                # Le fichier reste l'ancien : garder le contenu recalculé en mémoire
+                # pour que summary() et day_missions() ne servent pas de totaux périmés
+                path = self.month_dir(year, month) / self.FILE_NAME
+                with self._lock:
+                    self._months[(year, month)] = (self._file_signature(path), content)
+
+    def day_missions(self, d: date, validate=True) -> list:
+        """
+        Missions réduites de la journée (dicts type, voyage, nb_pal, sst,
+        chauffeur_nom ; liste partagée : ne pas la modifier). validate=False
+        suppose un refresh() récent couvrant cette date.
+        """
+        if validate or d not in self._days:
+            self.refresh([d])
+        return self._days[d][1]
+
+    def schedule_update(self, *dates):
+        """Après une modification de journées : mettre à jour les résumés de leurs mois en arrière-plan"""
+        with self._lock:
+            dates = [d for d in dict.fromkeys(dates) if d not in self._pending]
+            if not dates:
+                return
+            self._pending.update(dates)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ptt-rollup-update")
+
+        def work():
+            with self._lock:
+                self._pending.difference_update(dates)
+            try:
+                self.refresh(dates)
+            except Exception as e:
+                print(f"[Rollup] Erreur mise à jour des résumés : {e}")
+
+        self._executor.submit(work)
+
+    def invalidate(self):
+        """Oublier les résumés gardés en mémoire (les fichiers seront relus)"""
+        with self._lock:
+            self._months.clear()
+            self._days.clear()
+
+    def summary(self, start: date, end: date, by="mois") -> list:
+        """
+        Agrégats de [start, end] par mois ou par semaine ISO : [(libellé, agrégat)].
+        Les mois et semaines entièrement couverts sont lus tels quels dans les
+        résumés ; les bords de période sont recalculés à partir des journées.
+        """
+        dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        self.refresh(dates)
+
+        periods = {}
+        months = sorted({(d.year, d.month) for d in dates})
+        for year, month in months:
+            content = self._load_month(year, month)
+            month_dates = [d for d in dates if (d.year, d.month) == (year, month)]
+            groups = {}
+            for d in month_dates:
+                if by == "mois":
+                    key, part = f"{year:04d}-{month:02d}", "total"
+                else:
+                    iso = d.isocalendar()
+                    key, part = f"{iso[0]:04d}-S{iso[1]:02d}", get_week_folder(d)
+                groups.setdefault((key, part), []).append(d)
+            for (key, part), group_dates in groups.items():
+                in_month = [d for d in self._month_dates(year, month)
+                            if part == "total" or get_week_folder(d) == part]
+                if len(group_dates) == len(in_month):
+                    agg = content["total"] if part == "total" else content["weeks"].get(part, self._aggregate([]))
+                else:
+                    agg = self._aggregate(content["days"].get(format_date_internal(d), {}).get("missions", [])
+                                          for d in group_dates)
+                periods[key] = self._merge(periods[key], agg) if key in periods else agg
+        return sorted(periods.items())
+
+    @staticmethod
+    def _month_dates(year, month) -> list:
+        d = date(year, month, 1)
+        dates = []
+        while d.month == month:
+            dates.append(d)
+            d += timedelta(days=1)
+        return dates
+
+
+planning_rollups = PlanningRollups()
+
+
+# =============================================================================
+# ANNONCES SST - Mails J+1 aux sous-traitants (.eml, SMTP ou Outlook)
+# =============================================================================
+# Tous les messages d'une journée sont préparés en une passe à partir du
+# modèle de announcement_config.json, puis écrits en .eml (ouverts comme
+# brouillons par Outlook), envoyés sur une seule connexion SMTP ou affichés
+# dans Outlook. L'historique est enregistré en une seule écriture par lot.
+
+DEFAULT_ANNOUNCEMENT_CONFIG = {
+    "reply_to": "",
+    "subject": "Annonce missions transport - {date}",
+    "cc_addresses": [],
+    "body_template": """Bonjour,
+
+Pour le {date}, les missions suivantes sont planifiées pour votre société :
+
+{chauffeurs_list}
+
+Lieu de présentation des chauffeurs : {lieu_presentation}
+
+Merci de confirmer :
+- Que le(s) chauffeur(s) annoncé(s) est/sont bien les bons
+- Que vous acceptez la/les mission(s)
+
+Merci de répondre avant 20h00.
+
+Cordialement,
+{expediteur}""",
+    "lieu_presentation": "Tubize",
+    "variables_help": [
+        "{date} - Date de la mission (format: JJ/MM/AAAA)",
+        "{sst_name} - Nom du sous-traitant",
+        "{chauffeurs_list} - Liste des chauffeurs avec leur première heure",
+        "{lieu_presentation} - Lieu de présentation",
+        "{expediteur} - Nom de l'expéditeur",
+        "{nb_chauffeurs} - Nombre de chauffeurs",
+        "{nb_missions} - Nombre de missions"
+    ],
+    # Envoi direct (facultatif) : {"host", "port", "starttls", "username", "from"} ;
+    # le mot de passe est lu dans la variable d'environnement PTT_SMTP_PASSWORD
+    "smtp": {},
+}
+
+
+def load_announcement_config():
+    config = load_json(ANNOUNCEMENT_CONFIG_FILE, default=None)
+    if not isinstance(config, dict):
+        config = {}
+    for key, value in DEFAULT_ANNOUNCEMENT_CONFIG.items():
+        config.setdefault(key, value.copy() if isinstance(value, (dict, list)) else value)
+    return config
+
+
+class AnnouncementEngine:
+    """
+    Préparation et envoi des annonces SST d'une journée.
+
+    build() regroupe les missions par SST une seule fois et produit une
+    annonce (dict) par SST : destinataires, objet, corps, chauffeurs et
+    éventuel envoi précédent. Les méthodes d'envoi retournent les annonces
+    traitées ; record() les ajoute à l'historique en une seule sauvegarde.
+    """
+
+    def __init__(self, config=None, sst_emails=None, history=None, sender=""):
+        self.config = config if config is not None else load_announcement_config()
+        self.sst_emails = sst_emails if sst_emails is not None else load_json(SST_EMAILS_FILE, default={})
+        self.history = history if history is not None else load_json(ANNOUNCEMENT_HISTORY_FILE, default=[])
+        self.sender = sender or getpass.getuser().upper()
+        self._sent = {}
+        for h in self.history:  # Historique chronologique : le dernier envoi l'emporte
+            self._sent[(h.get("sst"), h.get("mission_date"))] = h
+
+    @staticmethod
+    def group_missions(missions):
+        """{sst: [missions]} (missions sans SST ignorées)"""
+        sst_missions = {}
+        for m in missions:
+            sst = (m.get("sst") or "").strip()
+            if sst:
+                sst_missions.setdefault(sst, []).append(m)
+        return sst_missions
+
+    def already_sent(self, sst, mission_date):
+        """Entrée d'historique d'un envoi précédent pour ce SST et cette date (ou None)"""
+        return self._sent.get((sst, format_date_internal(mission_date)))
+
+    def recipients(self, sst):
+        return self.sst_emails.get(sst, {}).get("emails", [])
+
+    def build(self, mission_date, missions, only=None, pending_only=False):
+        """
+        Annonces de la journée, triées par SST. `only` restreint à certains
+        SST ; `pending_only` écarte les SST déjà annoncés ou sans adresse.
+        """
+        announcements = []
+        date_display = mission_date.strftime("%d/%m/%Y")
+        for sst, sst_missions in sorted(self.group_missions(missions).items()):
+            if only is not None and sst not in only:
+                continue
+            emails = self.recipients(sst)
+            previous = self.already_sent(sst, mission_date)
+            if pending_only and (previous or not emails):
+                continue
+
+            # Première heure (la plus tôt) de chaque chauffeur
+            chauffeurs_dict = {}
+            for m in sst_missions:
+                chauffeur_nom = (m.get("chauffeur_nom") or "").strip()
+                if chauffeur_nom:
+                    heure = m.get("heure", "99:99")
+                    if chauffeur_nom not in chauffeurs_dict or heure < chauffeurs_dict[chauffeur_nom]:
+                        chauffeurs_dict[chauffeur_nom] = heure
+
+            chauffeurs_lines = []
+            for i, (nom, heure) in enumerate(sorted(chauffeurs_dict.items(), key=lambda x: x[1]), 1):
+                chauffeurs_lines.append(f"Chauffeur {i} : {nom} – Attendu pour {heure}")
+            chauffeurs_list = "\n".join(chauffeurs_lines) if chauffeurs_lines else "Aucun chauffeur assigné"
+
+            replacements = {
+                "{date}": date_display,
+                "{sst_name}": sst,
+                "{chauffeurs_list}": chauffeurs_list,
+                "{lieu_presentation}": self.config.get("lieu_presentation", "Tubize"),
+                "{expediteur}": self.sender,
+                "{nb_chauffeurs}": str(len(chauffeurs_dict)),
+                "{nb_missions}": str(len(sst_missions))
+            }
+            body = self.config.get("body_template", "")
+            subject = self.config.get("subject", "Annonce missions - {date}")
+            for key, value in replacements.items():
+                body = body.replace(key, value)
+                subject = subject.replace(key, value)
+
+            heures = [m.get("heure", "99:99") for m in sst_missions]
+            announcements.append({
+                "sst": sst,
+                "mission_date": mission_date,
+                "missions": sst_missions,
+                "chauffeurs": list(chauffeurs_dict.keys()),
+                "premiere_heure": min(heures) if heures else "N/A",
+                "recipients": emails,
+                "cc": list(self.config.get("cc_addresses", [])),
+                "reply_to": self.config.get("reply_to", ""),
+                "subject": subject,
+                "body": body,
+                "previous": previous,
+            })
+        return announcements
+
+    # ----- Formats de sortie -----
+
+    def to_message(self, announcement, from_address=""):
+        """Message MIME standard (email.message.EmailMessage) d'une annonce"""
+        from email.message import EmailMessage
+        from email.utils import formatdate, make_msgid
+
+        msg = EmailMessage()
+        if from_address:
+            msg["From"] = from_address
+        msg["To"] = ", ".join(announcement["recipients"])
+        if announcement["cc"]:
+            msg["Cc"] = ", ".join(announcement["cc"])
+        if announcement["reply_to"]:
+            msg["Reply-To"] = announcement["reply_to"]
+        msg["Subject"] = announcement["subject"]
+        msg["Date"] = formatdate(localtime=True)
+        msg["Message-ID"] = make_msgid(domain="ptt.local")
+        msg.set_content(announcement["body"])
+        return msg
+
+    def write_eml(self, announcements, out_dir):
+        """
+        Écrire un fichier .eml par annonce (en-tête X-Unsent : Outlook l'ouvre
+        comme un brouillon prêt à envoyer). Retourne [(annonce, chemin)].
+        """
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        written = []
+        for announcement in announcements:
+            msg = self.to_message(announcement, self.config.get("smtp", {}).get("from", ""))
+            msg["X-Unsent"] = "1"
+            safe_sst = "".join(c if c.isalnum() or c in "-_" else "_" for c in announcement["sst"])
+            path = out_dir / f"annonce_{format_date_internal(announcement['mission_date'])}_{safe_sst}.eml"
+            path.write_bytes(msg.as_bytes())
+            written.append((announcement, path))
+        return written
+
+    def send_smtp(self, announcements, smtp_config=None, password=None, connect=None):
+        """
+        Envoyer les annonces sur UNE connexion SMTP (rouverte une fois si le
+        serveur la coupe en cours de lot). Retourne (envoyées, erreurs) ;
+        erreurs = [(sst, message)]. `connect` permet de fournir la connexion.
+        """
+        import smtplib
+
+        smtp_config = smtp_config if smtp_config is not None else self.config.get("smtp", {})
+        host = smtp_config.get("host")
+        if not host and connect is None:
+            raise ValueError("Serveur SMTP non configuré (clé \"smtp\" de announcement_config.json)")
+        from_address = smtp_config.get("from") or self.config.get("reply_to")
+        if not from_address:
+            raise ValueError("Adresse d'expédition manquante (smtp.from ou reply_to)")
+        password = password if password is not None else os.environ.get("PTT_SMTP_PASSWORD")
+
+        def open_connection():
+            if connect is not None:
+                return connect()
+            server = smtplib.SMTP(host, int(smtp_config.get("port", 25)), timeout=30)
+            if smtp_config.get("starttls"):
+                server.starttls()
+            if smtp_config.get("username"):
+                server.login(smtp_config["username"], password or "")
+            return server
+
+        sent, errors = [], []
+        server = open_connection()
+        try:
+            for announcement in announcements:
+                msg = self.to_message(announcement, from_address)
+                recipients = announcement["recipients"] + announcement["cc"]
+                try:
+                    try:
+                        server.send_message(msg, from_addr=from_address, to_addrs=recipients)
+                    except smtplib.SMTPServerDisconnected:
+                        server = open_connection()
+                        server.send_message(msg, from_addr=from_address, to_addrs=recipients)
+                    sent.append(announcement)
+                except (smtplib.SMTPException, OSError) as e:
+                    errors.append((announcement["sst"], str(e)))
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+        return sent, errors
+
+    def display_outlook(self, announcement):
+        """Créer le mail dans Outlook et l'afficher (envoi manuel) ; nécessite ensure_outlook()"""
+        outlook = win32com.client.Dispatch("Outlook.Application")
+        mail = outlook.CreateItem(0)
+        mail.To = "; ".join(announcement["recipients"])
+        mail.Subject = announcement["subject"]
+        mail.Body = announcement["body"]
+        if announcement["cc"]:
+            mail.CC = "; ".join(announcement["cc"])
+        if announcement["reply_to"]:
+            mail.ReplyRecipients.Add(announcement["reply_to"])
+        mail.Display()  # Afficher le mail (ne pas envoyer automatiquement)
+
+    # ----- Historique -----
+
+    def record(self, announcements, channel):
+        """Ajouter les annonces traitées à l'historique (une seule sauvegarde)"""
+        if not announcements:
+            return []
+        sent_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        entries = []
+        for announcement in announcements:
+            entry = {
+                "id": str(uuid.uuid4()),
+                "sst": announcement["sst"],
+                "mission_date": format_date_internal(announcement["mission_date"]),
+                "sent_at": sent_at,
+                "sent_by": self.sender,
+                "recipients": announcement["recipients"],
+                "subject": announcement["subject"],
+                "nb_missions": len(announcement["missions"]),
+                "chauffeurs": announcement["chauffeurs"],
+                "channel": channel,
+            }
+            entries.append(entry)
+            self._sent[(entry["sst"], entry["mission_date"])] = entry
+        self.history.extend(entries)
+        save_json(ANNOUNCEMENT_HISTORY_FILE, self.history)
+        activity_logger.log_action("SST_ANNOUNCEMENT", {
+            "mission_date": entries[0]["mission_date"],
+            "channel": channel,
+            "sst": [e["sst"] for e in entries],
+        })
+        return entries
+
+
+# =============================================================================
+# GÉNÉRATION DE PLANNINGS PAR MODÈLE
+# =============================================================================
+# Un modèle décrit une semaine type : pour chaque jour (monday..sunday) la
+# liste des missions récurrentes (type, voyage, heure, palettes, SST et
+# chauffeur par défaut...). Le générateur l'instancie sur une plage de dates :
+# le calcul (simulation) est séparé de l'écriture pour permettre un aperçu.
+
+WEEKDAY_KEYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Champs d'une mission conservés dans un modèle
+TEMPLATE_MISSION_FIELDS = ("type", "heure", "voyage", "nb_pal", "sst", "chauffeur_nom",
+                           "ramasse", "infos", "sans_sst", "sans_chauffeur")
+
+
+def _planning_templates_path() -> Path:
+    # À côté des autres référentiels partagés (sst.json, chauffeurs.json...)
+    return ROOT_DIR / "_data" / "planning_templates.json"
+
+
+def load_planning_templates() -> dict:
+    """Modèles de semaine : {nom: {"days": {"monday": [missions], ...}}}"""
+    return load_json(_planning_templates_path(), {})
+
+
+def save_planning_templates(templates: dict):
+    save_json(_planning_templates_path(), templates)
+
+
+def template_from_week(monday: date) -> dict:
+    """Construire un modèle à partir des missions d'une semaine existante"""
+    days = {}
+    for offset, key in enumerate(WEEKDAY_KEYS):
+        missions = read_planning_day(monday + timedelta(days=offset))["missions"]
+        missions.sort(key=lambda m: (heure_to_minutes(m.get("heure"), 0), m.get("voyage", "")))
+        days[key] = [{k: m[k] for k in TEMPLATE_MISSION_FIELDS if k in m} for m in missions]
+    return {"days": days, "source_week": format_date_internal(monday)}
+
+
+class PlanningGenerator:
+    """
+    Instancie un modèle de semaine sur une plage de dates.
+
+    - plan()  : simulation, sans aucune écriture (aperçu / dry-run) ;
+    - write() : écrit les journées planifiées, un lot de fichiers par jour,
+                les jours étant traités en parallèle (I/O OneDrive).
+
+    Quand le chauffeur par défaut est indisponible ce jour-là (dispo_chauffeurs),
+    un autre chauffeur disponible du même SST, pas encore occupé ce jour, est choisi.
+    """
+
+    def __init__(self, voyages, chauffeurs, dispos):
+        self.voyage_codes = {v.get("code") for v in voyages}
+        self.chauffeurs = [ch for ch in chauffeurs if ch.get("actif", True)]
+        self.ids_by_name = {ch.get("nom_affichage"): ch.get("id") for ch in reversed(self.chauffeurs)}
+        # {date_str: {id_chauffeur: disponible}}
+        self.dispos = {}
+        for entry in dispos:
+            self.dispos.setdefault(entry.get("date"), {})[entry.get("id_chauffeur")] = bool(entry.get("disponible", True))
+
+    def _available(self, date_str, sst):
+        day_dispos = self.dispos.get(date_str, {})
+        return [ch for ch in self.chauffeurs
+                if ch.get("sst") == sst and day_dispos.get(ch.get("id"), True)]
+
+    def plan(self, template: dict, start: date, end: date, weekdays=None, skip_existing=True):
+        """
+        Simuler la génération du modèle entre `start` et `end` (inclus).
+        Retourne une liste de dicts {"date", "status", "missions", "warnings"}
+        où status vaut "new", "fill" (dossier existant mais vide) ou "exists".
+        """
+        weekdays = set(weekdays or WEEKDAY_KEYS)
+        days = template.get("days", {})
+        plans = []
+        d = start
+        while d <= end:
+            key = WEEKDAY_KEYS[d.weekday()]
+            entries = days.get(key, [])
+            if key in weekdays and entries:
+                plans.append(self._plan_day(d, entries, skip_existing))
+            d += timedelta(days=1)
+        return plans
+
+    def _plan_day(self, d, entries, skip_existing):
+        date_str = format_date_internal(d)
+        day_dir = get_planning_day_dir(d)
+        status = "new"
+        if day_dir.exists():
+            status = "exists" if scan_planning_day(d) else "fill"
+        if status == "exists" and skip_existing:
+            return {"date": d, "status": status, "missions": [], "warnings": []}
+
+        warnings = []
+        missions = []
+        used_drivers = set()
+        numeros = {}
+        planned = set()
+        if status == "exists":
+            # Compléter la journée : ne pas dupliquer ses missions (voyage + heure),
+            # ne pas reprendre ses chauffeurs comme remplaçants, continuer leurs numéros
+            for m in read_planning_day(d)["missions"]:
+                planned.add((m.get("voyage", ""), m.get("heure", "")))
+                chauffeur = m.get("chauffeur_nom", "")
+                if chauffeur:
+                    used_drivers.add(chauffeur)
+                    numero = int(m["numero"]) if str(m.get("numero", "")).isdigit() else 1
+                    numeros[chauffeur] = max(numeros.get(chauffeur, 0), numero)
+        day_dispos = self.dispos.get(date_str, {})
+        # Chauffeurs prévus par le modèle ce jour : à ne pas prendre comme remplaçants
+        reserved = {e.get("chauffeur_nom") for e in entries if not e.get("sans_chauffeur", False)}
+
+        for entry in sorted(entries, key=lambda e: heure_to_minutes(e.get("heure"), 0)):
+            voyage = entry.get("voyage", "")
+            if voyage not in self.voyage_codes:
+                warnings.append(f"voyage inconnu ignoré : {voyage}")
+                continue
+            if (voyage, entry.get("heure", "08:00")) in planned:
+                continue
+
+            sst = "" if entry.get("sans_sst", False) else entry.get("sst", "")
+            chauffeur = "" if entry.get("sans_chauffeur", False) else entry.get("chauffeur_nom", "")
+            if chauffeur:
+                ch_id = self.ids_by_name.get(chauffeur)
+                if ch_id is None or not day_dispos.get(ch_id, True):
+                    # Chauffeur par défaut absent : un autre chauffeur disponible du même SST
+                    candidates = [ch for ch in self._available(date_str, sst)
+                                  if ch.get("nom_affichage") not in used_drivers
+                                  and ch.get("nom_affichage") not in reserved]
+                    replacement = candidates[0].get("nom_affichage") if candidates else ""
+                    warnings.append(f"{entry.get('heure', '')} {voyage} : {chauffeur} indisponible"
+                                    + (f" → {replacement}" if replacement else " → sans chauffeur"))
+                    chauffeur = replacement
+            if chauffeur:
+                used_drivers.add(chauffeur)
+                numeros[chauffeur] = numeros.get(chauffeur, 0) + 1
+
+            missions.append({
+                "id": str(uuid.uuid4()),
+                "date": date_str,
+                "type": entry.get("type", "LIVRAISON"),
+                "heure": entry.get("heure", "08:00"),
+                "voyage": voyage,
+                "nb_pal": entry.get("nb_pal", 0),
+                "numero": numeros.get(chauffeur, 1),
+                "sst": sst,
+                "chauffeur_nom": chauffeur,
+                "chauffeur_id": self.ids_by_name.get(chauffeur) if chauffeur else None,
+                "ramasse": entry.get("ramasse", "") if entry.get("type") == "RAMASSE" else "",
+                "infos": entry.get("infos", ""),
+                "sans_sst": bool(entry.get("sans_sst", False)),
+                "sans_chauffeur": not chauffeur,
+            })
+        return {"date": d, "status": status, "missions": missions, "warnings": warnings}
+
+    @staticmethod
+    def summarize(plans) -> str:
+        """Résumé lisible d'une simulation"""
+        to_write = [p for p in plans if p["missions"]]
+        skipped = [p for p in plans if p["status"] == "exists" and not p["missions"]]
+        lines = [
+            f"{len(to_write)} jour(s) à générer, {sum(len(p['missions']) for p in to_write)} mission(s)",
+            f"{len(skipped)} jour(s) déjà planifié(s) ignoré(s)",
+            "",
+        ]
+        for p in plans:
+            label = {"new": "nouveau", "fill": "dossier vide", "exists": "existant"}[p["status"]]
+            if p["missions"]:
+                lines.append(f"{format_date_display(p['date'])} ({label}) : {len(p['missions'])} mission(s)")
+            else:
+                lines.append(f"{format_date_display(p['date'])} ({label}) : ignoré")
+            for w in p["warnings"]:
+                lines.append(f"    ⚠ {w}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def write(plans, template_name="", max_workers=8) -> dict:
+        """Écrire les journées planifiées ; retourne {"days": n, "missions": n, "errors": [...]}"""
+        generated_at = datetime.now().isoformat(timespec="seconds")
+
+        def write_day(plan):
+            day_dir = get_planning_day_dir(plan["date"])
+            day_dir.mkdir(parents=True, exist_ok=True)
+            for mission in plan["missions"]:
+                with open(day_dir / f"{mission['id']}.json", "w", encoding="utf-8") as f:
+                    json.dump(mission, f, indent=2, ensure_ascii=False)
+            # Métadonnées (fichier "_" ignoré par le chargement du planning)
+            with open(day_dir / "_generation.json", "w", encoding="utf-8") as f:
+                json.dump({"template": template_name, "generated_at": generated_at,
+                           "missions": len(plan["missions"])}, f, indent=2, ensure_ascii=False)
+            return len(plan["missions"])
+
+        result = {"days": 0, "missions": 0, "errors": []}
+        to_write = [p for p in plans if p["missions"]]
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ptt-generate") as pool:
+            futures = {pool.submit(write_day, p): p for p in to_write}
+            for future, plan in futures.items():
+                try:
+                    result["missions"] += future.result()
+                    result["days"] += 1
+                except Exception as e:
+                    result["errors"].append(f"{format_date_display(plan['date'])} : {e}")
+        # Résumés mensuels des journées écrites (en arrière-plan, une écriture par mois)
+        planning_rollups.schedule_update(*[p["date"] for p in to_write])
+        return result
+
+
+class RefreshScheduler:
+    """
+    Ordonnanceur unique des tâches périodiques (rafraîchissement des données,
+    cache local, Sauron...).
+
+    Chaque tâche se compose de :
+      - `when()`  : condition évaluée sur le thread Tk (ex. onglet visible) ;
+      - `check()` : vérification I/O exécutée HORS du thread Tk, qui retourne
+                    un résultat "vrai" s'il y a quelque chose à appliquer ;
+      - `apply(résultat)` : mise à jour de l'UI, ramenée sur le thread Tk
+                    (file de résultats vidée par un battement root.after).
+
+    L'intervalle double (jusqu'à max_backoff) tant que rien ne change et est
+    multiplié par `unfocused_factor` quand la fenêtre n'a pas le focus.
+    Les tâches `respect_editing` ne sont pas appliquées pendant une édition.
+    """
+
+    def __init__(self, root: tk.Misc, is_busy=None):
+        self.root = root
+        self.is_busy = is_busy or (lambda: False)
+        self.settings = load_local_settings()
+        self.jobs = {}
+        self.heartbeat_ms = 1000       # Battement au repos
+        self.fast_heartbeat_ms = 200   # Battement quand une vérification est en cours
+        self.unfocused_factor = 3
+        self._results = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ptt-refresh")
+        self._after_id = None
+        self._stopped = False
+
+    # ----- Gestion des tâches -----
+
+    def add_job(self, name, interval, check=None, apply=None, when=None,
+                max_backoff=8, respect_editing=True, enabled=True):
+        """Déclarer (ou remplacer) une tâche périodique ; interval en secondes"""
+        self.jobs[name] = {
+            "name": name,
+            "interval": max(1, interval),
+            "check": check,
+            "apply": apply,
+            "when": when,
+            "max_backoff": max_backoff,
+            "respect_editing": respect_editing,
+            "enabled": enabled,
+            "backoff": 1,
+            "running": False,
+            "next_due": time_module.monotonic() + interval,
+        }
+
+    def remove_job(self, name):
+        self.jobs.pop(name, None)
+
+    def set_enabled(self, name, enabled):
+        job = self.jobs.get(name)
+        if job:
+            job["enabled"] = bool(enabled)
+            job["backoff"] = 1
+            job["next_due"] = time_module.monotonic() + job["interval"]
+
+    def set_interval(self, name, seconds):
+        job = self.jobs.get(name)
+        if job:
+            job["interval"] = max(1, seconds)
+            job["next_due"] = time_module.monotonic() + job["interval"]
+
+    def trigger(self, name):
+        """Exécuter une tâche au prochain battement (appelable depuis un autre thread)"""
+        job = self.jobs.get(name)
+        if job:
+            job["backoff"] = 1
+            job["next_due"] = 0
+
+    def force_now(self, name="data"):
+        """Appliquer immédiatement une tâche, sans vérification préalable"""
+        job = self.jobs.get(name)
+        if job and job["apply"]:
+            job["apply"](True)
+
+    def apply(self, enabled: bool, seconds: int):
+        """Paramètres du menu Setup pour le rafraîchissement des données"""
+        self.settings["auto_refresh_enabled"] = bool(enabled)
+        self.settings["auto_refresh_seconds"] = max(1, int(seconds))
+        save_local_settings(self.settings)
+        self.set_interval("data", self.settings["auto_refresh_seconds"])
+        self.set_enabled("data", self.settings["auto_refresh_enabled"])
+
+    # ----- Boucle -----
+
+    def start(self):
+        self._stopped = False
+        self._schedule_heartbeat(self.heartbeat_ms)
+
+    def stop(self):
+        self._stopped = True
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self._executor.shutdown(wait=False)
+
+    def _schedule_heartbeat(self, delay_ms):
+        if not self._stopped and self._after_id is None:
+            self._after_id = self.root.after(delay_ms, self._heartbeat)
+
+    def _window_focused(self):
+        try:
+            return self.root.focus_displayof() is not None
+        except Exception:
+            return True
+
+    def _heartbeat(self):
+        self._after_id = None
+        if self._stopped:
+            return
+        try:
+            self._drain_results()
+
+            now = time_module.monotonic()
+            for job in list(self.jobs.values()):
+                if not job["enabled"] or job["running"] or now < job["next_due"]:
+                    continue
+                if job["when"] is not None and not job["when"]():
+                    job["next_due"] = now + job["interval"]
+                    continue
+
+                job["running"] = True
+                job["next_due"] = float("inf")  # Remis à 0 par trigger() pendant la vérification
+                if job["check"] is None:
+                    self._finish(job, True)
+                else:
+                    self._executor.submit(self._run_check, job)
+        except Exception as e:
+            print(f"[Scheduler] Erreur battement: {e}")
+        finally:
+            busy = any(job["running"] for job in self.jobs.values())
+            self._schedule_heartbeat(self.fast_heartbeat_ms if busy else self.heartbeat_ms)
+
+    def _run_check(self, job):
+        """Exécuté dans un thread de travail : aucune opération Tk ici"""
+        try:
+            with perf_monitor.measure(f"scheduler.{job['name']}.check"):
+                result = job["check"]()
+        except Exception as e:
+            print(f"[Scheduler] Erreur vérification {job['name']}: {e}")
+            result = None
+        self._results.put((job, result))
+
+    def _drain_results(self):
+        while True:
+            try:
+                job, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(job, result)
+
+    def _finish(self, job, result):
+        """Appliquer le résultat d'une tâche (thread Tk) et planifier la suivante"""
+        job["running"] = False
+        now = time_module.monotonic()
+
+        if result:
+            if job["respect_editing"] and self.is_busy():
+                # Édition en cours : on réessaie bientôt (la vérification est sans effet de bord)
+                job["next_due"] = now + 2
+                return
+            if job["apply"] is not None:
+                try:
+                    with perf_monitor.measure(f"scheduler.{job['name']}.apply"):
+                        job["apply"](result)
+                except Exception as e:
+                    print(f"[Scheduler] Erreur application {job['name']}: {e}")
+            job["backoff"] = 1
+        else:
+            job["backoff"] = min(job["backoff"] * 2, job["max_backoff"])
+
+        factor = job["backoff"] * (1 if self._window_focused() else self.unfocused_factor)
+        if job["next_due"] != 0:  # trigger() pendant la vérification : relancer tout de suite
+            job["next_due"] = now + job["interval"] * factor
+
+def install_setup_menu(root: tk.Tk, menubar: tk.Menu, refresher: "RefreshScheduler"):
+
+    setup_menu = tk.Menu(menubar, tearoff=0)
+    menubar.add_cascade(label="Setup", menu=setup_menu)
 
     var_enabled = tk.BooleanVar(value=refresher.settings.get("auto_refresh_enabled", True))
 
@@ -1157,6 +3535,56 @@ def install_setup_menu(root: tk.Tk, menubar: tk.Menu, refresh_callable):
     cache_menu.add_command(label="Forcer la mise à jour du cache", command=force_cache_refresh)
     cache_menu.add_command(label="Vider le cache", command=clear_cache)
 
+    # Menu Performances
+    perf_menu = tk.Menu(setup_menu, tearoff=0)
+    setup_menu.add_cascade(label="Performances", menu=perf_menu)
+
+    var_perf_enabled = tk.BooleanVar(value=perf_monitor.enabled)
+
+    def toggle_perf_monitoring():
+        perf_monitor.set_enabled(var_perf_enabled.get())
+
+    def show_perf_timings():
+        win = tk.Toplevel(root)
+        win.title("Performances — Derniers temps mesurés")
+        win.geometry("760x520")
+
+        frm = ttk.Frame(win, padding=8)
+        frm.pack(fill="both", expand=True)
+
+        text = tk.Text(frm, wrap="none", font=("Consolas", 9))
+        vsb = ttk.Scrollbar(frm, orient="vertical", command=text.yview)
+        text.configure(yscrollcommand=vsb.set)
+        vsb.pack(side="right", fill="y")
+        text.pack(side="left", fill="both", expand=True)
+
+        def fill():
+            text.config(state="normal")
+            text.delete("1.0", "end")
+            text.insert("1.0", perf_monitor.format_report(n_recent=50))
+            text.config(state="disabled")
+
+        btns = ttk.Frame(win, padding=(8, 0, 8, 8))
+        btns.pack(fill="x")
+        ttk.Button(btns, text="Actualiser", command=fill).pack(side="left")
+        ttk.Button(btns, text="Exporter un rapport…", command=dump_perf_report).pack(side="left", padx=6)
+        ttk.Button(btns, text="Fermer", command=win.destroy).pack(side="right")
+        fill()
+
+    def dump_perf_report():
+        try:
+            path = perf_monitor.dump_report()
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Impossible d'écrire le rapport :\n{e}")
+            return
+        messagebox.showinfo("Rapport de performances",
+                            f"Rapport enregistré :\n{path}\n\nJoignez ce fichier à votre signalement.")
+
+    perf_menu.add_checkbutton(label="Activer la mesure des temps", variable=var_perf_enabled,
+                              command=toggle_perf_monitoring)
+    perf_menu.add_command(label="Voir les derniers temps", command=show_perf_timings)
+    perf_menu.add_command(label="Exporter un rapport…", command=dump_perf_report)
+
     return refresher
 
 # ---------- Fonctions d'export ----------
@@ -1169,74 +3597,288 @@ def generate_export_filename(prefix="extraction_planning", extension="pdf"):
     filename = f"{prefix}_{now.strftime('%d_%m_%Y_%H%M')}_{user}.{extension}"
     return filename
 
-def export_treeview_to_excel(tree, filename, sheet_name="Planning", title="Planning Export"):
-    if not EXCEL_AVAILABLE:
-        return False, "Module openpyxl non disponible"
+class ExcelStreamWriter:
+    """
+    Classeur openpyxl en écriture seule (write_only) : chaque ligne est
+    sérialisée dès qu'elle est ajoutée au lieu de rester en mémoire, et la
+    mise en forme passe par des styles nommés enregistrés une seule fois dans
+    le classeur (une cellule ne porte plus que le nom de son style).
+
+    Ne touche à aucun widget Tk : utilisable depuis un thread d'export.
+    """
+
+    def __init__(self, sheet_title, col_widths=(), styles=None):
+        openpyxl = lazy_import("openpyxl")
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+        self._cell = WriteOnlyCell
+        self._column_letter = get_column_letter
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = None
+        self.row_count = 0
+        self._styles = set()
+        self.add_styles(styles or {})
+        self.new_sheet(sheet_title, col_widths)
+
+    def add_styles(self, styles):
+        """Enregistrer des styles nommés {nom: {"font", "fill", "alignment", "border"}}"""
+        from openpyxl.styles import NamedStyle
+        for name, spec in styles.items():
+            if name in self._styles:
+                continue
+            style = NamedStyle(name=name)
+            for attr, value in spec.items():
+                setattr(style, attr, value)
+            self.wb.add_named_style(style)
+            self._styles.add(name)
+
+    def new_sheet(self, title, col_widths=()):
+        """Ouvrir une nouvelle feuille (les largeurs doivent précéder la première ligne)"""
+        self.ws = self.wb.create_sheet(title)
+        self.row_count = 0
+        for col_idx, width in enumerate(col_widths, start=1):
+            self.ws.column_dimensions[self._column_letter(col_idx)].width = width
+
+    def append(self, values, styles=None):
+        """Ajouter une ligne ; `styles` = un nom pour toute la ligne ou un nom (ou None) par colonne"""
+        if styles is None:
+            row = list(values)
+        else:
+            if isinstance(styles, str):
+                styles = [styles] * len(values)
+            row = []
+            for value, style in zip(values, styles):
+                if style is None:
+                    row.append(value)
+                else:
+                    cell = self._cell(self.ws, value=value)
+                    cell.style = style
+                    row.append(cell)
+        self.ws.append(row)
+        self.row_count += 1
+
+    def merged(self, value, style, ncols):
+        """Ajouter une ligne dont les `ncols` premières cellules sont fusionnées"""
+        self.append([value], [style])
+        self.ws.merged_cells.add(f"A{self.row_count}:{self._column_letter(ncols)}{self.row_count}")
+
+    def blank(self, count=1):
+        for _ in range(count):
+            self.append([])
+
+    def save(self, filename):
+        self.wb.save(filename)
+
+
+def excel_planning_styles(accent, group_fill, group_font, type_styles, data_size=10):
+    """
+    Styles nommés des exports de planning : titre et en-têtes dans la couleur
+    `accent`, lignes de groupe, données centrées/alignées à gauche et cellules
+    "Type" colorées (`type_styles` = {"LIVRAISON": (fond, police ou None), ...}).
+    """
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
+    def fill(color):
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    side = Side(style='thin', color='CCCCCC')
+    border_thin = Border(left=side, right=side, top=side, bottom=side)
+    center_align = Alignment(horizontal='center', vertical='center')
+    left_align = Alignment(horizontal='left', vertical='center')
+    data_font = Font(size=data_size)
+
+    styles = {
+        "ptt_title": {"font": Font(bold=True, size=16, color=accent), "alignment": center_align},
+        "ptt_subtitle": {"font": Font(bold=True, size=12, color="666666"), "alignment": center_align},
+        "ptt_stats": {"font": Font(size=10, italic=True, color="888888"), "alignment": center_align},
+        "ptt_header": {"font": Font(bold=True, color="FFFFFF", size=11), "fill": fill(accent),
+                       "alignment": center_align, "border": border_thin},
+        "ptt_group": {"font": Font(bold=True, size=11, color=group_font), "fill": fill(group_fill),
+                      "alignment": left_align},
+        "ptt_data_c": {"font": data_font, "border": border_thin, "alignment": center_align},
+        "ptt_data_l": {"font": data_font, "border": border_thin, "alignment": left_align},
+        "ptt_footer": {"font": Font(size=8, italic=True, color="999999")},
+    }
+    for mission_type, (fill_color, font_color) in type_styles.items():
+        font = Font(size=data_size, bold=True, color=font_color) if font_color else data_font
+        styles[f"ptt_type_{mission_type.lower()}"] = {
+            "font": font, "fill": fill(fill_color), "border": border_thin, "alignment": center_align,
+        }
+    return styles
+
+
+def _excel_row_styles(ncols, center_cols, type_col=None, mission_type=None, type_styles=()):
+    """Noms de style par colonne d'une ligne de données (colonnes numérotées à partir de 1)"""
+    styles = ["ptt_data_c" if col in center_cols else "ptt_data_l" for col in range(1, ncols + 1)]
+    if type_col and mission_type in type_styles:
+        styles[type_col - 1] = f"ptt_type_{mission_type.lower()}"
+    return styles
+
+
+def _excel_footer(writer, blank_rows):
+    writer.blank(blank_rows)
+    writer.append([f"Exporté le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"], ["ptt_footer"])
+
+
+# Fréquence des notifications de progression (en lignes écrites)
+EXPORT_PROGRESS_STEP = 200
+
+
+def treeview_rows(tree):
+    """Copier les en-têtes et les valeurs d'un Treeview (à appeler dans le thread Tk)"""
+    columns = tree["columns"]
+    headers = [tree.heading(col)["text"] for col in columns]
+    rows = [list(tree.item(item)["values"]) for item in tree.get_children()]
+    return headers, rows
+
+
+@timed()
+def export_rows_to_excel(headers, rows, filename, sheet_name="Planning", title="Planning Export", progress=None):
+    """Écrire un tableau (en-têtes + lignes) en flux dans un classeur Excel"""
+    if not EXCEL_AVAILABLE:
+        return False, "Module openpyxl non disponible"
+
+    try:
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
+        side = Side(style='thin')
+        border = Border(left=side, right=side, top=side, bottom=side)
+        styles = {
+            "ptt_tree_title": {"font": Font(size=14, bold=True), "alignment": Alignment(horizontal='center')},
+            "ptt_tree_header": {"font": Font(bold=True, color="FFFFFF"), "alignment": Alignment(horizontal='center'),
+                                "fill": PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+                                "border": border},
+            "ptt_tree_cell": {"border": border},
+        }
+
+        # Largeur de colonne = plus long contenu (plafonné à 50), calculée avant l'écriture
+        widths = [len(str(h)) for h in headers]
+        for values in rows:
+            for col_idx, value in enumerate(values):
+                length = len(str(value))
+                if col_idx >= len(widths):
+                    widths.append(length)
+                elif length > widths[col_idx]:
+                    widths[col_idx] = length
+        if widths:
+            widths[0] = max(widths[0], len(str(title)))
+
+        writer = ExcelStreamWriter(sheet_name, [min(w + 2, 50) for w in widths], styles)
+        writer.merged(title, "ptt_tree_title", 7)
+        writer.blank()
+        writer.append(headers, "ptt_tree_header")
+        total = len(rows)
+        for n, values in enumerate(rows, start=1):
+            writer.append(values, "ptt_tree_cell")
+            if progress and n % EXPORT_PROGRESS_STEP == 0:
+                progress(n, total)
+
+        writer.save(filename)
+        if progress:
+            progress(total, total)
+        return True, f"Fichier Excel créé: {filename}"
+
+    except Exception as e:
+        return False, f"Erreur lors de l'export Excel: {str(e)}"
+
+
+def export_treeview_to_excel(tree, filename, sheet_name="Planning", title="Planning Export", progress=None):
+    headers, rows = treeview_rows(tree)
+    return export_rows_to_excel(headers, rows, filename, sheet_name=sheet_name, title=title, progress=progress)
+
 
-    try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+def run_export_in_background(root, title, func, *args, on_done=None, **kwargs):
+    """
+    Exécuter `func(*args, progress=..., **kwargs)` dans un thread, avec une
+    petite fenêtre de progression ; `on_done(success, message)` est appelé
+    ensuite dans le thread Tk. La fonction d'export ne doit toucher à aucun
+    widget : lui passer des copies des données (missions, lignes d'un Treeview).
+    """
+    events = queue.Queue()
 
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = sheet_name
-
-        ws.merge_cells('A1:G1')
-        title_cell = ws['A1']
-        title_cell.value = title
-        title_cell.font = Font(size=14, bold=True)
-        title_cell.alignment = Alignment(horizontal='center')
-
-        columns = tree["columns"]
-        headers = [tree.heading(col)["text"] for col in columns]
-
-        for col_idx, header in enumerate(headers, start=1):
-            cell = ws.cell(row=3, column=col_idx)
-            cell.value = header
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
+    def report(done, total):
+        events.put(("progress", done, total))
 
-        row_idx = 4
-        for item in tree.get_children():
-            values = tree.item(item)["values"]
-            for col_idx, value in enumerate(values, start=1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                cell.value = value
-                cell.border = Border(
-                    left=Side(style='thin'),
-                    right=Side(style='thin'),
-                    top=Side(style='thin'),
-                    bottom=Side(style='thin')
-                )
-            row_idx += 1
+    def work():
+        try:
+            result = func(*args, progress=report, **kwargs)
+        except Exception as e:
+            result = (False, f"Erreur lors de l'export: {e}")
+        events.put(("done", result))
+
+    win = tk.Toplevel(root)
+    win.title(title)
+    win.resizable(False, False)
+    win.transient(root)
+    win.protocol("WM_DELETE_WINDOW", lambda: None)  # L'export continue jusqu'au bout
+    status = tk.StringVar(value="Préparation de l'export…")
+    ttk.Label(win, textvariable=status, padding=10).pack(fill="x")
+    bar = ttk.Progressbar(win, mode="indeterminate", length=320)
+    bar.pack(padx=10, pady=(0, 10))
+    bar.start(15)
+
+    def poll():
+        result = None
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "done":
+                result = event[1]
+            else:
+                _, done, total = event
+                if total:
+                    if str(bar["mode"]) != "determinate":
+                        bar.stop()
+                        bar.configure(mode="determinate", maximum=total)
+                    bar["value"] = done
+                    status.set(f"Écriture… {done:,} / {total:,}".replace(",", " "))
+        if result is None:
+            root.after(100, poll)
+            return
+        win.destroy()
+        if on_done:
+            on_done(*result)
+
+    threading.Thread(target=work, daemon=True, name="ptt-export").start()
+    root.after(100, poll)
+
+def run_in_background(root, func, *args, on_done=None, **kwargs):
+    """
+    Exécuter `func(*args, **kwargs)` dans un thread puis `on_done(résultat, erreur)`
+    dans le thread Tk (erreur = None si tout s'est bien passé). `func` ne doit
+    toucher à aucun widget.
+    """
+    events = queue.Queue()
 
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except Exception:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column].width = adjusted_width
+    def work():
+        try:
+            events.put((func(*args, **kwargs), None))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            events.put((None, e))
 
-        wb.save(filename)
-        return True, f"Fichier Excel créé: {filename}"
+    def poll():
+        try:
+            result, error = events.get_nowait()
+        except queue.Empty:
+            root.after(30, poll)
+            return
+        if on_done:
+            on_done(result, error)
 
-    except Exception as e:
-        return False, f"Erreur lors de l'export Excel: {str(e)}"
+    threading.Thread(target=work, daemon=True, name="ptt-background").start()
+    root.after(30, poll)
+
+# Ouvrir les fichiers exportés à la fin de l'export (désactivé en mode ligne de commande)
+AUTO_OPEN_EXPORTS = True
 
 def open_exported_file(filepath):
     """Ouvre le fichier exporté avec l'application par défaut"""
+    if not AUTO_OPEN_EXPORTS:
+        return False
     import os
     import platform
     import subprocess
@@ -1251,70 +3893,42 @@ def open_exported_file(filepath):
     except Exception:
         return False
 
-def export_planning_excel_par_chauffeur(missions, voyages, current_date, filename):
+def _mission_time_key(m):
+    heure = m.get("heure", "99:99")
+    try:
+        parts = heure.replace("h", ":").replace("H", ":").split(":")
+        return int(parts[0]) * 60 + int(parts[1]) if len(parts) >= 2 else 9999
+    except:
+        return 9999
+
+
+@timed()
+def export_planning_excel_par_chauffeur(missions, voyages, current_date, filename, progress=None):
     """Export Excel spécialisé pour la vue par Chauffeur - format professionnel"""
     if not EXCEL_AVAILABLE:
         return False, "Module openpyxl non disponible"
 
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
-        from openpyxl.utils import get_column_letter
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Planning Chauffeurs"
-
-        # Styles
-        header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        title_font = Font(bold=True, size=16, color="1F4E79")
-        subtitle_font = Font(bold=True, size=12, color="666666")
-        group_fill = PatternFill(start_color="D6E3F8", end_color="D6E3F8", fill_type="solid")
-        group_font = Font(bold=True, size=11, color="1F4E79")
-        data_font = Font(size=10)
-        border_thin = Border(
-            left=Side(style='thin', color='CCCCCC'),
-            right=Side(style='thin', color='CCCCCC'),
-            top=Side(style='thin', color='CCCCCC'),
-            bottom=Side(style='thin', color='CCCCCC')
-        )
-        center_align = Alignment(horizontal='center', vertical='center')
-        left_align = Alignment(horizontal='left', vertical='center')
+        type_styles = {"LIVRAISON": ("E8F5E9", None), "RAMASSE": ("FFF3E0", None)}
+        headers = ["Chauffeur", "N°", "Heure", "Type", "Voyage", "Palettes", "SST", "Pays", "Infos"]
+        col_widths = [20, 6, 10, 12, 12, 10, 15, 15, 30]
+        writer = ExcelStreamWriter("Planning Chauffeurs", col_widths,
+                                   excel_planning_styles("1F4E79", "D6E3F8", "1F4E79", type_styles))
 
         # En-tête du document
-        ws.merge_cells('A1:H1')
-        ws['A1'] = "PLANNING PAR CHAUFFEUR"
-        ws['A1'].font = title_font
-        ws['A1'].alignment = center_align
-
-        ws.merge_cells('A2:H2')
-        ws['A2'] = f"Date: {format_date_display(current_date)}"
-        ws['A2'].font = subtitle_font
-        ws['A2'].alignment = center_align
+        writer.merged("PLANNING PAR CHAUFFEUR", "ptt_title", 8)
+        writer.merged(f"Date: {format_date_display(current_date)}", "ptt_subtitle", 8)
 
         # Statistiques rapides
         total_missions = len([m for m in missions if not str(m.get("chauffeur_nom", "")).startswith("─")])
         total_palettes = sum(int(m.get("nb_pal", 0)) for m in missions if str(m.get("nb_pal", "")).isdigit())
         chauffeurs_uniques = len(set(m.get("chauffeur_nom", "") for m in missions if m.get("chauffeur_nom") and not str(m.get("chauffeur_nom", "")).startswith("─")))
-
-        ws.merge_cells('A3:H3')
-        ws['A3'] = f"Total: {total_missions} missions | {total_palettes} palettes | {chauffeurs_uniques} chauffeurs"
-        ws['A3'].font = Font(size=10, italic=True, color="888888")
-        ws['A3'].alignment = center_align
+        writer.merged(f"Total: {total_missions} missions | {total_palettes} palettes | {chauffeurs_uniques} chauffeurs",
+                      "ptt_stats", 8)
 
         # En-têtes de colonnes (ligne 5)
-        headers = ["Chauffeur", "N°", "Heure", "Type", "Voyage", "Palettes", "SST", "Pays", "Infos"]
-        col_widths = [20, 6, 10, 12, 12, 10, 15, 15, 30]
-
-        for col_idx, (header, width) in enumerate(zip(headers, col_widths), start=1):
-            cell = ws.cell(row=5, column=col_idx)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_align
-            cell.border = border_thin
-            ws.column_dimensions[get_column_letter(col_idx)].width = width
+        writer.blank()
+        writer.append(headers, "ptt_header")
 
         # Regrouper les missions par chauffeur
         v_by_code = {v.get("code"): v for v in voyages}
@@ -1326,18 +3940,13 @@ def export_planning_excel_par_chauffeur(missions, voyages, current_date, filenam
                     missions_by_driver[driver] = []
                 missions_by_driver[driver].append(m)
 
-        row_idx = 6
+        written = 0
         for driver_name in sorted(missions_by_driver.keys()):
             driver_missions = missions_by_driver[driver_name]
 
             # Ligne de groupe pour le chauffeur
-            ws.merge_cells(f'A{row_idx}:I{row_idx}')
             driver_palettes = sum(int(m.get("nb_pal", 0)) for m in driver_missions if str(m.get("nb_pal", "")).isdigit())
-            ws.cell(row=row_idx, column=1).value = f"  {driver_name} ({len(driver_missions)} missions, {driver_palettes} pal.)"
-            ws.cell(row=row_idx, column=1).font = group_font
-            ws.cell(row=row_idx, column=1).fill = group_fill
-            ws.cell(row=row_idx, column=1).alignment = left_align
-            row_idx += 1
+            writer.merged(f"  {driver_name} ({len(driver_missions)} missions, {driver_palettes} pal.)", "ptt_group", 9)
 
             # Trier les missions par numéro
             sorted_missions = sorted(driver_missions, key=lambda x: int(x.get("numero", 0)) if str(x.get("numero", "")).isdigit() else 0)
@@ -1358,132 +3967,70 @@ def export_planning_excel_par_chauffeur(missions, voyages, current_date, filenam
                     country,
                     m.get("infos", "")
                 ]
+                # Type coloré selon livraison / ramasse
+                writer.append(values, _excel_row_styles(9, (2, 3, 4, 5, 6), 4, m.get("type"), type_styles))
 
-                for col_idx, value in enumerate(values, start=1):
-                    cell = ws.cell(row=row_idx, column=col_idx)
-                    cell.value = value
-                    cell.font = data_font
-                    cell.border = border_thin
-                    cell.alignment = center_align if col_idx in [2, 3, 4, 5, 6] else left_align
-
-                # Colorer selon le type
-                type_cell = ws.cell(row=row_idx, column=4)
-                if m.get("type") == "LIVRAISON":
-                    type_cell.fill = PatternFill(start_color="E8F5E9", end_color="E8F5E9", fill_type="solid")
-                elif m.get("type") == "RAMASSE":
-                    type_cell.fill = PatternFill(start_color="FFF3E0", end_color="FFF3E0", fill_type="solid")
-
-                row_idx += 1
+                written += 1
+                if progress and written % EXPORT_PROGRESS_STEP == 0:
+                    progress(written, total_missions)
 
-            row_idx += 1  # Espace entre les groupes
+            writer.blank()  # Espace entre les groupes
 
         # Pied de page
-        ws.cell(row=row_idx + 1, column=1).value = f"Exporté le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-        ws.cell(row=row_idx + 1, column=1).font = Font(size=8, italic=True, color="999999")
+        _excel_footer(writer, 1)
 
-        wb.save(filename)
+        writer.save(filename)
+        if progress:
+            progress(total_missions, total_missions)
         open_exported_file(filename)
         return True, f"Export Excel créé et ouvert: {filename}"
 
     except Exception as e:
         return False, f"Erreur lors de l'export Excel: {str(e)}"
 
-def export_planning_excel_par_heure(missions, voyages, current_date, filename):
+@timed()
+def export_planning_excel_par_heure(missions, voyages, current_date, filename, progress=None):
     """Export Excel spécialisé pour la vue par Heure - format chronologique"""
     if not EXCEL_AVAILABLE:
         return False, "Module openpyxl non disponible"
 
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Planning Horaire"
-
-        # Styles
-        header_fill = PatternFill(start_color="2E7D32", end_color="2E7D32", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        title_font = Font(bold=True, size=16, color="2E7D32")
-        subtitle_font = Font(bold=True, size=12, color="666666")
-        time_fill = PatternFill(start_color="E8F5E9", end_color="E8F5E9", fill_type="solid")
-        time_font = Font(bold=True, size=11, color="2E7D32")
-        data_font = Font(size=10)
-        border_thin = Border(
-            left=Side(style='thin', color='CCCCCC'),
-            right=Side(style='thin', color='CCCCCC'),
-            top=Side(style='thin', color='CCCCCC'),
-            bottom=Side(style='thin', color='CCCCCC')
-        )
-        center_align = Alignment(horizontal='center', vertical='center')
-        left_align = Alignment(horizontal='left', vertical='center')
+        type_styles = {"LIVRAISON": ("C8E6C9", "2E7D32"), "RAMASSE": ("FFE0B2", "E65100")}
+        headers = ["Heure", "Type", "Voyage", "Chauffeur", "N°", "Palettes", "SST", "Pays", "Infos"]
+        col_widths = [10, 12, 12, 20, 6, 10, 15, 15, 30]
+        writer = ExcelStreamWriter("Planning Horaire", col_widths,
+                                   excel_planning_styles("2E7D32", "E8F5E9", "2E7D32", type_styles))
 
         # En-tête
-        ws.merge_cells('A1:I1')
-        ws['A1'] = "PLANNING CHRONOLOGIQUE"
-        ws['A1'].font = title_font
-        ws['A1'].alignment = center_align
-
-        ws.merge_cells('A2:I2')
-        ws['A2'] = f"Date: {format_date_display(current_date)}"
-        ws['A2'].font = subtitle_font
-        ws['A2'].alignment = center_align
+        writer.merged("PLANNING CHRONOLOGIQUE", "ptt_title", 9)
+        writer.merged(f"Date: {format_date_display(current_date)}", "ptt_subtitle", 9)
 
         # Statistiques
         total_missions = len([m for m in missions if m.get("heure")])
         livraisons = len([m for m in missions if m.get("type") == "LIVRAISON"])
         ramasses = len([m for m in missions if m.get("type") == "RAMASSE"])
-
-        ws.merge_cells('A3:I3')
-        ws['A3'] = f"Total: {total_missions} missions | {livraisons} livraisons | {ramasses} ramasses"
-        ws['A3'].font = Font(size=10, italic=True, color="888888")
-        ws['A3'].alignment = center_align
+        writer.merged(f"Total: {total_missions} missions | {livraisons} livraisons | {ramasses} ramasses",
+                      "ptt_stats", 9)
 
         # En-têtes
-        headers = ["Heure", "Type", "Voyage", "Chauffeur", "N°", "Palettes", "SST", "Pays", "Infos"]
-        col_widths = [10, 12, 12, 20, 6, 10, 15, 15, 30]
-
-        for col_idx, (header, width) in enumerate(zip(headers, col_widths), start=1):
-            cell = ws.cell(row=5, column=col_idx)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_align
-            cell.border = border_thin
-            ws.column_dimensions[get_column_letter(col_idx)].width = width
+        writer.blank()
+        writer.append(headers, "ptt_header")
 
         # Trier par heure
         v_by_code = {v.get("code"): v for v in voyages}
+        sorted_missions = sorted([m for m in missions if m.get("heure")], key=_mission_time_key)
 
-        def time_key(m):
-            heure = m.get("heure", "99:99")
-            try:
-                parts = heure.replace("h", ":").replace("H", ":").split(":")
-                return int(parts[0]) * 60 + int(parts[1]) if len(parts) >= 2 else 9999
-            except:
-                return 9999
-
-        sorted_missions = sorted([m for m in missions if m.get("heure")], key=time_key)
-
-        row_idx = 6
         last_hour = None
-
-        for m in sorted_missions:
+        for written, m in enumerate(sorted_missions, start=1):
             heure = m.get("heure", "")
             current_hour = heure.split(":")[0] if ":" in heure else heure.split("h")[0] if "h" in heure else ""
 
             # Séparateur d'heure
             if current_hour != last_hour and current_hour:
                 if last_hour is not None:
-                    row_idx += 1
-                ws.merge_cells(f'A{row_idx}:I{row_idx}')
-                ws.cell(row=row_idx, column=1).value = f"  {current_hour}h00 - {current_hour}h59"
-                ws.cell(row=row_idx, column=1).font = time_font
-                ws.cell(row=row_idx, column=1).fill = time_fill
-                ws.cell(row=row_idx, column=1).alignment = left_align
+                    writer.blank()
+                writer.merged(f"  {current_hour}h00 - {current_hour}h59", "ptt_group", 9)
                 last_hour = current_hour
-                row_idx += 1
 
             voyage_code = m.get("voyage", "")
             voyage = v_by_code.get(voyage_code, {})
@@ -1500,100 +4047,51 @@ def export_planning_excel_par_heure(missions, voyages, current_date, filename):
                 country,
                 m.get("infos", "")
             ]
+            # Type coloré selon livraison / ramasse
+            writer.append(values, _excel_row_styles(9, (1, 2, 3, 5, 6), 2, m.get("type"), type_styles))
 
-            for col_idx, value in enumerate(values, start=1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                cell.value = value
-                cell.font = data_font
-                cell.border = border_thin
-                cell.alignment = center_align if col_idx in [1, 2, 3, 5, 6] else left_align
-
-            # Colorer selon le type
-            type_cell = ws.cell(row=row_idx, column=2)
-            if m.get("type") == "LIVRAISON":
-                type_cell.fill = PatternFill(start_color="C8E6C9", end_color="C8E6C9", fill_type="solid")
-                type_cell.font = Font(size=10, bold=True, color="2E7D32")
-            elif m.get("type") == "RAMASSE":
-                type_cell.fill = PatternFill(start_color="FFE0B2", end_color="FFE0B2", fill_type="solid")
-                type_cell.font = Font(size=10, bold=True, color="E65100")
-
-            row_idx += 1
+            if progress and written % EXPORT_PROGRESS_STEP == 0:
+                progress(written, total_missions)
 
         # Pied de page
-        ws.cell(row=row_idx + 2, column=1).value = f"Exporté le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-        ws.cell(row=row_idx + 2, column=1).font = Font(size=8, italic=True, color="999999")
+        _excel_footer(writer, 2)
 
-        wb.save(filename)
+        writer.save(filename)
+        if progress:
+            progress(total_missions, total_missions)
         open_exported_file(filename)
         return True, f"Export Excel créé et ouvert: {filename}"
 
     except Exception as e:
         return False, f"Erreur lors de l'export Excel: {str(e)}"
 
-def export_planning_excel_par_voyage(missions, voyages, current_date, filename):
+@timed()
+def export_planning_excel_par_voyage(missions, voyages, current_date, filename, progress=None):
     """Export Excel spécialisé pour la vue par Voyage - format groupé par destination"""
     if not EXCEL_AVAILABLE:
         return False, "Module openpyxl non disponible"
 
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Planning Voyages"
-
-        # Styles
-        header_fill = PatternFill(start_color="5E35B1", end_color="5E35B1", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        title_font = Font(bold=True, size=16, color="5E35B1")
-        subtitle_font = Font(bold=True, size=12, color="666666")
-        voyage_fill = PatternFill(start_color="EDE7F6", end_color="EDE7F6", fill_type="solid")
-        voyage_font = Font(bold=True, size=11, color="5E35B1")
-        data_font = Font(size=10)
-        border_thin = Border(
-            left=Side(style='thin', color='CCCCCC'),
-            right=Side(style='thin', color='CCCCCC'),
-            top=Side(style='thin', color='CCCCCC'),
-            bottom=Side(style='thin', color='CCCCCC')
-        )
-        center_align = Alignment(horizontal='center', vertical='center')
-        left_align = Alignment(horizontal='left', vertical='center')
+        type_styles = {"LIVRAISON": ("E8F5E9", None), "RAMASSE": ("FFF3E0", None)}
+        headers = ["Voyage", "Pays", "Type", "Heure", "Chauffeur", "N°", "Palettes", "SST", "Infos"]
+        col_widths = [12, 15, 12, 10, 20, 6, 10, 15, 30]
+        writer = ExcelStreamWriter("Planning Voyages", col_widths,
+                                   excel_planning_styles("5E35B1", "EDE7F6", "5E35B1", type_styles))
 
         # En-tête
-        ws.merge_cells('A1:I1')
-        ws['A1'] = "PLANNING PAR VOYAGE"
-        ws['A1'].font = title_font
-        ws['A1'].alignment = center_align
-
-        ws.merge_cells('A2:I2')
-        ws['A2'] = f"Date: {format_date_display(current_date)}"
-        ws['A2'].font = subtitle_font
-        ws['A2'].alignment = center_align
+        writer.merged("PLANNING PAR VOYAGE", "ptt_title", 9)
+        writer.merged(f"Date: {format_date_display(current_date)}", "ptt_subtitle", 9)
 
         # Statistiques
         v_by_code = {v.get("code"): v for v in voyages}
         voyages_uniques = len(set(m.get("voyage", "") for m in missions if m.get("voyage")))
         total_palettes = sum(int(m.get("nb_pal", 0)) for m in missions if str(m.get("nb_pal", "")).isdigit())
-
-        ws.merge_cells('A3:I3')
-        ws['A3'] = f"Total: {voyages_uniques} voyages | {len(missions)} missions | {total_palettes} palettes"
-        ws['A3'].font = Font(size=10, italic=True, color="888888")
-        ws['A3'].alignment = center_align
+        writer.merged(f"Total: {voyages_uniques} voyages | {len(missions)} missions | {total_palettes} palettes",
+                      "ptt_stats", 9)
 
         # En-têtes
-        headers = ["Voyage", "Pays", "Type", "Heure", "Chauffeur", "N°", "Palettes", "SST", "Infos"]
-        col_widths = [12, 15, 12, 10, 20, 6, 10, 15, 30]
-
-        for col_idx, (header, width) in enumerate(zip(headers, col_widths), start=1):
-            cell = ws.cell(row=5, column=col_idx)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_align
-            cell.border = border_thin
-            ws.column_dimensions[get_column_letter(col_idx)].width = width
+        writer.blank()
+        writer.append(headers, "ptt_header")
 
         # Regrouper par voyage
         missions_by_voyage = {}
@@ -1603,7 +4101,8 @@ def export_planning_excel_par_voyage(missions, voyages, current_date, filename):
                 missions_by_voyage[voyage_code] = []
             missions_by_voyage[voyage_code].append(m)
 
-        row_idx = 6
+        total_missions = len(missions)
+        written = 0
         for voyage_code in sorted(missions_by_voyage.keys()):
             voyage_missions = missions_by_voyage[voyage_code]
             voyage = v_by_code.get(voyage_code, {})
@@ -1611,25 +4110,11 @@ def export_planning_excel_par_voyage(missions, voyages, current_date, filename):
 
             # Ligne de groupe
             voyage_palettes = sum(int(m.get("nb_pal", 0)) for m in voyage_missions if str(m.get("nb_pal", "")).isdigit())
-            ws.merge_cells(f'A{row_idx}:I{row_idx}')
-            ws.cell(row=row_idx, column=1).value = f"  {voyage_code} - {country} ({len(voyage_missions)} missions, {voyage_palettes} pal.)"
-            ws.cell(row=row_idx, column=1).font = voyage_font
-            ws.cell(row=row_idx, column=1).fill = voyage_fill
-            ws.cell(row=row_idx, column=1).alignment = left_align
-            row_idx += 1
+            writer.merged(f"  {voyage_code} - {country} ({len(voyage_missions)} missions, {voyage_palettes} pal.)",
+                          "ptt_group", 9)
 
             # Trier par heure
-            def time_key(m):
-                heure = m.get("heure", "99:99")
-                try:
-                    parts = heure.replace("h", ":").replace("H", ":").split(":")
-                    return int(parts[0]) * 60 + int(parts[1]) if len(parts) >= 2 else 9999
-                except:
-                    return 9999
-
-            sorted_missions = sorted(voyage_missions, key=time_key)
-
-            for m in sorted_missions:
+            for m in sorted(voyage_missions, key=_mission_time_key):
                 values = [
                     "",  # Voyage vide (déjà affiché)
                     "",  # Pays vide (déjà affiché)
@@ -1641,494 +4126,483 @@ def export_planning_excel_par_voyage(missions, voyages, current_date, filename):
                     m.get("sst", ""),
                     m.get("infos", "")
                 ]
+                # Type coloré selon livraison / ramasse
+                writer.append(values, _excel_row_styles(9, (3, 4, 6, 7), 3, m.get("type"), type_styles))
 
-                for col_idx, value in enumerate(values, start=1):
-                    cell = ws.cell(row=row_idx, column=col_idx)
-                    cell.value = value
-                    cell.font = data_font
-                    cell.border = border_thin
-                    cell.alignment = center_align if col_idx in [3, 4, 6, 7] else left_align
-
-                # Colorer selon le type
-                type_cell = ws.cell(row=row_idx, column=3)
-                if m.get("type") == "LIVRAISON":
-                    type_cell.fill = PatternFill(start_color="E8F5E9", end_color="E8F5E9", fill_type="solid")
-                elif m.get("type") == "RAMASSE":
-                    type_cell.fill = PatternFill(start_color="FFF3E0", end_color="FFF3E0", fill_type="solid")
-
-                row_idx += 1
+                written += 1
+                if progress and written % EXPORT_PROGRESS_STEP == 0:
+                    progress(written, total_missions)
 
-            row_idx += 1  # Espace entre les groupes
+            writer.blank()  # Espace entre les groupes
 
         # Pied de page
-        ws.cell(row=row_idx + 1, column=1).value = f"Exporté le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-        ws.cell(row=row_idx + 1, column=1).font = Font(size=8, italic=True, color="999999")
+        _excel_footer(writer, 1)
 
-        wb.save(filename)
+        writer.save(filename)
+        if progress:
+            progress(total_missions, total_missions)
         open_exported_file(filename)
         return True, f"Export Excel créé et ouvert: {filename}"
 
     except Exception as e:
         return False, f"Erreur lors de l'export Excel: {str(e)}"
 
-def export_planning_pdf_par_chauffeur(missions, voyages, current_date, filename):
-    """Export PDF spécialisé pour la vue par Chauffeur - format professionnel"""
-    if not PDF_AVAILABLE:
-        return False, "Module reportlab non disponible"
-
-    try:
-        from reportlab.lib.pagesizes import A4, landscape
-        from reportlab.lib import colors
-        from reportlab.lib.units import cm, mm
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-        doc = SimpleDocTemplate(str(filename), pagesize=landscape(A4),
-                               leftMargin=1*cm, rightMargin=1*cm,
-                               topMargin=1*cm, bottomMargin=1*cm)
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # Styles personnalisés
-        title_style = ParagraphStyle('TitleStyle', parent=styles['Heading1'],
-                                     fontSize=18, textColor=colors.HexColor('#1F4E79'),
-                                     alignment=TA_CENTER, spaceAfter=5)
-        subtitle_style = ParagraphStyle('SubtitleStyle', parent=styles['Normal'],
-                                        fontSize=12, textColor=colors.HexColor('#666666'),
-                                        alignment=TA_CENTER, spaceAfter=3)
-        stats_style = ParagraphStyle('StatsStyle', parent=styles['Normal'],
-                                     fontSize=9, textColor=colors.HexColor('#888888'),
-                                     alignment=TA_CENTER, spaceAfter=15)
-        group_style = ParagraphStyle('GroupStyle', parent=styles['Normal'],
-                                     fontSize=10, textColor=colors.HexColor('#1F4E79'),
-                                     fontName='Helvetica-Bold', spaceBefore=10, spaceAfter=3)
-        footer_style = ParagraphStyle('FooterStyle', parent=styles['Normal'],
-                                      fontSize=8, textColor=colors.HexColor('#999999'),
-                                      alignment=TA_CENTER)
-
-        # En-tête
-        elements.append(Paragraph("PLANNING PAR CHAUFFEUR", title_style))
-        elements.append(Paragraph(f"Date: {format_date_display(current_date)}", subtitle_style))
-
-        # Statistiques
-        total_missions = len([m for m in missions if not str(m.get("chauffeur_nom", "")).startswith("─")])
-        total_palettes = sum(int(m.get("nb_pal", 0)) for m in missions if str(m.get("nb_pal", "")).isdigit())
-        chauffeurs_uniques = len(set(m.get("chauffeur_nom", "") for m in missions if m.get("chauffeur_nom") and not str(m.get("chauffeur_nom", "")).startswith("─")))
-        elements.append(Paragraph(f"Total: {total_missions} missions | {total_palettes} palettes | {chauffeurs_uniques} chauffeurs", stats_style))
+# ---------- Export PDF : styles partagés, rendu par journée, export par lot ----------
 
-        # Regrouper par chauffeur
-        v_by_code = {v.get("code"): v for v in voyages}
-        missions_by_driver = {}
-        for m in missions:
-            driver = m.get("chauffeur_nom", "Non assigné")
-            if driver and not str(driver).startswith("─"):
-                if driver not in missions_by_driver:
-                    missions_by_driver[driver] = []
-                missions_by_driver[driver].append(m)
+# Styles reportlab par vue, construits une fois par processus (voir pdf_planning_styles)
+_pdf_styles_cache = {}
 
-        # Couleurs
-        header_color = colors.HexColor('#1F4E79')
-        group_color = colors.HexColor('#D6E3F8')
-        livraison_color = colors.HexColor('#E8F5E9')
-        ramasse_color = colors.HexColor('#FFF3E0')
+# Couleurs par vue : (accent, fond livraison, fond ramasse)
+PDF_VIEW_COLORS = {
+    "chauffeur": ('#1F4E79', '#E8F5E9', '#FFF3E0'),
+    "heure": ('#2E7D32', '#C8E6C9', '#FFE0B2'),
+    "voyage": ('#5E35B1', '#E8F5E9', '#FFF3E0'),
+}
 
-        for driver_name in sorted(missions_by_driver.keys()):
-            driver_missions = missions_by_driver[driver_name]
-            driver_palettes = sum(int(m.get("nb_pal", 0)) for m in driver_missions if str(m.get("nb_pal", "")).isdigit())
 
-            elements.append(Paragraph(f"{driver_name} ({len(driver_missions)} missions, {driver_palettes} palettes)", group_style))
+def pdf_planning_styles(view):
+    """Styles de paragraphe et de tableau d'une vue ("chauffeur", "heure", "voyage" ou "tableau")"""
+    st = _pdf_styles_cache.get(view)
+    if st is not None:
+        return st
 
-            # Tableau pour ce chauffeur
-            table_data = [["N°", "Heure", "Type", "Voyage", "Palettes", "SST", "Pays", "Infos"]]
+    lazy_import("reportlab.platypus")
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+
+    styles = getSampleStyleSheet()
+    if view == "tableau":
+        st = {
+            "title": ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16,
+                                    textColor=colors.HexColor('#366092'), spaceAfter=30, alignment=TA_CENTER),
+            "date": ParagraphStyle('DateStyle', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER),
+            "table": TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 8),
+                ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+            ]),
+        }
+        _pdf_styles_cache[view] = st
+        return st
+
+    accent, livraison, ramasse = PDF_VIEW_COLORS[view]
+    st = {
+        "title": ParagraphStyle('TitleStyle', parent=styles['Heading1'],
+                                fontSize=18, textColor=colors.HexColor(accent),
+                                alignment=TA_CENTER, spaceAfter=5),
+        "subtitle": ParagraphStyle('SubtitleStyle', parent=styles['Normal'],
+                                   fontSize=12, textColor=colors.HexColor('#666666'),
+                                   alignment=TA_CENTER, spaceAfter=3),
+        "stats": ParagraphStyle('StatsStyle', parent=styles['Normal'],
+                                fontSize=9, textColor=colors.HexColor('#888888'),
+                                alignment=TA_CENTER, spaceAfter=15),
+        "group": ParagraphStyle('GroupStyle', parent=styles['Normal'],
+                                fontSize=10, textColor=colors.HexColor(accent),
+                                fontName='Helvetica-Bold', spaceBefore=10, spaceAfter=3),
+        "footer": ParagraphStyle('FooterStyle', parent=styles['Normal'],
+                                 fontSize=8, textColor=colors.HexColor('#999999'),
+                                 alignment=TA_CENTER),
+        "livraison": colors.HexColor(livraison),
+        "ramasse": colors.HexColor(ramasse),
+    }
+
+    # Style de base des tableaux (les fonds par type de mission s'y ajoutent)
+    header_size, padding = (9, 4) if view == "heure" else (8, 3)
+    left_cols = {"chauffeur": (5, 7), "heure": (3, 6, 8), "voyage": (2, 5, 6)}[view]
+    commands = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(accent)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_size),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]
+    commands += [('ALIGN', (col, 1), (col, -1), 'LEFT') for col in left_cols]
+    commands += [
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), padding),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+    ]
+    if view == "heure":
+        commands.append(('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F5F5F5')]))
+    st["table"] = TableStyle(commands)
+    _pdf_styles_cache[view] = st
+    return st
+
+
+def _pdf_mission_table(table_data, col_widths, missions, type_col, st):
+    """Tableau de missions : style de base partagé + fond de la colonne Type"""
+    from reportlab.platypus import Table, TableStyle
+
+    t = Table(table_data, colWidths=col_widths)
+    t.setStyle(st["table"])
+    type_commands = []
+    for idx, m in enumerate(missions, start=1):
+        if m.get("type") == "LIVRAISON":
+            type_commands.append(('BACKGROUND', (type_col, idx), (type_col, idx), st["livraison"]))
+        elif m.get("type") == "RAMASSE":
+            type_commands.append(('BACKGROUND', (type_col, idx), (type_col, idx), st["ramasse"]))
+    if type_commands:
+        t.setStyle(TableStyle(type_commands))
+    return t
+
+
+def _pdf_elements_par_chauffeur(missions, voyages, current_date, st, label=""):
+    from reportlab.platypus import Paragraph, Spacer
+
+    elements = []
+    # En-tête
+    elements.append(Paragraph("PLANNING PAR CHAUFFEUR", st["title"]))
+    elements.append(Paragraph(f"Date: {format_date_display(current_date)}{label}", st["subtitle"]))
+
+    # Statistiques
+    total_missions = len([m for m in missions if not str(m.get("chauffeur_nom", "")).startswith("─")])
+    total_palettes = sum(int(m.get("nb_pal", 0)) for m in missions if str(m.get("nb_pal", "")).isdigit())
+    chauffeurs_uniques = len(set(m.get("chauffeur_nom", "") for m in missions if m.get("chauffeur_nom") and not str(m.get("chauffeur_nom", "")).startswith("─")))
+    elements.append(Paragraph(f"Total: {total_missions} missions | {total_palettes} palettes | {chauffeurs_uniques} chauffeurs", st["stats"]))
+
+    # Regrouper par chauffeur
+    v_by_code = {v.get("code"): v for v in voyages}
+    missions_by_driver = {}
+    for m in missions:
+        driver = m.get("chauffeur_nom", "Non assigné")
+        if driver and not str(driver).startswith("─"):
+            if driver not in missions_by_driver:
+                missions_by_driver[driver] = []
+            missions_by_driver[driver].append(m)
+
+    for driver_name in sorted(missions_by_driver.keys()):
+        driver_missions = missions_by_driver[driver_name]
+        driver_palettes = sum(int(m.get("nb_pal", 0)) for m in driver_missions if str(m.get("nb_pal", "")).isdigit())
+
+        elements.append(Paragraph(f"{driver_name} ({len(driver_missions)} missions, {driver_palettes} palettes)", st["group"]))
+
+        # Tableau pour ce chauffeur
+        table_data = [["N°", "Heure", "Type", "Voyage", "Palettes", "SST", "Pays", "Infos"]]
+
+        sorted_missions = sorted(driver_missions, key=lambda x: int(x.get("numero", 0)) if str(x.get("numero", "")).isdigit() else 0)
 
-            sorted_missions = sorted(driver_missions, key=lambda x: int(x.get("numero", 0)) if str(x.get("numero", "")).isdigit() else 0)
+        for m in sorted_missions:
+            voyage_code = m.get("voyage", "")
+            voyage = v_by_code.get(voyage_code, {})
+            country = voyage.get("country", "Belgique")
+            table_data.append([
+                str(m.get("numero", "")),
+                m.get("heure", ""),
+                m.get("type", ""),
+                voyage_code,
+                str(m.get("nb_pal", "")),
+                m.get("sst", ""),
+                country,
+                str(m.get("infos", ""))[:30]
+            ])
 
-            for m in sorted_missions:
-                voyage_code = m.get("voyage", "")
-                voyage = v_by_code.get(voyage_code, {})
-                country = voyage.get("country", "Belgique")
-                table_data.append([
-                    str(m.get("numero", "")),
-                    m.get("heure", ""),
-                    m.get("type", ""),
-                    voyage_code,
-                    str(m.get("nb_pal", "")),
-                    m.get("sst", ""),
-                    country,
-                    str(m.get("infos", ""))[:30]
-                ])
+        elements.append(_pdf_mission_table(table_data, [25, 50, 70, 60, 50, 80, 80, 150], sorted_missions, 2, st))
+        elements.append(Spacer(1, 10))
+    return elements
 
-            col_widths = [25, 50, 70, 60, 50, 80, 80, 150]
-            t = Table(table_data, colWidths=col_widths)
 
-            # Style du tableau
-            table_style = [
-                ('BACKGROUND', (0, 0), (-1, 0), header_color),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 8),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('ALIGN', (5, 1), (5, -1), 'LEFT'),
-                ('ALIGN', (7, 1), (7, -1), 'LEFT'),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ]
+def _pdf_elements_par_heure(missions, voyages, current_date, st, label=""):
+    from reportlab.platypus import Paragraph
 
-            # Colorer les lignes selon le type
-            for idx, m in enumerate(sorted_missions, start=1):
-                if m.get("type") == "LIVRAISON":
-                    table_style.append(('BACKGROUND', (2, idx), (2, idx), livraison_color))
-                elif m.get("type") == "RAMASSE":
-                    table_style.append(('BACKGROUND', (2, idx), (2, idx), ramasse_color))
+    elements = []
+    # En-tête
+    elements.append(Paragraph("PLANNING CHRONOLOGIQUE", st["title"]))
+    elements.append(Paragraph(f"Date: {format_date_display(current_date)}{label}", st["subtitle"]))
 
-            t.setStyle(TableStyle(table_style))
-            elements.append(t)
-            elements.append(Spacer(1, 10))
+    # Statistiques
+    total_missions = len([m for m in missions if m.get("heure")])
+    livraisons = len([m for m in missions if m.get("type") == "LIVRAISON"])
+    ramasses = len([m for m in missions if m.get("type") == "RAMASSE"])
+    total_palettes = sum(int(m.get("nb_pal", 0)) for m in missions if str(m.get("nb_pal", "")).isdigit())
+    elements.append(Paragraph(f"Total: {total_missions} missions | {livraisons} livraisons | {ramasses} ramasses | {total_palettes} palettes", st["stats"]))
 
-        # Pied de page
-        elements.append(Spacer(1, 20))
-        elements.append(Paragraph(f"Exporté le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", footer_style))
+    # Trier par heure
+    v_by_code = {v.get("code"): v for v in voyages}
+    sorted_missions = sorted([m for m in missions if m.get("heure")], key=_mission_time_key)
 
-        doc.build(elements)
-        open_exported_file(filename)
-        return True, f"Export PDF créé et ouvert: {filename}"
+    # Tableau principal
+    table_data = [["Heure", "Type", "Voyage", "Chauffeur", "N°", "Palettes", "SST", "Pays", "Infos"]]
 
-    except Exception as e:
-        return False, f"Erreur lors de l'export PDF: {str(e)}"
+    for m in sorted_missions:
+        voyage_code = m.get("voyage", "")
+        voyage = v_by_code.get(voyage_code, {})
+        country = voyage.get("country", "Belgique")
+        table_data.append([
+            m.get("heure", ""),
+            m.get("type", ""),
+            voyage_code,
+            m.get("chauffeur_nom", ""),
+            str(m.get("numero", "")),
+            str(m.get("nb_pal", "")),
+            m.get("sst", ""),
+            country,
+            str(m.get("infos", ""))[:25]
+        ])
 
-def export_planning_pdf_par_heure(missions, voyages, current_date, filename):
-    """Export PDF spécialisé pour la vue par Heure - format chronologique"""
-    if not PDF_AVAILABLE:
-        return False, "Module reportlab non disponible"
+    elements.append(_pdf_mission_table(table_data, [45, 70, 60, 100, 25, 45, 80, 80, 130], sorted_missions, 1, st))
+    return elements
 
-    try:
-        from reportlab.lib.pagesizes import A4, landscape
-        from reportlab.lib import colors
-        from reportlab.lib.units import cm
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-        doc = SimpleDocTemplate(str(filename), pagesize=landscape(A4),
-                               leftMargin=1*cm, rightMargin=1*cm,
-                               topMargin=1*cm, bottomMargin=1*cm)
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # Styles
-        title_style = ParagraphStyle('TitleStyle', parent=styles['Heading1'],
-                                     fontSize=18, textColor=colors.HexColor('#2E7D32'),
-                                     alignment=TA_CENTER, spaceAfter=5)
-        subtitle_style = ParagraphStyle('SubtitleStyle', parent=styles['Normal'],
-                                        fontSize=12, textColor=colors.HexColor('#666666'),
-                                        alignment=TA_CENTER, spaceAfter=3)
-        stats_style = ParagraphStyle('StatsStyle', parent=styles['Normal'],
-                                     fontSize=9, textColor=colors.HexColor('#888888'),
-                                     alignment=TA_CENTER, spaceAfter=15)
-        footer_style = ParagraphStyle('FooterStyle', parent=styles['Normal'],
-                                      fontSize=8, textColor=colors.HexColor('#999999'),
-                                      alignment=TA_CENTER)
 
-        # En-tête
-        elements.append(Paragraph("PLANNING CHRONOLOGIQUE", title_style))
-        elements.append(Paragraph(f"Date: {format_date_display(current_date)}", subtitle_style))
+def _pdf_elements_par_voyage(missions, voyages, current_date, st, label=""):
+    from reportlab.platypus import Paragraph, Spacer
 
-        # Statistiques
-        total_missions = len([m for m in missions if m.get("heure")])
-        livraisons = len([m for m in missions if m.get("type") == "LIVRAISON"])
-        ramasses = len([m for m in missions if m.get("type") == "RAMASSE"])
-        total_palettes = sum(int(m.get("nb_pal", 0)) for m in missions if str(m.get("nb_pal", "")).isdigit())
-        elements.append(Paragraph(f"Total: {total_missions} missions | {livraisons} livraisons | {ramasses} ramasses | {total_palettes} palettes", stats_style))
+    elements = []
+    # En-tête
+    elements.append(Paragraph("PLANNING PAR VOYAGE", st["title"]))
+    elements.append(Paragraph(f"Date: {format_date_display(current_date)}{label}", st["subtitle"]))
 
-        # Couleurs
-        header_color = colors.HexColor('#2E7D32')
-        livraison_color = colors.HexColor('#C8E6C9')
-        ramasse_color = colors.HexColor('#FFE0B2')
+    # Statistiques
+    v_by_code = {v.get("code"): v for v in voyages}
+    voyages_uniques = len(set(m.get("voyage", "") for m in missions if m.get("voyage")))
+    total_palettes = sum(int(m.get("nb_pal", 0)) for m in missions if str(m.get("nb_pal", "")).isdigit())
+    elements.append(Paragraph(f"Total: {voyages_uniques} voyages | {len(missions)} missions | {total_palettes} palettes", st["stats"]))
 
-        # Trier par heure
-        v_by_code = {v.get("code"): v for v in voyages}
+    # Regrouper par voyage
+    missions_by_voyage = {}
+    for m in missions:
+        voyage_code = m.get("voyage", "Sans voyage")
+        if voyage_code not in missions_by_voyage:
+            missions_by_voyage[voyage_code] = []
+        missions_by_voyage[voyage_code].append(m)
 
-        def time_key(m):
-            heure = m.get("heure", "99:99")
-            try:
-                parts = heure.replace("h", ":").replace("H", ":").split(":")
-                return int(parts[0]) * 60 + int(parts[1]) if len(parts) >= 2 else 9999
-            except:
-                return 9999
+    for voyage_code in sorted(missions_by_voyage.keys()):
+        voyage_missions = missions_by_voyage[voyage_code]
+        voyage = v_by_code.get(voyage_code, {})
+        country = voyage.get("country", "Belgique")
+        voyage_palettes = sum(int(m.get("nb_pal", 0)) for m in voyage_missions if str(m.get("nb_pal", "")).isdigit())
 
-        sorted_missions = sorted([m for m in missions if m.get("heure")], key=time_key)
+        elements.append(Paragraph(f"{voyage_code} - {country} ({len(voyage_missions)} missions, {voyage_palettes} palettes)", st["group"]))
 
-        # Tableau principal
-        table_data = [["Heure", "Type", "Voyage", "Chauffeur", "N°", "Palettes", "SST", "Pays", "Infos"]]
+        # Tableau trié par heure
+        table_data = [["Heure", "Type", "Chauffeur", "N°", "Palettes", "SST", "Infos"]]
+        sorted_missions = sorted(voyage_missions, key=_mission_time_key)
 
         for m in sorted_missions:
-            voyage_code = m.get("voyage", "")
-            voyage = v_by_code.get(voyage_code, {})
-            country = voyage.get("country", "Belgique")
             table_data.append([
                 m.get("heure", ""),
                 m.get("type", ""),
-                voyage_code,
                 m.get("chauffeur_nom", ""),
                 str(m.get("numero", "")),
                 str(m.get("nb_pal", "")),
                 m.get("sst", ""),
-                country,
-                str(m.get("infos", ""))[:25]
+                str(m.get("infos", ""))[:35]
             ])
 
-        col_widths = [45, 70, 60, 100, 25, 45, 80, 80, 130]
-        t = Table(table_data, colWidths=col_widths)
-
-        table_style = [
-            ('BACKGROUND', (0, 0), (-1, 0), header_color),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('ALIGN', (3, 1), (3, -1), 'LEFT'),
-            ('ALIGN', (6, 1), (6, -1), 'LEFT'),
-            ('ALIGN', (8, 1), (8, -1), 'LEFT'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F5F5F5')]),
-        ]
-
-        # Colorer selon le type
-        for idx, m in enumerate(sorted_missions, start=1):
-            if m.get("type") == "LIVRAISON":
-                table_style.append(('BACKGROUND', (1, idx), (1, idx), livraison_color))
-            elif m.get("type") == "RAMASSE":
-                table_style.append(('BACKGROUND', (1, idx), (1, idx), ramasse_color))
+        elements.append(_pdf_mission_table(table_data, [50, 70, 120, 30, 50, 100, 180], sorted_missions, 1, st))
+        elements.append(Spacer(1, 10))
+    return elements
 
-        t.setStyle(TableStyle(table_style))
-        elements.append(t)
-
-        # Pied de page
-        elements.append(Spacer(1, 20))
-        elements.append(Paragraph(f"Exporté le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", footer_style))
 
-        doc.build(elements)
-        open_exported_file(filename)
-        return True, f"Export PDF créé et ouvert: {filename}"
+_PDF_VIEW_BUILDERS = {
+    "chauffeur": _pdf_elements_par_chauffeur,
+    "heure": _pdf_elements_par_heure,
+    "voyage": _pdf_elements_par_voyage,
+}
 
-    except Exception as e:
-        return False, f"Erreur lors de l'export PDF: {str(e)}"
 
-def export_planning_pdf_par_voyage(missions, voyages, current_date, filename):
-    """Export PDF spécialisé pour la vue par Voyage - format groupé par destination"""
+def render_planning_pdf(view, sections, voyages, filename):
+    """
+    Écrire un PDF de planning : `sections` = [(date, missions, libellé)], une
+    section par journée (saut de page entre les journées). Lève l'exception
+    reportlab en cas d'échec.
+    """
+    lazy_import("reportlab.platypus")
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+
+    st = pdf_planning_styles(view)
+    build_elements = _PDF_VIEW_BUILDERS[view]
+    doc = SimpleDocTemplate(str(filename), pagesize=landscape(A4),
+                           leftMargin=1*cm, rightMargin=1*cm,
+                           topMargin=1*cm, bottomMargin=1*cm)
+    elements = []
+    for i, (d, missions, label) in enumerate(sections):
+        if i:
+            elements.append(PageBreak())
+        elements.extend(build_elements(missions, voyages, d, st, label))
+
+    # Pied de page
+    elements.append(Spacer(1, 20))
+    elements.append(Paragraph(f"Exporté le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", st["footer"]))
+    doc.build(elements)
+
+
+def _export_planning_pdf_day(view, missions, voyages, current_date, filename):
     if not PDF_AVAILABLE:
         return False, "Module reportlab non disponible"
 
     try:
-        from reportlab.lib.pagesizes import A4, landscape
-        from reportlab.lib import colors
-        from reportlab.lib.units import cm
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-        doc = SimpleDocTemplate(str(filename), pagesize=landscape(A4),
-                               leftMargin=1*cm, rightMargin=1*cm,
-                               topMargin=1*cm, bottomMargin=1*cm)
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # Styles
-        title_style = ParagraphStyle('TitleStyle', parent=styles['Heading1'],
-                                     fontSize=18, textColor=colors.HexColor('#5E35B1'),
-                                     alignment=TA_CENTER, spaceAfter=5)
-        subtitle_style = ParagraphStyle('SubtitleStyle', parent=styles['Normal'],
-                                        fontSize=12, textColor=colors.HexColor('#666666'),
-                                        alignment=TA_CENTER, spaceAfter=3)
-        stats_style = ParagraphStyle('StatsStyle', parent=styles['Normal'],
-                                     fontSize=9, textColor=colors.HexColor('#888888'),
-                                     alignment=TA_CENTER, spaceAfter=15)
-        group_style = ParagraphStyle('GroupStyle', parent=styles['Normal'],
-                                     fontSize=10, textColor=colors.HexColor('#5E35B1'),
-                                     fontName='Helvetica-Bold', spaceBefore=10, spaceAfter=3)
-        footer_style = ParagraphStyle('FooterStyle', parent=styles['Normal'],
-                                      fontSize=8, textColor=colors.HexColor('#999999'),
-                                      alignment=TA_CENTER)
-
-        # En-tête
-        elements.append(Paragraph("PLANNING PAR VOYAGE", title_style))
-        elements.append(Paragraph(f"Date: {format_date_display(current_date)}", subtitle_style))
-
-        # Statistiques
-        v_by_code = {v.get("code"): v for v in voyages}
-        voyages_uniques = len(set(m.get("voyage", "") for m in missions if m.get("voyage")))
-        total_palettes = sum(int(m.get("nb_pal", 0)) for m in missions if str(m.get("nb_pal", "")).isdigit())
-        elements.append(Paragraph(f"Total: {voyages_uniques} voyages | {len(missions)} missions | {total_palettes} palettes", stats_style))
-
-        # Couleurs
-        header_color = colors.HexColor('#5E35B1')
-        group_color = colors.HexColor('#EDE7F6')
-        livraison_color = colors.HexColor('#E8F5E9')
-        ramasse_color = colors.HexColor('#FFF3E0')
+        render_planning_pdf(view, [(current_date, missions, "")], voyages, filename)
+        open_exported_file(filename)
+        return True, f"Export PDF créé et ouvert: {filename}"
 
-        # Regrouper par voyage
-        missions_by_voyage = {}
-        for m in missions:
-            voyage_code = m.get("voyage", "Sans voyage")
-            if voyage_code not in missions_by_voyage:
-                missions_by_voyage[voyage_code] = []
-            missions_by_voyage[voyage_code].append(m)
+    except Exception as e:
+        return False, f"Erreur lors de l'export PDF: {str(e)}"
 
-        for voyage_code in sorted(missions_by_voyage.keys()):
-            voyage_missions = missions_by_voyage[voyage_code]
-            voyage = v_by_code.get(voyage_code, {})
-            country = voyage.get("country", "Belgique")
-            voyage_palettes = sum(int(m.get("nb_pal", 0)) for m in voyage_missions if str(m.get("nb_pal", "")).isdigit())
+@timed()
+def export_planning_pdf_par_chauffeur(missions, voyages, current_date, filename):
+    """Export PDF spécialisé pour la vue par Chauffeur - format professionnel"""
+    return _export_planning_pdf_day("chauffeur", missions, voyages, current_date, filename)
 
-            elements.append(Paragraph(f"{voyage_code} - {country} ({len(voyage_missions)} missions, {voyage_palettes} palettes)", group_style))
+@timed()
+def export_planning_pdf_par_heure(missions, voyages, current_date, filename):
+    """Export PDF spécialisé pour la vue par Heure - format chronologique"""
+    return _export_planning_pdf_day("heure", missions, voyages, current_date, filename)
 
-            # Tableau
-            table_data = [["Heure", "Type", "Chauffeur", "N°", "Palettes", "SST", "Infos"]]
+@timed()
+def export_planning_pdf_par_voyage(missions, voyages, current_date, filename):
+    """Export PDF spécialisé pour la vue par Voyage - format groupé par destination"""
+    return _export_planning_pdf_day("voyage", missions, voyages, current_date, filename)
 
-            def time_key(m):
-                heure = m.get("heure", "99:99")
-                try:
-                    parts = heure.replace("h", ":").replace("H", ":").split(":")
-                    return int(parts[0]) * 60 + int(parts[1]) if len(parts) >= 2 else 9999
-                except:
-                    return 9999
 
-            sorted_missions = sorted(voyage_missions, key=time_key)
+# Regroupements possibles de l'export PDF par lot
+PDF_BATCH_SPLITS = {
+    "periode": "Un seul fichier (une section par jour)",
+    "jour": "Un fichier par jour",
+    "sst": "Un fichier par SST (une section par jour)",
+}
 
-            for m in sorted_missions:
-                table_data.append([
-                    m.get("heure", ""),
-                    m.get("type", ""),
-                    m.get("chauffeur_nom", ""),
-                    str(m.get("numero", "")),
-                    str(m.get("nb_pal", "")),
-                    m.get("sst", ""),
-                    str(m.get("infos", ""))[:35]
-                ])
 
-            col_widths = [50, 70, 120, 30, 50, 100, 180]
-            t = Table(table_data, colWidths=col_widths)
+def _safe_filename_part(text):
+    import re
+    return re.sub(r"[^\w\-]+", "_", str(text)).strip("_") or "sans_nom"
 
-            table_style = [
-                ('BACKGROUND', (0, 0), (-1, 0), header_color),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 8),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('ALIGN', (2, 1), (2, -1), 'LEFT'),
-                ('ALIGN', (5, 1), (5, -1), 'LEFT'),
-                ('ALIGN', (6, 1), (6, -1), 'LEFT'),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ]
 
-            # Colorer selon le type
-            for idx, m in enumerate(sorted_missions, start=1):
-                if m.get("type") == "LIVRAISON":
-                    table_style.append(('BACKGROUND', (1, idx), (1, idx), livraison_color))
-                elif m.get("type") == "RAMASSE":
-                    table_style.append(('BACKGROUND', (1, idx), (1, idx), ramasse_color))
+def plan_pdf_batch(view, days, split, out_dir):
+    """
+    Découper un export par lot en fichiers : `days` = [(date, missions)].
+    Retourne [(nom de fichier, [(date, missions, libellé)])] ; les jours sans
+    mission sont ignorés.
+    """
+    days = [(d, missions) for d, missions in days if missions]
+    if not days:
+        return []
+    out_dir = Path(out_dir)
+    start = format_date_internal(days[0][0])
+    end = format_date_internal(days[-1][0])
+    if split == "jour":
+        return [(out_dir / f"planning_{view}_{format_date_internal(d)}.pdf", [(d, missions, "")])
+                for d, missions in days]
+    if split == "sst":
+        by_sst = {}
+        for d, missions in days:
+            per_day = {}
+            for m in missions:
+                per_day.setdefault((m.get("sst") or "").strip() or "Sans SST", []).append(m)
+            for sst, sst_missions in per_day.items():
+                by_sst.setdefault(sst, []).append((d, sst_missions, f" - SST: {sst}"))
+        return [(out_dir / f"planning_{view}_{_safe_filename_part(sst)}_{start}_{end}.pdf", sections)
+                for sst, sections in sorted(by_sst.items())]
+    return [(out_dir / f"planning_{view}_{start}_{end}.pdf", [(d, missions, "") for d, missions in days])]
 
-            t.setStyle(TableStyle(table_style))
-            elements.append(t)
-            elements.append(Spacer(1, 10))
 
-        # Pied de page
-        elements.append(Spacer(1, 20))
-        elements.append(Paragraph(f"Exporté le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", footer_style))
+def _render_pdf_job(job):
+    """Rendu d'un fichier du lot (exécuté dans un processus de travail)"""
+    view, sections, voyages, filename = job
+    try:
+        render_planning_pdf(view, sections, voyages, filename)
+        return True, str(filename)
+    except Exception as e:
+        return False, f"{Path(filename).name}: {e}"
 
-        doc.build(elements)
-        open_exported_file(filename)
-        return True, f"Export PDF créé et ouvert: {filename}"
 
-    except Exception as e:
-        return False, f"Erreur lors de l'export PDF: {str(e)}"
+@timed()
+def export_planning_pdf_batch(view, dates, voyages, out_dir, split="periode", load_day=None,
+                              max_workers=None, progress=None):
+    """
+    Export PDF d'une période : missions lues par journée (`load_day`, par
+    défaut le cache partagé day_store), découpées selon `split` (voir
+    PDF_BATCH_SPLITS) puis rendues en parallèle, un fichier par processus.
+    """
+    if not PDF_AVAILABLE:
+        return False, "Module reportlab non disponible"
 
-def export_treeview_to_pdf(tree, filename, title="Planning Export", date_str=""):
+    load_day = load_day or day_store.get
+    days = [(d, load_day(d)) for d in dates]
+    jobs = [(view, sections, voyages, filename)
+            for filename, sections in plan_pdf_batch(view, days, split, out_dir)]
+    if not jobs:
+        return False, "Aucune mission sur la période choisie"
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    total = len(jobs)
+    results = []
+    workers = min(total, max_workers or os.cpu_count() or 1)
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_render_pdf_job, job) for job in jobs]
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    if progress:
+                        progress(len(results), total)
+        except Exception as e:
+            # Pool de processus indisponible (environnement restreint) : rendu séquentiel
+            print(f"Export PDF par lot : rendu séquentiel ({e})")
+            results = []
+    if not results:
+        for job in jobs:
+            results.append(_render_pdf_job(job))
+            if progress:
+                progress(len(results), total)
+
+    errors = [message for ok, message in results if not ok]
+    written = total - len(errors)
+    message = f"{written} fichier(s) PDF créé(s) dans {out_dir}"
+    if errors:
+        message += "\n" + "\n".join(f"✗ {error}" for error in errors)
+    return not errors, message
+
+
+def export_rows_to_pdf(headers, rows, filename, title="Planning Export", date_str=""):
+    """Écrire un tableau (en-têtes + lignes) dans un PDF paysage"""
     if not PDF_AVAILABLE:
         return False, "Module reportlab non disponible"
-    
+
     try:
+        lazy_import("reportlab.platypus")
         from reportlab.lib.pagesizes import A4, landscape
-        from reportlab.lib import colors
-        from reportlab.lib.units import cm
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER
-        
+        from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+
+        st = pdf_planning_styles("tableau")
         doc = SimpleDocTemplate(str(filename), pagesize=landscape(A4))
-        elements = []
-        
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        title_para = Paragraph(title, title_style)
-        elements.append(title_para)
-        
+        elements = [Paragraph(title, st["title"])]
         if date_str:
-            date_style = ParagraphStyle(
-                'DateStyle',
-                parent=styles['Normal'],
-                fontSize=10,
-                alignment=TA_CENTER
-            )
-            date_para = Paragraph(f"Date: {date_str}", date_style)
-            elements.append(date_para)
+            elements.append(Paragraph(f"Date: {date_str}", st["date"]))
             elements.append(Spacer(1, 20))
-        
-        columns = tree["columns"]
-        headers = [tree.heading(col)["text"] for col in columns]
-        
-        table_data = [headers]
-        for item in tree.get_children():
-            values = tree.item(item)["values"]
-            table_data.append([str(v) for v in values])
-        
-        t = Table(table_data)
-        
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ])
-        
-        t.setStyle(style)
+
+        t = Table([headers] + [[str(v) for v in values] for values in rows])
+        t.setStyle(st["table"])
         elements.append(t)
-        
+
         doc.build(elements)
         return True, f"Fichier PDF créé: {filename}"
-    
+
     except Exception as e:
         return False, f"Erreur lors de l'export PDF: {str(e)}"
 
+@timed()
+def export_treeview_to_pdf(tree, filename, title="Planning Export", date_str=""):
+    headers, rows = treeview_rows(tree)
+    return export_rows_to_pdf(headers, rows, filename, title=title, date_str=date_str)
+
+
 # =============================================================================
 # MODULE D'ANALYSE AVANCÉE INTÉGRÉ
 # =============================================================================
@@ -2162,6 +4636,285 @@ def calculate_variation(current, previous):
     return ((current - previous) / abs(previous)) * 100
 
 
+# Dimensions et métriques du tableau croisé (vue Pivot de l'analyse avancée)
+PIVOT_DIMENSIONS = ["Date", "Semaine", "Mois", "Voyage", "SST", "Chauffeur", "Pays", "Type"]
+PIVOT_METRICS = {'Revenus': 'revenus', 'Coûts': 'couts', 'Marge': 'marge', 'Palettes': 'palettes', 'Missions': None}
+
+
+class PivotEngine:
+    """
+    Tableau croisé matérialisé sur une liste de missions d'analyse
+    (data['missions_list']).
+
+    La clé de chaque dimension est calculée une seule fois par jeu de données
+    (les dimensions de date une fois par jour distinct), les colonnes de
+    métriques aussi ; chaque résultat (lignes, colonnes, métriques, filtre)
+    est mémorisé, si bien que changer de dimension ou de métrique ne
+    reparcourt pas les missions une seconde fois.
+    """
+
+    def __init__(self, missions):
+        self.missions = missions
+        self._keys = {}      # {dimension: [clé par mission]}
+        self._values = {}    # {métrique: [valeur par mission]}
+        self._results = {}   # {(lignes, colonnes, métriques, filtre): résultat}
+
+    @staticmethod
+    def _date_key(d, dim):
+        if dim == "Date":
+            return format_date_display(d)
+        if dim == "Semaine":
+            return f"S{d.isocalendar()[1]:02d}"
+        return d.strftime("%Y-%m")
+
+    def keys(self, dim):
+        """Clé de la dimension `dim` pour chaque mission (calculée une fois)"""
+        keys = self._keys.get(dim)
+        if keys is not None:
+            return keys
+        if dim in ("Date", "Semaine", "Mois"):
+            by_date = {}
+            keys = []
+            for m in self.missions:
+                d = m['date']
+                key = by_date.get(d)
+                if key is None:
+                    key = by_date[d] = self._date_key(d, dim)
+                keys.append(key)
+        elif dim in ("SST", "Chauffeur"):
+            field = 'sst' if dim == "SST" else 'chauffeur'
+            keys = [m[field] or "N/A" for m in self.missions]
+        elif dim in ("Voyage", "Pays", "Type"):
+            field = {'Voyage': 'voyage', 'Pays': 'pays', 'Type': 'type'}[dim]
+            keys = [m[field] for m in self.missions]
+        else:
+            keys = ["N/A"] * len(self.missions)
+        self._keys[dim] = keys
+        return keys
+
+    def values(self, metric):
+        """Valeur de la métrique pour chaque mission (1 par mission pour 'Missions')"""
+        values = self._values.get(metric)
+        if values is None:
+            field = PIVOT_METRICS.get(metric, 'marge')
+            if field is None:
+                values = [1] * len(self.missions)
+            else:
+                values = [m.get(field, 0) for m in self.missions]
+            self._values[metric] = values
+        return values
+
+    def pivot(self, rows_dim, cols_dim, metrics=None, filters=None):
+        """
+        Croiser `rows_dim` × `cols_dim` pour chaque métrique de `metrics`
+        (toutes par défaut). `filters` = {dimension: valeurs retenues}.
+
+        Retourne {"rows": [...] (ordre d'apparition), "cols": [...] (triées),
+        "cells": {métrique: {ligne: {colonne: valeur}}},
+        "row_totals" / "col_totals": {métrique: {clé: total}},
+        "grand_totals": {métrique: total}}.
+        """
+        metrics = tuple(metrics or PIVOT_METRICS)
+        filter_key = tuple(sorted((dim, tuple(sorted(map(str, allowed))))
+                                  for dim, allowed in (filters or {}).items()))
+        cache_key = (rows_dim, cols_dim, metrics, filter_key)
+        result = self._results.get(cache_key)
+        if result is not None:
+            return result
+
+        indices = range(len(self.missions))
+        for dim, allowed in (filters or {}).items():
+            dim_keys = self.keys(dim)
+            allowed = set(allowed)
+            indices = [i for i in indices if dim_keys[i] in allowed]
+
+        # Regrouper une fois les missions par cellule, puis sommer chaque métrique
+        row_keys = self.keys(rows_dim)
+        col_keys = self.keys(cols_dim)
+        groups = {}
+        for i in indices:
+            groups.setdefault((row_keys[i], col_keys[i]), []).append(i)
+        rows = {row: None for row, _ in groups}
+        cols = {col for _, col in groups}
+
+        cells = {metric: {} for metric in metrics}
+        row_totals = {metric: {} for metric in metrics}
+        col_totals = {metric: {} for metric in metrics}
+        grand_totals = {metric: 0 for metric in metrics}
+        for metric in metrics:
+            values = self.values(metric)
+            m_cells, m_rows, m_cols = cells[metric], row_totals[metric], col_totals[metric]
+            for (row, col), members in groups.items():
+                value = sum(map(values.__getitem__, members))
+                m_cells.setdefault(row, {})[col] = value
+                m_rows[row] = m_rows.get(row, 0) + value
+                m_cols[col] = m_cols.get(col, 0) + value
+                grand_totals[metric] += value
+
+        result = {
+            "rows": list(rows),
+            "cols": sorted(cols, key=str),
+            "cells": cells,
+            "row_totals": row_totals,
+            "col_totals": col_totals,
+            "grand_totals": grand_totals,
+        }
+        self._results[cache_key] = result
+        return result
+
+
+# Graphiques d'analyse : figures créées une fois et mises à jour sur place,
+# séries préparées hors du thread Tk
+CHART_MAX_POINTS = 366  # Au-delà, les séries quotidiennes sont moyennées par paquets de jours
+CHART_TOP = 15
+
+
+def downsample_series(dates, *series, max_points=CHART_MAX_POINTS):
+    """
+    Réduire des séries quotidiennes à `max_points` points au plus : moyenne par
+    paquets de jours consécutifs, datée du premier jour du paquet.
+    Retourne (dates, série1, série2, ...).
+    """
+    n = len(dates)
+    if n <= max_points:
+        return (list(dates),) + tuple(list(s) for s in series)
+    step = -(-n // max_points)
+    reduced = [list(dates[::step])]
+    for s in series:
+        reduced.append([sum(s[i:i + step]) / len(s[i:i + step]) for i in range(0, n, step)])
+    return tuple(reduced)
+
+
+def prepare_chart_series(data, top=CHART_TOP):
+    """Séries prêtes à tracer (tris, top N, longues périodes réduites) ; sans Tk, exécutable dans un thread"""
+    voyages = sorted(data['by_voyage'].items(), key=lambda x: x[1]['revenus'], reverse=True)[:top]
+    drivers = sorted(((d, v['revenus'], v['couts'], v['revenus'] - v['couts'], v['missions'])
+                      for d, v in data['by_driver'].items()), key=lambda x: x[3], reverse=True)[:top]
+    return {
+        'daily': downsample_series(data['dates'], data['revenus'], data['couts'], data['marges']),
+        'totals': (sum(data['revenus']), sum(data['couts']), sum(data['marges'])),
+        'voyages': [(code, v['revenus'], v['missions']) for code, v in voyages],
+        'ssts': [(sst, v['couts'], v['missions'], v.get('chauffeurs', 0)) for sst, v in data['by_sst'].items()],
+        'drivers': drivers,
+        'countries': [(c, v['revenus'], v['couts'], v['missions']) for c, v in data['by_country'].items()],
+    }
+
+
+def prepare_trend_series(data, metric_key, ma_days=None, forecast_days=0):
+    """Courbe, moyenne mobile, droite de tendance et prévision d'une métrique quotidienne"""
+    import numpy as np
+    dates = data['dates']
+    if metric_key == 'palettes_liv':
+        values = [l + r for l, r in zip(data['palettes_liv'], data['palettes_ram'])]
+    else:
+        values = data[metric_key]
+
+    result = {'values': downsample_series(dates, values), 'ma': None, 'trend': None, 'forecast': None}
+    if ma_days and len(values) >= 3 and len(values) >= ma_days:
+        ma_values = np.convolve(values, np.ones(ma_days) / ma_days, mode='valid')
+        result['ma'] = downsample_series(dates[ma_days - 1:], ma_values.tolist())
+    if len(values) >= 2:
+        z = np.polyfit(np.arange(len(values)), values, 1)
+        p = np.poly1d(z)
+        # Droite : ses deux extrémités suffisent
+        result['trend'] = ([dates[0], dates[-1]], [p(0), p(len(values) - 1)], z[0])
+        if forecast_days and len(values) >= 7:
+            forecast_x = np.arange(len(values), len(values) + forecast_days)
+            result['forecast'] = ([dates[-1] + timedelta(days=i + 1) for i in range(forecast_days)],
+                                  p(forecast_x).tolist())
+    return result
+
+
+def rescale_axes(ax, extra_y=()):
+    """Recalculer les limites après une mise à jour sur place (relim ignore les remplissages)"""
+    ax.relim()
+    if extra_y:
+        x0 = ax.dataLim.x0
+        ax.update_datalim([(x0, min(extra_y)), (x0, max(extra_y))])
+    ax.autoscale_view()
+
+
+def update_bar_labels(bars, texts, labels, offset=0):
+    """Replacer les étiquettes au-dessus des barres après set_height"""
+    for bar, text, label in zip(bars, texts, labels):
+        text.set_position((bar.get_x() + bar.get_width() / 2., bar.get_height() + offset))
+        text.set_text(label)
+
+
+class ChartPanel:
+    """
+    Une figure matplotlib et son canvas Tk, créés une seule fois. `reuse(clé)`
+    indique si les artistes gardés dans `state` peuvent être mis à jour sur
+    place (même disposition : mêmes catégories, mêmes courbes) ; sinon la
+    figure est vidée pour être reconstruite.
+    """
+
+    def __init__(self, master, title=None, figsize=(11, 4), facecolor='#f8fafc',
+                 toolbar=True, padding=5):
+        self.frame = ttk.LabelFrame(master, text=title, padding=padding) if title else ttk.Frame(master)
+        self.fig = Figure(figsize=figsize, dpi=100)
+        self.fig.patch.set_facecolor(facecolor)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.frame)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        if toolbar:
+            toolbar_frame = ttk.Frame(self.frame)
+            toolbar_frame.pack(fill="x")
+            NavigationToolbar2Tk(self.canvas, toolbar_frame).update()
+        self.key = None
+        self.state = {}
+
+    def reuse(self, key):
+        if key == self.key and self.state:
+            return True
+        self.fig.clear()
+        self.key = key
+        self.state = {}
+        return False
+
+    def draw(self):
+        self.canvas.draw_idle()
+
+
+def show_chart_panels(container, panels, wanted, factory, **pack):
+    """
+    Afficher dans `container` les panneaux `wanted` [(type, titre)], dans l'ordre :
+    ceux déjà créés sont réaffichés, les autres créés par `factory(titre)`.
+    Les autres widgets du conteneur (message d'accueil, résumé...) sont détruits.
+    """
+    frames = {panel.frame for panel in panels.values()}
+    for widget in container.winfo_children():
+        if widget in frames:
+            widget.pack_forget()
+        else:
+            widget.destroy()
+    shown = []
+    for c_type, title in wanted:
+        panel = panels.get(c_type)
+        if panel is None:
+            panel = panels[c_type] = factory(title)
+        panel.frame.pack(**pack)
+        shown.append((c_type, panel))
+    return shown
+
+
+def bind_mousewheel_on_hover(canvas):
+    """
+    Diriger la molette (liaison globale) vers `canvas`, et la reprendre chaque
+    fois que la souris entre dans ce canvas : plusieurs onglets défilants
+    coexistent sans se voler la molette, et un canvas détruit (onglet
+    déchargé) est simplement ignoré.
+    """
+    def on_wheel(event):
+        if canvas.winfo_exists():
+            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+
+    def on_enter(_event=None):
+        canvas.bind_all("<MouseWheel>", on_wheel)
+
+    canvas.bind("<Enter>", on_enter, add="+")
+    on_enter()
+
+
 class AdvancedAnalyseModule:
     """Module d'analyse avancée avec dashboard, filtres, graphiques et exports."""
     
@@ -2178,8 +4931,14 @@ class AdvancedAnalyseModule:
         
         self.current_data = None
         self.comparison_data = None
+        self.chart_series = None
         self.analyse_figures = []
         self.filter_vars = {}
+        self._analysis_token = None
+        self._trend_token = None
+        self._chart_panels = {}    # {type de graphique: ChartPanel}
+        self._mini_panel = None    # Aperçu du dashboard
+        self._trend_panel = None
         
         self.build_analyse_tab()
     
@@ -2188,7 +4947,7 @@ class AdvancedAnalyseModule:
         self.tab_analyse = ttk.Frame(self.notebook)
         self.notebook.add(self.tab_analyse, text="📊 Analyse Avancée")
         
-        if not MATPLOTLIB_AVAILABLE:
+        if not ensure_matplotlib():
             self._show_matplotlib_error()
             return
         
@@ -2410,7 +5169,7 @@ class AdvancedAnalyseModule:
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
-        canvas.bind_all("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
+        bind_mousewheel_on_hover(canvas)
         self.dashboard_canvas = canvas
         
         ttk.Label(self.dashboard_content, text="📈 Cliquez sur 'Analyser' pour afficher le tableau de bord",
@@ -2514,7 +5273,7 @@ class AdvancedAnalyseModule:
         
         ttk.Label(row1, text="Lignes :").pack(side="left")
         self.pivot_rows_var = tk.StringVar(value="SST")
-        pivot_dims = ["Date", "Semaine", "Mois", "Voyage", "SST", "Chauffeur", "Pays", "Type"]
+        pivot_dims = PIVOT_DIMENSIONS
         ttk.Combobox(row1, textvariable=self.pivot_rows_var, values=pivot_dims, width=12, state="readonly").pack(side="left", padx=5)
         
         ttk.Label(row1, text="Colonnes :").pack(side="left", padx=(20, 5))
@@ -2523,7 +5282,7 @@ class AdvancedAnalyseModule:
         
         ttk.Label(row1, text="Valeur :").pack(side="left", padx=(20, 5))
         self.pivot_value_var = tk.StringVar(value="Marge")
-        ttk.Combobox(row1, textvariable=self.pivot_value_var, values=["Revenus", "Coûts", "Marge", "Palettes", "Missions"], width=12, state="readonly").pack(side="left", padx=5)
+        ttk.Combobox(row1, textvariable=self.pivot_value_var, values=list(PIVOT_METRICS), width=12, state="readonly").pack(side="left", padx=5)
         
         ttk.Button(row1, text="🔄 Générer", command=self._generate_pivot).pack(side="left", padx=20)
         
@@ -2635,6 +5394,7 @@ class AdvancedAnalyseModule:
     
     # === Analyse principale ===
     
+    @timed()
     def run_analysis(self):
         try:
             start_date = parse_date_input(self.date_start_var.get())
@@ -2645,29 +5405,47 @@ class AdvancedAnalyseModule:
                 return
             
             filters = self._get_current_filters()
-            self.current_data = self._collect_data(start_date, end_date, filters)
-            
+            periods = [(start_date, end_date)]
             if self.comparison_enabled_var.get():
-                comp_start, comp_end = self._get_comparison_period(start_date, end_date)
-                self.comparison_data = self._collect_data(comp_start, comp_end, filters)
-            else:
-                self.comparison_data = None
-            
-            self._populate_filter_lists()
-            self._update_dashboard()
-            self._update_charts()
-            self._update_table()
+                periods.append(self._get_comparison_period(start_date, end_date))
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
+        
+        pipeline = self.app.analytics()
+        token = self._analysis_token = object()
+        
+        def work():
+            # Chaque journée de l'union des périodes n'est lue qu'une fois
+            pipeline.prefetch({start + timedelta(days=i) for start, end in periods
+                               for i in range((end - start).days + 1)})
+            current = self._collect_data(start_date, end_date, filters, pipeline)
+            comparison = self._collect_data(*periods[1], filters, pipeline) if len(periods) > 1 else None
+            return current, comparison, prepare_chart_series(current)
+        
+        def done(result, error):
+            if token is not self._analysis_token:
+                return  # Une analyse plus récente a été lancée
+            if error is not None:
+                messagebox.showerror("Erreur", f"Erreur: {error}")
+                return
+            self.current_data, self.comparison_data, self.chart_series = result
+            try:
+                self._populate_filter_lists()
+                self._update_dashboard()
+                self._update_charts()
+                self._update_table()
+            except Exception as e:
+                messagebox.showerror("Erreur", f"Erreur: {e}")
+                import traceback
+                traceback.print_exc()
+                return
             
             nb_days = (end_date - start_date).days + 1
             nb_missions = len(self.current_data.get('missions_list', []))
             messagebox.showinfo("Analyse terminée", f"{nb_days} jours analysés\n{nb_missions} missions trouvées")
-            
-        except ValueError as e:
-            messagebox.showerror("Erreur", str(e))
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur: {e}")
-            import traceback
-            traceback.print_exc()
+        
+        run_in_background(self.root, work, on_done=done)
     
     def _get_current_filters(self):
         filters = {
@@ -2692,185 +5470,10 @@ class AdvancedAnalyseModule:
             comp_end = start_date - timedelta(days=1)
             return comp_end - timedelta(days=period_days), comp_end
     
-    def _collect_data(self, start_date, end_date, filters):
-        data = {
-            'dates': [], 'revenus': [], 'couts': [], 'marges': [],
-            'missions_count': [], 'palettes_liv': [], 'palettes_ram': [],
-            'by_voyage': {}, 'by_sst': {}, 'by_driver': {}, 'by_country': {},
-            'by_type': {'LIVRAISON': {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0},
-                       'RAMASSE': {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}},
-            'by_weekday': {i: {'revenus': 0, 'couts': 0, 'missions': 0} for i in range(7)},
-            'by_week': {}, 'by_month': {},
-            'missions_list': [],
-            'start_date': start_date, 'end_date': end_date, 'filters': filters,
-        }
-        
-        current = start_date
-        while current <= end_date:
-            day_data = self._collect_day_data(current, filters)
-            
-            data['dates'].append(current)
-            data['revenus'].append(day_data['revenus'])
-            data['couts'].append(day_data['couts'])
-            data['marges'].append(day_data['revenus'] - day_data['couts'])
-            data['missions_count'].append(day_data['missions'])
-            data['palettes_liv'].append(day_data['pal_liv'])
-            data['palettes_ram'].append(day_data['pal_ram'])
-            
-            weekday = current.weekday()
-            data['by_weekday'][weekday]['revenus'] += day_data['revenus']
-            data['by_weekday'][weekday]['couts'] += day_data['couts']
-            data['by_weekday'][weekday]['missions'] += day_data['missions']
-            
-            week_key = f"{current.year}-W{current.isocalendar()[1]:02d}"
-            if week_key not in data['by_week']:
-                data['by_week'][week_key] = {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}
-            data['by_week'][week_key]['revenus'] += day_data['revenus']
-            data['by_week'][week_key]['couts'] += day_data['couts']
-            data['by_week'][week_key]['missions'] += day_data['missions']
-            
-            month_key = f"{current.year}-{current.month:02d}"
-            if month_key not in data['by_month']:
-                data['by_month'][month_key] = {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}
-            data['by_month'][month_key]['revenus'] += day_data['revenus']
-            data['by_month'][month_key]['couts'] += day_data['couts']
-            data['by_month'][month_key]['missions'] += day_data['missions']
-            
-            for key in ['by_voyage', 'by_sst', 'by_driver', 'by_country']:
-                for entity, vals in day_data[key].items():
-                    if entity not in data[key]:
-                        data[key][entity] = {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}
-                    for metric in ['revenus', 'couts', 'missions', 'palettes']:
-                        data[key][entity][metric] += vals.get(metric, 0)
-            
-            for mission in day_data['missions_list']:
-                m_type = mission.get('type', 'LIVRAISON')
-                if m_type in data['by_type']:
-                    data['by_type'][m_type]['revenus'] += mission.get('revenus', 0)
-                    data['by_type'][m_type]['missions'] += 1
-                    data['by_type'][m_type]['palettes'] += mission.get('palettes', 0)
-            
-            data['missions_list'].extend(day_data['missions_list'])
-            current += timedelta(days=1)
-        
-        return data
-    
-    def _collect_day_data(self, d, filters):
-        day_data = {
-            'revenus': 0, 'couts': 0, 'missions': 0, 'pal_liv': 0, 'pal_ram': 0,
-            'by_voyage': {}, 'by_sst': {}, 'by_driver': {}, 'by_country': {},
-            'missions_list': [],
-        }
-        
-        date_str = format_date_internal(d)
-        day_dir = get_planning_day_dir(d)
-        
-        if not day_dir or not day_dir.exists():
-            return day_data
-        
-        missions = []
-        for file in day_dir.glob("*.json"):
-            mission_data = load_json(file, None)
-            if mission_data:
-                missions.append(mission_data)
-        
-        revenus_date = self.revenus_palettes.get(date_str, {})
-        
-        for mission in missions:
-            m_type = mission.get("type", "LIVRAISON")
-            if m_type not in filters['types']:
-                continue
-            
-            voyage_code = mission.get("voyage", "")
-            voyage = next((v for v in self.voyages if v.get("code") == voyage_code), None)
-            country = self._normalize_country(voyage.get("country", "Belgique") if voyage else "Belgique")
-            
-            if country not in filters['countries']:
-                continue
-            
-            if filters['voyages'] and voyage_code not in filters['voyages']:
-                continue
-            
-            nb_pal = int(mission.get("nb_pal", 0) or 0)
-            
-            rev_config = revenus_date.get(country, revenus_date.get("Belgique", {}))
-            if isinstance(rev_config, dict):
-                rev_per_pal = rev_config.get("livraison" if m_type == "LIVRAISON" else "ramasse", 0)
-            else:
-                rev_per_pal = 0
-            
-            mission_rev = nb_pal * rev_per_pal
-            
-            chauffeur_nom = mission.get("chauffeur_nom", "")
-            chauffeur = next((c for c in self.chauffeurs if f"{c.get('nom', '')} {c.get('prenom', '')}" == chauffeur_nom), None)
-            sst = chauffeur.get("sst", "") if chauffeur else mission.get("sst", "")
-            
-            if filters['sst'] and sst not in filters['sst']:
-                continue
-            
-            mission_cout = 0
-            if sst and sst in self.tarifs_sst:
-                tarifs_country = self.tarifs_sst[sst].get(country, {})
-                tarif = tarifs_country.get(date_str, 0)
-                if tarif == 0:
-                    sorted_dates = sorted([dt for dt in tarifs_country.keys() if dt <= date_str], reverse=True)
-                    if sorted_dates:
-                        tarif = tarifs_country[sorted_dates[0]]
-                mission_cout = tarif
-            
-            day_data['missions'] += 1
-            day_data['revenus'] += mission_rev
-            day_data['couts'] += mission_cout
-            
-            if m_type == "LIVRAISON":
-                day_data['pal_liv'] += nb_pal
-            else:
-                day_data['pal_ram'] += nb_pal
-            
-            if voyage_code:
-                if voyage_code not in day_data['by_voyage']:
-                    day_data['by_voyage'][voyage_code] = {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}
-                day_data['by_voyage'][voyage_code]['revenus'] += mission_rev
-                day_data['by_voyage'][voyage_code]['missions'] += 1
-                day_data['by_voyage'][voyage_code]['palettes'] += nb_pal
-            
-            if sst:
-                if sst not in day_data['by_sst']:
-                    day_data['by_sst'][sst] = {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}
-                day_data['by_sst'][sst]['couts'] += mission_cout
-                day_data['by_sst'][sst]['missions'] += 1
-            
-            if chauffeur_nom:
-                if chauffeur_nom not in day_data['by_driver']:
-                    day_data['by_driver'][chauffeur_nom] = {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}
-                day_data['by_driver'][chauffeur_nom]['revenus'] += mission_rev
-                day_data['by_driver'][chauffeur_nom]['couts'] += mission_cout
-                day_data['by_driver'][chauffeur_nom]['missions'] += 1
-                day_data['by_driver'][chauffeur_nom]['palettes'] += nb_pal
-            
-            if country:
-                if country not in day_data['by_country']:
-                    day_data['by_country'][country] = {'revenus': 0, 'couts': 0, 'missions': 0, 'palettes': 0}
-                day_data['by_country'][country]['revenus'] += mission_rev
-                day_data['by_country'][country]['couts'] += mission_cout
-                day_data['by_country'][country]['missions'] += 1
-                day_data['by_country'][country]['palettes'] += nb_pal
-            
-            day_data['missions_list'].append({
-                'date': d, 'voyage': voyage_code, 'pays': country, 'type': m_type,
-                'sst': sst, 'chauffeur': chauffeur_nom, 'palettes': nb_pal,
-                'revenus': mission_rev, 'couts': mission_cout, 'marge': mission_rev - mission_cout,
-            })
-        
-        return day_data
-    
-    def _normalize_country(self, country):
-        mapping = {
-            "pays-bas": "Pays-Bas", "paysbas": "Pays-Bas", "netherlands": "Pays-Bas",
-            "belgique": "Belgique", "belgium": "Belgique",
-            "luxembourg": "Luxembourg", "france": "France", "allemagne": "Allemagne",
-        }
-        return mapping.get(country.lower(), country)
+    @timed()
+    def _collect_data(self, start_date, end_date, filters, pipeline=None):
+        """Agrégats de la période via le pipeline partagé avec l'onglet Analyse"""
+        return (pipeline or self.app.analytics()).collect(start_date, end_date, filters)
     
     # === Mise à jour des vues ===
     
@@ -2879,7 +5482,10 @@ class AdvancedAnalyseModule:
             return
         
         for widget in self.dashboard_content.winfo_children():
-            widget.destroy()
+            if self._mini_panel is not None and widget is self._mini_panel.frame:
+                widget.pack_forget()  # Réutilisé par _create_mini_charts
+            else:
+                widget.destroy()
         
         data = self.current_data
         comp_data = self.comparison_data
@@ -3008,59 +5614,75 @@ class AdvancedAnalyseModule:
         if not self.current_data:
             return
         
-        charts_frame = ttk.LabelFrame(self.dashboard_content, text="📈 Aperçu", padding=10)
-        charts_frame.pack(fill="x", padx=10, pady=5)
-        
-        data = self.current_data
-        
-        fig = Figure(figsize=(12, 3), dpi=100)
-        fig.patch.set_facecolor('#f8fafc')
+        if self._mini_panel is None:
+            self._mini_panel = ChartPanel(self.dashboard_content, "📈 Aperçu", figsize=(12, 3),
+                                          toolbar=False, padding=10)
+        panel = self._mini_panel
+        panel.frame.pack(fill="x", padx=10, pady=5)
+        
+        series = self.chart_series
+        dates, revenus, couts, marges = series['daily']
+        top_voyages = series['voyages'][:5]
+        countries = [c[0] for c in series['countries']]
+        country_revenus = [c[1] for c in series['countries']]
+        codes = [v[0] for v in top_voyages]
+        revs = [v[1] for v in top_voyages]
+        
+        def draw_pie(ax):
+            if sum(country_revenus) > 0:
+                ax.pie(country_revenus, labels=countries, autopct='%1.0f%%', textprops={'fontsize': 7})
+                ax.set_title('Par Pays', fontsize=9)
+        
+        if panel.reuse(('mini', bool(dates), tuple(codes))):
+            st = panel.state
+            if dates:
+                st['rev'].set_data(dates, revenus)
+                st['cout'].set_data(dates, couts)
+                st['fill'].remove()
+                st['fill'] = st['ax1'].fill_between(dates, marges, alpha=0.3, color='blue')
+                rescale_axes(st['ax1'], marges)
+            st['ax2'].clear()
+            st['ax2'].set_prop_cycle(None)  # Mêmes couleurs qu'à la création
+            draw_pie(st['ax2'])
+            for bar, rev in zip(st['bars'], revs):
+                bar.set_width(rev)
+            rescale_axes(st['ax3'])
+            panel.draw()
+            return
+        
+        fig = panel.fig
+        st = panel.state
         
         # Evolution
-        ax1 = fig.add_subplot(131)
-        if data['dates']:
-            ax1.plot(data['dates'], data['revenus'], 'g-', linewidth=1.5, label='Rev')
-            ax1.plot(data['dates'], data['couts'], 'r-', linewidth=1.5, label='Coûts')
-            ax1.fill_between(data['dates'], data['marges'], alpha=0.3, color='blue')
+        ax1 = st['ax1'] = fig.add_subplot(131)
+        if dates:
+            st['rev'], = ax1.plot(dates, revenus, 'g-', linewidth=1.5, label='Rev')
+            st['cout'], = ax1.plot(dates, couts, 'r-', linewidth=1.5, label='Coûts')
+            st['fill'] = ax1.fill_between(dates, marges, alpha=0.3, color='blue')
             ax1.set_title('Évolution', fontsize=9)
             ax1.tick_params(labelsize=7)
             ax1.legend(fontsize=7)
             ax1.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
         
         # Par pays (pie)
-        ax2 = fig.add_subplot(132)
-        if data['by_country']:
-            countries = list(data['by_country'].keys())
-            revenus = [data['by_country'][c]['revenus'] for c in countries]
-            if sum(revenus) > 0:
-                ax2.pie(revenus, labels=countries, autopct='%1.0f%%', textprops={'fontsize': 7})
-                ax2.set_title('Par Pays', fontsize=9)
+        st['ax2'] = fig.add_subplot(132)
+        draw_pie(st['ax2'])
         
         # Top voyages (bar)
-        ax3 = fig.add_subplot(133)
-        if data['by_voyage']:
-            sorted_voyages = sorted(data['by_voyage'].items(), key=lambda x: x[1]['revenus'], reverse=True)[:5]
-            codes = [v[0] for v in sorted_voyages]
-            revs = [v[1]['revenus'] for v in sorted_voyages]
-            ax3.barh(codes, revs, color=COLORS_ANALYSE['chart_blue'])
+        ax3 = st['ax3'] = fig.add_subplot(133)
+        st['bars'] = ax3.barh(codes, revs, color=COLORS_ANALYSE['chart_blue'])
+        if codes:
             ax3.set_title('Top 5 Voyages', fontsize=9)
             ax3.tick_params(labelsize=7)
         
         fig.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, master=charts_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        panel.draw()
     
     def _update_charts(self):
         if not MATPLOTLIB_AVAILABLE or not self.current_data:
             return
         
-        for widget in self.charts_container.winfo_children():
-            widget.destroy()
-        self.analyse_figures = []
-        
-        data = self.current_data
+        series = self.chart_series
         chart_type = self.chart_type_var.get()
         
         charts_to_create = []
@@ -3075,43 +5697,46 @@ class AdvancedAnalyseModule:
         if chart_type in ["Tous", "Par Pays"]:
             charts_to_create.append(("country", "🌍 Par Pays"))
         
-        for c_type, title in charts_to_create:
-            chart_frame = ttk.LabelFrame(self.charts_container, text=title, padding=5)
-            chart_frame.pack(fill="x", pady=5, padx=5)
-            
-            fig = Figure(figsize=(11, 4), dpi=100)
-            fig.patch.set_facecolor('#f8fafc')
-            
-            if c_type == "timeline":
-                self._create_timeline_chart(fig, data)
-            elif c_type == "voyage":
-                self._create_voyage_chart(fig, data)
-            elif c_type == "sst":
-                self._create_sst_chart(fig, data)
-            elif c_type == "driver":
-                self._create_driver_chart(fig, data)
-            elif c_type == "country":
-                self._create_country_chart(fig, data)
-            
-            canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True)
-            
-            toolbar_frame = ttk.Frame(chart_frame)
-            toolbar_frame.pack(fill="x")
-            NavigationToolbar2Tk(canvas, toolbar_frame)
-            
-            self.analyse_figures.append((fig, canvas))
-    
-    def _create_timeline_chart(self, fig, data):
+        renderers = {
+            "timeline": self._create_timeline_chart,
+            "voyage": self._create_voyage_chart,
+            "sst": self._create_sst_chart,
+            "driver": self._create_driver_chart,
+            "country": self._create_country_chart,
+        }
+        shown = show_chart_panels(self.charts_container, self._chart_panels, charts_to_create,
+                                  lambda title: ChartPanel(self.charts_container, title, figsize=(11, 4)),
+                                  fill="x", pady=5, padx=5)
+        for c_type, panel in shown:
+            renderers[c_type](panel, series)
+            panel.draw()
+        self.analyse_figures = [(panel.fig, panel.canvas) for _c_type, panel in shown]
+    
+    def _create_timeline_chart(self, panel, series):
+        dates, revenus, couts, marges = series['daily']
+        if not dates:
+            panel.reuse('empty')
+            panel.fig.add_subplot(111).text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
+            return
+        
+        total_rev, total_cout, total_marge = series['totals']
+        totals_text = f"Rev: {format_currency(total_rev)}\nCoûts: {format_currency(total_cout)}\nMarge: {format_currency(total_marge)}"
+        
+        if panel.reuse('timeline'):
+            st = panel.state
+            st['rev'].set_data(dates, revenus)
+            st['cout'].set_data(dates, couts)
+            st['fill'].remove()
+            st['fill'] = st['ax'].fill_between(dates, marges, alpha=0.3, color=COLORS_ANALYSE['chart_blue'])
+            st['totals'].set_text(totals_text)
+            rescale_axes(st['ax'], marges)
+            return
+        
+        fig = panel.fig
         ax = fig.add_subplot(111)
-        if not data['dates']:
-            ax.text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
-            return
-        
-        ax.plot(data['dates'], data['revenus'], color=COLORS_ANALYSE['success'], linewidth=2, label='Revenus', marker='o', markersize=3)
-        ax.plot(data['dates'], data['couts'], color=COLORS_ANALYSE['danger'], linewidth=2, label='Coûts', marker='s', markersize=3)
-        ax.fill_between(data['dates'], data['marges'], alpha=0.3, color=COLORS_ANALYSE['chart_blue'], label='Marge')
+        rev, = ax.plot(dates, revenus, color=COLORS_ANALYSE['success'], linewidth=2, label='Revenus', marker='o', markersize=3)
+        cout, = ax.plot(dates, couts, color=COLORS_ANALYSE['danger'], linewidth=2, label='Coûts', marker='s', markersize=3)
+        fill = ax.fill_between(dates, marges, alpha=0.3, color=COLORS_ANALYSE['chart_blue'], label='Marge')
         ax.axhline(y=0, color='black', linestyle='-', linewidth=0.5)
         
         ax.set_xlabel('Date')
@@ -3120,88 +5745,118 @@ class AdvancedAnalyseModule:
         ax.grid(True, alpha=0.3)
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
         
-        total_rev = sum(data['revenus'])
-        total_cout = sum(data['couts'])
-        total_marge = sum(data['marges'])
-        ax.text(0.98, 0.98, f"Rev: {format_currency(total_rev)}\nCoûts: {format_currency(total_cout)}\nMarge: {format_currency(total_marge)}",
-                transform=ax.transAxes, fontsize=9, verticalalignment='top', horizontalalignment='right',
-                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+        totals = ax.text(0.98, 0.98, totals_text,
+                         transform=ax.transAxes, fontsize=9, verticalalignment='top', horizontalalignment='right',
+                         bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
         
         fig.autofmt_xdate()
         fig.tight_layout()
+        panel.state = {'ax': ax, 'rev': rev, 'cout': cout, 'fill': fill, 'totals': totals}
     
-    def _create_voyage_chart(self, fig, data):
-        ax = fig.add_subplot(111)
-        if not data['by_voyage']:
-            ax.text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
+    def _create_voyage_chart(self, panel, series):
+        if not series['voyages']:
+            panel.reuse('empty')
+            panel.fig.add_subplot(111).text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
             return
         
-        sorted_voyages = sorted(data['by_voyage'].items(), key=lambda x: x[1]['revenus'], reverse=True)[:15]
-        codes = [v[0] for v in sorted_voyages]
-        revenus = [v[1]['revenus'] for v in sorted_voyages]
-        missions = [v[1]['missions'] for v in sorted_voyages]
+        codes = [v[0] for v in series['voyages']]
+        revenus = [v[1] for v in series['voyages']]
+        labels = [f'{v[2]}m' for v in series['voyages']]
         
+        if panel.reuse(('voyage', tuple(codes))):
+            st = panel.state
+            for bar, rev in zip(st['bars'], revenus):
+                bar.set_height(rev)
+            update_bar_labels(st['bars'], st['labels'], labels)
+            rescale_axes(st['ax'])
+            return
+        
+        fig = panel.fig
+        ax = fig.add_subplot(111)
         colors = plt.cm.Blues([0.4 + 0.4 * i/len(codes) for i in range(len(codes))])
         bars = ax.bar(codes, revenus, color=colors)
         
-        for bar, m_count in zip(bars, missions):
-            ax.text(bar.get_x() + bar.get_width()/2., bar.get_height(), f'{m_count}m', ha='center', va='bottom', fontsize=8)
+        texts = [ax.text(bar.get_x() + bar.get_width()/2., bar.get_height(), label, ha='center', va='bottom', fontsize=8)
+                 for bar, label in zip(bars, labels)]
         
         ax.set_xlabel('Code Voyage')
         ax.set_ylabel('Revenus (€)')
         ax.tick_params(axis='x', rotation=45)
         ax.grid(True, alpha=0.3, axis='y')
         fig.tight_layout()
+        panel.state = {'ax': ax, 'bars': bars, 'labels': texts}
     
-    def _create_sst_chart(self, fig, data):
-        ax1 = fig.add_subplot(121)
-        ax2 = fig.add_subplot(122)
+    def _create_sst_chart(self, panel, series):
+        if not series['ssts']:
+            panel.reuse('empty')
+            panel.fig.add_subplot(121).text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
+            panel.fig.add_subplot(122)
+            return
         
-        if not data['by_sst']:
-            ax1.text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
+        ssts = [s[0] for s in series['ssts']]
+        couts = [s[1] for s in series['ssts']]
+        missions = [s[2] for s in series['ssts']]
+        
+        if panel.reuse(('sst', tuple(ssts))):
+            st = panel.state
+            for bars, heights, ax in ((st['bars1'], couts, st['ax1']), (st['bars2'], missions, st['ax2'])):
+                for bar, height in zip(bars, heights):
+                    bar.set_height(height)
+                rescale_axes(ax)
             return
         
-        ssts = list(data['by_sst'].keys())
-        couts = [data['by_sst'][s]['couts'] for s in ssts]
-        missions = [data['by_sst'][s]['missions'] for s in ssts]
+        fig = panel.fig
+        ax1 = fig.add_subplot(121)
+        ax2 = fig.add_subplot(122)
         
-        ax1.bar(ssts, couts, color=plt.cm.Reds([0.4 + 0.4 * i/len(ssts) for i in range(len(ssts))]))
+        bars1 = ax1.bar(ssts, couts, color=plt.cm.Reds([0.4 + 0.4 * i/len(ssts) for i in range(len(ssts))]))
         ax1.set_title('Coûts par SST', fontsize=10)
         ax1.set_ylabel('Coûts (€)')
         ax1.tick_params(axis='x', rotation=45)
         ax1.grid(True, alpha=0.3, axis='y')
         
-        ax2.bar(ssts, missions, color=plt.cm.Blues([0.4 + 0.4 * i/len(ssts) for i in range(len(ssts))]))
+        bars2 = ax2.bar(ssts, missions, color=plt.cm.Blues([0.4 + 0.4 * i/len(ssts) for i in range(len(ssts))]))
         ax2.set_title('Missions par SST', fontsize=10)
         ax2.set_ylabel('Missions')
         ax2.tick_params(axis='x', rotation=45)
         ax2.grid(True, alpha=0.3, axis='y')
         
         fig.tight_layout()
+        panel.state = {'ax1': ax1, 'ax2': ax2, 'bars1': bars1, 'bars2': bars2}
     
-    def _create_driver_chart(self, fig, data):
-        ax = fig.add_subplot(111)
-        if not data['by_driver']:
-            ax.text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
+    def _create_driver_chart(self, panel, series):
+        sorted_drivers = series['drivers']
+        if not sorted_drivers:
+            panel.reuse('empty')
+            panel.fig.add_subplot(111).text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
             return
         
         import numpy as np
-        driver_data = [(d, v['revenus'], v['couts'], v['revenus'] - v['couts']) for d, v in data['by_driver'].items()]
-        sorted_drivers = sorted(driver_data, key=lambda x: x[3], reverse=True)[:15]
-        
         drivers = [d[0][:15] for d in sorted_drivers]
         revenus = [d[1] for d in sorted_drivers]
         couts = [d[2] for d in sorted_drivers]
         marges = [d[3] for d in sorted_drivers]
-        
         x = np.arange(len(drivers))
+        
+        if panel.reuse(('driver', tuple(d[0] for d in sorted_drivers))):
+            st = panel.state
+            for bars, heights in ((st['bars_rev'], revenus), (st['bars_cout'], couts)):
+                for bar, height in zip(bars, heights):
+                    bar.set_height(height)
+            st['marge'].set_ydata(marges)
+            rescale_axes(st['ax'])
+            rescale_axes(st['ax2'])
+            return
+        
+        fig = panel.fig
+        ax = fig.add_subplot(111)
         width = 0.35
         
-        ax.bar(x - width/2, revenus, width, label='Revenus', color=COLORS_ANALYSE['success'], alpha=0.8)
-        ax.bar(x + width/2, couts, width, label='Coûts', color=COLORS_ANALYSE['danger'], alpha=0.8)
+        bars_rev = ax.bar(x - width/2, revenus, width, label='Revenus', color=COLORS_ANALYSE['success'], alpha=0.8)
+        bars_cout = ax.bar(x + width/2, couts, width, label='Coûts', color=COLORS_ANALYSE['danger'], alpha=0.8)
         
         ax2 = ax.twinx()
-        ax2.plot(x, marges, 'b-', marker='D', linewidth=2, label='Marge', markersize=6)
+        marge, = ax2.plot(x, marges, 'b-', marker='D', linewidth=2, label='Marge', markersize=6)
         ax2.axhline(y=0, color='blue', linestyle='--', alpha=0.5)
         ax2.set_ylabel('Marge (€)', color='blue')
         
@@ -3212,33 +5867,59 @@ class AdvancedAnalyseModule:
         ax2.legend(loc='upper right')
         ax.grid(True, alpha=0.3, axis='y')
         fig.tight_layout()
+        panel.state = {'ax': ax, 'ax2': ax2, 'bars_rev': bars_rev, 'bars_cout': bars_cout, 'marge': marge}
     
-    def _create_country_chart(self, fig, data):
-        ax1 = fig.add_subplot(121)
-        ax2 = fig.add_subplot(122)
-        
-        if not data['by_country']:
-            ax1.text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
+    def _create_country_chart(self, panel, series):
+        if not series['countries']:
+            panel.reuse('empty')
+            panel.fig.add_subplot(121).text(0.5, 0.5, "Aucune donnée", ha='center', va='center')
+            panel.fig.add_subplot(122)
             return
         
         import numpy as np
-        countries = list(data['by_country'].keys())
-        revenus = [data['by_country'][c]['revenus'] for c in countries]
-        couts = [data['by_country'][c]['couts'] for c in countries]
+        countries = [c[0] for c in series['countries']]
+        revenus = [c[1] for c in series['countries']]
+        couts = [c[2] for c in series['countries']]
         marges = [r - c for r, c in zip(revenus, couts)]
         
-        if sum(revenus) > 0:
-            ax1.pie(revenus, labels=countries, autopct='%1.1f%%', startangle=90)
-            ax1.set_title('Répartition revenus')
+        def draw_pie(ax):
+            if sum(revenus) > 0:
+                ax.pie(revenus, labels=countries, autopct='%1.1f%%', startangle=90)
+                ax.set_title('Répartition revenus')
+        
+        def marge_label(text, i):
+            text.set_position((i, max(revenus[i], couts[i]) + 50))
+            text.set_text(f'{marges[i]:+,.0f}€')
+            text.set_color(COLORS_ANALYSE['success'] if marges[i] >= 0 else COLORS_ANALYSE['danger'])
+        
+        if panel.reuse(('country', tuple(countries))):
+            st = panel.state
+            st['ax1'].clear()
+            st['ax1'].set_prop_cycle(None)  # Mêmes couleurs qu'à la création
+            draw_pie(st['ax1'])
+            for bars, heights in ((st['bars_rev'], revenus), (st['bars_cout'], couts)):
+                for bar, height in zip(bars, heights):
+                    bar.set_height(height)
+            for i, text in enumerate(st['labels']):
+                marge_label(text, i)
+            rescale_axes(st['ax2'])
+            return
+        
+        fig = panel.fig
+        ax1 = fig.add_subplot(121)
+        ax2 = fig.add_subplot(122)
+        draw_pie(ax1)
         
         x = np.arange(len(countries))
         width = 0.35
-        ax2.bar(x - width/2, revenus, width, label='Revenus', color=COLORS_ANALYSE['success'])
-        ax2.bar(x + width/2, couts, width, label='Coûts', color=COLORS_ANALYSE['danger'])
+        bars_rev = ax2.bar(x - width/2, revenus, width, label='Revenus', color=COLORS_ANALYSE['success'])
+        bars_cout = ax2.bar(x + width/2, couts, width, label='Coûts', color=COLORS_ANALYSE['danger'])
         
-        for i, marge in enumerate(marges):
-            color = COLORS_ANALYSE['success'] if marge >= 0 else COLORS_ANALYSE['danger']
-            ax2.text(i, max(revenus[i], couts[i]) + 50, f'{marge:+,.0f}€', ha='center', fontsize=8, color=color)
+        labels = []
+        for i in range(len(countries)):
+            text = ax2.text(0, 0, '', ha='center', fontsize=8)
+            marge_label(text, i)
+            labels.append(text)
         
         ax2.set_xticks(x)
         ax2.set_xticklabels(countries)
@@ -3246,6 +5927,7 @@ class AdvancedAnalyseModule:
         ax2.legend()
         ax2.grid(True, alpha=0.3, axis='y')
         fig.tight_layout()
+        panel.state = {'ax1': ax1, 'ax2': ax2, 'bars_rev': bars_rev, 'bars_cout': bars_cout, 'labels': labels}
     
     def _update_table(self):
         if not self.current_data:
@@ -3302,6 +5984,14 @@ class AdvancedAnalyseModule:
             else:
                 self.data_tree.detach(item)
     
+    def _pivot_engine(self):
+        """Moteur pivot du jeu de données courant (recréé après chaque analyse)"""
+        missions = self.current_data['missions_list']
+        engine = getattr(self, '_pivot_engine_cache', None)
+        if engine is None or engine.missions is not missions:
+            engine = self._pivot_engine_cache = PivotEngine(missions)
+        return engine
+    
     def _generate_pivot(self):
         if not self.current_data:
             messagebox.showwarning("Attention", "Lancez d'abord une analyse")
@@ -3310,22 +6000,22 @@ class AdvancedAnalyseModule:
         for widget in self.pivot_container.winfo_children():
             widget.destroy()
         
-        data = self.current_data
         rows_dim = self.pivot_rows_var.get()
         cols_dim = self.pivot_cols_var.get()
         value_metric = self.pivot_value_var.get()
+        if value_metric not in PIVOT_METRICS:
+            value_metric = 'Marge'
         
-        pivot_data = self._build_pivot_data(data, rows_dim, cols_dim, value_metric)
+        # Toutes les métriques en une passe : changer de métrique ensuite est immédiat
+        pivot = self._pivot_engine().pivot(rows_dim, cols_dim)
         
-        if not pivot_data:
+        if not pivot["rows"]:
             ttk.Label(self.pivot_container, text="Pas de données", font=("Segoe UI", 11)).pack(pady=20)
             return
         
-        rows = list(pivot_data.keys())
-        cols = set()
-        for row_data in pivot_data.values():
-            cols.update(row_data.keys())
-        cols = sorted(cols)
+        rows = pivot["rows"]
+        cols = pivot["cols"]
+        cells = pivot["cells"][value_metric]
         
         columns = [rows_dim] + cols + ['Total']
         
@@ -3351,116 +6041,89 @@ class AdvancedAnalyseModule:
         
         for row_key in rows:
             row_values = [row_key]
-            total = 0
             for col_key in cols:
-                val = pivot_data[row_key].get(col_key, 0)
+                val = cells[row_key].get(col_key, 0)
                 row_values.append(format_number(val, 2) if val != 0 else "-")
-                total += val
-            row_values.append(format_number(total, 2))
+            row_values.append(format_number(pivot["row_totals"][value_metric][row_key], 2))
             pivot_tree.insert("", "end", values=row_values)
         
         # Totaux
-        total_row = ['TOTAL']
-        grand_total = 0
-        for col_key in cols:
-            col_total = sum(pivot_data[r].get(col_key, 0) for r in rows)
-            total_row.append(format_number(col_total, 2))
-            grand_total += col_total
-        total_row.append(format_number(grand_total, 2))
+        col_totals = pivot["col_totals"][value_metric]
+        total_row = ['TOTAL'] + [format_number(col_totals.get(col_key, 0), 2) for col_key in cols]
+        total_row.append(format_number(pivot["grand_totals"][value_metric], 2))
         pivot_tree.insert("", "end", values=total_row, tags=('total',))
         pivot_tree.tag_configure('total', background='#e2e8f0', font=('Segoe UI', 9, 'bold'))
     
-    def _build_pivot_data(self, data, rows_dim, cols_dim, value_metric):
-        pivot = {}
-        metric_map = {'Revenus': 'revenus', 'Coûts': 'couts', 'Marge': 'marge', 'Palettes': 'palettes', 'Missions': 'missions'}
-        metric_key = metric_map.get(value_metric, 'marge')
-        
-        for mission in data['missions_list']:
-            row_key = self._get_dim_value(mission, rows_dim)
-            col_key = self._get_dim_value(mission, cols_dim)
-            
-            value = 1 if metric_key == 'missions' else mission.get(metric_key, 0)
-            
-            if row_key not in pivot:
-                pivot[row_key] = {}
-            if col_key not in pivot[row_key]:
-                pivot[row_key][col_key] = 0
-            pivot[row_key][col_key] += value
-        
-        return pivot
-    
-    def _get_dim_value(self, mission, dim):
-        if dim == "Date":
-            return format_date_display(mission['date'])
-        elif dim == "Semaine":
-            return f"S{mission['date'].isocalendar()[1]:02d}"
-        elif dim == "Mois":
-            return mission['date'].strftime("%Y-%m")
-        elif dim == "Voyage":
-            return mission['voyage']
-        elif dim == "SST":
-            return mission['sst'] or "N/A"
-        elif dim == "Chauffeur":
-            return mission['chauffeur'] or "N/A"
-        elif dim == "Pays":
-            return mission['pays']
-        elif dim == "Type":
-            return mission['type']
-        return "N/A"
-    
     def _update_trends(self):
         if not MATPLOTLIB_AVAILABLE or not self.current_data:
             return
         
-        for widget in self.trends_container.winfo_children():
-            widget.destroy()
-        
         data = self.current_data
         metric = self.trend_metric_var.get()
         ma_option = self.trend_ma_var.get()
+        forecast = self.trend_forecast_var.get()
         
         metric_map = {'Revenus': 'revenus', 'Coûts': 'couts', 'Marge': 'marges', 'Palettes': 'palettes_liv', 'Missions': 'missions_count'}
         metric_key = metric_map.get(metric, 'marges')
+        ma_days = int(ma_option.split()[0]) if ma_option != "Aucune" else None
         
-        dates = data['dates']
-        values = data[metric_key]
-        
-        if metric_key == 'palettes_liv':
-            values = [l + r for l, r in zip(data['palettes_liv'], data['palettes_ram'])]
+        token = self._trend_token = object()
         
-        import numpy as np
-        
-        fig = Figure(figsize=(11, 6), dpi=100)
-        fig.patch.set_facecolor('#f8fafc')
+        def done(trend, error):
+            if token is not self._trend_token:
+                return  # Options modifiées entre-temps
+            if error is not None:
+                messagebox.showerror("Erreur", f"Erreur: {error}")
+                return
+            self._draw_trend(metric, ma_days, trend)
+        
+        # Moyenne mobile et régression calculées hors du thread Tk
+        run_in_background(self.root, prepare_trend_series, data, metric_key, ma_days,
+                          7 if forecast else 0, on_done=done)
+    
+    def _draw_trend(self, metric, ma_days, trend):
+        if self._trend_panel is None:
+            for widget in self.trends_container.winfo_children():
+                widget.destroy()
+            self._trend_panel = ChartPanel(self.trends_container, figsize=(11, 6))
+            self._trend_panel.frame.pack(fill="both", expand=True)
+        panel = self._trend_panel
+        
+        dates, values = trend['values']
+        trend_label = f"Tendance ({trend['trend'][2]:+.1f}/j)" if trend['trend'] else None
+        layout = ('trend', trend['ma'] is not None, trend['trend'] is not None, trend['forecast'] is not None)
+        
+        if panel.reuse(layout):
+            st = panel.state
+            ax = st['ax']
+            st['values'].set_data(dates, values)
+            st['values'].set_label(metric)
+            if trend['ma'] is not None:
+                st['ma'].set_data(*trend['ma'])
+                st['ma'].set_label(f'MM{ma_days}')
+            if trend['trend'] is not None:
+                st['trend'].set_data(*trend['trend'][:2])
+                st['trend'].set_label(trend_label)
+            if trend['forecast'] is not None:
+                st['forecast'].set_data(*trend['forecast'])
+            rescale_axes(ax)
+            ax.set_ylabel(metric)
+            ax.set_title(f'Tendance - {metric}')
+            ax.legend(loc='upper left')
+            panel.draw()
+            return
+        
+        fig = panel.fig
         ax = fig.add_subplot(111)
+        st = panel.state = {'ax': ax}
         
-        ax.plot(dates, values, 'b-', linewidth=2, label=metric, marker='o', markersize=4)
-        
-        if ma_option != "Aucune" and len(values) >= 3:
-            ma_days = int(ma_option.split()[0])
-            if len(values) >= ma_days:
-                ma_values = np.convolve(values, np.ones(ma_days)/ma_days, mode='valid')
-                ax.plot(dates[ma_days-1:], ma_values, 'r--', linewidth=2, label=f'MM{ma_days}', alpha=0.8)
-        
-        if len(values) >= 2:
-            x_numeric = np.arange(len(values))
-            z = np.polyfit(x_numeric, values, 1)
-            p = np.poly1d(z)
-            ax.plot(dates, p(x_numeric), 'g--', linewidth=1.5, label=f'Tendance ({z[0]:+.1f}/j)', alpha=0.7)
-        
-        if self.trend_forecast_var.get() and len(values) >= 7:
-            forecast_days = 7
-            last_date = dates[-1]
-            forecast_dates = [last_date + timedelta(days=i+1) for i in range(forecast_days)]
-            
-            x_numeric = np.arange(len(values))
-            z = np.polyfit(x_numeric, values, 1)
-            p = np.poly1d(z)
-            
-            forecast_x = np.arange(len(values), len(values) + forecast_days)
-            forecast_values = p(forecast_x)
-            
-            ax.plot(forecast_dates, forecast_values, 'b:', linewidth=2, label='Prévision', alpha=0.6)
+        st['values'], = ax.plot(dates, values, 'b-', linewidth=2, label=metric, marker='o', markersize=4)
+        if trend['ma'] is not None:
+            st['ma'], = ax.plot(*trend['ma'], 'r--', linewidth=2, label=f'MM{ma_days}', alpha=0.8)
+        if trend['trend'] is not None:
+            st['trend'], = ax.plot(*trend['trend'][:2], 'g--', linewidth=1.5, label=trend_label, alpha=0.7)
+        if trend['forecast'] is not None:
+            st['forecast'], = ax.plot(*trend['forecast'], 'b:', linewidth=2, label='Prévision', alpha=0.6)
         
         ax.set_xlabel('Date')
         ax.set_ylabel(metric)
@@ -3470,14 +6133,7 @@ class AdvancedAnalyseModule:
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
         fig.autofmt_xdate()
         fig.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, master=self.trends_container)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
-        
-        toolbar_frame = ttk.Frame(self.trends_container)
-        toolbar_frame.pack(fill="x")
-        NavigationToolbar2Tk(canvas, toolbar_frame)
+        panel.draw()
     
     # === Exports ===
     
@@ -3489,55 +6145,58 @@ class AdvancedAnalyseModule:
             messagebox.showwarning("Attention", "Lancez d'abord une analyse")
             return
         
+        data = self.current_data
+        export_dir = ROOT_DIR / "_export"
+        export_dir.mkdir(parents=True, exist_ok=True)
+        filename = export_dir / f"analyse_{data['start_date'].strftime('%Y%m%d')}_{data['end_date'].strftime('%Y%m%d')}.xlsx"
+        
+        def done(success, message):
+            if not success:
+                messagebox.showerror("Erreur", message)
+                return
+            messagebox.showinfo("Succès", f"Exporté: {filename}")
+            import subprocess
+            subprocess.Popen(f'explorer /select,"{filename}"')
+        
+        run_export_in_background(self.root, "Export Excel", self._write_excel_report, data, filename, on_done=done)
+    
+    @timed()
+    def _write_excel_report(self, data, filename, progress=None):
+        """Écrire le rapport d'analyse (résumé + détail) en flux ; sans accès Tk"""
         try:
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill
-            
-            wb = openpyxl.Workbook()
-            data = self.current_data
+            from openpyxl.styles import Font
             
             # Feuille résumé
-            ws1 = wb.active
-            ws1.title = "Résumé"
-            ws1['A1'] = "RAPPORT D'ANALYSE"
-            ws1['A1'].font = Font(bold=True, size=14)
-            ws1['A3'] = f"Période: {format_date_display(data['start_date'])} - {format_date_display(data['end_date'])}"
-            
+            writer = ExcelStreamWriter("Résumé", styles={
+                "ptt_report_title": {"font": Font(bold=True, size=14)},
+                "ptt_bold": {"font": Font(bold=True)},
+            })
+            writer.append(["RAPPORT D'ANALYSE"], ["ptt_report_title"])
+            writer.blank()
+            writer.append([f"Période: {format_date_display(data['start_date'])} - {format_date_display(data['end_date'])}"])
+            writer.blank()
             kpis = [("Revenus", sum(data['revenus'])), ("Coûts", sum(data['couts'])),
                    ("Marge", sum(data['marges'])), ("Missions", sum(data['missions_count']))]
-            for i, (label, value) in enumerate(kpis, 5):
-                ws1[f'A{i}'] = label
-                ws1[f'B{i}'] = value
-            
-            # Feuille détail
-            ws2 = wb.create_sheet("Détail")
-            headers = ["Date", "Voyage", "Pays", "Type", "SST", "Chauffeur", "Palettes", "Revenus", "Coûts", "Marge"]
-            for col, h in enumerate(headers, 1):
-                ws2.cell(row=1, column=col, value=h).font = Font(bold=True)
+            for label, value in kpis:
+                writer.append([label, value])
             
-            for row, m in enumerate(data['missions_list'], 2):
-                ws2.cell(row=row, column=1, value=format_date_display(m['date']))
-                ws2.cell(row=row, column=2, value=m['voyage'])
-                ws2.cell(row=row, column=3, value=m['pays'])
-                ws2.cell(row=row, column=4, value=m['type'])
-                ws2.cell(row=row, column=5, value=m['sst'])
-                ws2.cell(row=row, column=6, value=m['chauffeur'])
-                ws2.cell(row=row, column=7, value=m['palettes'])
-                ws2.cell(row=row, column=8, value=m['revenus'])
-                ws2.cell(row=row, column=9, value=m['couts'])
-                ws2.cell(row=row, column=10, value=m['marge'])
-            
-            export_dir = ROOT_DIR / "_export"
-            export_dir.mkdir(parents=True, exist_ok=True)
-            filename = export_dir / f"analyse_{data['start_date'].strftime('%Y%m%d')}_{data['end_date'].strftime('%Y%m%d')}.xlsx"
-            wb.save(filename)
-            
-            messagebox.showinfo("Succès", f"Exporté: {filename}")
-            import subprocess
-            subprocess.Popen(f'explorer /select,"{filename}"')
+            # Feuille détail
+            writer.new_sheet("Détail")
+            writer.append(["Date", "Voyage", "Pays", "Type", "SST", "Chauffeur", "Palettes", "Revenus", "Coûts", "Marge"],
+                          "ptt_bold")
+            total = len(data['missions_list'])
+            for n, m in enumerate(data['missions_list'], start=1):
+                writer.append([format_date_display(m['date']), m['voyage'], m['pays'], m['type'], m['sst'],
+                               m['chauffeur'], m['palettes'], m['revenus'], m['couts'], m['marge']])
+                if progress and n % EXPORT_PROGRESS_STEP == 0:
+                    progress(n, total)
+            
+            writer.save(filename)
+            return True, f"Exporté: {filename}"
         except Exception as e:
-            messagebox.showerror("Erreur", str(e))
+            return False, str(e)
     
+    @timed()
     def export_to_csv(self):
         if not self.current_data:
             messagebox.showwarning("Attention", "Lancez d'abord une analyse")
@@ -3563,6 +6222,7 @@ class AdvancedAnalyseModule:
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
     
+    @timed()
     def export_to_pdf(self):
         if not PDF_AVAILABLE:
             messagebox.showerror("Erreur", "pip install reportlab")
@@ -3572,6 +6232,7 @@ class AdvancedAnalyseModule:
             return
         
         try:
+            lazy_import("reportlab.platypus")
             from reportlab.lib.pagesizes import A4, landscape
             from reportlab.lib import colors
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
@@ -3615,6 +6276,7 @@ class AdvancedAnalyseModule:
 
 
 class TransportPlannerApp:
+    @timed()
     def __init__(self, root):
         self.root = root
         self.root.title("Planning transport Tubize - BETA v0.6.0 - Analyse Avancée")
@@ -3636,13 +6298,14 @@ class TransportPlannerApp:
         # Enregistrer la fermeture de l'application
         self.root.protocol("WM_DELETE_WINDOW", self._on_app_close)
 
-        self.rights = self.load_rights()
-        self.sst_list = load_json(self.data_dir / "sst.json", [])
-        self.voyages = self.load_voyages_data()
-        self.chauffeurs = load_json(self.data_dir / "chauffeurs.json", [])
-        self.dispos = load_json(self.data_dir / "dispo_chauffeurs.json", [])
-        self.tarifs_sst = load_json(self.data_dir / "tarifs_sst.json", {})
-        self.revenus_palettes = load_json(self.data_dir / "revenus_palettes.json", {})
+        with perf_monitor.measure("démarrage.chargement_référentiels"):
+            self.rights = self.load_rights()
+            self.sst_list = load_json(self.data_dir / "sst.json", [])
+            self.voyages = self.load_voyages_data()
+            self.chauffeurs = load_json(self.data_dir / "chauffeurs.json", [])
+            self.dispos = load_json(self.data_dir / "dispo_chauffeurs.json", [])
+            self.tarifs_sst = load_json(self.data_dir / "tarifs_sst.json", {})
+            self.revenus_palettes = load_json(self.data_dir / "revenus_palettes.json", {})
 
         self.current_date = date.today()
         self.missions = []
@@ -3661,26 +6324,111 @@ class TransportPlannerApp:
         self.is_editing = False
         self.refresh_timer_id = None
         self.file_timestamps = {}
-        # Boucle d'auto-rafraîchissement simple (sans clignotement)
-        self._auto_refresh_interval_ms = 15000  # 15 secondes
-        self._auto_refresh_job = None
+        # Ordonnanceur unique des tâches périodiques (données, cache, Sauron)
+        self.scheduler = RefreshScheduler(
+            self.root, is_busy=lambda: self.user_editing or self.is_editing)
+        # Délai avant de décharger un onglet peu utilisé qui n'est plus affiché
+        self._lazy_tab_unload_delay_ms = 5 * 60 * 1000  # 5 minutes
 
 
-        self.build_gui()
+        with perf_monitor.measure("démarrage.build_gui"):
+            self.build_gui()
 
-        # Démarrer le système de cache en arrière-plan
-        # Le cache pré-télécharge les plannings des dates proches
-        planning_cache.start(on_cache_updated=self._on_cache_updated)
+        # Le cache pré-télécharge les plannings des dates proches (cycles pilotés
+        # par l'ordonnanceur, hors thread Tk)
+        planning_cache.attach_to_scheduler(self.scheduler, on_cache_updated=self._on_cache_updated)
         # Nettoyer les anciennes entrées de cache
         planning_cache.clear_old_cache(max_age_days=30)
 
         self.load_planning_for_date(self.current_date)
-        self._start_auto_refresh_loop()
+        self._register_periodic_jobs()
+        self.scheduler.start()
         self.update_status_bar_initial()
 
         # Log du changement d'onglet
         self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
+    def _register_periodic_jobs(self):
+        """Déclarer les tâches périodiques auprès de l'ordonnanceur"""
+        settings = self.scheduler.settings
+        # Données (_data + planning du jour) : vérification des mtimes hors thread Tk
+        self.scheduler.add_job(
+            "data", int(settings.get("auto_refresh_seconds", 10)),
+            check=self._detect_data_changes,
+            apply=lambda _changed: self._apply_data_refresh(),
+            enabled=settings.get("auto_refresh_enabled", True),
+        )
+        # Sauron : uniquement quand l'onglet est affiché et que les logs ont changé.
+        # La vérification (poll) consomme les nouvelles actions : son résultat doit
+        # toujours être appliqué, même pendant une édition (il ne touche que l'onglet Sauron).
+        self.scheduler.add_job(
+            "sauron", 30,
+            when=self._is_sauron_tab_visible,
+            check=self._detect_sauron_changes,
+            apply=self._apply_sauron_refresh,
+            max_backoff=4,
+            respect_editing=False,
+        )
+
+    def _detect_data_changes(self):
+        """Vérifier (sans rien modifier) si un référentiel ou le planning du jour a changé.
+        Exécuté hors du thread Tk par l'ordonnanceur."""
+        for key in REFERENCE_FILES:
+            filepath = self._reference_file_path(key)
+            try:
+                if filepath.exists() and self.file_timestamps.get(key) != filepath.stat().st_mtime:
+                    return True
+            except Exception:
+                return True
+
+        try:
+            if self._diff_day_signatures()[0]:
+                return True
+        except Exception:
+            pass
+        return False
+
+    def _diff_day_signatures(self):
+        """Comparer les fichiers du jour courant à ceux du dernier chargement.
+
+        Retourne (changé, signatures_actuelles, modifiés_ou_ajoutés, supprimés).
+        Sans effet de bord : utilisable hors du thread Tk.
+        """
+        loaded = getattr(self, "_day_signatures", None)
+        if not loaded or loaded["date"] != self.current_date:
+            # Aucun chargement de référence pour cette date (navigation en cours)
+            return False, {}, [], []
+        current = scan_planning_day(self.current_date)
+        previous = loaded["files"]
+        changed = [path for path, sig in current.items() if previous.get(path) != sig]
+        removed = [path for path in previous if path not in current]
+        return bool(changed or removed), current, changed, removed
+
+    def _apply_data_refresh(self):
+        """Recharger/rafraîchir les vues (thread Tk) et mettre à jour la barre de statut"""
+        if self.refresh_all():
+            self.last_refresh_dt = datetime.now()
+            try:
+                self.status_var.set(
+                    f"Session : {self.current_user} | Dernière MAJ : {self.last_refresh_dt.strftime('%d/%m/%Y %H:%M:%S')}"
+                )
+            except Exception:
+                pass
+
+    def _is_sauron_tab_visible(self):
+        try:
+            return (hasattr(self, 'tab_sauron') and self.tab_sauron.winfo_exists()
+                    and self.notebook.select() == str(self.tab_sauron))
+        except Exception:
+            return False
+
+    def _detect_sauron_changes(self):
+        """Nouvelles actions des journaux (lecture incrémentale hors thread Tk), sinon None"""
+        return activity_logger.poll() or None
+
+    def _apply_sauron_refresh(self, changes):
+        self.sauron_apply_log_changes(changes)
+
     def _on_cache_updated(self):
         """Callback appelé quand le cache a été mis à jour en arrière-plan"""
         # On peut éventuellement rafraîchir l'UI si la date courante a été mise en cache
@@ -3690,8 +6438,9 @@ class TransportPlannerApp:
     def _on_app_close(self):
         """Gérer la fermeture de l'application"""
         try:
-            # Arrêter le système de cache
+            # Arrêter le système de cache et l'ordonnanceur
             planning_cache.stop()
+            self.scheduler.stop()
         except Exception as e:
             print(f"Erreur arrêt cache: {e}")
         try:
@@ -3702,7 +6451,10 @@ class TransportPlannerApp:
             self.root.destroy()
     
     def _on_tab_changed(self, event):
-        """Logger les changements d'onglet"""
+        """Construire l'onglet à la demande et logger les changements d'onglet"""
+        if self._lazy_building:
+            return
+        self._ensure_selected_tab_built()
         try:
             current_tab = self.notebook.tab(self.notebook.select(), "text")
             activity_logger.log_action("TAB_CHANGE", {"tab": current_tab})
@@ -3729,19 +6481,20 @@ class TransportPlannerApp:
         """
         # Ne pas rafraîchir si l'utilisateur est en train d'éditer quelque chose
         if getattr(self, "user_editing", False) or getattr(self, "is_editing", False):
-            return
+            return False
 
         try:
-            # Recharger les données JSON uniquement si des fichiers ont changé
-            files_changed = self.reload_data_from_files()
-            if not files_changed:
-                return
+            # Recharger les données JSON uniquement si des fichiers ont changé ;
+            # on récupère l'ensemble des vues qui dépendent des fichiers rechargés
+            views = self.reload_data_from_files()
+            if not views:
+                return False
 
-            # Rafraîchir les différentes vues de façon incrémentale
-            self.smart_refresh_all_views()
+            # Rafraîchir uniquement les vues concernées, de façon incrémentale
+            self.smart_refresh_all_views(views)
 
             # Mettre à jour le résumé en haut de l'écran
-            if hasattr(self, "update_summary_stats"):
+            if "summary" in views and hasattr(self, "update_summary_stats"):
                 try:
                     self.update_summary_stats()
                 except Exception:
@@ -3753,63 +6506,19 @@ class TransportPlannerApp:
                     self.refresh_users_view()
                 except Exception:
                     pass
+            return True
 
         except Exception as e:
             print(f"Erreur lors du refresh_all: {e}")
             import traceback
             traceback.print_exc()
+            return False
 
     def load_rights(self):
-        rights = load_json(self.data_dir / "users_rights.json", {})
-        roles_def = rights.get("roles", {})
-        users_def = rights.get("users", {})
-
-        user_roles = users_def.get(self.current_user, ["viewer"])
-
-        permissions = {
-            "view_planning": False,
-            "edit_planning": False,
-            "view_drivers": False,
-            "manage_drivers": False,
-            "edit_driver_planning": False,
-            "manage_rights": False,
-            "manage_voyages": False,
-            "generate_planning": False,
-            "edit_past_planning": False,
-            "edit_past_planning_advanced": False,
-            "view_finance": False,
-            "manage_finance": False,
-            "view_analyse": False,
-            "view_sauron": False,
-            "send_announcements": False,
-            "manage_announcements_config": False,
-        }
-
-        for role_name in user_roles:
-            role = roles_def.get(role_name, {})
-            for k, v in role.items():
-                if v:
-                    permissions[k] = True
-
-        return {"roles_def": roles_def, "users_def": users_def, "permissions": permissions}
+        return resolve_user_rights(self.data_dir, self.current_user)
 
     def load_voyages_data(self):
-        raw = load_json(self.data_dir / "voyages.json", [])
-        voyages = []
-        for v in raw:
-            if isinstance(v, str):
-                voyages.append({"code": v, "type": "LIVRAISON", "actif": True, "country": "Belgique", "duree": 60})
-            elif isinstance(v, dict):
-                voyages.append(
-                    {
-                        "code": v.get("code", ""),
-                        "type": v.get("type", "LIVRAISON"),
-                        "actif": v.get("actif", True),
-                        "country": v.get("country", "Belgique"),
-                        "duree": v.get("duree", 60),
-                    }
-                )
-        return voyages
+        return load_voyages(self.data_dir)
 
     def save_voyages_data(self):
         save_json(self.data_dir / "voyages.json", self.voyages)
@@ -3832,29 +6541,135 @@ class TransportPlannerApp:
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill="both", expand=True)
 
+        # Seul l'onglet Planning est construit au démarrage : les autres onglets
+        # sont construits à leur première sélection (voir _on_tab_changed).
+        self._lazy_tabs = []
+        self._lazy_building = False
         if perms["view_planning"]:
             self.build_planning_tab()
-            self.build_suivi_missions_tab()  # Nouvel onglet Suivi missions
+            self._add_lazy_tab("Suivi missions", self.build_suivi_missions_tab)
         if perms["view_drivers"]:
-            self.build_chauffeurs_tab()
+            self._add_lazy_tab("Chauffeurs", self.build_chauffeurs_tab)
         if perms["manage_voyages"]:
-            self.build_voyages_tab()
+            self._add_lazy_tab("Tournées / Voyages", self.build_voyages_tab)
         if perms["view_finance"]:
-            self.build_finance_tab()
+            self._add_lazy_tab("💰 Finance", self.build_finance_tab)
         if perms["view_analyse"]:
-            self.build_analyse_tab()
+            self._add_lazy_tab("📊 Analyse", self.build_analyse_simple_tab, unloadable=True)
+            self._add_lazy_tab("📊 Analyse Avancée", self.build_analyse_advanced_tab, unloadable=True)
         if perms["generate_planning"]:
-            self.build_admin_tab()
+            self._add_lazy_tab("⚙️ Admin", self.build_admin_tab, unloadable=True)
         if perms["manage_rights"]:
-            self.build_rights_tab()
+            self._add_lazy_tab("Droits", self.build_rights_tab, unloadable=True)
         if perms["view_sauron"]:
-            self.build_sauron_tab()
+            self._add_lazy_tab("👁 Sauron", self.build_sauron_tab, unloadable=True)
         
         try:
-            install_setup_menu(self.root, menubar, self.refresh_all)
+            install_setup_menu(self.root, menubar, self.scheduler)
         except Exception:
             pass
 
+    # ---------- Onglets construits à la demande ----------
+
+    def _add_lazy_tab(self, title, builder, unloadable=False):
+        """Réserver la place d'un onglet qui sera construit à sa première sélection.
+
+        Les onglets ``unloadable`` (peu utilisés) sont détruits après
+        ``_lazy_tab_unload_delay_ms`` passées sur un autre onglet, puis
+        reconstruits à la sélection suivante.
+        """
+        placeholder = ttk.Frame(self.notebook)
+        ttk.Label(placeholder, text="⏳ Chargement...", font=("Arial", 11),
+                  foreground="gray").pack(pady=40)
+        self.notebook.add(placeholder, text=title)
+        self._lazy_tabs.append({
+            "title": title,
+            "builder": builder,
+            "unloadable": unloadable,
+            "placeholder": placeholder,
+            "frame": None,       # Onglet réel une fois construit
+            "attrs": [],         # Attributs de l'application créés par le builder
+            "unload_job": None,
+        })
+
+    def _ensure_selected_tab_built(self):
+        """Construire l'onglet sélectionné s'il ne l'est pas encore et planifier
+        le déchargement des onglets peu utilisés qui ne sont plus affichés."""
+        if self._lazy_building or not getattr(self, "_lazy_tabs", None):
+            return
+        selected = self.notebook.select()
+
+        for entry in self._lazy_tabs:
+            if entry["frame"] is None:
+                if str(entry["placeholder"]) == selected:
+                    self._build_lazy_tab(entry)
+                continue
+
+            if not entry["unloadable"]:
+                continue
+            if str(entry["frame"]) == selected:
+                if entry["unload_job"]:
+                    self.root.after_cancel(entry["unload_job"])
+                    entry["unload_job"] = None
+            elif entry["unload_job"] is None:
+                entry["unload_job"] = self.root.after(
+                    self._lazy_tab_unload_delay_ms, lambda e=entry: self._unload_lazy_tab(e))
+
+    def _build_lazy_tab(self, entry):
+        """Construire un onglet et le placer à la position de son emplacement réservé"""
+        placeholder = entry["placeholder"]
+        attrs_before = set(vars(self))
+        tabs_before = set(self.notebook.tabs())
+
+        self._lazy_building = True
+        try:
+            entry["builder"]()
+            new_tabs = [t for t in self.notebook.tabs() if t not in tabs_before]
+            if not new_tabs:
+                return
+            frame = self.root.nametowidget(new_tabs[0])
+            self.notebook.insert(self.notebook.index(placeholder), frame)
+            self.notebook.select(frame)
+            self.notebook.hide(placeholder)
+            entry["frame"] = frame
+            entry["attrs"] = [name for name in vars(self) if name not in attrs_before]
+        except Exception as e:
+            print(f"Erreur construction onglet {entry['title']}: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            self._lazy_building = False
+
+    def _unload_lazy_tab(self, entry):
+        """Détruire un onglet peu utilisé pour libérer la mémoire (reconstruit à la demande)"""
+        entry["unload_job"] = None
+        frame = entry["frame"]
+        if frame is None:
+            return
+        if self.notebook.select() == str(frame) or self.user_editing:
+            return
+
+        self._lazy_building = True
+        try:
+            # Réafficher l'emplacement réservé à sa position d'origine
+            self.notebook.add(entry["placeholder"])
+            frame.destroy()
+        finally:
+            self._lazy_building = False
+        entry["frame"] = None
+
+        # Oublier les widgets/état créés par le builder (les vues testent hasattr)
+        for name in entry["attrs"]:
+            value = getattr(self, name, None)
+            if name.endswith("_job") and value:
+                try:
+                    self.root.after_cancel(value)
+                except Exception:
+                    pass
+            if hasattr(self, name):
+                delattr(self, name)
+        entry["attrs"] = []
+
     def build_planning_tab(self):
         self.tab_planning = ttk.Frame(self.notebook)
         self.notebook.add(self.tab_planning, text="Planning")
@@ -3891,6 +6706,10 @@ class TransportPlannerApp:
         )
         self.existing_dates_combo.pack(side="left")
         ttk.Button(top_frame, text="Ouvrir", command=self.on_open_existing_date).pack(side="left", padx=5)
+
+        # Indicateur de chargement de la journée (lecture en arrière-plan)
+        self.planning_loading_label = ttk.Label(top_frame, text="", foreground="#757575")
+        self.planning_loading_label.pack(side="left", padx=10)
         
         ttk.Separator(self.tab_planning, orient='horizontal').pack(fill='x', padx=5, pady=2)
 
@@ -4348,11 +7167,17 @@ class TransportPlannerApp:
         self.gantt_names_canvas.bind("<MouseWheel>", on_gantt_mousewheel_vertical)
         # Shift + molette = scroll vertical
         self.gantt_canvas.bind("<Shift-MouseWheel>", on_gantt_mousewheel_vertical)
+        # Redimensionnement = de nouvelles lignes peuvent devenir visibles
+        self.gantt_canvas.bind("<Configure>", self._gantt_render_visible)
+
+        # État du dessin incrémental (voir suivi_draw_gantt)
+        self._gantt_state = None
 
     def _gantt_yview_both(self, *args):
         """Synchroniser le scroll vertical entre les deux canvas du Gantt"""
         self.gantt_canvas.yview(*args)
         self.gantt_names_canvas.yview(*args)
+        self._gantt_render_visible()
 
     def _build_suivi_edit_form(self):
         """Construire le formulaire d'édition pour le suivi missions"""
@@ -4513,6 +7338,7 @@ class TransportPlannerApp:
         if path:
             save_json(path, {k: v for k, v in mission.items() if k != "_path"})
             planning_cache.force_refresh(self.suivi_current_date)
+            planning_rollups.schedule_update(self.suivi_current_date)
 
         # Logger l'action
         activity_logger.log_action("MISSION_EDIT", {
@@ -4812,13 +7638,20 @@ class TransportPlannerApp:
         self.suivi_refresh_view()
 
     def suivi_draw_gantt(self):
-        """Dessiner le diagramme de Gantt avec noms fixes à gauche"""
+        """Dessiner le diagramme de Gantt avec noms fixes à gauche.
+
+        Le dessin est incrémental : les éléments de chaque barre sont mémorisés
+        par mission (tag ``bar_<id>``) et seules les barres dont l'horaire, la
+        durée ou le statut ont changé sont redessinées. Les lignes chauffeurs
+        ne sont dessinées que lorsqu'elles entrent dans la zone visible.
+        """
         canvas = self.gantt_canvas
         names_canvas = self.gantt_names_canvas
-        canvas.delete("all")
-        names_canvas.delete("all")
 
         if not self.suivi_missions:
+            canvas.delete("all")
+            names_canvas.delete("all")
+            self._gantt_state = None
             canvas.create_text(400, 200, text="Aucune mission pour cette date",
                              font=('Arial', 14), fill='gray')
             return
@@ -4828,6 +7661,7 @@ class TransportPlannerApp:
         HOUR_WIDTH = 100
         TOP_MARGIN = 40    # Pour les heures
         NAMES_WIDTH = 200  # Largeur de la colonne des noms
+        NB_HOURS = 28      # 0h à 28h pour couvrir les heures tardives
 
         # Collecter les chauffeurs uniques avec des missions ce jour
         # Format: {chauffeur_nom: {"missions": [...], "sst": "..."}}
@@ -4856,71 +7690,124 @@ class TransportPlannerApp:
             # Tri alphabétique
             drivers = sorted(drivers_with_missions.keys())
 
-        total_height = TOP_MARGIN + len(drivers) * DRIVER_HEIGHT + 20
+        rows = [(driver, drivers_with_missions[driver]["sst"]) for driver in drivers]
+        layout_key = (self.suivi_current_date, tuple(rows))
+
+        state = getattr(self, '_gantt_state', None)
+        if state is None or state["layout"] != layout_key:
+            # Disposition différente (date, chauffeurs, tri) → on repart d'un canvas vierge
+            canvas.delete("all")
+            names_canvas.delete("all")
+            state = {
+                "layout": layout_key,
+                "driver_height": DRIVER_HEIGHT,
+                "hour_width": HOUR_WIDTH,
+                "top_margin": TOP_MARGIN,
+                "names_width": NAMES_WIDTH,
+                "nb_hours": NB_HOURS,
+                "rows": rows,
+                "drawn_rows": set(),
+                "bars": {},  # {mission_id: signature de la barre dessinée}
+            }
+            self._gantt_state = state
+
+            total_height = TOP_MARGIN + len(rows) * DRIVER_HEIGHT + 20
+
+            # === CANVAS DES NOMS (gauche, fixe) ===
+            names_canvas.create_text(NAMES_WIDTH/2, 20, text="Chauffeur",
+                                    font=('Arial', 9, 'bold'))
+            names_canvas.create_line(0, TOP_MARGIN, NAMES_WIDTH, TOP_MARGIN, fill='#CCCCCC')
+
+            # === CANVAS TIMELINE (droite, scrollable) : en-têtes d'heures ===
+            for hour in range(0, NB_HOURS):
+                x = hour * HOUR_WIDTH
+                canvas.create_text(x + HOUR_WIDTH/2, 20, text=f"{hour:02d}:00",
+                                 font=('Arial', 9))
+                canvas.create_line(x, TOP_MARGIN, x, TOP_MARGIN + len(rows) * DRIVER_HEIGHT,
+                                 fill='#E0E0E0', dash=(2, 2))
+
+            # Configurer les zones de scroll
+            canvas.configure(scrollregion=(0, 0, NB_HOURS * HOUR_WIDTH, total_height))
+            names_canvas.configure(scrollregion=(0, 0, NAMES_WIDTH, total_height))
+
+        state["v_by_code"] = v_by_code
+        # Missions dont le chauffeur est déjà occupé (durée du voyage) : surlignées en rouge
+        state["conflicts"] = DayIntervalIndex(self.suivi_missions, self.voyages).conflicting_ids()
+        state["row_missions"] = [drivers_with_missions[driver]["missions"] for driver in drivers]
+
+        # Mettre à jour les barres déjà dessinées (uniquement celles qui ont changé)
+        present_ids = set()
+        for i in state["drawn_rows"]:
+            for m in state["row_missions"][i]:
+                present_ids.add(m["id"])
+                self.suivi_draw_gantt_bar(canvas, m, i, v_by_code,
+                                          HOUR_WIDTH, DRIVER_HEIGHT, 0, TOP_MARGIN)
 
-        # === CANVAS DES NOMS (gauche, fixe) ===
-        # En-tête "Chauffeur"
-        names_canvas.create_text(NAMES_WIDTH/2, 20, text="Chauffeur",
-                                font=('Arial', 9, 'bold'))
-        names_canvas.create_line(0, TOP_MARGIN, NAMES_WIDTH, TOP_MARGIN, fill='#CCCCCC')
+        # Supprimer les barres des missions disparues ou déplacées hors de la zone dessinée
+        for mission_id in list(state["bars"].keys()):
+            if mission_id not in present_ids:
+                canvas.delete(f"bar_{mission_id}")
+                del state["bars"][mission_id]
 
-        # Dessiner les noms des chauffeurs
-        for i, driver in enumerate(drivers):
-            y = TOP_MARGIN + i * DRIVER_HEIGHT
-            driver_info = drivers_with_missions[driver]
-            sst = driver_info["sst"]
+        self._gantt_render_visible()
 
-            # Fond alterné
-            if i % 2 == 0:
-                names_canvas.create_rectangle(0, y, NAMES_WIDTH, y + DRIVER_HEIGHT,
-                                             fill='#FAFAFA', outline='')
+    def _gantt_render_visible(self, event=None):
+        """Dessiner les lignes chauffeurs du Gantt qui entrent dans la zone visible"""
+        state = getattr(self, '_gantt_state', None)
+        if not state or not state["rows"]:
+            return
 
-            # Nom du chauffeur avec SST
-            display_text = driver
-            if sst:
-                display_text = f"{driver} ({sst})"
-            names_canvas.create_text(10, y + DRIVER_HEIGHT/2, text=display_text,
-                                    anchor='w', font=('Arial', 9, 'bold'))
+        canvas = self.gantt_canvas
+        names_canvas = self.gantt_names_canvas
+        driver_height = state["driver_height"]
+        top_margin = state["top_margin"]
+        names_width = state["names_width"]
+        timeline_width = state["nb_hours"] * state["hour_width"]
+        nb_rows = len(state["rows"])
+
+        # Zone visible (avec une marge de 2 lignes pour fluidifier le scroll)
+        view_height = canvas.winfo_height()
+        if view_height <= 1:
+            view_height = 30 * driver_height  # Canvas pas encore affiché
+        y_top = canvas.canvasy(0)
+        first = max(0, int((y_top - top_margin) // driver_height) - 2)
+        last = min(nb_rows - 1, int((y_top + view_height - top_margin) // driver_height) + 2)
+
+        for i in range(first, last + 1):
+            if i in state["drawn_rows"]:
+                continue
+            state["drawn_rows"].add(i)
 
-            # Ligne horizontale
-            names_canvas.create_line(0, y + DRIVER_HEIGHT, NAMES_WIDTH, y + DRIVER_HEIGHT,
-                                    fill='#E0E0E0')
+            driver, sst = state["rows"][i]
+            y = top_margin + i * driver_height
 
-        # === CANVAS TIMELINE (droite, scrollable) ===
-        # Dessiner les en-têtes d'heures (0h à 28h pour couvrir les heures tardives)
-        for hour in range(0, 28):
-            x = hour * HOUR_WIDTH
-            canvas.create_text(x + HOUR_WIDTH/2, 20, text=f"{hour:02d}:00",
-                             font=('Arial', 9))
-            canvas.create_line(x, TOP_MARGIN, x, TOP_MARGIN + len(drivers) * DRIVER_HEIGHT,
-                             fill='#E0E0E0', dash=(2, 2))
-
-        # Dessiner les lignes des chauffeurs sur la timeline
-        for i, driver in enumerate(drivers):
-            y = TOP_MARGIN + i * DRIVER_HEIGHT
-            driver_info = drivers_with_missions[driver]
-
-            # Fond alterné
+            # Fond alterné + nom du chauffeur avec SST
             if i % 2 == 0:
-                canvas.create_rectangle(0, y, 28 * HOUR_WIDTH, y + DRIVER_HEIGHT,
+                names_canvas.create_rectangle(0, y, names_width, y + driver_height,
+                                             fill='#FAFAFA', outline='')
+                canvas.create_rectangle(0, y, timeline_width, y + driver_height,
                                        fill='#FAFAFA', outline='')
 
-            # Ligne horizontale
-            canvas.create_line(0, y + DRIVER_HEIGHT, 28 * HOUR_WIDTH, y + DRIVER_HEIGHT,
-                             fill='#E0E0E0')
+            display_text = f"{driver} ({sst})" if sst else driver
+            names_canvas.create_text(10, y + driver_height/2, text=display_text,
+                                    anchor='w', font=('Arial', 9, 'bold'))
 
-            # Dessiner les barres des missions (sans LEFT_MARGIN maintenant)
-            for m in driver_info["missions"]:
-                self.suivi_draw_gantt_bar(canvas, m, i, v_by_code,
-                                          HOUR_WIDTH, DRIVER_HEIGHT, 0, TOP_MARGIN)
+            # Lignes horizontales
+            names_canvas.create_line(0, y + driver_height, names_width, y + driver_height,
+                                    fill='#E0E0E0')
+            canvas.create_line(0, y + driver_height, timeline_width, y + driver_height,
+                             fill='#E0E0E0')
 
-        # Configurer les zones de scroll
-        canvas.configure(scrollregion=(0, 0, 28 * HOUR_WIDTH, total_height))
-        names_canvas.configure(scrollregion=(0, 0, NAMES_WIDTH, total_height))
+            for m in state["row_missions"][i]:
+                self.suivi_draw_gantt_bar(canvas, m, i, state["v_by_code"],
+                                          state["hour_width"], driver_height, 0, top_margin)
 
     def suivi_draw_gantt_bar(self, canvas, mission, driver_idx, v_by_code,
                              hour_width, driver_height, left_margin, top_margin):
-        """Dessiner une barre de mission dans le Gantt avec case à cocher"""
+        """Dessiner une barre de mission dans le Gantt avec case à cocher.
+
+        Ne fait rien si la barre déjà dessinée pour cette mission est identique.
+        """
         try:
             heure_str = mission.get("heure", "08:00")
             h, m = map(int, heure_str.split(":"))
@@ -4934,6 +7821,20 @@ class TransportPlannerApp:
         duree_minutes = voyage.get("duree", 60)  # Par défaut 60 minutes
         duree_hours = duree_minutes / 60
 
+        is_done = self.suivi_missions_status.get(mission["id"], False)
+        state = getattr(self, '_gantt_state', None)
+        is_conflict = bool(state) and mission["id"] in state.get("conflicts", ())
+
+        # Signature de la barre : si elle n'a pas changé, on garde les items existants
+        mission_tag = f"bar_{mission['id']}"
+        signature = (driver_idx, heure_str, voyage_code, duree_minutes,
+                     mission.get("type"), mission.get("sst", "N/A"), is_done, is_conflict)
+        if state is not None:
+            if state["bars"].get(mission["id"]) == signature:
+                return
+            canvas.delete(mission_tag)
+            state["bars"][mission["id"]] = signature
+
         # Calculer les coordonnées
         x1 = left_margin + start_hour * hour_width
         x2 = x1 + duree_hours * hour_width
@@ -4941,7 +7842,6 @@ class TransportPlannerApp:
         y2 = y1 + driver_height - 10
 
         # Couleur selon le type et le statut
-        is_done = self.suivi_missions_status.get(mission["id"], False)
         if is_done:
             fill_color = "#9E9E9E"  # Gris pour effectué
         elif mission.get("type") == "LIVRAISON":
@@ -4949,8 +7849,13 @@ class TransportPlannerApp:
         else:
             fill_color = "#4CAF50"  # Vert pour ramasse
 
-        # Dessiner la barre
-        bar = canvas.create_rectangle(x1, y1, x2, y2, fill=fill_color, outline='#333333')
+        # Dessiner la barre (bordure rouge épaisse si le chauffeur est déjà occupé)
+        if is_conflict:
+            bar = canvas.create_rectangle(x1, y1, x2, y2, fill=fill_color, outline='#D32F2F',
+                                          width=3, tags=mission_tag)
+        else:
+            bar = canvas.create_rectangle(x1, y1, x2, y2, fill=fill_color, outline='#333333',
+                                          tags=mission_tag)
 
         # Case à cocher à gauche de la barre
         checkbox_size = 14
@@ -4961,17 +7866,18 @@ class TransportPlannerApp:
 
         # Dessiner la case à cocher
         checkbox = canvas.create_rectangle(cb_x1, cb_y1, cb_x2, cb_y2,
-                                          fill='white', outline='#333333', width=1)
+                                          fill='white', outline='#333333', width=1,
+                                          tags=mission_tag)
 
         # Si effectué, dessiner le coche
         if is_done:
             # Dessiner un coche vert
             canvas.create_line(cb_x1 + 2, cb_y1 + checkbox_size/2,
                              cb_x1 + checkbox_size/3, cb_y2 - 3,
-                             fill='#2E7D32', width=2)
+                             fill='#2E7D32', width=2, tags=mission_tag)
             canvas.create_line(cb_x1 + checkbox_size/3, cb_y2 - 3,
                              cb_x2 - 2, cb_y1 + 3,
-                             fill='#2E7D32', width=2)
+                             fill='#2E7D32', width=2, tags=mission_tag)
 
         # Texte dans la barre (décalé à droite de la checkbox)
         text = f"{voyage_code}"
@@ -4979,7 +7885,7 @@ class TransportPlannerApp:
         bar_width = x2 - text_x
         if bar_width > 30:
             canvas.create_text(text_x + bar_width/2, (y1 + y2) / 2, text=text,
-                             fill='white', font=('Arial', 8, 'bold'))
+                             fill='white', font=('Arial', 8, 'bold'), tags=mission_tag)
 
         # Tooltip au survol
         def show_tooltip(event):
@@ -4988,6 +7894,8 @@ class TransportPlannerApp:
             info += f"Durée: {duree_minutes} min\n"
             info += f"SST: {mission.get('sst', 'N/A')}\n"
             info += f"Statut: {'✔ Effectué' if is_done else '☐ En attente'}"
+            if is_conflict:
+                info += "\n⚠ Chevauchement avec une autre mission du chauffeur"
             # Créer un tooltip simple
             tooltip = canvas.create_text(event.x + 10, event.y - 10,
                                         text=info, anchor='nw',
@@ -5150,11 +8058,17 @@ class TransportPlannerApp:
         def export_excel_par_chauffeur():
             desktop = get_desktop_path()
             filename = desktop / generate_export_filename(prefix='planning_par_chauffeur', extension='xlsx')
-            success, message = export_planning_excel_par_chauffeur(self.missions, self.voyages, self.current_date, filename)
-            if success:
-                messagebox.showinfo('Export réussi', f"Fichier exporté sur le bureau et ouvert:\n{filename.name}")
-            else:
-                messagebox.showerror('Erreur export', message)
+
+            def done(success, message):
+                if success:
+                    messagebox.showinfo('Export réussi', f"Fichier exporté sur le bureau et ouvert:\n{filename.name}")
+                else:
+                    messagebox.showerror('Erreur export', message)
+
+            # Copie des missions : le planning peut être rafraîchi pendant l'export
+            run_export_in_background(self.root, "Export Excel", export_planning_excel_par_chauffeur,
+                                     [dict(m) for m in self.missions], list(self.voyages), self.current_date,
+                                     filename, on_done=done)
 
         def export_pdf_par_chauffeur():
             desktop = get_desktop_path()
@@ -5169,9 +8083,62 @@ class TransportPlannerApp:
             ttk.Button(export_frame, text='📊 Exporter Excel', command=export_excel_par_chauffeur).pack(side='left', padx=5)
         if PDF_AVAILABLE:
             ttk.Button(export_frame, text='📄 Exporter PDF', command=export_pdf_par_chauffeur).pack(side='left', padx=5)
+            ttk.Button(export_frame, text='📚 PDF période…', command=lambda: self.open_batch_pdf_export('chauffeur', win)).pack(side='left', padx=5)
         
         ttk.Button(export_frame, text="Fermer", command=on_close).pack(side="left", padx=10)
     
+    def open_batch_pdf_export(self, view, parent=None):
+        """Boîte de dialogue d'export PDF d'une période (plusieurs jours en un seul lot)"""
+        dlg = tk.Toplevel(parent or self.root)
+        dlg.title("Export PDF d'une période")
+        dlg.transient(parent or self.root)
+        dlg.resizable(False, False)
+
+        # Par défaut : la semaine de la date affichée (lundi → samedi)
+        monday = self.current_date - timedelta(days=self.current_date.weekday())
+        start_var = tk.StringVar(value=format_date_display(monday))
+        end_var = tk.StringVar(value=format_date_display(monday + timedelta(days=5)))
+        split_var = tk.StringVar(value="sst" if view == "chauffeur" else "periode")
+
+        frame = ttk.Frame(dlg, padding=10)
+        frame.pack(fill="both", expand=True)
+        ttk.Label(frame, text="Du :").grid(row=0, column=0, sticky="w")
+        ttk.Entry(frame, textvariable=start_var, width=12).grid(row=0, column=1, sticky="w", padx=5)
+        ttk.Label(frame, text="Au :").grid(row=0, column=2, sticky="w")
+        ttk.Entry(frame, textvariable=end_var, width=12).grid(row=0, column=3, sticky="w", padx=5)
+        for row, (key, label) in enumerate(PDF_BATCH_SPLITS.items(), start=1):
+            ttk.Radiobutton(frame, text=label, value=key, variable=split_var).grid(
+                row=row, column=0, columnspan=4, sticky="w", pady=1)
+
+        def generate():
+            try:
+                start = parse_date_input(start_var.get())
+                end = parse_date_input(end_var.get())
+            except ValueError as e:
+                messagebox.showerror("Erreur", f"Date invalide: {e}", parent=dlg)
+                return
+            if end < start:
+                messagebox.showerror("Erreur", "La date de fin précède la date de début", parent=dlg)
+                return
+            dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+            out_dir = get_desktop_path() / generate_export_filename(prefix=f"planning_{view}", extension="pdf")[:-4]
+            dlg.destroy()
+
+            def done(success, message):
+                if success:
+                    messagebox.showinfo("Export réussi", message)
+                    open_exported_file(out_dir)
+                else:
+                    messagebox.showerror("Erreur export", message)
+
+            run_export_in_background(self.root, "Export PDF", export_planning_pdf_batch, view, dates,
+                                     list(self.voyages), out_dir, split=split_var.get(), on_done=done)
+
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=len(PDF_BATCH_SPLITS) + 1, column=0, columnspan=4, pady=(10, 0))
+        ttk.Button(buttons, text="📄 Générer", command=generate).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Annuler", command=dlg.destroy).pack(side="left", padx=5)
+
     def open_view_by_time(self):
         win = tk.Toplevel(self.root)
         win.title(f"Vue par Heure - {format_date_display(self.current_date)}")
@@ -5321,11 +8288,17 @@ class TransportPlannerApp:
         def export_excel_par_heure():
             desktop = get_desktop_path()
             filename = desktop / generate_export_filename(prefix='planning_par_heure', extension='xlsx')
-            success, message = export_planning_excel_par_heure(self.missions, self.voyages, self.current_date, filename)
-            if success:
-                messagebox.showinfo('Export réussi', f"Fichier exporté sur le bureau et ouvert:\n{filename.name}")
-            else:
-                messagebox.showerror('Erreur export', message)
+
+            def done(success, message):
+                if success:
+                    messagebox.showinfo('Export réussi', f"Fichier exporté sur le bureau et ouvert:\n{filename.name}")
+                else:
+                    messagebox.showerror('Erreur export', message)
+
+            # Copie des missions : le planning peut être rafraîchi pendant l'export
+            run_export_in_background(self.root, "Export Excel", export_planning_excel_par_heure,
+                                     [dict(m) for m in self.missions], list(self.voyages), self.current_date,
+                                     filename, on_done=done)
 
         def export_pdf_par_heure():
             desktop = get_desktop_path()
@@ -5340,6 +8313,7 @@ class TransportPlannerApp:
             ttk.Button(export_frame, text='📊 Exporter Excel', command=export_excel_par_heure).pack(side='left', padx=5)
         if PDF_AVAILABLE:
             ttk.Button(export_frame, text='📄 Exporter PDF', command=export_pdf_par_heure).pack(side='left', padx=5)
+            ttk.Button(export_frame, text='📚 PDF période…', command=lambda: self.open_batch_pdf_export('heure', win)).pack(side='left', padx=5)
         
         ttk.Button(export_frame, text="Fermer", command=on_close).pack(side="left", padx=10)
     
@@ -5510,11 +8484,17 @@ class TransportPlannerApp:
         def export_excel_par_voyage():
             desktop = get_desktop_path()
             filename = desktop / generate_export_filename(prefix='planning_par_voyage', extension='xlsx')
-            success, message = export_planning_excel_par_voyage(self.missions, self.voyages, self.current_date, filename)
-            if success:
-                messagebox.showinfo('Export réussi', f"Fichier exporté sur le bureau et ouvert:\n{filename.name}")
-            else:
-                messagebox.showerror('Erreur export', message)
+
+            def done(success, message):
+                if success:
+                    messagebox.showinfo('Export réussi', f"Fichier exporté sur le bureau et ouvert:\n{filename.name}")
+                else:
+                    messagebox.showerror('Erreur export', message)
+
+            # Copie des missions : le planning peut être rafraîchi pendant l'export
+            run_export_in_background(self.root, "Export Excel", export_planning_excel_par_voyage,
+                                     [dict(m) for m in self.missions], list(self.voyages), self.current_date,
+                                     filename, on_done=done)
 
         def export_pdf_par_voyage():
             desktop = get_desktop_path()
@@ -5529,6 +8509,7 @@ class TransportPlannerApp:
             ttk.Button(export_frame, text='📊 Exporter Excel', command=export_excel_par_voyage).pack(side='left', padx=5)
         if PDF_AVAILABLE:
             ttk.Button(export_frame, text='📄 Exporter PDF', command=export_pdf_par_voyage).pack(side='left', padx=5)
+            ttk.Button(export_frame, text='📚 PDF période…', command=lambda: self.open_batch_pdf_export('voyage', win)).pack(side='left', padx=5)
         
         ttk.Button(export_frame, text="Fermer", command=on_close).pack(side="left", padx=10)
 
@@ -5555,47 +8536,12 @@ class TransportPlannerApp:
 
         # Charger les configurations
         sst_emails = load_json(SST_EMAILS_FILE, default={})
-        announcement_config = load_json(ANNOUNCEMENT_CONFIG_FILE, default={
-            "reply_to": "",
-            "subject": "Annonce missions transport - {date}",
-            "cc_addresses": [],
-            "body_template": """Bonjour,
-
-Pour le {date}, les missions suivantes sont planifiées pour votre société :
-
-{chauffeurs_list}
-
-Lieu de présentation des chauffeurs : {lieu_presentation}
-
-Merci de confirmer :
-- Que le(s) chauffeur(s) annoncé(s) est/sont bien les bons
-- Que vous acceptez la/les mission(s)
-
-Merci de répondre avant 20h00.
-
-Cordialement,
-{expediteur}""",
-            "lieu_presentation": "Tubize",
-            "variables_help": [
-                "{date} - Date de la mission (format: JJ/MM/AAAA)",
-                "{sst_name} - Nom du sous-traitant",
-                "{chauffeurs_list} - Liste des chauffeurs avec leur première heure",
-                "{lieu_presentation} - Lieu de présentation",
-                "{expediteur} - Nom de l'expéditeur",
-                "{nb_chauffeurs} - Nombre de chauffeurs",
-                "{nb_missions} - Nombre de missions"
-            ]
-        })
+        announcement_config = load_announcement_config()
         history = load_json(ANNOUNCEMENT_HISTORY_FILE, default=[])
+        engine = AnnouncementEngine(announcement_config, sst_emails, history, sender=self.current_user)
 
         # Récupérer les SST du planning J+1
-        sst_missions = {}
-        for m in self.missions:
-            sst = m.get("sst", "").strip()
-            if sst:
-                if sst not in sst_missions:
-                    sst_missions[sst] = []
-                sst_missions[sst].append(m)
+        sst_missions = engine.group_missions(self.missions)
 
         if not sst_missions:
             messagebox.showinfo("Aucun SST",
@@ -5651,35 +8597,25 @@ Cordialement,
         tree.pack(side="left", fill="both", expand=True)
         vsb.pack(side="right", fill="y")
 
-        def check_already_sent(sst_name, target_date):
+        def check_already_sent(sst_name):
             """Vérifier si un mail a déjà été envoyé pour ce SST et cette date"""
-            for h in history:
-                if h.get("sst") == sst_name and h.get("mission_date") == target_date:
-                    return h
-            return None
+            return engine.already_sent(sst_name, self.current_date)
 
         def refresh_sst_list():
             for item in tree.get_children():
                 tree.delete(item)
 
-            target_date_str = self.current_date.strftime("%Y-%m-%d")
-
-            for sst, missions in sorted(sst_missions.items()):
-                # Trouver les chauffeurs uniques
-                chauffeurs = list(set(m.get("chauffeur_nom", "N/A") for m in missions if m.get("chauffeur_nom")))
+            for announcement in engine.build(self.current_date, self.missions):
+                sst = announcement["sst"]
+                chauffeurs = announcement["chauffeurs"]
                 chauffeurs_str = ", ".join(chauffeurs) if chauffeurs else "Non assigné"
 
-                # Trouver la première heure
-                heures = [m.get("heure", "99:99") for m in missions]
-                premiere_heure = min(heures) if heures else "N/A"
-
                 # Email configuré
-                email_config = sst_emails.get(sst, {})
-                emails = email_config.get("emails", [])
+                emails = announcement["recipients"]
                 email_str = emails[0] if emails else "❌ Non configuré"
 
                 # Vérifier si déjà envoyé
-                already_sent = check_already_sent(sst, target_date_str)
+                already_sent = announcement["previous"]
                 if already_sent:
                     status = f"✅ Envoyé le {already_sent.get('sent_at', '')[:16]}"
                     tag = "sent"
@@ -5689,9 +8625,9 @@ Cordialement,
 
                 tree.insert("", "end", values=(
                     sst,
-                    len(missions),
+                    len(announcement["missions"]),
                     chauffeurs_str[:50] + ("..." if len(chauffeurs_str) > 50 else ""),
-                    premiere_heure,
+                    announcement["premiere_heure"],
                     email_str[:40] + ("..." if len(email_str) > 40 else ""),
                     status
                 ), tags=(tag,))
@@ -5715,8 +8651,7 @@ Cordialement,
             sst_name = item['values'][0]
 
             # Vérifier si déjà envoyé
-            target_date_str = self.current_date.strftime("%Y-%m-%d")
-            already_sent = check_already_sent(sst_name, target_date_str)
+            already_sent = check_already_sent(sst_name)
 
             if already_sent:
                 msg = (f"Un mail a déjà été envoyé pour {sst_name} "
@@ -5741,135 +8676,104 @@ Cordialement,
 
         def send_announcement_email(sst_name):
             """Générer et ouvrir le mail dans Outlook"""
-            if not OUTLOOK_AVAILABLE:
+            if not ensure_outlook():
                 messagebox.showerror("Outlook non disponible",
                     "Le module Outlook (win32com) n'est pas installé.\n"
                     "Installez-le avec: pip install pywin32")
                 return
 
-            missions = sst_missions.get(sst_name, [])
-            email_config = sst_emails.get(sst_name, {})
-            emails = email_config.get("emails", [])
-
-            # Préparer les données
-            # Construire la liste des chauffeurs avec leur première heure
-            # Regrouper les missions par chauffeur et trouver la première heure
-            chauffeurs_dict = {}
-            for m in missions:
-                chauffeur_nom = m.get("chauffeur_nom", "").strip()
-                if chauffeur_nom:
-                    heure = m.get("heure", "99:99")
-                    if chauffeur_nom not in chauffeurs_dict:
-                        chauffeurs_dict[chauffeur_nom] = heure
-                    else:
-                        # Garder la première heure (la plus tôt)
-                        if heure < chauffeurs_dict[chauffeur_nom]:
-                            chauffeurs_dict[chauffeur_nom] = heure
-
-            # Générer la liste formatée
-            chauffeurs_lines = []
-            for i, (nom, heure) in enumerate(sorted(chauffeurs_dict.items(), key=lambda x: x[1]), 1):
-                chauffeurs_lines.append(f"Chauffeur {i} : {nom} – Attendu pour {heure}")
-            chauffeurs_list = "\n".join(chauffeurs_lines) if chauffeurs_lines else "Aucun chauffeur assigné"
-
-            chauffeurs = list(chauffeurs_dict.keys())
-
-            # Remplacer les variables dans le template
-            body = announcement_config.get("body_template", "")
-            subject = announcement_config.get("subject", "Annonce missions - {date}")
-
-            replacements = {
-                "{date}": self.current_date.strftime("%d/%m/%Y"),
-                "{sst_name}": sst_name,
-                "{chauffeurs_list}": chauffeurs_list,
-                "{lieu_presentation}": announcement_config.get("lieu_presentation", "Tubize"),
-                "{expediteur}": self.current_user,
-                "{nb_chauffeurs}": str(len(chauffeurs)),
-                "{nb_missions}": str(len(missions))
-            }
-
-            for key, value in replacements.items():
-                body = body.replace(key, value)
-                subject = subject.replace(key, value)
-
+            announcement = engine.build(self.current_date, self.missions, only={sst_name})[0]
             try:
-                outlook = win32com.client.Dispatch("Outlook.Application")
-                mail = outlook.CreateItem(0)
-
-                mail.To = "; ".join(emails)
-                mail.Subject = subject
-                mail.Body = body
-
-                # Ajouter CC si configuré
-                cc_addresses = announcement_config.get("cc_addresses", [])
-                if cc_addresses:
-                    mail.CC = "; ".join(cc_addresses)
-
-                # Configurer Reply-To si spécifié
-                reply_to = announcement_config.get("reply_to", "")
-                if reply_to:
-                    mail.ReplyRecipients.Add(reply_to)
-
-                mail.Display()  # Afficher le mail (ne pas envoyer automatiquement)
-
-                # Enregistrer dans l'historique
-                history_entry = {
-                    "id": str(uuid.uuid4()),
-                    "sst": sst_name,
-                    "mission_date": self.current_date.strftime("%Y-%m-%d"),
-                    "sent_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "sent_by": self.current_user,
-                    "recipients": emails,
-                    "subject": subject,
-                    "nb_missions": len(missions),
-                    "chauffeurs": chauffeurs
-                }
-                history.append(history_entry)
-                save_json(ANNOUNCEMENT_HISTORY_FILE, history)
-
-                # Log de l'activité
-                if hasattr(self, 'activity_logger'):
-                    self.activity_logger.log_action(
-                        action="send_sst_announcement",
-                        entity_type="announcement",
-                        entity_id=history_entry["id"],
-                        details={"sst": sst_name, "mission_date": self.current_date.strftime("%Y-%m-%d")}
-                    )
-
-                refresh_sst_list()
-                messagebox.showinfo("Mail créé",
-                    f"Le mail pour {sst_name} a été créé dans Outlook.\n"
-                    "Vérifiez le contenu et envoyez-le manuellement.")
-
+                engine.display_outlook(announcement)
             except Exception as e:
                 messagebox.showerror("Erreur Outlook", f"Erreur lors de la création du mail:\n{e}")
+                return
 
-        def send_all_pending():
-            """Envoyer les annonces à tous les SST en attente"""
-            target_date_str = self.current_date.strftime("%Y-%m-%d")
-            pending_sst = []
-
-            for sst in sst_missions.keys():
-                email_config = sst_emails.get(sst, {})
-                emails = email_config.get("emails", [])
-                if emails and not check_already_sent(sst, target_date_str):
-                    pending_sst.append(sst)
-
-            if not pending_sst:
+            engine.record([announcement], "outlook")
+            refresh_sst_list()
+            refresh_history()
+            messagebox.showinfo("Mail créé",
+                f"Le mail pour {sst_name} a été créé dans Outlook.\n"
+                "Vérifiez le contenu et envoyez-le manuellement.")
+
+        def pending_announcements(action_label):
+            """Annonces des SST en attente (avec email), après confirmation"""
+            pending = engine.build(self.current_date, self.missions, pending_only=True)
+            if not pending:
                 messagebox.showinfo("Aucun envoi", "Tous les SST ont déjà reçu leur annonce ou n'ont pas d'email configuré.")
-                return
+                return []
 
-            msg = f"Créer les mails pour {len(pending_sst)} SST ?\n\n" + "\n".join(f"  - {s}" for s in pending_sst)
+            msg = f"{action_label} pour {len(pending)} SST ?\n\n" + "\n".join(f"  - {a['sst']}" for a in pending)
             if not messagebox.askyesno("Confirmer envoi groupé", msg):
+                return []
+            return pending
+
+        def send_all_pending():
+            """Créer dans Outlook les annonces de tous les SST en attente"""
+            if not ensure_outlook():
+                messagebox.showerror("Outlook non disponible",
+                    "Le module Outlook (win32com) n'est pas installé.\n"
+                    "Utilisez l'export en fichiers .eml.")
                 return
+            pending = pending_announcements("Créer les mails")
+            created = []
+            for announcement in pending:
+                try:
+                    engine.display_outlook(announcement)
+                    created.append(announcement)
+                except Exception as e:
+                    messagebox.showerror("Erreur Outlook",
+                        f"Erreur lors de la création du mail pour {announcement['sst']}:\n{e}")
+                    break
+            if created:
+                engine.record(created, "outlook")
+                refresh_sst_list()
+                refresh_history()
 
-            for sst in pending_sst:
-                send_announcement_email(sst)
+        def export_all_pending_eml():
+            """Écrire les annonces en attente en fichiers .eml (brouillons Outlook)"""
+            pending = pending_announcements("Créer les fichiers .eml")
+            if not pending:
+                return
+            out_dir = get_desktop_path() / f"annonces_{format_date_internal(self.current_date)}"
+            written = engine.write_eml(pending, out_dir)
+            engine.record([announcement for announcement, _ in written], "eml")
+            refresh_sst_list()
+            refresh_history()
+            messagebox.showinfo("Fichiers créés",
+                f"{len(written)} annonce(s) écrite(s) dans :\n{out_dir}\n\n"
+                "Ouvrez chaque fichier pour vérifier et envoyer le mail.")
+            open_exported_file(out_dir)
+
+        def send_all_pending_smtp():
+            """Envoyer directement les annonces en attente (une seule connexion SMTP)"""
+            pending = pending_announcements("Envoyer les mails par SMTP")
+            if not pending:
+                return
+            try:
+                sent, errors = engine.send_smtp(pending)
+            except (ValueError, OSError) as e:
+                messagebox.showerror("Erreur SMTP", str(e))
+                return
+            engine.record(sent, "smtp")
+            refresh_sst_list()
+            refresh_history()
+            if errors:
+                messagebox.showwarning("Envoi partiel",
+                    f"{len(sent)} annonce(s) envoyée(s), {len(errors)} en erreur :\n"
+                    + "\n".join(f"  - {sst}: {error}" for sst, error in errors))
+            else:
+                messagebox.showinfo("Envoyé", f"{len(sent)} annonce(s) envoyée(s).")
 
         ttk.Button(btn_frame, text="📧 Envoyer au SST sélectionné",
                   command=send_announcement_to_selected).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="📬 Envoyer à tous les SST en attente",
                   command=send_all_pending).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="📝 Fichiers .eml (en attente)",
+                  command=export_all_pending_eml).pack(side="left", padx=5)
+        if announcement_config.get("smtp", {}).get("host"):
+            ttk.Button(btn_frame, text="📤 Envoi SMTP (en attente)",
+                      command=send_all_pending_smtp).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="🔄 Rafraîchir",
                   command=refresh_sst_list).pack(side="left", padx=5)
 
@@ -6407,18 +9311,37 @@ Cordialement,
         }
         return flags.get(country, "🌍")
 
-    def setup_combobox_autocomplete(self, combobox, all_values_var_name, on_select_callback=None):
+    def _autocomplete_index(self, all_values_var_name):
+        """Index de préfixes de la liste `all_values_var_name`, reconstruit
+        uniquement quand la liste est remplacée (rechargement, changement de type/SST)"""
+        values = getattr(self, all_values_var_name, [])
+        cache = self.__dict__.setdefault("_autocomplete_indexes", {})
+        cached = cache.get(all_values_var_name)
+        if cached is None or cached.values is not values:
+            cached = PrefixIndex(values)
+            cache[all_values_var_name] = cached
+        return cached
+
+    def setup_combobox_autocomplete(self, combobox, all_values_var_name, on_select_callback=None,
+                                    max_results=200):
+        # Liste actuellement affichée : évite de réaffecter la liste complète à chaque clic
+        shown = {"values": None}
+
+        def show(values):
+            if values is not shown["values"]:
+                combobox['values'] = values
+                shown["values"] = values
+
         def filter_and_update():
             typed = combobox.get()
-            all_values = getattr(self, all_values_var_name, [])
+            index = self._autocomplete_index(all_values_var_name)
             
             if not typed:
-                combobox['values'] = all_values
-                return all_values
+                show(index.values)
+                return index.values
             
-            typed_upper = typed.upper()
-            filtered = [v for v in all_values if str(v).upper().startswith(typed_upper)]
-            combobox['values'] = filtered
+            filtered = index.search(typed, limit=max_results)
+            show(filtered)
             
             return filtered
         
@@ -6452,7 +9375,7 @@ Cordialement,
             if len(filtered) == 1:
                 typed = combobox.get()
                 match = filtered[0]
-                if typed.upper() != match.upper():
+                if fold_text(typed) != fold_text(match):
                     cursor_pos = combobox.index(tk.INSERT)
                     combobox.set(match)
                     combobox.icursor(cursor_pos)
@@ -6461,12 +9384,10 @@ Cordialement,
                         combobox.after(150, on_select_callback)
         
         def on_focusin(event):
-            all_values = getattr(self, all_values_var_name, [])
-            combobox['values'] = all_values
+            show(getattr(self, all_values_var_name, []))
         
         def on_click(event):
-            all_values = getattr(self, all_values_var_name, [])
-            combobox['values'] = all_values
+            show(getattr(self, all_values_var_name, []))
         
         def on_select(event):
             if on_select_callback:
@@ -6742,40 +9663,40 @@ Cordialement,
                     max_num = n
         self.form_numero.set(str(max_num + 1 if max_num >= 0 else 1))
     
+    def _get_day_index(self):
+        """Index d'intervalles du jour courant (reconstruit si la date ou les voyages ont changé)"""
+        index = getattr(self, "day_index", None)
+        if index is None or index.date != self.current_date or index.voyages is not self.voyages:
+            index = DayIntervalIndex(self.missions, self.voyages)
+            index.date = self.current_date
+            index.voyages = self.voyages
+            self.day_index = index
+        return index
+
     def check_delivery_duplicate(self, voyage_code, new_heure):
-        try:
-            h, m = map(int, new_heure.split(":"))
-            new_time_minutes = h * 60 + m
-            
-            for mission in self.missions:
-                if self.form_mode == "edit" and self.form_existing:
-                    if mission.get("id") == self.form_existing.get("id"):
-                        continue
-                
-                if mission.get("type") == "LIVRAISON" and mission.get("voyage") == voyage_code:
-                    mission_heure = mission.get("heure", "00:00")
-                    mh, mm = map(int, mission_heure.split(":"))
-                    mission_time_minutes = mh * 60 + mm
-                    
-                    diff_minutes = abs(new_time_minutes - mission_time_minutes)
-                    
-                    if diff_minutes < 120:
-                        hours = diff_minutes // 60
-                        minutes = diff_minutes % 60
-                        
-                        chauffeur = mission.get("chauffeur_nom", "Non assigné")
-                        
-                        if diff_minutes == 0:
-                            return f"⚠️ Une livraison '{voyage_code}' existe déjà à {mission_heure} (Chauffeur: {chauffeur}).\n\nÉcart: MÊME HEURE"
-                        elif hours == 0:
-                            return f"⚠️ Une livraison '{voyage_code}' existe déjà à {mission_heure} (Chauffeur: {chauffeur}).\n\nÉcart: {minutes} minute(s) seulement"
-                        else:
-                            return f"⚠️ Une livraison '{voyage_code}' existe déjà à {mission_heure} (Chauffeur: {chauffeur}).\n\nÉcart: {hours}h{minutes:02d} (moins de 2h)"
-            
+        new_time_minutes = heure_to_minutes(new_heure)
+        if new_time_minutes is None:
             return None
-        except Exception as e:
+
+        exclude_id = self.form_existing.get("id") if (self.form_mode == "edit" and self.form_existing) else None
+        nearest = self._get_day_index().nearest_delivery(voyage_code, new_time_minutes,
+                                                         window=120, exclude_id=exclude_id)
+        if nearest is None:
             return None
 
+        mission, diff_minutes = nearest
+        mission_heure = mission.get("heure", "00:00")
+        hours = diff_minutes // 60
+        minutes = diff_minutes % 60
+        chauffeur = mission.get("chauffeur_nom", "Non assigné")
+
+        if diff_minutes == 0:
+            return f"⚠️ Une livraison '{voyage_code}' existe déjà à {mission_heure} (Chauffeur: {chauffeur}).\n\nÉcart: MÊME HEURE"
+        elif hours == 0:
+            return f"⚠️ Une livraison '{voyage_code}' existe déjà à {mission_heure} (Chauffeur: {chauffeur}).\n\nÉcart: {minutes} minute(s) seulement"
+        else:
+            return f"⚠️ Une livraison '{voyage_code}' existe déjà à {mission_heure} (Chauffeur: {chauffeur}).\n\nÉcart: {hours}h{minutes:02d} (moins de 2h)"
+
     def on_form_save(self):
         type_ = self.form_type.get()
         voy = self.form_voyage.get().strip()
@@ -6847,6 +9768,25 @@ Cordialement,
             chauffeur_nom = ""  # Vider le chauffeur si la case est cochée
             chauffeur_id = None
 
+        # Vérifier que le chauffeur n'est pas déjà occupé sur ce créneau (durée du voyage)
+        if chauffeur_nom:
+            overlaps = self._get_day_index().mission_overlaps(
+                {"id": mid, "heure": self.form_heure.get(), "voyage": voy, "chauffeur_nom": chauffeur_nom}
+            )
+            if overlaps:
+                details = "\n".join(
+                    f"  • {m.get('heure', '')} {m.get('voyage', '')} ({m.get('type', '')})"
+                    for m in sorted(overlaps, key=lambda m: m.get("heure", ""))
+                )
+                response = messagebox.askokcancel(
+                    "⚠️ Attention - Chauffeur déjà occupé",
+                    f"⚠️ {chauffeur_nom} a déjà une mission sur ce créneau :\n\n{details}\n\n"
+                    "Voulez-vous quand même enregistrer cette mission ?",
+                    icon='warning'
+                )
+                if not response:
+                    return
+
         mission = self.form_existing.copy() if (self.form_mode == "edit" and self.form_existing) else {}
         mission.update(
             {
@@ -6881,6 +9821,7 @@ Cordialement,
 
         # Invalider le cache pour cette date (le fichier a été modifié)
         planning_cache.force_refresh(self.current_date)
+        planning_rollups.schedule_update(self.current_date)
 
         # Logger l'action Sauron
         if self.form_mode == "edit":
@@ -6909,6 +9850,7 @@ Cordialement,
                 break
         if not found:
             self.missions.append(mission)
+        self._get_day_index().add(mission)
 
         self.refresh_planning_view()
         self.hide_planning_form()
@@ -6917,9 +9859,9 @@ Cordialement,
         self.hide_planning_form()
 
     def set_today(self):
-        self.current_date = date.today()
-        self.date_var.set(format_date_display(self.current_date))
-        self.load_planning_for_date(self.current_date)
+        today = date.today()
+        self.date_var.set(format_date_display(today))
+        self.request_planning_load(today)
 
     def navigate_days(self, days):
         from datetime import timedelta
@@ -6927,8 +9869,7 @@ Cordialement,
             current = datetime.strptime(self.date_var.get(), "%d/%m/%Y").date()
             new_date = current + timedelta(days=days)
             self.date_var.set(format_date_display(new_date))
-            self.current_date = new_date
-            self.load_planning_for_date(new_date)
+            self.request_planning_load(new_date)
         except ValueError:
             messagebox.showerror("Erreur", "Format de date invalide.")
     
@@ -6938,8 +9879,7 @@ Cordialement,
         except ValueError as e:
             messagebox.showerror("Erreur", f"Date invalide.\nFormat attendu: JJ/MM/AAAA\nExemple: 25/12/2024")
             return
-        self.current_date = d
-        self.load_planning_for_date(d)
+        self.request_planning_load(d)
 
     def on_open_existing_date(self):
         value = self.existing_dates_var.get()
@@ -6951,8 +9891,7 @@ Cordialement,
             messagebox.showerror("Erreur", "Date invalide.")
             return
         self.date_var.set(format_date_display(d))
-        self.current_date = d
-        self.load_planning_for_date(d)
+        self.request_planning_load(d)
 
     def ensure_day_dir(self, d: date, allow_creation=False):
         day_dir = get_planning_day_dir(d)
@@ -6960,76 +9899,142 @@ Cordialement,
             return None
         return day_dir
 
+    @timed()
     def load_planning_for_date(self, d: date, preserve_ui=False, force_source=False):
         """
-        Charger le planning pour une date donnée.
+        Charger le planning pour une date donnée (synchrone, thread Tk).
+
+        Utilisé après une modification locale, quand la suite du traitement a
+        besoin de self.missions à jour. La navigation passe par
+        request_planning_load(), qui lit la journée hors du thread Tk.
 
         Args:
             d: Date à charger
             preserve_ui: Préserver l'état de l'UI lors du rafraîchissement
             force_source: Forcer le chargement depuis la source (ignorer le cache)
         """
+        # Une lecture en arrière-plan éventuelle devient obsolète
+        self._planning_load_seq = getattr(self, "_planning_load_seq", 0) + 1
+        self._set_planning_loading(None)
+
         # Prioritiser les dates adjacentes pour le pré-téléchargement
         planning_cache.prioritize_date(d + timedelta(days=1))
         planning_cache.prioritize_date(d - timedelta(days=1))
 
-        # 1. Essayer d'abord le cache local (rapide)
-        if not force_source:
-            cached_missions = planning_cache.get_cached_planning(d)
-            if cached_missions is not None:
-                # Filtrer uniquement les missions valides (avec un id)
-                self.missions = [m for m in cached_missions if m and isinstance(m, dict) and "id" in m]
-                print(f"[Cache] Planning {d} chargé depuis le cache ({len(self.missions)} missions)")
-                # Compléter les chauffeur_id manquants
-                for data in self.missions:
-                    if "chauffeur_nom" in data and "chauffeur_id" not in data:
-                        chauffeur_nom = data["chauffeur_nom"]
-                        for ch in self.chauffeurs:
-                            if ch.get("nom_affichage") == chauffeur_nom:
-                                data["chauffeur_id"] = ch["id"]
-                                break
-                self.refresh_planning_view(preserve_ui=preserve_ui)
-                if hasattr(self, "existing_dates_combo"):
-                    self.existing_dates_combo["values"] = list_existing_dates()
-                self._update_views_after_planning_load()
-                return
+        result = read_planning_day(d, force_source=force_source)
+        result["existing_dates"] = list_existing_dates() if result["source"] != "absent" else None
+        self._apply_planning_load(d, result, preserve_ui=preserve_ui)
 
-        # 2. Charger depuis la source (OneDrive)
-        day_dir = self.ensure_day_dir(d)
-        if day_dir is None:
-            # Vérifier si c'est vraiment inexistant ou juste pas en cache
-            if not planning_cache.is_cached(d):
-                messagebox.showinfo(
-                    "Planning inexistant",
-                    f"Le planning pour le {format_date_display(d)} n'existe pas encore.\n\n"
-                    "Contactez votre responsable pour générer ce planning."
-                )
-            self.missions = []
-            self.refresh_planning_view(preserve_ui=preserve_ui)
-        else:
-            # Charger les missions depuis les fichiers JSON
-            self.missions = []
-            for file in day_dir.glob("*.json"):
-                # Ignorer les fichiers de métadonnées (commençant par _)
-                if file.name.startswith("_"):
-                    continue
-                data = load_json(file, None)
-                if not data or not isinstance(data, dict) or "id" not in data:
-                    continue
-                data["_path"] = file.as_posix()
+    def request_planning_load(self, d: date, delay_ms=120):
+        """
+        Charger le planning d'une date sans bloquer l'interface.
+
+        La lecture (cache ou OneDrive) est faite dans un thread de travail et le
+        résultat est appliqué sur le thread Tk ; self.current_date ne change
+        qu'à ce moment-là, avec self.missions, pour que les enregistrements et
+        contrôles faits entre-temps visent la journée affichée. Les clics rapprochés sont
+        regroupés (délai `delay_ms`) et toute demande plus récente annule les
+        précédentes : seule la dernière date demandée est affichée.
+        """
+        self._planning_load_seq = getattr(self, "_planning_load_seq", 0) + 1
+        seq = self._planning_load_seq
+        self._set_planning_loading(d)
 
-                if "chauffeur_nom" in data and "chauffeur_id" not in data:
-                    chauffeur_nom = data["chauffeur_nom"]
-                    for ch in self.chauffeurs:
-                        if ch.get("nom_affichage") == chauffeur_nom:
-                            data["chauffeur_id"] = ch["id"]
-                            break
+        if getattr(self, "_planning_load_job", None) is not None:
+            try:
+                self.root.after_cancel(self._planning_load_job)
+            except Exception:
+                pass
+        self._planning_load_job = self.root.after(delay_ms, lambda: self._submit_planning_load(d, seq))
 
-                self.missions.append(data)
-            self.refresh_planning_view(preserve_ui=preserve_ui)
-            if hasattr(self, "existing_dates_combo"):
-                self.existing_dates_combo["values"] = list_existing_dates()
+    def _submit_planning_load(self, d: date, seq):
+        self._planning_load_job = None
+        if seq != self._planning_load_seq:
+            return
+
+        # Prioritiser les dates adjacentes pour le pré-téléchargement
+        planning_cache.prioritize_date(d + timedelta(days=1))
+        planning_cache.prioritize_date(d - timedelta(days=1))
+
+        if not hasattr(self, "_planning_load_executor"):
+            self._planning_load_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ptt-day-load")
+            self._planning_load_results = queue.Queue()
+
+        def work():
+            """Thread de travail : aucune opération Tk ici"""
+            is_cancelled = lambda: seq != self._planning_load_seq
+            try:
+                if is_cancelled():
+                    return
+                with perf_monitor.measure("planning.lecture_journée"):
+                    result = read_planning_day(d, is_cancelled=is_cancelled)
+                    result["existing_dates"] = list_existing_dates() if result["source"] != "absent" else None
+            except PlanningLoadCancelled:
+                return
+            except Exception as e:
+                result = {"missions": [], "source": "error", "error": e}
+            self._planning_load_results.put((seq, d, result))
+
+        self._planning_load_executor.submit(work)
+        if getattr(self, "_planning_poll_job", None) is None:
+            self._planning_poll_job = self.root.after(30, self._poll_planning_load)
+
+    def _poll_planning_load(self):
+        """Récupérer (thread Tk) le résultat du chargement en arrière-plan"""
+        self._planning_poll_job = None
+        while True:
+            try:
+                seq, d, result = self._planning_load_results.get_nowait()
+            except queue.Empty:
+                break
+            if seq == self._planning_load_seq:
+                self._set_planning_loading(None)
+                if result["source"] == "error":
+                    print(f"[Planning] Erreur chargement {d}: {result['error']}")
+                    # La journée affichée reste la précédente
+                    self.date_var.set(format_date_display(self.current_date))
+                    messagebox.showerror("Erreur", f"Impossible de charger le planning du {format_date_display(d)}.\n\n{result['error']}")
+                    return
+                self._apply_planning_load(d, result)
+                return
+        # Chargement toujours en cours (ou résultat obsolète ignoré) : on repasse plus tard
+        if getattr(self, "_planning_loading_date", None) is not None:
+            self._planning_poll_job = self.root.after(50, self._poll_planning_load)
+
+    def _set_planning_loading(self, d):
+        """Afficher/masquer l'indicateur de chargement de la journée"""
+        self._planning_loading_date = d
+        if hasattr(self, "planning_loading_label"):
+            text = f"⏳ Chargement du {format_date_display(d)}…" if d is not None else ""
+            self.planning_loading_label.config(text=text)
+
+    def _apply_planning_load(self, d: date, result, preserve_ui=False):
+        """Installer les missions lues pour la date `d` et rafraîchir les vues (thread Tk)"""
+        # Date et missions changent ensemble (voir request_planning_load)
+        self.current_date = d
+        self.missions = result["missions"]
+        # Référence pour la détection fichier par fichier du rafraîchissement automatique
+        self._day_signatures = {"date": d, "files": result.get("signatures", {})}
+        if result["source"] == "cache":
+            print(f"[Cache] Planning {d} chargé depuis le cache ({len(self.missions)} missions)")
+        elif result["source"] == "absent" and not planning_cache.is_cached(d):
+            messagebox.showinfo(
+                "Planning inexistant",
+                f"Le planning pour le {format_date_display(d)} n'existe pas encore.\n\n"
+                "Contactez votre responsable pour générer ce planning."
+            )
 
+        # Compléter les chauffeur_id manquants
+        ids_by_name = {ch.get("nom_affichage"): ch["id"] for ch in reversed(self.chauffeurs) if "id" in ch}
+        for data in self.missions:
+            if "chauffeur_nom" in data and "chauffeur_id" not in data:
+                if data["chauffeur_nom"] in ids_by_name:
+                    data["chauffeur_id"] = ids_by_name[data["chauffeur_nom"]]
+
+        self.day_index = None  # Reconstruit à la première requête
+        self.refresh_planning_view(preserve_ui=preserve_ui)
+        if result.get("existing_dates") is not None and hasattr(self, "existing_dates_combo"):
+            self.existing_dates_combo["values"] = result["existing_dates"]
         self._update_views_after_planning_load()
 
     def _update_views_after_planning_load(self):
@@ -7044,6 +10049,7 @@ Cordialement,
         except Exception as e:
             print(f"Erreur lors de la mise à jour des vues chauffeurs après rechargement du planning: {e}")
 
+    @timed()
     def refresh_planning_view(self, preserve_ui=False):
         if preserve_ui:
             selected_items = {}
@@ -7058,17 +10064,60 @@ Cordialement,
         self.country_frames.clear()
         self.country_trees.clear()
 
-        missions_by_country = {}
-        v_by_code = {v.get("code"): v for v in self.voyages}
+        view_model = self.build_planning_view_model()
+
+        for country, groups in view_model.items():
+            self.create_country_planning_section(country)
+            
+            if hasattr(self, 'country_headers') and country in self.country_headers:
+                self.country_headers[country]["livraison_label"].config(
+                    text=f"📦 LIVRAISONS - {country} ({len(groups['livraison'])})"
+                )
+                self.country_headers[country]["ramasse_label"].config(
+                    text=f"🚛 RAMASSES - {country} ({len(groups['ramasse'])})"
+                )
+            
+            for tree_type, rows in groups.items():
+                tree = self.country_trees[country][tree_type]
+                for row in rows:
+                    tree.insert("", "end", iid=row["id"], values=row["values"], tags=(row["tag"],))
+        
+        if preserve_ui and selected_items:
+            for key, item_id in selected_items.items():
+                parts = key.split('_')
+                country = '_'.join(parts[:-1])
+                tree_type = parts[-1]
+                if country in self.country_trees and tree_type in self.country_trees[country]:
+                    tree = self.country_trees[country][tree_type]
+                    if item_id in tree.get_children(""):
+                        tree.selection_set(item_id)
+                        tree.see(item_id)
         
+        self.refresh_drivers_availability_view()
+        self.refresh_drivers_used_view()
+        self.update_summary_stats()
+    
+    def build_planning_view_model(self):
+        """
+        Modèle de vue du planning du jour, calculé en une passe :
+        {pays: {"livraison": [lignes], "ramasse": [lignes]}} avec, pour chaque
+        ligne, {"id", "values", "tag"}. Les pays sont dans l'ordre d'affichage
+        (Belgique d'abord) et les lignes triées selon self.sort_criteria.
+        Utilisé à la fois par refresh_planning_view (reconstruction) et par
+        diff_refresh_planning (mise à jour par différence).
+        """
+        date_str = self.current_date.strftime("%Y-%m-%d")
+        v_by_code = {v.get("code"): v for v in self.voyages}
+
+        missions_by_country = {}
+        country_of = {}
         for m in self.missions:
-            voyage_code = m.get("voyage", "")
-            voyage = v_by_code.get(voyage_code, {})
-            country = voyage.get("country", "Belgique")
-            
-            if country not in missions_by_country:
-                missions_by_country[country] = []
-            missions_by_country[country].append(m)
+            # Une mission d'une autre date (fichier déplacé à la main) n'a rien à faire ici
+            if m.get("date") and m.get("date") != date_str:
+                continue
+            country = normalize_country(v_by_code.get(m.get("voyage", ""), {}).get("country", "Belgique"))
+            country_of[m["id"]] = country
+            missions_by_country.setdefault(country, []).append(m)
 
         sort_key_functions = {
             "heure": lambda m: self._time_key(m),
@@ -7076,42 +10125,18 @@ Cordialement,
             "chauffeur": lambda m: m.get("chauffeur_nom", ""),
             "numero": lambda m: int(m.get("numero", 0)) if str(m.get("numero", "")).isdigit() else 0,
             "sst": lambda m: m.get("sst", ""),
-            "pays": lambda m: (v_by_code.get(m.get("voyage", ""), {}).get("country", "Belgique"), self._time_key(m))
+            "pays": lambda m: (country_of[m["id"]], self._time_key(m))
         }
-        
         sort_func = sort_key_functions.get(self.sort_criteria, sort_key_functions["heure"])
-        
-        for country in missions_by_country:
-            missions_by_country[country] = sorted(missions_by_country[country], 
-                                                 key=sort_func, 
-                                                 reverse=self.sort_reverse)
-
-        sorted_countries = sorted(missions_by_country.keys(), key=lambda x: (x != "Belgique", x))
 
-        for country in sorted_countries:
-            self.create_country_planning_section(country)
-            
-            nb_liv_country = sum(1 for m in missions_by_country[country] if m.get("type") == "LIVRAISON")
-            nb_ram_country = sum(1 for m in missions_by_country[country] if m.get("type") == "RAMASSE")
-            
-            if hasattr(self, 'country_headers') and country in self.country_headers:
-                self.country_headers[country]["livraison_label"].config(
-                    text=f"📦 LIVRAISONS - {country} ({nb_liv_country})"
-                )
-                self.country_headers[country]["ramasse_label"].config(
-                    text=f"🚛 RAMASSES - {country} ({nb_ram_country})"
-                )
-            
-            tree_liv = self.country_trees[country]["livraison"]
-            tree_ram = self.country_trees[country]["ramasse"]
-            
-            row_num = 0
-            for m in missions_by_country[country]:
+        view_model = {}
+        for country in sorted(missions_by_country.keys(), key=lambda x: (x != "Belgique", x)):
+            groups = {"livraison": [], "ramasse": []}
+            for m in sorted(missions_by_country[country], key=sort_func, reverse=self.sort_reverse):
                 # Afficher "N/A" si la mission est marquée sans SST ou sans chauffeur
                 sst_display = "N/A" if m.get("sans_sst", False) else m.get("sst", "")
                 chauffeur_display = "N/A" if m.get("sans_chauffeur", False) else m.get("chauffeur_nom", "")
-
-                values_common = (
+                values = (
                     m.get("heure", ""),
                     m.get("voyage", ""),
                     m.get("nb_pal", ""),
@@ -7120,36 +10145,21 @@ Cordialement,
                     chauffeur_display,
                     m.get("infos", ""),
                 )
+                if m.get("type") == "LIVRAISON":
+                    rows = groups["livraison"]
+                else:
+                    rows = groups["ramasse"]
+                    values = values[:-1] + (m.get("ramasse", ""), m.get("infos", ""))
 
-                # Déterminer le tag: incomplete si voyage incomplet, sinon alternance pair/impair
-                is_incomplete = m.get("sans_sst", False) or m.get("sans_chauffeur", False)
-                if is_incomplete:
+                # Tag: incomplete si voyage incomplet, sinon alternance pair/impair
+                if m.get("sans_sst", False) or m.get("sans_chauffeur", False):
                     tag = 'incomplete'
                 else:
-                    tag = 'evenrow' if row_num % 2 == 0 else 'oddrow'
+                    tag = 'evenrow' if len(rows) % 2 == 0 else 'oddrow'
+                rows.append({"id": m["id"], "values": values, "tag": tag})
+            view_model[country] = groups
+        return view_model
 
-                if m.get("type") == "LIVRAISON":
-                    tree_liv.insert("", "end", iid=m["id"], values=values_common, tags=(tag,))
-                else:
-                    values_ram = values_common[:-1] + (m.get("ramasse", ""), m.get("infos", ""))
-                    tree_ram.insert("", "end", iid=m["id"], values=values_ram, tags=(tag,))
-                row_num += 1
-        
-        if preserve_ui and selected_items:
-            for key, item_id in selected_items.items():
-                parts = key.split('_')
-                country = '_'.join(parts[:-1])
-                tree_type = parts[-1]
-                if country in self.country_trees and tree_type in self.country_trees[country]:
-                    tree = self.country_trees[country][tree_type]
-                    if item_id in tree.get_children(""):
-                        tree.selection_set(item_id)
-                        tree.see(item_id)
-        
-        self.refresh_drivers_availability_view()
-        self.refresh_drivers_used_view()
-        self.update_summary_stats()
-    
     def _time_key(self, m):
         try:
             h, mi = map(int, m.get("heure", "00:00").split(":"))
@@ -7554,9 +10564,11 @@ Cordialement,
         if path and os.path.exists(path):
             os.remove(path)
         self.missions = [m for m in self.missions if m["id"] != mid]
+        self._get_day_index().remove(mid)
 
         # Invalider le cache pour cette date (le fichier a été supprimé)
         planning_cache.force_refresh(self.current_date)
+        planning_rollups.schedule_update(self.current_date)
 
         self.refresh_planning_view()
 
@@ -8504,13 +11516,53 @@ Cordialement,
         
         ttk.Button(month_row, text="Générer le mois", command=self.admin_generate_month).pack(side="left", padx=5)
         
+        tpl_frame = ttk.LabelFrame(main, text="🧩 Générer à partir d'un modèle de semaine", padding=15)
+        tpl_frame.pack(fill="x", pady=(0, 15))
+
+        tpl_row = ttk.Frame(tpl_frame)
+        tpl_row.pack(fill="x")
+
+        ttk.Label(tpl_row, text="Modèle :").pack(side="left", padx=(0, 5))
+        self.admin_template_var = tk.StringVar()
+        self.admin_template_combo = ttk.Combobox(tpl_row, textvariable=self.admin_template_var,
+                                                 width=25, state="readonly")
+        self.admin_template_combo.pack(side="left", padx=5)
+        ttk.Button(tpl_row, text="Créer depuis la semaine affichée au planning",
+                   command=self.admin_template_from_week).pack(side="left", padx=5)
+
+        range_row = ttk.Frame(tpl_frame)
+        range_row.pack(fill="x", pady=(10, 0))
+
+        ttk.Label(range_row, text="Du :").pack(side="left", padx=(0, 5))
+        self.admin_tpl_start_var = tk.StringVar(value=date.today().strftime("%d/%m/%Y"))
+        ttk.Entry(range_row, textvariable=self.admin_tpl_start_var, width=12).pack(side="left", padx=5)
+        ttk.Label(range_row, text="Au :").pack(side="left", padx=(10, 5))
+        self.admin_tpl_end_var = tk.StringVar(value=(date.today() + timedelta(days=6)).strftime("%d/%m/%Y"))
+        ttk.Entry(range_row, textvariable=self.admin_tpl_end_var, width=12).pack(side="left", padx=5)
+
+        self.admin_tpl_skip_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(range_row, text="Ignorer les jours déjà planifiés",
+                        variable=self.admin_tpl_skip_var).pack(side="left", padx=10)
+
+        ttk.Button(range_row, text="Aperçu (simulation)",
+                   command=self.admin_template_preview).pack(side="left", padx=5)
+        self.admin_tpl_generate_btn = ttk.Button(range_row, text="Générer", command=self.admin_template_generate)
+        self.admin_tpl_generate_btn.pack(side="left", padx=5)
+
+        self.admin_tpl_summary = tk.Text(tpl_frame, height=8, font=("Consolas", 9), wrap="none")
+        self.admin_tpl_summary.pack(fill="x", pady=(10, 0))
+        self.admin_tpl_summary.configure(state="disabled")
+
+        self.admin_template_refresh_list()
+
         info_frame = ttk.LabelFrame(main, text="ℹ️ Informations", padding=15)
         info_frame.pack(fill="x", pady=(15, 0))
         
         info_text = (
             "• La génération crée les dossiers nécessaires pour les plannings.\n"
             "• Si un jour existe déjà, il ne sera pas recréé.\n"
-            "• Les plannings générés sont vides au départ.\n"
+            "• Les plannings générés par jour/semaine/mois sont vides au départ ;\n"
+            "  un modèle de semaine permet de les pré-remplir (aperçu avant écriture).\n"
             "• Les utilisateurs avec le droit 'view_planning' peuvent les consulter.\n"
             "• Les utilisateurs avec le droit 'edit_planning' peuvent les modifier."
         )
@@ -8648,6 +11700,132 @@ Cordialement,
                            f"• {created} jour(s) créé(s)\n"
                            f"• {skipped} jour(s) existait(ent) déjà")
     
+    def admin_template_refresh_list(self, select=None):
+        names = sorted(load_planning_templates().keys())
+        self.admin_template_combo["values"] = names
+        if select in names:
+            self.admin_template_var.set(select)
+        elif self.admin_template_var.get() not in names:
+            self.admin_template_var.set(names[0] if names else "")
+
+    def admin_template_from_week(self):
+        """Enregistrer la semaine du planning courant comme modèle"""
+        monday = self.current_date - timedelta(days=self.current_date.weekday())
+        name = simpledialog.askstring(
+            "Nouveau modèle",
+            f"Nom du modèle (semaine du {format_date_display(monday)}) :",
+            initialvalue=f"Semaine {monday.isocalendar()[1]}",
+        )
+        if not name:
+            return
+        templates = load_planning_templates()
+        if name in templates and not messagebox.askyesno("Confirmer", f"Remplacer le modèle '{name}' ?"):
+            return
+
+        template = template_from_week(monday)
+        nb = sum(len(missions) for missions in template["days"].values())
+        if nb == 0:
+            messagebox.showinfo("Info", "Aucune mission dans cette semaine : modèle non créé.")
+            return
+        templates[name] = template
+        save_planning_templates(templates)
+        activity_logger.log_action("TEMPLATE_CREATE", {"template": name, "missions": nb,
+                                                       "source_week": template["source_week"]})
+        self.admin_template_refresh_list(select=name)
+        messagebox.showinfo("Succès", f"Modèle '{name}' créé ({nb} mission(s)).")
+
+    def _admin_template_plans(self):
+        """Simuler la génération demandée ; retourne (nom, plans) ou None si saisie invalide"""
+        name = self.admin_template_var.get()
+        template = load_planning_templates().get(name)
+        if not template:
+            messagebox.showerror("Erreur", "Sélectionnez un modèle.")
+            return None
+        try:
+            start = parse_date_input(self.admin_tpl_start_var.get())
+            end = parse_date_input(self.admin_tpl_end_var.get())
+        except ValueError:
+            messagebox.showerror("Erreur", "Format de date invalide. Utilisez JJ/MM/AAAA (ex: 25/12/2024)")
+            return None
+        if end < start:
+            messagebox.showerror("Erreur", "La date de fin précède la date de début.")
+            return None
+
+        generator = PlanningGenerator(self.voyages, self.chauffeurs, self.dispos)
+        with perf_monitor.measure("admin.génération_modèle.simulation"):
+            plans = generator.plan(template, start, end, skip_existing=self.admin_tpl_skip_var.get())
+        return name, plans
+
+    def _admin_template_show_summary(self, text):
+        self.admin_tpl_summary.configure(state="normal")
+        self.admin_tpl_summary.delete("1.0", "end")
+        self.admin_tpl_summary.insert("1.0", text)
+        self.admin_tpl_summary.configure(state="disabled")
+
+    def admin_template_preview(self):
+        result = self._admin_template_plans()
+        if result:
+            self._admin_template_show_summary(PlanningGenerator.summarize(result[1]))
+
+    def admin_template_generate(self):
+        result = self._admin_template_plans()
+        if not result:
+            return
+        name, plans = result
+        summary = PlanningGenerator.summarize(plans)
+        self._admin_template_show_summary(summary)
+
+        nb_days = sum(1 for p in plans if p["missions"])
+        if nb_days == 0:
+            messagebox.showinfo("Info", "Rien à générer sur cette période.")
+            return
+        if not messagebox.askyesno("Confirmer", f"Générer le modèle '{name}' ?\n\n"
+                                               + "\n".join(summary.splitlines()[:2])):
+            return
+
+        # Écriture hors du thread Tk (plusieurs mois = plusieurs milliers de fichiers)
+        self.admin_tpl_generate_btn.configure(state="disabled")
+        self._admin_template_show_summary(f"⏳ Écriture de {nb_days} jour(s) en cours…\n\n{summary}")
+
+        def work():
+            with perf_monitor.measure("admin.génération_modèle.écriture"):
+                return PlanningGenerator.write(plans, template_name=name)
+
+        def done(written, error):
+            if hasattr(self, "admin_tpl_generate_btn"):
+                self.admin_tpl_generate_btn.configure(state="normal")
+                self._admin_template_show_summary(summary)
+            if error is not None:
+                messagebox.showerror("Erreur", f"Erreur lors de la génération du modèle '{name}' :\n{error}")
+                return
+            self._admin_template_written(name, plans, written)
+
+        run_in_background(self.root, work, on_done=done)
+
+    def _admin_template_written(self, name, plans, written):
+        """Fin de génération (thread Tk) : journal, listes de dates et planning affiché"""
+        activity_logger.log_action("PLANNING_GENERATE", {
+            "template": name,
+            "start": format_date_internal(plans[0]["date"]),
+            "end": format_date_internal(plans[-1]["date"]),
+            "days": written["days"],
+            "missions": written["missions"],
+        })
+
+        if hasattr(self, "existing_dates_combo"):
+            self.existing_dates_combo["values"] = list_existing_dates()
+        if any(p["date"] == self.current_date and p["missions"] for p in plans):
+            self.load_planning_for_date(self.current_date, preserve_ui=True)
+
+        message = (f"Modèle '{name}' généré.\n"
+                   f"• {written['days']} jour(s) écrit(s)\n"
+                   f"• {written['missions']} mission(s) créée(s)")
+        if written["errors"]:
+            message += "\n\nErreurs :\n" + "\n".join(written["errors"][:10])
+            messagebox.showwarning("Génération terminée avec erreurs", message)
+        else:
+            messagebox.showinfo("Succès", message)
+
     def build_voyages_tab(self):
         self.tab_voy = ttk.Frame(self.notebook)
         self.notebook.add(self.tab_voy, text="Tournées / Voyages")
@@ -9720,6 +12898,7 @@ Cordialement,
         else:
             messagebox.showinfo("Info", "Aucun revenu trouvé à supprimer")
 
+    @timed()
     def calculate_finance(self):
         """Calcul financier avec affichage regroupé par SST"""
         try:
@@ -9734,332 +12913,23 @@ Cordialement,
             self.calc_result_text.insert("1.0", f"Aucun planning pour le {format_date_display(d)}")
             return
         
-        missions = []
-        for file in day_dir.glob("*.json"):
-            data = load_json(file, None)
-            if data:
-                missions.append(data)
-        
+        missions = day_store.get(d)
         if not missions:
             self.calc_result_text.delete("1.0", "end")
             self.calc_result_text.insert("1.0", f"Planning vide pour le {format_date_display(d)}")
             return
         
-        date_str = format_date_internal(d)
-        
-        # Structure: {sst: {tarif_country: set(chauffeurs)}}
-        sst_drivers_by_country = {}        # IMPORTANT: Compter les chauffeurs UNIQUES par SST
-        # 1 chauffeur = 1 forfait par jour, peu importe le nombre de missions
-        
-        # DEBUG: Afficher la structure d'une mission pour comprendre le problème
-        if missions and len(missions) > 0:
-            sample = missions[0]
-        
-        for mission in missions:
-            sst = mission.get("sst", "").strip()
-            chauffeur_name = mission.get("chauffeur_nom", mission.get("chauffeur", "")).strip()
-            
-            # Ignorer les missions sans SST
-            if not sst or sst == "":
-                continue
-            
-            # Déterminer le pays de la MISSION (pas du chauffeur!)
-            voyage_code = mission.get("voyage", "")
-            voyage = None
-            for v in self.voyages:
-                if v.get("code", "") == voyage_code:
-                    voyage = v
-                    break
-            
-            if voyage:
-                mission_country = voyage.get("country", "Belgique")
-                # Normaliser le nom du pays
-                if mission_country.lower() in ["pays-bas", "paysbas", "pays bas", "netherlands"]:
-                    mission_country = "Pays-Bas"
-                elif mission_country.lower() in ["belgique", "belgium", "be"]:
-                    mission_country = "Belgique"
-                elif mission_country.lower() in ["luxembourg", "lux", "lu"]:
-                    mission_country = "Luxembourg"
-                elif mission_country.lower() in ["france", "fr"]:
-                    mission_country = "France"
-            else:
-                # Si pas de voyage, deviner depuis le code
-                if voyage_code:
-                    if voyage_code.upper().startswith("P-B"):
-                        mission_country = "Pays-Bas"
-                    elif voyage_code.upper().startswith("RES") or voyage_code.upper().startswith("ALV"):
-                        mission_country = "Luxembourg"
-                    else:
-                        mission_country = "Belgique"
-                else:
-                    mission_country = "Belgique"
-            
-            # Initialiser les structures
-            if sst not in sst_drivers_by_country:
-                sst_drivers_by_country[sst] = {}
-            if mission_country not in sst_drivers_by_country[sst]:
-                sst_drivers_by_country[sst][mission_country] = set()
-            
-            # Ajouter le chauffeur UNIQUEMENT s'il a un nom
-            # Un chauffeur = 1 forfait, même s'il fait plusieurs missions
-            if chauffeur_name:
-                sst_drivers_by_country[sst][mission_country].add(chauffeur_name)
-            # Si pas de chauffeur: ne rien ajouter (les missions sans chauffeur ne coûtent rien)
-        
-        # Calculer les revenus par palettes et par pays
-        revenue_by_country = {}
-        
-        # DEBUG: compter les missions par pays
-        missions_by_country = {}
-        
-        for mission in missions:
-            voyage_code = mission.get("voyage", "")
-            
-            # Recherche du voyage
-            voyage = None
-            for v in self.voyages:
-                if v.get("code", "") == voyage_code:
-                    voyage = v
-                    break
-            
-            # Déterminer le pays
-            if voyage:
-                country = voyage.get("country", "Belgique")
-                # Normaliser le nom du pays
-                if country.lower() in ["pays-bas", "paysbas", "pays bas", "netherlands"]:
-                    country = "Pays-Bas"
-                elif country.lower() in ["belgique", "belgium", "be"]:
-                    country = "Belgique"
-                elif country.lower() in ["luxembourg", "lux", "lu"]:
-                    country = "Luxembourg"
-                elif country.lower() in ["france", "fr"]:
-                    country = "France"
-            else:
-                # Si pas de voyage trouvé, essayer de deviner depuis le code voyage
-                if voyage_code:
-                    if voyage_code.upper().startswith("P-B"):
-                        country = "Pays-Bas"
-                    elif voyage_code.upper().startswith("RES") or voyage_code.upper().startswith("ALV"):
-                        country = "Luxembourg"
-                    else:
-                        country = "Belgique"
-                else:
-                    country = "Belgique"
-            
-            # Initialiser le pays
-            if country not in revenue_by_country:
-                revenue_by_country[country] = {"pal_liv": 0, "pal_ram": 0}
-            if country not in missions_by_country:
-                missions_by_country[country] = 0
-            
-            missions_by_country[country] += 1
-            
-            # Compter les palettes (gérer les strings et None)
-            try:
-                nb_pal_str = mission.get("nb_pal", 0)
-                if nb_pal_str is None or nb_pal_str == "":
-                    nb_pal = 0
-                else:
-                    nb_pal = int(nb_pal_str)
-            except (ValueError, TypeError):
-                nb_pal = 0
-            
-            if mission.get("type") == "LIVRAISON":
-                revenue_by_country[country]["pal_liv"] += nb_pal
-            else:
-                revenue_by_country[country]["pal_ram"] += nb_pal
-        
-        # Calculer les revenus totaux
-        total_revenus = 0
-        revenue_details = []
-        
-        for country, pal_data in revenue_by_country.items():
-            rev_liv = 0
-            rev_ram = 0
-            
-            if date_str in self.revenus_palettes:
-                if country in self.revenus_palettes[date_str]:
-                    rev_data = self.revenus_palettes[date_str][country]
-                    rev_liv = rev_data.get("livraison", 0)
-                    rev_ram = rev_data.get("ramasse", 0)
-                elif "livraison" in self.revenus_palettes[date_str]:
-                    rev_data = self.revenus_palettes[date_str]
-                    rev_liv = rev_data.get("livraison", 0)
-                    rev_ram = rev_data.get("ramasse", 0)
-            
-            if rev_liv == 0 and rev_ram == 0:
-                for dt in sorted([d for d in self.revenus_palettes.keys() if d <= date_str], reverse=True):
-                    if country in self.revenus_palettes[dt]:
-                        rev_data = self.revenus_palettes[dt][country]
-                        rev_liv = rev_data.get("livraison", 0)
-                        rev_ram = rev_data.get("ramasse", 0)
-                        if rev_liv > 0 or rev_ram > 0:
-                            break
-                    elif "livraison" in self.revenus_palettes[dt]:
-                        rev_data = self.revenus_palettes[dt]
-                        rev_liv = rev_data.get("livraison", 0)
-                        rev_ram = rev_data.get("ramasse", 0)
-                        if rev_liv > 0 or rev_ram > 0:
-                            break
-            
-            rev_liv_total = pal_data["pal_liv"] * rev_liv
-            rev_ram_total = pal_data["pal_ram"] * rev_ram
-            country_revenue = rev_liv_total + rev_ram_total
-            total_revenus += country_revenue
-            
-            revenue_details.append({
-                "country": country,
-                "pal_liv": pal_data["pal_liv"],
-                "pal_ram": pal_data["pal_ram"],
-                "rev_liv": rev_liv,
-                "rev_ram": rev_ram,
-                "rev_liv_total": rev_liv_total,
-                "rev_ram_total": rev_ram_total,
-                "total": country_revenue
-            })
-        
-        # Afficher les résultats
-        # Calculer le nombre de chauffeurs UNIQUES (pas le nombre de missions)
-        unique_drivers = set()
-        missions_with_sst = 0
-        
-        for mission in missions:
-            sst = mission.get("sst", "").strip()
-            if sst:
-                missions_with_sst += 1
-            
-            chauffeur_name = mission.get("chauffeur_nom", mission.get("chauffeur", "")).strip()
-            if chauffeur_name:
-                unique_drivers.add(chauffeur_name)
-        
-        result = f"📊 ANALYSE FINANCIÈRE - {format_date_display(d)}\n"
-        result += "=" * 70 + "\n"
-        result += f"Missions totales: {len(missions)} | "
-        result += f"Avec SST: {missions_with_sst} | "
-        result += f"Chauffeurs uniques: {len(unique_drivers)}\n\n"
-
-        for detail in revenue_details:
-            result += f"\n{detail['country']}:\n"
-            result += f"  Livraisons : {detail['pal_liv']} pal × {detail['rev_liv']:.2f} € = {detail['rev_liv_total']:,.2f} €\n"
-            result += f"  Ramasses   : {detail['pal_ram']} pal × {detail['rev_ram']:.2f} € = {detail['rev_ram_total']:,.2f} €\n"
-            result += f"  Sous-total : {detail['total']:,.2f} €\n"
-        result += f"\nTOTAL REVENUS : {total_revenus:,.2f} €\n\n"
-        
-        result += "💶 COÛTS SST:\n"
-        result += "-" * 70 + "\n"
-        
-        total_costs = 0
-        total_sst_used = 0
-        total_drivers_used = 0
-        
-        if sst_drivers_by_country:
-            # Construire d'abord les données à afficher
-            sst_display_data = {}
-            
-            for sst in sorted(sst_drivers_by_country.keys()):
-                countries_drivers = sst_drivers_by_country[sst]
-                
-                # ÉTAPE 1: Pour chaque chauffeur, trouver le tarif MAX parmi tous ses pays
-                driver_max_tarif = {}  # {driver_name: (country, tarif)}
-                
-                for country in countries_drivers.keys():
-                    drivers = countries_drivers[country]
-                    
-                    # Récupérer le tarif pour ce pays
-                    tarif_journalier = 0
-                    if sst in self.tarifs_sst and country in self.tarifs_sst[sst]:
-                        tarifs = self.tarifs_sst[sst][country]
-                        tarif_journalier = tarifs.get(date_str, 0)
-                        
-                        if tarif_journalier == 0:
-                            sorted_dates = sorted([dt for dt in tarifs.keys() if dt <= date_str], reverse=True)
-                            if sorted_dates:
-                                tarif_journalier = tarifs[sorted_dates[0]]
-                    
-                    # Pour chaque chauffeur de ce pays
-                    for driver in drivers:
-                        if driver not in driver_max_tarif or tarif_journalier > driver_max_tarif[driver][1]:
-                            driver_max_tarif[driver] = (country, tarif_journalier)
-                
-                # ÉTAPE 2: Regrouper les chauffeurs par pays (avec le tarif max)
-                country_drivers_max = {}  # {country: [drivers]}
-                for driver, (country, tarif) in driver_max_tarif.items():
-                    if country not in country_drivers_max:
-                        country_drivers_max[country] = []
-                    country_drivers_max[country].append(driver)
-                
-                # ÉTAPE 3: Calculer les coûts
-                sst_total_cost = 0
-                sst_total_drivers = len(driver_max_tarif)
-                sst_lines = []
-                
-                for country in sorted(country_drivers_max.keys()):
-                    drivers = country_drivers_max[country]
-                    nb_drivers = len(drivers)
-                    
-                    # Récupérer le tarif pour ce pays
-                    tarif_journalier = 0
-                    if sst in self.tarifs_sst and country in self.tarifs_sst[sst]:
-                        tarifs = self.tarifs_sst[sst][country]
-                        tarif_journalier = tarifs.get(date_str, 0)
-                        
-                        if tarif_journalier == 0:
-                            sorted_dates = sorted([dt for dt in tarifs.keys() if dt <= date_str], reverse=True)
-                            if sorted_dates:
-                                tarif_journalier = tarifs[sorted_dates[0]]
-                    
-                    # Coût pour ce pays
-                    cost = nb_drivers * tarif_journalier
-                    sst_total_cost += cost
-                    
-                    # Affichage
-                    drivers_list = ", ".join(sorted(drivers))
-                    sst_lines.append(f"  {country}: {nb_drivers} chauffeur(s) × {tarif_journalier:.2f} € = {cost:,.2f} €\n")
-                    sst_lines.append(f"    → {drivers_list}\n")
-                
-                # N'ajouter que si ce SST a des chauffeurs
-                if sst_total_drivers > 0:
-                    sst_display_data[sst] = {
-                        'lines': sst_lines,
-                        'total_drivers': sst_total_drivers,
-                        'total_cost': sst_total_cost
-                    }
-                    total_costs += sst_total_cost
-                    total_drivers_used += sst_total_drivers
-                    total_sst_used += 1
-            
-            # Afficher les SST avec des données
-            if sst_display_data:
-                for sst, data in sst_display_data.items():
-                    result += f"\nSST: {sst}\n"
-                    for line in data['lines']:
-                        result += line
-                    result += f"  Total SST {sst}: {data['total_drivers']} chauffeur(s) = {data['total_cost']:,.2f} €\n"
-                
-                result += f"\n" + "=" * 70 + "\n"
-                result += f"TOTAL: {total_sst_used} SST utilisé(s), {total_drivers_used} chauffeur(s) utilisé(s)\n"
-                result += f"TOTAL COÛTS : {total_costs:,.2f} €\n\n"
-            else:
-                result += "\n  Aucun chauffeur assigné pour cette date\n"
-                result += "  Vérifiez que:\n"
-                result += "  • Les missions ont un SST défini\n"
-                result += "  • Les chauffeurs sont assignés aux missions\n"
-                result += "  • Les tarifs SST sont définis\n\n"
-        else:
-            result += "\n  Aucune mission avec SST pour cette date\n\n"
-        
-        result += "📈 RÉSULTAT:\n"
-        result += "-" * 70 + "\n"
-        marge = total_revenus - total_costs
-        pct = (marge / total_revenus * 100) if total_revenus > 0 else 0
-        
-        if marge >= 0:
-            result += f"MARGE : +{marge:,.2f} € ({pct:.1f}%)\n"
-        else:
-            result += f"PERTE : {marge:,.2f} € ({pct:.1f}%)\n"
-        
+        result = self.finance_engine().compute_day(d, missions)
         self.calc_result_text.delete("1.0", "end")
-        self.calc_result_text.insert("1.0", result)
+        self.calc_result_text.insert("1.0", format_finance_day(result))
+
+    def finance_engine(self):
+        """Moteur financier sur les voyages, tarifs SST et revenus actuellement chargés"""
+        return FinanceEngine(self.voyages, self.tarifs_sst, self.revenus_palettes)
+
+    def analytics(self):
+        """Pipeline d'analyse partagé, aligné sur les référentiels actuellement chargés"""
+        return analytics_pipeline.configure(self.voyages, self.tarifs_sst, self.revenus_palettes)
 
     def refresh_finance_view(self):
         """Rafraîchir la vue finance"""
@@ -10094,7 +12964,7 @@ Cordialement,
         self.tab_analyse_simple = ttk.Frame(self.notebook)
         self.notebook.add(self.tab_analyse_simple, text="📊 Analyse")
         
-        if not MATPLOTLIB_AVAILABLE:
+        if not ensure_matplotlib():
             msg_frame = ttk.Frame(self.tab_analyse_simple)
             msg_frame.pack(fill="both", expand=True, padx=20, pady=20)
             ttk.Label(msg_frame, text="⚠️ Module matplotlib non disponible", 
@@ -10122,9 +12992,7 @@ Cordialement,
         main_scrollbar_x.pack(side="bottom", fill="x")
         main_canvas.pack(side="left", fill="both", expand=True)
         
-        def _on_mousewheel(event):
-            main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        main_canvas.bind_all("<MouseWheel>", _on_mousewheel)
+        bind_mousewheel_on_hover(main_canvas)
         
         self.analyse_canvas = main_canvas
         
@@ -10192,6 +13060,8 @@ Cordialement,
         self.analyse_placeholder.pack(pady=50)
         
         self.analyse_figures = []
+        self._analyse_chart_panels = {}  # {type de graphique: ChartPanel}
+        self._analyse_charts_token = None
         self.tab_analyse_simple.bind("<Configure>", self._on_analyse_resize)
     
     def refresh_analyse_view(self):
@@ -10217,178 +13087,14 @@ Cordialement,
         # Ne rien faire ici pour éviter les ralentissements
         pass
     
+    @timed()
     def get_analyse_data(self, start_date, end_date):
-        """Récupérer les données d'analyse pour une période"""
-        data = {
-            'dates': [],
-            'revenus': [],
-            'couts': [],
-            'marges': [],
-            'missions_count': [],
-            'palettes_liv': [],
-            'palettes_ram': [],
-            'by_voyage': {},
-            'by_sst': {},
-            'by_driver': {},
-            'by_country': {},
-        }
-        
-        current = start_date
-        while current <= end_date:
-            day_dir = get_planning_day_dir(current)
-            date_str = format_date_internal(current)
-            
-            day_data = {
-                'date': current,
-                'revenus': 0,
-                'couts': 0,
-                'missions': 0,
-                'pal_liv': 0,
-                'pal_ram': 0,
-            }
-            
-            if day_dir and day_dir.exists():
-                missions = []
-                for file in day_dir.glob("*.json"):
-                    mission_data = load_json(file, None)
-                    if mission_data:
-                        missions.append(mission_data)
-                
-                day_data['missions'] = len(missions)
-                
-                # Analyser chaque mission
-                drivers_by_sst = {}  # Pour éviter de compter plusieurs fois le même chauffeur
-                
-                for mission in missions:
-                    voyage_code = mission.get("voyage", "N/A")
-                    sst = mission.get("sst", "N/A")
-                    driver = mission.get("chauffeur_nom", mission.get("chauffeur", "N/A"))
-                    mission_type = mission.get("type", "LIVRAISON")
-                    
-                    # Palettes
-                    try:
-                        nb_pal = int(mission.get("nb_pal", 0) or 0)
-                    except (ValueError, TypeError):
-                        nb_pal = 0
-                    
-                    if mission_type == "LIVRAISON":
-                        day_data['pal_liv'] += nb_pal
-                    else:
-                        day_data['pal_ram'] += nb_pal
-                    
-                    # Déterminer le pays
-                    voyage = next((v for v in self.voyages if v.get("code") == voyage_code), None)
-                    country = voyage.get("country", "Belgique") if voyage else "Belgique"
-                    
-                    # Normaliser le pays
-                    country_map = {
-                        "pays-bas": "Pays-Bas", "paysbas": "Pays-Bas", "netherlands": "Pays-Bas",
-                        "belgique": "Belgique", "belgium": "Belgique",
-                        "france": "France", "luxembourg": "Luxembourg",
-                    }
-                    country = country_map.get(country.lower(), country)
-                    
-                    # Revenus par palette
-                    rev_liv = 0
-                    rev_ram = 0
-                    if date_str in self.revenus_palettes:
-                        if country in self.revenus_palettes[date_str]:
-                            rev_data = self.revenus_palettes[date_str][country]
-                            rev_liv = rev_data.get("livraison", 0)
-                            rev_ram = rev_data.get("ramasse", 0)
-                        elif "livraison" in self.revenus_palettes[date_str]:
-                            rev_data = self.revenus_palettes[date_str]
-                            rev_liv = rev_data.get("livraison", 0)
-                            rev_ram = rev_data.get("ramasse", 0)
-                    
-                    # Calculer revenus
-                    if mission_type == "LIVRAISON":
-                        mission_rev = nb_pal * rev_liv
-                    else:
-                        mission_rev = nb_pal * rev_ram
-                    
-                    day_data['revenus'] += mission_rev
-                    
-                    # Par voyage
-                    if voyage_code not in data['by_voyage']:
-                        data['by_voyage'][voyage_code] = {'revenus': 0, 'missions': 0, 'palettes': 0}
-                    data['by_voyage'][voyage_code]['revenus'] += mission_rev
-                    data['by_voyage'][voyage_code]['missions'] += 1
-                    data['by_voyage'][voyage_code]['palettes'] += nb_pal
-                    
-                    # Par pays
-                    if country not in data['by_country']:
-                        data['by_country'][country] = {'revenus': 0, 'couts': 0, 'missions': 0}
-                    data['by_country'][country]['revenus'] += mission_rev
-                    data['by_country'][country]['missions'] += 1
-                    
-                    # Par SST (compter chauffeurs uniques)
-                    if sst and sst != "N/A":
-                        if sst not in drivers_by_sst:
-                            drivers_by_sst[sst] = {}
-                        if country not in drivers_by_sst[sst]:
-                            drivers_by_sst[sst][country] = set()
-                        if driver and driver != "N/A":
-                            drivers_by_sst[sst][country].add(driver)
-                    
-                    # Par chauffeur
-                    if driver and driver != "N/A":
-                        if driver not in data['by_driver']:
-                            data['by_driver'][driver] = {'revenus': 0, 'missions': 0, 'palettes': 0, 'couts': 0}
-                        data['by_driver'][driver]['revenus'] += mission_rev
-                        data['by_driver'][driver]['missions'] += 1
-                        data['by_driver'][driver]['palettes'] += nb_pal
-                
-                # Calculer les coûts SST
-                for sst, countries in drivers_by_sst.items():
-                    if sst not in data['by_sst']:
-                        data['by_sst'][sst] = {'couts': 0, 'chauffeurs': 0, 'revenus': 0}
-                    
-                    for country, drivers in countries.items():
-                        nb_drivers = len(drivers)
-                        
-                        # Récupérer le tarif
-                        tarif = 0
-                        if sst in self.tarifs_sst and country in self.tarifs_sst[sst]:
-                            tarifs = self.tarifs_sst[sst][country]
-                            tarif = tarifs.get(date_str, 0)
-                            if tarif == 0:
-                                sorted_dates = sorted([dt for dt in tarifs.keys() if dt <= date_str], reverse=True)
-                                if sorted_dates:
-                                    tarif = tarifs[sorted_dates[0]]
-                        
-                        cost = nb_drivers * tarif
-                        day_data['couts'] += cost
-                        data['by_sst'][sst]['couts'] += cost
-                        data['by_sst'][sst]['chauffeurs'] += nb_drivers
-                        
-                        # Coût par pays
-                        if country in data['by_country']:
-                            data['by_country'][country]['couts'] += cost
-                        
-                        # Coût par chauffeur (répartir équitablement)
-                        if nb_drivers > 0:
-                            cost_per_driver = tarif
-                            for driver in drivers:
-                                if driver in data['by_driver']:
-                                    data['by_driver'][driver]['couts'] += cost_per_driver
-            
-            # Ajouter les données du jour
-            data['dates'].append(current)
-            data['revenus'].append(day_data['revenus'])
-            data['couts'].append(day_data['couts'])
-            data['marges'].append(day_data['revenus'] - day_data['couts'])
-            data['missions_count'].append(day_data['missions'])
-            data['palettes_liv'].append(day_data['pal_liv'])
-            data['palettes_ram'].append(day_data['pal_ram'])
-            
-            current += timedelta(days=1)
-        
-        return data
+        """Récupérer les données d'analyse pour une période (pipeline partagé avec l'Analyse avancée)"""
+        return self.analytics().collect(start_date, end_date)
     
     def generate_analyse_charts(self):
-        """Générer les graphiques d'analyse"""
-        if not MATPLOTLIB_AVAILABLE:
+        """Générer les graphiques d'analyse (données préparées en arrière-plan, figures réutilisées)"""
+        if not ensure_matplotlib():
             messagebox.showerror("Erreur", "matplotlib n'est pas installé")
             return
         
@@ -10404,14 +13110,24 @@ Cordialement,
             messagebox.showerror("Erreur", "La date de début doit être avant la date de fin")
             return
         
-        # Récupérer les données
-        data = self.get_analyse_data(start_date, end_date)
+        pipeline = self.analytics()
+        token = self._analyse_charts_token = object()
         
-        # Nettoyer les anciens graphiques
-        for widget in self.charts_container.winfo_children():
-            widget.destroy()
-        self.analyse_figures = []
+        def work():
+            data = pipeline.collect(start_date, end_date)
+            return data, prepare_chart_series(data)
+        
+        def done(result, error):
+            if token is not self._analyse_charts_token:
+                return  # Une génération plus récente a été lancée
+            if error is not None:
+                messagebox.showerror("Erreur", f"Erreur lors de l'analyse: {error}")
+                return
+            self._draw_analyse_charts(*result, start_date, end_date)
         
+        run_in_background(self.root, work, on_done=done)
+    
+    def _draw_analyse_charts(self, data, series, start_date, end_date):
         # Type de graphique sélectionné
         selected_type = self.analyse_chart_types_map.get(
             self.analyse_chart_combo.get(), "all")
@@ -10424,7 +13140,7 @@ Cordialement,
         except Exception:
             container_width = 1200
         
-        # Taille des figures
+        # Taille des figures (à leur création ; elles suivent ensuite la fenêtre)
         fig_width = min(12, max(8, container_width / 100))
         fig_height = 5
         
@@ -10441,57 +13157,53 @@ Cordialement,
         if selected_type == "all" or selected_type == "profitability":
             charts_to_show.append(("profitability", "📊 Rentabilité par Pays"))
         
-        row = 0
-        for chart_type, title in charts_to_show:
-            chart_frame = ttk.LabelFrame(self.charts_container, text=title, padding=5)
-            chart_frame.pack(fill="x", pady=10, padx=5)
-            
-            fig = Figure(figsize=(fig_width, fig_height), dpi=100)
-            fig.patch.set_facecolor('#f5f5f5')
-            
-            if chart_type == "ca_evolution":
-                self._create_ca_evolution_chart(fig, data)
-            elif chart_type == "ca_voyage":
-                self._create_voyage_chart(fig, data)
-            elif chart_type == "sst_analysis":
-                self._create_sst_chart(fig, data)
-            elif chart_type == "driver_analysis":
-                self._create_driver_chart(fig, data)
-            elif chart_type == "profitability":
-                self._create_profitability_chart(fig, data)
-            
-            canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True)
-            
-            # Toolbar
-            toolbar_frame = ttk.Frame(chart_frame)
-            toolbar_frame.pack(fill="x")
-            toolbar = NavigationToolbar2Tk(canvas, toolbar_frame)
-            toolbar.update()
-            
-            self.analyse_figures.append((fig, canvas))
-            row += 1
+        renderers = {
+            "ca_evolution": self._create_ca_evolution_chart,
+            "ca_voyage": self._create_voyage_chart,
+            "sst_analysis": self._create_sst_chart,
+            "driver_analysis": self._create_driver_chart,
+            "profitability": self._create_profitability_chart,
+        }
+        shown = show_chart_panels(
+            self.charts_container, self._analyse_chart_panels, charts_to_show,
+            lambda title: ChartPanel(self.charts_container, title, figsize=(fig_width, fig_height),
+                                     facecolor='#f5f5f5'),
+            fill="x", pady=10, padx=5)
+        for chart_type, panel in shown:
+            renderers[chart_type](panel, series)
+            panel.draw()
+        self.analyse_figures = [(panel.fig, panel.canvas) for _chart_type, panel in shown]
         
         # Résumé statistique
         self._create_summary_stats(data, start_date, end_date)
     
-    def _create_ca_evolution_chart(self, fig, data):
+    def _create_ca_evolution_chart(self, panel, series):
         """Créer le graphique d'évolution du CA"""
-        ax = fig.add_subplot(111)
+        dates, revenus, couts, marges = series['daily']
+        if not dates:
+            panel.reuse('empty')
+            panel.fig.add_subplot(111).text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
+            return
+        
+        total_rev, total_cout, total_marge = series['totals']
+        totals_text = f"Total Rev: {total_rev:,.0f}€\nTotal Coûts: {total_cout:,.0f}€\nMarge: {total_marge:,.0f}€"
         
-        if not data['dates']:
-            ax.text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
+        if panel.reuse('ca_evolution'):
+            st = panel.state
+            st['rev'].set_data(dates, revenus)
+            st['cout'].set_data(dates, couts)
+            st['fill'].remove()
+            st['fill'] = st['ax'].fill_between(dates, marges, alpha=0.3, color='blue')
+            st['totals'].set_text(totals_text)
+            rescale_axes(st['ax'], marges)
             return
         
-        dates = data['dates']
-        revenus = data['revenus']
-        couts = data['couts']
-        marges = data['marges']
+        fig = panel.fig
+        ax = fig.add_subplot(111)
         
-        ax.plot(dates, revenus, 'g-', linewidth=2, label='Revenus', marker='o', markersize=3)
-        ax.plot(dates, couts, 'r-', linewidth=2, label='Coûts', marker='s', markersize=3)
-        ax.fill_between(dates, marges, alpha=0.3, color='blue', label='Marge')
+        rev, = ax.plot(dates, revenus, 'g-', linewidth=2, label='Revenus', marker='o', markersize=3)
+        cout, = ax.plot(dates, couts, 'r-', linewidth=2, label='Coûts', marker='s', markersize=3)
+        fill = ax.fill_between(dates, marges, alpha=0.3, color='blue', label='Marge')
         ax.axhline(y=0, color='black', linestyle='-', linewidth=0.5)
         
         ax.set_xlabel('Date')
@@ -10505,40 +13217,44 @@ Cordialement,
         fig.autofmt_xdate()
         
         # Totaux dans le coin
-        total_rev = sum(revenus)
-        total_cout = sum(couts)
-        total_marge = sum(marges)
-        ax.text(0.98, 0.98, f"Total Rev: {total_rev:,.0f}€\nTotal Coûts: {total_cout:,.0f}€\nMarge: {total_marge:,.0f}€",
-                transform=ax.transAxes, fontsize=9, verticalalignment='top', horizontalalignment='right',
-                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+        totals = ax.text(0.98, 0.98, totals_text,
+                         transform=ax.transAxes, fontsize=9, verticalalignment='top', horizontalalignment='right',
+                         bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
         
         fig.tight_layout()
+        panel.state = {'ax': ax, 'rev': rev, 'cout': cout, 'fill': fill, 'totals': totals}
     
-    def _create_voyage_chart(self, fig, data):
+    def _create_voyage_chart(self, panel, series):
         """Créer le graphique CA par voyage"""
-        ax = fig.add_subplot(111)
-        
-        voyages_data = data['by_voyage']
-        if not voyages_data:
-            ax.text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
+        # Top 15 par revenus (trié par prepare_chart_series)
+        sorted_voyages = series['voyages']
+        if not sorted_voyages:
+            panel.reuse('empty')
+            panel.fig.add_subplot(111).text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
             return
         
-        # Trier par revenus et prendre le top 15
-        sorted_voyages = sorted(voyages_data.items(), key=lambda x: x[1]['revenus'], reverse=True)[:15]
-        
         codes = [v[0] for v in sorted_voyages]
-        revenus = [v[1]['revenus'] for v in sorted_voyages]
-        missions = [v[1]['missions'] for v in sorted_voyages]
+        revenus = [v[1] for v in sorted_voyages]
+        labels = [f'{v[2]}m' for v in sorted_voyages]
+        
+        if panel.reuse(('ca_voyage', tuple(codes))):
+            st = panel.state
+            for bar, rev in zip(st['bars'], revenus):
+                bar.set_height(rev)
+            update_bar_labels(st['bars'], st['labels'], labels)
+            rescale_axes(st['ax'])
+            return
+        
+        fig = panel.fig
+        ax = fig.add_subplot(111)
         
         # Graphique à barres
         bars = ax.bar(codes, revenus, color='steelblue', alpha=0.8)
         
         # Ajouter le nombre de missions sur chaque barre
-        for bar, mission_count in zip(bars, missions):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{mission_count}m',
-                   ha='center', va='bottom', fontsize=8, color='darkblue')
+        texts = [ax.text(bar.get_x() + bar.get_width()/2., bar.get_height(), label,
+                         ha='center', va='bottom', fontsize=8, color='darkblue')
+                 for bar, label in zip(bars, labels)]
         
         ax.set_xlabel('Code Voyage')
         ax.set_ylabel('Revenus (€)')
@@ -10546,22 +13262,37 @@ Cordialement,
         ax.grid(True, alpha=0.3, axis='y')
         
         fig.tight_layout()
+        panel.state = {'ax': ax, 'bars': bars, 'labels': texts}
     
-    def _create_sst_chart(self, fig, data):
+    def _create_sst_chart(self, panel, series):
         """Créer le graphique d'analyse SST"""
+        if not series['ssts']:
+            panel.reuse('empty')
+            for pos in (121, 122):
+                panel.fig.add_subplot(pos).text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
+            return
+        
+        ssts = [s[0] for s in series['ssts']]
+        couts = [s[1] for s in series['ssts']]
+        chauffeurs = [s[3] for s in series['ssts']]
+        cout_labels = [f'{cout:,.0f}€' if cout > 0 else '' for cout in couts]
+        ch_labels = [str(ch) if ch > 0 else '' for ch in chauffeurs]
+        
+        if panel.reuse(('sst_analysis', tuple(ssts))):
+            st = panel.state
+            for bars, heights, texts, labels, ax in (
+                    (st['bars1'], couts, st['labels1'], cout_labels, st['ax1']),
+                    (st['bars2'], chauffeurs, st['labels2'], ch_labels, st['ax2'])):
+                for bar, height in zip(bars, heights):
+                    bar.set_height(height)
+                update_bar_labels(bars, texts, labels)
+                rescale_axes(ax)
+            return
+        
+        fig = panel.fig
         ax1 = fig.add_subplot(121)
         ax2 = fig.add_subplot(122)
         
-        sst_data = data['by_sst']
-        if not sst_data:
-            ax1.text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
-            ax2.text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
-            return
-        
-        ssts = list(sst_data.keys())
-        couts = [sst_data[s]['couts'] for s in ssts]
-        chauffeurs = [sst_data[s]['chauffeurs'] for s in ssts]
-        
         # Graphique 1: Coûts par SST
         colors = plt.cm.Reds([0.3 + 0.5 * i/len(ssts) for i in range(len(ssts))])
         bars1 = ax1.bar(ssts, couts, color=colors)
@@ -10572,10 +13303,9 @@ Cordialement,
         ax1.grid(True, alpha=0.3, axis='y')
         
         # Ajouter les valeurs
-        for bar, cout in zip(bars1, couts):
-            if cout > 0:
-                ax1.text(bar.get_x() + bar.get_width()/2., bar.get_height(),
-                        f'{cout:,.0f}€', ha='center', va='bottom', fontsize=8)
+        labels1 = [ax1.text(bar.get_x() + bar.get_width()/2., bar.get_height(), label,
+                            ha='center', va='bottom', fontsize=8)
+                   for bar, label in zip(bars1, cout_labels)]
         
         # Graphique 2: Nombre de chauffeurs par SST
         colors2 = plt.cm.Blues([0.3 + 0.5 * i/len(ssts) for i in range(len(ssts))])
@@ -10586,33 +13316,21 @@ Cordialement,
         ax2.tick_params(axis='x', rotation=45)
         ax2.grid(True, alpha=0.3, axis='y')
         
-        for bar, ch in zip(bars2, chauffeurs):
-            if ch > 0:
-                ax2.text(bar.get_x() + bar.get_width()/2., bar.get_height(),
-                        str(ch), ha='center', va='bottom', fontsize=8)
+        labels2 = [ax2.text(bar.get_x() + bar.get_width()/2., bar.get_height(), label,
+                            ha='center', va='bottom', fontsize=8)
+                   for bar, label in zip(bars2, ch_labels)]
         
         fig.tight_layout()
+        panel.state = {'ax1': ax1, 'ax2': ax2, 'bars1': bars1, 'bars2': bars2,
+                       'labels1': labels1, 'labels2': labels2}
     
-    def _create_driver_chart(self, fig, data):
+    def _create_driver_chart(self, panel, series):
         """Créer le graphique d'analyse des chauffeurs"""
-        ax = fig.add_subplot(111)
-        
-        driver_data = data['by_driver']
-        if not driver_data:
-            ax.text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
-            return
-        
-        # Calculer la marge par chauffeur et trier
-        drivers_with_margin = []
-        for driver, vals in driver_data.items():
-            marge = vals['revenus'] - vals['couts']
-            drivers_with_margin.append((driver, vals['revenus'], vals['couts'], marge, vals['missions']))
-        
-        # Trier par marge et prendre top 15
-        sorted_drivers = sorted(drivers_with_margin, key=lambda x: x[3], reverse=True)[:15]
-        
+        # Top 15 par marge (trié par prepare_chart_series)
+        sorted_drivers = series['drivers']
         if not sorted_drivers:
-            ax.text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
+            panel.reuse('empty')
+            panel.fig.add_subplot(111).text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
             return
         
         drivers = [d[0][:15] for d in sorted_drivers]  # Tronquer les noms
@@ -10620,6 +13338,18 @@ Cordialement,
         couts = [d[2] for d in sorted_drivers]
         marges = [d[3] for d in sorted_drivers]
         
+        if panel.reuse(('driver_analysis', tuple(d[0] for d in sorted_drivers))):
+            st = panel.state
+            for bars, heights in ((st['bars1'], revenus), (st['bars2'], couts)):
+                for bar, height in zip(bars, heights):
+                    bar.set_height(height)
+            st['marge'].set_ydata(marges)
+            rescale_axes(st['ax'])
+            rescale_axes(st['ax2'])
+            return
+        
+        fig = panel.fig
+        ax = fig.add_subplot(111)
         x = range(len(drivers))
         width = 0.35
         
@@ -10628,7 +13358,7 @@ Cordialement,
         
         # Ligne de marge
         ax2 = ax.twinx()
-        ax2.plot(x, marges, 'b-', marker='D', linewidth=2, label='Marge', markersize=6)
+        marge, = ax2.plot(x, marges, 'b-', marker='D', linewidth=2, label='Marge', markersize=6)
         ax2.axhline(y=0, color='blue', linestyle='--', alpha=0.5)
         ax2.set_ylabel('Marge (€)', color='blue')
         ax2.tick_params(axis='y', labelcolor='blue')
@@ -10642,32 +13372,54 @@ Cordialement,
         ax.grid(True, alpha=0.3, axis='y')
         
         fig.tight_layout()
+        panel.state = {'ax': ax, 'ax2': ax2, 'bars1': bars1, 'bars2': bars2, 'marge': marge}
     
-    def _create_profitability_chart(self, fig, data):
+    def _create_profitability_chart(self, panel, series):
         """Créer le graphique de rentabilité par pays"""
-        ax1 = fig.add_subplot(121)
-        ax2 = fig.add_subplot(122)
-        
-        country_data = data['by_country']
-        if not country_data:
-            ax1.text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
-            ax2.text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
+        if not series['countries']:
+            panel.reuse('empty')
+            for pos in (121, 122):
+                panel.fig.add_subplot(pos).text(0.5, 0.5, "Aucune donnée disponible", ha='center', va='center', fontsize=12)
             return
         
-        countries = list(country_data.keys())
-        revenus = [country_data[c]['revenus'] for c in countries]
-        couts = [country_data[c]['couts'] for c in countries]
+        countries = [c[0] for c in series['countries']]
+        revenus = [c[1] for c in series['countries']]
+        couts = [c[2] for c in series['countries']]
         marges = [r - c for r, c in zip(revenus, couts)]
-        missions = [country_data[c]['missions'] for c in countries]
-        
-        # Graphique 1: Camembert des revenus
-        colors = ['#2ecc71', '#3498db', '#9b59b6', '#e74c3c', '#f39c12'][:len(countries)]
-        if sum(revenus) > 0:
-            wedges, texts, autotexts = ax1.pie(revenus, labels=countries, autopct='%1.1f%%',
-                                               colors=colors, startangle=90)
-            ax1.set_title('Répartition des revenus par pays')
-        else:
-            ax1.text(0.5, 0.5, "Aucun revenu", ha='center', va='center')
+        
+        def draw_pie(ax):
+            # Camembert des revenus
+            colors = ['#2ecc71', '#3498db', '#9b59b6', '#e74c3c', '#f39c12'][:len(countries)]
+            if sum(revenus) > 0:
+                ax.pie(revenus, labels=countries, autopct='%1.1f%%', colors=colors, startangle=90)
+                ax.set_title('Répartition des revenus par pays')
+            else:
+                ax.text(0.5, 0.5, "Aucun revenu", ha='center', va='center')
+        
+        def marge_label(text, i):
+            # Marge affichée au-dessus de la barre des revenus
+            text.set_position((i, revenus[i] + 50))
+            text.set_text(f"{'+' if marges[i] >= 0 else ''}{marges[i]:,.0f}€")
+            text.set_color('green' if marges[i] >= 0 else 'red')
+        
+        if panel.reuse(('profitability', tuple(countries))):
+            st = panel.state
+            st['ax1'].clear()
+            st['ax1'].set_prop_cycle(None)  # Mêmes couleurs qu'à la création
+            draw_pie(st['ax1'])
+            for bar, rev in zip(st['bars_rev'], revenus):
+                bar.set_height(rev)
+            for bar, cout in zip(st['bars_cout'], couts):
+                bar.set_height(-cout)
+            for i, text in enumerate(st['labels']):
+                marge_label(text, i)
+            rescale_axes(st['ax2'])
+            return
+        
+        fig = panel.fig
+        ax1 = fig.add_subplot(121)
+        ax2 = fig.add_subplot(122)
+        draw_pie(ax1)
         
         # Graphique 2: Barres empilées revenus/coûts/marge
         x = range(len(countries))
@@ -10676,12 +13428,11 @@ Cordialement,
         bars_rev = ax2.bar(x, revenus, width, label='Revenus', color='green', alpha=0.7)
         bars_cout = ax2.bar(x, [-c for c in couts], width, label='Coûts', color='red', alpha=0.7)
         
-        # Ajouter la marge comme texte
-        for i, (rev, cout, marge) in enumerate(zip(revenus, couts, marges)):
-            color = 'green' if marge >= 0 else 'red'
-            sign = '+' if marge >= 0 else ''
-            ax2.text(i, rev + 50, f'{sign}{marge:,.0f}€', ha='center', va='bottom', 
-                    fontsize=9, color=color, fontweight='bold')
+        labels = []
+        for i in x:
+            text = ax2.text(0, 0, '', ha='center', va='bottom', fontsize=9, fontweight='bold')
+            marge_label(text, i)
+            labels.append(text)
         
         ax2.set_xlabel('Pays')
         ax2.set_ylabel('Montant (€)')
@@ -10693,6 +13444,7 @@ Cordialement,
         ax2.grid(True, alpha=0.3, axis='y')
         
         fig.tight_layout()
+        panel.state = {'ax1': ax1, 'ax2': ax2, 'bars_rev': bars_rev, 'bars_cout': bars_cout, 'labels': labels}
     
     def _create_summary_stats(self, data, start_date, end_date):
         """Créer le résumé statistique"""
@@ -10761,6 +13513,7 @@ Cordialement,
             marge_driver = top_driver[1]['revenus'] - top_driver[1]['couts']
             ttk.Label(col4, text=f"Chauffeur: {top_driver[0][:12]}... ({marge_driver:,.0f}€)").pack(anchor="w")
     
+    @timed()
     def export_analyse_data(self):
         """Exporter les données d'analyse"""
         try:
@@ -10777,7 +13530,7 @@ Cordialement,
             return
         
         try:
-            import openpyxl
+            openpyxl = lazy_import("openpyxl")
             from openpyxl.styles import Font, PatternFill, Alignment
             
             wb = openpyxl.Workbook()
@@ -11089,9 +13842,9 @@ Cordialement,
         filters_frame.pack(fill="x", padx=5, pady=5)
         
         ttk.Label(filters_frame, text="📅 Période:").pack(side="left")
-        self.sauron_date_filter = ttk.Combobox(filters_frame, values=[
-            "Aujourd'hui", "Hier", "7 derniers jours", "30 derniers jours", "Tout"
-        ], state="readonly", width=15)
+        # Les mois archivés de l'utilisateur sélectionné sont ajoutés ("Archive AAAA-MM")
+        self.sauron_date_filter = ttk.Combobox(filters_frame, values=SAURON_PERIODS,
+                                               state="readonly", width=15)
         self.sauron_date_filter.set("Aujourd'hui")
         self.sauron_date_filter.pack(side="left", padx=5)
         self.sauron_date_filter.bind("<<ComboboxSelected>>", lambda e: self.sauron_filter_actions())
@@ -11148,32 +13901,17 @@ Cordialement,
         self.sauron_actions_data = {}
         
         # Charger les données initiales
+        # (l'actualisation périodique est assurée par la tâche "sauron" de l'ordonnanceur)
         self.sauron_refresh_all()
-        
-        # Auto-refresh toutes les 30 secondes
-        self._sauron_refresh_job = None
-        self._start_sauron_auto_refresh()
     
-    def _start_sauron_auto_refresh(self):
-        """Démarrer le rafraîchissement automatique de Sauron"""
-        if self._sauron_refresh_job:
-            self.root.after_cancel(self._sauron_refresh_job)
-        
-        def refresh_loop():
-            if hasattr(self, 'tab_sauron') and self.tab_sauron.winfo_exists():
-                # Ne rafraîchir que si l'onglet Sauron est visible
-                try:
-                    current_tab = self.notebook.tab(self.notebook.select(), "text")
-                    if "Sauron" in current_tab:
-                        self.sauron_refresh_all()
-                except Exception:
-                    pass
-                self._sauron_refresh_job = self.root.after(30000, refresh_loop)
-        
-        self._sauron_refresh_job = self.root.after(30000, refresh_loop)
+    def _sauron_archive_month(self):
+        """Mois archivé choisi dans le filtre de période, sinon None"""
+        value = self.sauron_date_filter.get()
+        return value[len("Archive "):] if value.startswith("Archive ") else None
     
     def sauron_refresh_all(self):
-        """Rafraîchir toutes les données Sauron"""
+        """Rafraîchir toutes les données Sauron (reconstruction complète)"""
+        activity_logger.poll()
         self.sauron_refresh_users_list()
         # Rafraîchir aussi les détails si un utilisateur est sélectionné
         sel = self.sauron_users_tree.selection()
@@ -11206,32 +13944,93 @@ Cordialement,
                 continue
             
             is_active = username in active_usernames
-            status = "🟢 Actif" if is_active else "⚪ Inactif"
-            
-            # Formater la dernière connexion
-            last_login = stats.get("last_login", "-")
-            if last_login and last_login != "-":
-                try:
-                    last_dt = datetime.fromisoformat(last_login)
-                    last_login = last_dt.strftime("%d/%m/%Y %H:%M")
-                except Exception:
-                    pass
-            
-            values = (
-                username,
-                status,
-                stats.get("total_sessions", 0),
-                stats.get("total_time_formatted", "-"),
-                last_login
-            )
-            
             tag = 'active' if is_active else 'inactive'
-            self.sauron_users_tree.insert("", "end", iid=username, values=values, tags=(tag,))
+            self.sauron_users_tree.insert("", "end", iid=username,
+                                          values=self._sauron_user_values(username, stats, is_active),
+                                          tags=(tag,))
         
         # Restaurer la sélection
         if old_selection_user and self.sauron_users_tree.exists(old_selection_user):
             self.sauron_users_tree.selection_set(old_selection_user)
     
+    def _sauron_user_values(self, username, stats, is_active):
+        """Valeurs d'une ligne de la liste des utilisateurs"""
+        status = "🟢 Actif" if is_active else "⚪ Inactif"
+        
+        # Formater la dernière connexion
+        last_login = stats.get("last_login", "-")
+        if last_login and last_login != "-":
+            try:
+                last_dt = datetime.fromisoformat(last_login)
+                last_login = last_dt.strftime("%d/%m/%Y %H:%M")
+            except Exception:
+                pass
+        
+        return (
+            username,
+            status,
+            stats.get("total_sessions", 0),
+            stats.get("total_time_formatted", "-"),
+            last_login or "-"
+        )
+    
+    def sauron_apply_log_changes(self, changes):
+        """
+        Appliquer les actions lues par activity_logger.poll() sans tout reconstruire :
+        seules les lignes des utilisateurs concernés sont mises à jour et les
+        nouvelles actions de l'utilisateur sélectionné sont ajoutées en tête.
+        """
+        if not changes or not hasattr(self, 'sauron_users_tree') or not self.sauron_users_tree.winfo_exists():
+            return
+        
+        tree = self.sauron_users_tree
+        active_usernames = {u["user"] for u in activity_logger.get_active_sessions()}
+        active_count = len(active_usernames)
+        self.sauron_active_count.config(text=f"({active_count} actif{'s' if active_count > 1 else ''})")
+        
+        for username in changes:
+            stats = activity_logger.get_user_stats(username)
+            if not stats:
+                if tree.exists(username):
+                    tree.delete(username)
+                continue
+            is_active = username in active_usernames
+            values = self._sauron_user_values(username, stats, is_active)
+            tag = 'active' if is_active else 'inactive'
+            if tree.exists(username):
+                tree.item(username, values=values, tags=(tag,))
+            else:
+                index = sum(1 for other in tree.get_children() if other < username)
+                tree.insert("", index, iid=username, values=values, tags=(tag,))
+        
+        # Le statut actif dépend aussi de l'heure : le recalculer pour les autres lignes
+        for username in tree.get_children():
+            if username in changes:
+                continue
+            tag = 'active' if username in active_usernames else 'inactive'
+            if tuple(tree.item(username, "tags")) != (tag,):
+                values = list(tree.item(username, "values"))
+                values[1] = "🟢 Actif" if tag == 'active' else "⚪ Inactif"
+                tree.item(username, values=values, tags=(tag,))
+        
+        username = getattr(self, 'sauron_selected_user', None)
+        if username not in changes or not tree.exists(username):
+            return
+        reset, new_actions = changes[username]
+        if reset:
+            self.sauron_on_user_select(None)
+            return
+        self._sauron_update_stats_labels(activity_logger.get_user_stats(username))
+        if self._sauron_archive_month():
+            return  # Un mois archivé est affiché : les nouvelles actions n'en font pas partie
+        for action in self._sauron_apply_filters(new_actions):
+            self._sauron_insert_action(action, 0)
+        # Conserver au plus 2000 actions affichées
+        history = self.sauron_history_tree
+        for item in history.get_children()[2000:]:
+            history.delete(item)
+            self.sauron_actions_data.pop(item, None)
+    
     def sauron_filter_users(self):
         """Filtrer la liste des utilisateurs"""
         filter_text = self.sauron_filter_var.get().upper()
@@ -11260,6 +14059,19 @@ Cordialement,
         
         # Mettre à jour les statistiques
         stats = activity_logger.get_user_stats(username)
+        self._sauron_update_stats_labels(stats)
+        
+        # Proposer les mois archivés de cet utilisateur dans le filtre de période
+        archives = [f"Archive {m}" for m in (stats or {}).get("archived_months", [])]
+        self.sauron_date_filter.config(values=SAURON_PERIODS + archives)
+        if self._sauron_archive_month() and self.sauron_date_filter.get() not in archives:
+            self.sauron_date_filter.set("Tout")
+        
+        # Charger l'historique
+        self.sauron_load_user_history(username)
+    
+    def _sauron_update_stats_labels(self, stats):
+        """Afficher les statistiques de l'utilisateur sélectionné"""
         if stats:
             self.sauron_stat_sessions.config(text=f"Sessions: {stats.get('total_sessions', 0)}")
             self.sauron_stat_time.config(text=f"Temps total: {stats.get('total_time_formatted', '-')}")
@@ -11273,9 +14085,6 @@ Cordialement,
                 except Exception:
                     pass
             self.sauron_stat_last.config(text=f"Dernière connexion: {last_login}")
-        
-        # Charger l'historique
-        self.sauron_load_user_history(username)
     
     def sauron_load_user_history(self, username):
         """Charger l'historique d'un utilisateur"""
@@ -11284,42 +14093,47 @@ Cordialement,
             self.sauron_history_tree.delete(item)
         self.sauron_actions_data = {}
         
-        # Récupérer les logs
-        all_logs = activity_logger.get_all_users_logs()
-        if username not in all_logs:
-            return
-        
-        actions = all_logs[username].get("actions", [])
+        # Récupérer les logs (déjà lus par le dernier poll) ou le mois archivé demandé
+        month = self._sauron_archive_month()
+        if month:
+            actions = activity_logger.get_archived_actions(username, month)
+        else:
+            actions = activity_logger.get_user_actions(username)
         
         # Appliquer les filtres
         filtered_actions = self._sauron_apply_filters(actions)
         
         # Ajouter les actions (les plus récentes en premier)
         for action in reversed(filtered_actions[-2000:]):  # Afficher jusqu'à 2000 actions
-            action_id = action.get("id", str(uuid.uuid4())[:12])
-            timestamp = action.get("timestamp", "-")
-            action_type = action.get("type", "UNKNOWN")
-            details = action.get("details", {})
-            
-            # Formater le timestamp
-            try:
-                dt = datetime.fromisoformat(timestamp)
-                timestamp_fmt = dt.strftime("%d/%m/%Y %H:%M:%S")
-            except Exception:
-                timestamp_fmt = timestamp
-            
-            # Formater les détails pour l'affichage
-            details_str = self._format_action_details(action)
-            
-            # Déterminer le tag de couleur
-            tag = self._get_action_tag(action_type)
-            
-            self.sauron_history_tree.insert("", "end", iid=action_id, 
-                                           values=(timestamp_fmt, action_type, details_str),
-                                           tags=(tag,))
-            
-            # Stocker les données complètes pour les détails
-            self.sauron_actions_data[action_id] = action
+            self._sauron_insert_action(action, "end")
+    
+    def _sauron_insert_action(self, action, index):
+        """Insérer une action dans l'historique (index "end" ou 0 pour la tête)"""
+        action_id = action.get("id", str(uuid.uuid4())[:12])
+        if self.sauron_history_tree.exists(action_id):
+            return  # Déjà affichée (lecture concurrente d'une actualisation complète)
+        timestamp = action.get("timestamp", "-")
+        action_type = action.get("type", "UNKNOWN")
+        
+        # Formater le timestamp
+        try:
+            dt = datetime.fromisoformat(timestamp)
+            timestamp_fmt = dt.strftime("%d/%m/%Y %H:%M:%S")
+        except Exception:
+            timestamp_fmt = timestamp
+        
+        # Formater les détails pour l'affichage
+        details_str = self._format_action_details(action)
+        
+        # Déterminer le tag de couleur
+        tag = self._get_action_tag(action_type)
+        
+        self.sauron_history_tree.insert("", index, iid=action_id, 
+                                       values=(timestamp_fmt, action_type, details_str),
+                                       tags=(tag,))
+        
+        # Stocker les données complètes pour les détails
+        self.sauron_actions_data[action_id] = action
     
     def _sauron_apply_filters(self, actions):
         """Appliquer les filtres de date et de type"""
@@ -11336,7 +14150,7 @@ Cordialement,
             start_date = now - timedelta(days=7)
         elif date_filter == "30 derniers jours":
             start_date = now - timedelta(days=30)
-        else:  # Tout
+        else:  # Tout (journal non archivé) ou mois archivé
             start_date = None
         
         filtered = []
@@ -11495,6 +14309,7 @@ Cordialement,
             return
         
         username = self.sauron_selected_user
+        self.sauron_apply_log_changes(activity_logger.poll())
         all_logs = activity_logger.get_all_users_logs()
         
         if username not in all_logs:
@@ -11520,161 +14335,160 @@ Cordialement,
             except Exception as e:
                 messagebox.showerror("Erreur", f"Erreur lors de l'export:\n{e}")
 
+    def _reference_file_path(self, key):
+        """Chemin du fichier de référentiel `key` (voir REFERENCE_FILES)"""
+        path = REFERENCE_FILES[key][0]
+        return self.data_dir / path if isinstance(path, str) else path
+
+    @timed()
     def reload_data_from_files(self):
         """Recharger les données depuis les fichiers JSON - seulement si modifiés.
         
-        - Surveille les fichiers de référentiels (_data)
+        - Surveille les fichiers de référentiels (_data) un par un et ne
+          recharge que ceux qui ont changé
         - Surveille aussi le planning du jour courant dans le dossier _planning
+
+        Retourne l'ensemble des vues à rafraîchir (vide si rien n'a changé).
         """
         try:
-            import os
-            from pathlib import Path
-            
             # 1) Vérifier les fichiers de référentiels (_data)
-            files_to_check = {
-                'voyages': VOYAGES_FILE,
-                'chauffeurs': CHAUFFEURS_FILE,
-                'dispos': self.data_dir / "dispo_chauffeurs.json",
-                'sst': self.data_dir / "sst.json",
-                'tarifs_sst': TARIFS_SST_FILE,
-                'revenus': REVENUS_FILE,
-            }
-            
-            files_changed = False
-            
-            for key, filepath in files_to_check.items():
+            changed_keys = []
+            for key in REFERENCE_FILES:
+                filepath = self._reference_file_path(key)
                 try:
                     if filepath.exists():
                         current_mtime = filepath.stat().st_mtime
                         # Vérifier si le fichier a changé
-                        if key not in self.file_timestamps or self.file_timestamps[key] != current_mtime:
-                            files_changed = True
+                        if self.file_timestamps.get(key) != current_mtime:
+                            changed_keys.append(key)
                             self.file_timestamps[key] = current_mtime
                 except Exception:
-                    # En cas de souci sur un fichier, on préfère rafraîchir quand même
-                    files_changed = True
+                    # En cas de souci sur un fichier, on préfère le recharger quand même
+                    changed_keys.append(key)
             
             # 2) Vérifier le planning du jour courant (_planning/YYYY/MM/Semaine_xx/AAAA-MM-JJ)
-            missions_changed = False
+            #    fichier par fichier : seuls les fichiers ajoutés/modifiés seront relus
             try:
-                day_dir = get_planning_day_dir(self.current_date)
-                if day_dir.exists():
-                    latest_mtime = None
-                    for f in day_dir.glob("*.json"):
-                        try:
-                            mtime = f.stat().st_mtime
-                            if latest_mtime is None or mtime > latest_mtime:
-                                latest_mtime = mtime
-                        except Exception:
-                            pass
-                    
-                    if latest_mtime is not None:
-                        prev = self.file_timestamps.get("missions_current")
-                        if prev is None or prev != latest_mtime:
-                            missions_changed = True
-                            self.file_timestamps["missions_current"] = latest_mtime
+                missions_changed, day_signatures, changed_paths, removed_paths = self._diff_day_signatures()
             except Exception:
                 # En cas d'erreur sur le planning du jour, on ne casse pas tout
-                pass
-            
-            # 3) Appliquer les rechargements nécessaires
-            if files_changed:
-                # ⚠ IMPORTANT : ne PAS toucher aux missions ici.
-                # Les missions du planning sont chargées via load_planning_for_date()
-                # et sauvegardées jour par jour dans le dossier _planning.
-                # Ici, on ne recharge que les référentiels globaux.
-                self.voyages = load_json(VOYAGES_FILE, [])
-                self.chauffeurs = load_json(CHAUFFEURS_FILE, [])
-                self.dispos = load_json(self.data_dir / "dispo_chauffeurs.json", [])
-                self.sst_list = load_json(self.data_dir / "sst.json", [])
-                self.tarifs_sst = load_json(TARIFS_SST_FILE, {})
-                self.revenus_palettes = load_json(REVENUS_FILE, {})
+                missions_changed = False
+            
+            # 3) Recharger uniquement les référentiels modifiés
+            # ⚠ IMPORTANT : ne PAS toucher aux missions ici.
+            # Les missions du planning sont chargées via load_planning_for_date()
+            # et sauvegardées jour par jour dans le dossier _planning.
+            views = set()
+            for key in changed_keys:
+                _, attr, default, dependent_views = REFERENCE_FILES[key]
+                setattr(self, attr, load_json(self._reference_file_path(key), default))
+                views.update(dependent_views)
+                print(f"[Refresh] Référentiel rechargé : {key}")
             
             if missions_changed:
-                # Recharger les missions pour la date courante,
-                # en conservant au mieux l'état de l'interface
-                self.load_planning_for_date(self.current_date, preserve_ui=True)
-                # On retourne False pour éviter un second refresh via smart_refresh_all_views
-                return False
-            
-            # Si seuls les référentiels ont changé → on laisse smart_refresh_all_views faire son travail
-            if files_changed:
-                return True  # Fichiers rechargés (référentiels)
-            
-            return False  # Aucun changement
+                # Appliquer uniquement le delta (fichiers relus / missions retirées)
+                # puis mettre à jour le planning par différence
+                changed_ids = self._apply_day_delta(day_signatures, changed_paths, removed_paths)
+                if "planning" not in views:
+                    self.diff_refresh_planning(changed_ids)
+                views.update({"drivers", "summary"})
+            
+            return views
                 
         except Exception as e:
             print(f"Erreur lors du rechargement des données: {e}")
-            return False
-
-    def _start_auto_refresh_loop(self):
-        """Démarre la boucle d'auto-rafraîchissement interne."""
-        if self._auto_refresh_job is None:
-            self._auto_refresh_job = self.root.after(self._auto_refresh_interval_ms, self._auto_refresh_tick)
-
-    def _auto_refresh_tick(self):
-        """Tick périodique : recharge les données et rafraîchit les vues si nécessaire."""
-        self._auto_refresh_job = None
-        try:
-            # Ne pas rafraîchir si l'utilisateur est en train d'éditer
-            if getattr(self, "user_editing", False) or getattr(self, "is_editing", False):
-                return
-
-            # Recharger les données depuis les fichiers (seulement si modifiés)
-            changed = self.reload_data_from_files()
-            if changed:
-                # Rafraîchir intelligemment les vues (par différence, sans clignotement)
-                self.smart_refresh_all_views()
-
-            # Mettre à jour l'horodatage de dernière MAJ si quelque chose a été traité
-            if changed:
-                from datetime import datetime
-                self.last_refresh_dt = datetime.now()
-                try:
-                    self.status_var.set(
-                        f"Session : {self.current_user} | Dernière MAJ : {self.last_refresh_dt.strftime('%d/%m/%Y %H:%M:%S')}"
-                    )
-                except Exception:
-                    pass
-        except Exception as e:
-            print(f"Erreur lors de l'auto-rafraîchissement: {e}")
-        finally:
-            # Reprogrammer le prochain tick
-            self._start_auto_refresh_loop()
+            return set()
+
+    def _apply_day_delta(self, signatures, changed_paths, removed_paths):
+        """Relire les fichiers missions ajoutés/modifiés du jour courant et retirer
+        ceux qui ont disparu. Retourne l'ensemble des id de missions touchées."""
+        by_path = {m.get("_path"): i for i, m in enumerate(self.missions)}
+        day_index = self._get_day_index()
+        ids_by_name = {ch.get("nom_affichage"): ch["id"] for ch in reversed(self.chauffeurs) if "id" in ch}
+        changed_ids = set()
+
+        removed = set(removed_paths)
+        for path in changed_paths:
+            data = load_json(Path(path), None)
+            if not data or not isinstance(data, dict) or "id" not in data:
+                # Fichier illisible ou incomplet (écriture en cours) : traité comme absent
+                removed.add(path)
+                signatures.pop(path, None)
+                continue
+            data["_path"] = path
+            if "chauffeur_nom" in data and "chauffeur_id" not in data:
+                if data["chauffeur_nom"] in ids_by_name:
+                    data["chauffeur_id"] = ids_by_name[data["chauffeur_nom"]]
+            if path in by_path:
+                old = self.missions[by_path[path]]
+                changed_ids.add(old.get("id"))
+                day_index.remove(old.get("id"))
+                self.missions[by_path[path]] = data
+            else:
+                self.missions.append(data)
+            changed_ids.add(data["id"])
+            day_index.add(data)
+
+        if removed:
+            for m in self.missions:
+                if m.get("_path") in removed:
+                    changed_ids.add(m.get("id"))
+                    day_index.remove(m.get("id"))
+            self.missions = [m for m in self.missions if m.get("_path") not in removed]
+
+        self._day_signatures = {"date": self.current_date, "files": signatures}
+        print(f"[Refresh] Planning du jour : {len(changed_paths)} fichier(s) relu(s), "
+              f"{len(removed_paths)} supprimé(s)")
+        return changed_ids
+
+    def smart_refresh_all_views(self, views=None):
+        """Refresh intelligent des vues - SANS CLIGNOTEMENT
+
+        `views` : ensemble des vues à rafraîchir, telles que déclarées dans
+        REFERENCE_FILES ("planning", "chauffeurs", "voyages", "finance",
+        "drivers", "sst_combos") ; None = toutes.
+        """
+        def wanted(view):
+            return views is None or view in views
 
-    def smart_refresh_all_views(self):
-        """Refresh intelligent de toutes les vues - SANS CLIGNOTEMENT"""
         try:
             # Refresh UNIQUEMENT par différence (ZÉRO effacement)
             
             # 1. Planning principal (par pays) : mise à jour par différence
-            self.diff_refresh_planning()
+            if wanted("planning"):
+                self.diff_refresh_planning()
             
             # 2. Onglet Chauffeurs : mise à jour de la liste des chauffeurs
-            if hasattr(self, 'tree_ch'):
+            if wanted("chauffeurs") and hasattr(self, 'tree_ch'):
                 self.diff_refresh_chauffeurs()
             
             # 3. Onglet Voyages : mise à jour de la liste des voyages
-            if hasattr(self, 'tree_voy'):
+            if wanted("voyages") and hasattr(self, 'tree_voy'):
                 self.diff_refresh_voyages()
             
             # 4. Vue finance (SST + revenus) : on ne touche qu'au contenu, pas à la mise en page
-            if hasattr(self, 'finance_sst_listbox'):
+            if wanted("finance") and hasattr(self, 'finance_sst_listbox'):
                 self.refresh_finance_view()
+
+            # 5. Listes déroulantes SST du formulaire planning
+            if wanted("sst_combos") and hasattr(self, 'form_sst_cb'):
+                self.all_sst_values = self.sst_list.copy()
+                self.form_sst_cb["values"] = self.sst_list
             
-            # 5. Vue Analyse : ne pas rafraîchir automatiquement (coûteux)
+            # 6. Vue Analyse : ne pas rafraîchir automatiquement (coûteux)
             # L'utilisateur doit cliquer sur "Générer les graphiques"
             
-            # 6. Vues disponibilité / planning chauffeurs
-            try:
-                if hasattr(self, 'drivers_available_frame'):
-                    self.refresh_drivers_availability_view()
-                if hasattr(self, 'drivers_used_frame'):
-                    self.refresh_drivers_used_view()
-                if hasattr(self, 'calendar_container'):
-                    self.refresh_calendar()
-            except Exception as ee:
-                print(f"Erreur refresh vues chauffeurs (auto): {ee}")
+            # 7. Vues disponibilité / planning chauffeurs
+            if wanted("drivers"):
+                try:
+                    if hasattr(self, 'drivers_available_frame'):
+                        self.refresh_drivers_availability_view()
+                    if hasattr(self, 'drivers_used_frame'):
+                        self.refresh_drivers_used_view()
+                    if hasattr(self, 'calendar_container'):
+                        self.refresh_calendar()
+                except Exception as ee:
+                    print(f"Erreur refresh vues chauffeurs (auto): {ee}")
                 
         except Exception as e:
             print(f"Erreur lors du smart refresh: {e}")
@@ -11772,128 +14586,80 @@ Cordialement,
         """Cette méthode n'est plus utilisée - on utilise refresh_planning_view()"""
         pass
     
-    def diff_refresh_planning(self):
-        """Refresh du planning par DIFFÉRENCE - ZÉRO clignotement"""
+    def diff_refresh_planning(self, changed_ids=None):
+        """Refresh du planning par DIFFÉRENCE - ZÉRO clignotement
+
+        Le modèle de vue du jour est calculé une seule fois
+        (build_planning_view_model) puis chaque TreeView est comparé à lui.
+        changed_ids : si fourni, seules les valeurs de ces missions (ajoutées,
+        modifiées ou supprimées) sont relues dans les TreeViews.
+        """
         if not hasattr(self, 'country_trees'):
             return
+
+        view_model = self.build_planning_view_model()
+
+        # Un pays apparaît ou disparaît : les sections sont à reconstruire
+        if list(view_model.keys()) != list(self.country_trees.keys()):
+            self.refresh_planning_view(preserve_ui=True)
+            return
         
-        # Pour chaque pays
-        for country, trees in self.country_trees.items():
-            # Pour chaque type (livraison, ramasse)
-            for tree_type, tree in trees.items():
+        for country, groups in view_model.items():
+            if hasattr(self, 'country_headers') and country in self.country_headers:
+                self.country_headers[country]["livraison_label"].config(
+                    text=f"📦 LIVRAISONS - {country} ({len(groups['livraison'])})"
+                )
+                self.country_headers[country]["ramasse_label"].config(
+                    text=f"🚛 RAMASSES - {country} ({len(groups['ramasse'])})"
+                )
+
+            for tree_type, tree in self.country_trees[country].items():
                 try:
-                    # Sauvegarder sélection et scroll AVANT
-                    old_selection = list(tree.selection())
-                    old_yview = tree.yview()[0] if tree.yview() else 0
-                    
-                    # Obtenir l'état ACTUEL du TreeView
-                    current_items = {}
-                    for item_id in tree.get_children():
-                        current_items[item_id] = tree.item(item_id, 'values')
-                    
-                    # Obtenir les NOUVELLES données
-                    new_missions = self.get_missions_for_tree(country, tree_type)
-                    
-                    # Créer un dict des nouvelles données
-                    new_items = {}
-                    for mission in new_missions:
-                        new_items[mission['id']] = mission['values']
-                    
-                    # MISE À JOUR PAR DIFFÉRENCE
-                    
-                    # 1. MODIFIER les items qui ont changé
-                    for item_id, new_values in new_items.items():
-                        if item_id in current_items:
-                            # Item existe déjà
-                            if current_items[item_id] != new_values:
-                                # Valeurs différentes → MODIFIER (pas supprimer+recréer)
-                                tree.item(item_id, values=new_values)
-                        else:
-                            # Nouvel item → AJOUTER
-                            tree.insert("", "end", iid=item_id, values=new_values)
-                    
-                    # 2. SUPPRIMER les items qui n'existent plus
-                    for item_id in current_items.keys():
-                        if item_id not in new_items:
-                            tree.delete(item_id)
-                    
-                    # Restaurer sélection et scroll APRÈS
-                    for item_id in old_selection:
-                        if tree.exists(item_id):
-                            tree.selection_add(item_id)
-                    
-                    tree.yview_moveto(old_yview)
-                    
-                    # Appliquer les couleurs alternées UNIQUEMENT si des changements
-                    if len(current_items) != len(new_items) or current_items.keys() != new_items.keys():
-                        for idx, item_id in enumerate(tree.get_children()):
-                            tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-                            tree.item(item_id, tags=(tag,))
-                    
+                    self._diff_planning_tree(tree, groups.get(tree_type, []), changed_ids)
                 except Exception as e:
                     print(f"Erreur diff_refresh {country}/{tree_type}: {e}")
                     import traceback
                     traceback.print_exc()
-    
-    def get_missions_for_tree(self, country, tree_type):
-        """Obtenir les données formatées pour un TreeView"""
-        result = []
-        
-        # Filtrer les missions pour cette date
-        date_str = self.current_date.strftime("%Y-%m-%d")
-        missions_today = [m for m in self.missions if m.get("date") == date_str]
-        
-        for mission in missions_today:
-            # Déterminer le pays de la mission via le voyage
-            voyage_code = mission.get("voyage", "")
-            voyage = next((v for v in self.voyages if v.get("code") == voyage_code), None)
-            mission_country = voyage.get("country", "Belgique") if voyage else "Belgique"
-            
-            # Normaliser le nom du pays
-            if mission_country.lower() in ["pays-bas", "paysbas", "pays bas", "netherlands"]:
-                mission_country = "Pays-Bas"
-            elif mission_country.lower() in ["belgique", "belgium", "be"]:
-                mission_country = "Belgique"
-            elif mission_country.lower() in ["luxembourg", "lux", "lu"]:
-                mission_country = "Luxembourg"
-            elif mission_country.lower() in ["france", "fr"]:
-                mission_country = "France"
-            
-            # Filtrer par pays
-            if mission_country != country:
-                continue
-            
-            # Filtrer par type
-            mission_type = mission.get("type", "LIVRAISON")
-            if tree_type == "livraison" and mission_type != "LIVRAISON":
-                continue
-            if tree_type == "ramasse" and mission_type != "RAMASSE":
-                continue
-            
-            # Formater les valeurs pour le TreeView
-            mission_id = mission.get("id", "")
-            heure = mission.get("heure", "")
-            nb_pal = mission.get("nb_pal", "")
-            numero = mission.get("numero", "")
-            sst = mission.get("sst", "")
-            chauffeur = mission.get("chauffeur_nom", "")
-            infos = mission.get("infos", "")
-            
-            if tree_type == "livraison":
-                values = (heure, voyage_code, nb_pal, numero, sst, chauffeur, infos)
-            else:  # ramasse
-                ramasse = mission.get("ramasse", "")
-                values = (heure, voyage_code, nb_pal, numero, sst, chauffeur, ramasse, infos)
-            
-            result.append({
-                'id': mission_id,
-                'values': values
-            })
-        
-        # IMPORTANT: Trier par heure pour garantir un ordre stable
-        result.sort(key=lambda x: x['values'][0] if x['values'] else '')
-        
-        return result
+
+    def _diff_planning_tree(self, tree, rows, changed_ids=None):
+        """Aligner un TreeView du planning sur les lignes du modèle de vue"""
+        # Sauvegarder sélection et scroll AVANT
+        old_selection = list(tree.selection())
+        old_yview = tree.yview()[0] if tree.yview() else 0
+
+        current_ids = list(tree.get_children())
+        new_ids = [row["id"] for row in rows]
+        new_set = set(new_ids)
+
+        # 1. SUPPRIMER les items qui n'existent plus
+        for item_id in current_ids:
+            if item_id not in new_set:
+                tree.delete(item_id)
+        current_set = set(current_ids) & new_set
+
+        # 2. AJOUTER les nouveaux items à leur place, MODIFIER ceux qui ont changé
+        for idx, row in enumerate(rows):
+            item_id = row["id"]
+            if item_id not in current_set:
+                tree.insert("", idx, iid=item_id, values=row["values"], tags=(row["tag"],))
+            elif changed_ids is None or item_id in changed_ids:
+                item = tree.item(item_id)
+                if tuple(str(v) for v in item["values"]) != tuple(str(v) for v in row["values"]):
+                    tree.item(item_id, values=row["values"])
+                if tuple(item["tags"]) != (row["tag"],):
+                    tree.item(item_id, tags=(row["tag"],))
+
+        # 3. ORDRE et couleurs alternées, seulement si la structure a changé
+        if list(tree.get_children()) != new_ids or current_set != set(current_ids):
+            for idx, row in enumerate(rows):
+                tree.move(row["id"], "", idx)
+                tree.item(row["id"], tags=(row["tag"],))
+
+        # Restaurer sélection et scroll APRÈS
+        for item_id in old_selection:
+            if tree.exists(item_id):
+                tree.selection_add(item_id)
+        tree.yview_moveto(old_yview)
     
     def smart_refresh_chauffeurs(self):
         """Cette méthode n'est plus utilisée - on utilise refresh_chauffeurs_view()"""
@@ -12013,9 +14779,690 @@ Cordialement,
             self.refresh_timer_id = None
 
 
+# =============================================================================
+# DONNÉES SYNTHÉTIQUES ET BANCS D'ESSAI - Mesure des chemins sans interface
+# =============================================================================
+
+class SyntheticPlanningTree:
+    """
+    Génère un ROOT_DIR fictif au format réel : référentiels de _data (SST,
+    voyages, chauffeurs, dispos, tarifs, revenus) et journées de _planning
+    (un fichier JSON par mission). Le tirage dépend uniquement de la graine :
+    deux générations avec les mêmes paramètres sont identiques, ce qui rend
+    les mesures comparables d'une version à l'autre.
+    """
+
+    MARKER = "_synthetique.json"  # Dans _data : protège un vrai ROOT_DIR d'un écrasement
+    COUNTRY_PREFIXES = {"Belgique": "BE", "Pays-Bas": "P-B", "Luxembourg": "RES", "France": "FR"}
+
+    def __init__(self, root, nb_sst=8, nb_voyages=1500, nb_chauffeurs=2000,
+                 missions_per_day=600, seed=42):
+        self.root = Path(root)
+        self.nb_sst = nb_sst
+        self.nb_voyages = nb_voyages
+        self.nb_chauffeurs = nb_chauffeurs
+        self.missions_per_day = missions_per_day
+        self.seed = seed
+
+        import random
+        rng = random.Random(seed)
+        countries = list(self.COUNTRY_PREFIXES)
+        self.ssts = [f"SST{i:02d}" for i in range(1, nb_sst + 1)]
+        self.voyages = []
+        for i in range(nb_voyages):
+            country = rng.choices(countries, weights=[60, 20, 10, 10])[0]
+            self.voyages.append({
+                "code": f"{self.COUNTRY_PREFIXES[country]}{i:04d}",
+                "type": "LIVRAISON" if rng.random() < 0.7 else "RAMASSE",
+                "actif": True,
+                "country": country,
+                "duree": rng.randrange(30, 241, 15),
+            })
+        self.chauffeurs = []
+        for i in range(nb_chauffeurs):
+            self.chauffeurs.append({
+                "id": f"CH_{i:06d}",
+                "nom": f"NOM{i:05d}",
+                "prenom": f"Chauffeur {i:05d}",
+                "sst": self.ssts[i % nb_sst],
+                "type": "SST",
+                "telephone": "",
+                "actif": True,
+                "nom_affichage": f"Chauffeur {i:05d}",
+            })
+
+    def is_safe_target(self) -> bool:
+        """
+        Le dossier n'est pas le ROOT_DIR courant et il est entièrement vide
+        (ou absent), ou a déjà été produit par ce générateur (marqueur).
+        """
+        if self.root.resolve() == ROOT_DIR.resolve():
+            return False
+        if (self.root / "_data" / self.MARKER).exists():
+            return True
+        return not self.root.exists() or not any(self.root.iterdir())
+
+    def clear_days(self):
+        """Supprimer les journées d'une génération précédente (arbre synthétique uniquement)"""
+        planning_dir = self.root / "_planning"
+        if (self.root / "_data" / self.MARKER).exists() and planning_dir.exists():
+            shutil.rmtree(planning_dir)
+
+    def _day_dir(self, d: date) -> Path:
+        # Même arborescence que get_planning_day_dir, sous self.root
+        return self.root / get_planning_day_dir(d).relative_to(ROOT_DIR)
+
+    def _dispos(self, d: date, rng) -> list:
+        """Chauffeurs indisponibles ce jour (~5 %)"""
+        date_str = format_date_internal(d)
+        return [{"id_chauffeur": ch["id"], "date": date_str, "disponible": False}
+                for ch in self.chauffeurs if rng.random() < 0.05]
+
+    def write_reference_data(self, start: date, end: date):
+        """Référentiels de _data ; tarifs révisés tous les 6 mois, revenus tous les 3 mois"""
+        import random
+        rng = random.Random(self.seed)
+        data_dir = self.root / "_data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+
+        tarifs, revenus, dispos = {}, {}, []
+        month = date(start.year, start.month, 1)
+        index = 0
+        while month <= end:
+            date_str = format_date_internal(month)
+            if index % 6 == 0:
+                for sst in self.ssts:
+                    for country in self.COUNTRY_PREFIXES:
+                        tarifs.setdefault(sst, {}).setdefault(country, {})[date_str] = rng.randrange(180, 420, 5)
+            if index % 3 == 0:
+                revenus[date_str] = {country: {"livraison": round(rng.uniform(8, 25), 2),
+                                               "ramasse": round(rng.uniform(4, 15), 2)}
+                                     for country in self.COUNTRY_PREFIXES}
+            index += 1
+            month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+        d = start
+        while d <= end:
+            dispos.extend(self._dispos(d, random.Random(self.seed * 1000003 + d.toordinal())))
+            d += timedelta(days=1)
+
+        files = {
+            "sst.json": self.ssts, "voyages.json": self.voyages, "chauffeurs.json": self.chauffeurs,
+            "dispo_chauffeurs.json": dispos, "tarifs_sst.json": tarifs, "revenus_palettes.json": revenus,
+        }
+        for name, content in files.items():
+            with open(data_dir / name, "w", encoding="utf-8") as f:
+                json.dump(content, f, indent=2, ensure_ascii=False)
+        with open(data_dir / self.MARKER, "w", encoding="utf-8") as f:
+            json.dump({"seed": self.seed, "start": format_date_internal(start), "end": format_date_internal(end),
+                       "sst": self.nb_sst, "voyages": self.nb_voyages, "chauffeurs": self.nb_chauffeurs,
+                       "missions_per_day": self.missions_per_day,
+                       "generated_at": datetime.now().isoformat(timespec="seconds")}, f, indent=2)
+
+    def day_missions(self, d: date) -> list:
+        """Missions d'une journée (aucune le dimanche), 1 à 3 missions par chauffeur"""
+        import random
+        if d.weekday() == 6:
+            return []
+        rng = random.Random(self.seed * 1000003 + d.toordinal())
+        unavailable = {entry["id_chauffeur"] for entry in self._dispos(d, rng)}
+        drivers = [ch for ch in self.chauffeurs if ch["id"] not in unavailable]
+        rng.shuffle(drivers)
+        date_str = format_date_internal(d)
+        count = int(self.missions_per_day * rng.uniform(0.8, 1.2) * (0.5 if d.weekday() == 5 else 1))
+
+        missions = []
+        numeros = {}
+        driver_index = 0
+        for _ in range(count):
+            voyage = rng.choice(self.voyages)
+            driver = None
+            if drivers and rng.random() > 0.08:  # ~8 % de missions sans chauffeur
+                if numeros.get(drivers[driver_index % len(drivers)]["nom_affichage"], 0) >= rng.randint(1, 3):
+                    driver_index += 1
+                driver = drivers[driver_index % len(drivers)]
+            name = driver["nom_affichage"] if driver else ""
+            if name:
+                numeros[name] = numeros.get(name, 0) + 1
+            missions.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "date": date_str,
+                "type": voyage["type"],
+                "heure": rng.choice(TIME_CHOICES[16:89]),  # 04:00 à 22:00
+                "voyage": voyage["code"],
+                "nb_pal": rng.randint(1, 33),
+                "numero": numeros.get(name, 1),
+                "sst": driver["sst"] if driver else rng.choice(self.ssts),
+                "chauffeur_nom": name,
+                "chauffeur_id": driver["id"] if driver else None,
+                "ramasse": "",
+                "infos": "",
+                "sans_sst": False,
+                "sans_chauffeur": not name,
+            })
+        return missions
+
+    def write_days(self, start: date, end: date, max_workers=8) -> dict:
+        """Écrire les journées de [start, end] ; retourne {"days": n, "missions": n}"""
+        def write_day(d):
+            missions = self.day_missions(d)
+            if not missions:
+                return 0
+            day_dir = self._day_dir(d)
+            day_dir.mkdir(parents=True, exist_ok=True)
+            for mission in missions:
+                with open(day_dir / f"{mission['id']}.json", "w", encoding="utf-8") as f:
+                    json.dump(mission, f, indent=2, ensure_ascii=False)
+            return len(missions)
+
+        dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ptt-synthetic") as pool:
+            counts = list(pool.map(write_day, dates))
+        return {"days": sum(1 for c in counts if c), "missions": sum(counts)}
+
+
+class PlanningBenchmark:
+    """
+    Bancs d'essai des chemins sans interface sur le ROOT_DIR courant :
+      - lecture des journées (read_planning_day, comme load_planning_for_date),
+        depuis la source puis depuis le cache local ;
+      - reconstruction du cache (PlanningCache.rebuild) ;
+      - reconstruction des résumés mensuels (PlanningRollups.refresh) ;
+      - finance sur la période (FinanceEngine.compute_range, calculate_finance) ;
+      - agrégats d'analyse (AnalyticsPipeline.collect, utilisé par _collect_data).
+    Les passages "froid" vident la mémoire (day_store, planning_rollups) avant
+    chaque mesure et relisent les résumés sur disque ; les passages "chaud"
+    réutilisent ce qui est en mémoire. Le cache local est redirigé vers
+    un dossier temporaire pour ne pas mélanger données réelles et mesurées.
+    Les résumés mensuels (_rollup.json) étant supprimés et réécrits dans
+    ROOT_DIR, les mesures ne tournent que sur un arbre synthétique
+    (marqueur SyntheticPlanningTree.MARKER), jamais sur la production.
+    """
+
+    def __init__(self, start: date, end: date, repeat=3, memory=False):
+        self.start = start
+        self.end = end
+        self.repeat = max(1, repeat)
+        self.memory = memory
+        self.dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        self.results = []
+
+    def measure(self, name, func, setup=None):
+        """Exécuter `func` self.repeat fois (après `setup`) ; durées et pic mémoire"""
+        import contextlib
+        import io
+        import statistics
+        import tracemalloc
+
+        durations = []
+        peak = 0
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            if self.memory:
+                tracemalloc.start()
+            started = time_module.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):  # Messages [Cache] etc. hors mesure
+                func()
+            durations.append(time_module.perf_counter() - started)
+            if self.memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            perf_monitor.record(f"bench.{name}", durations[-1])
+        result = {
+            "name": name,
+            "runs": len(durations),
+            "min_ms": min(durations) * 1000,
+            "median_ms": statistics.median(durations) * 1000,
+            "max_ms": max(durations) * 1000,
+            "peak_kib": peak / 1024 if self.memory else None,
+        }
+        self.results.append(result)
+        print(f"  {name:<45} {result['median_ms']:>10.1f} ms")
+        return result
+
+    @staticmethod
+    def is_safe_root() -> bool:
+        """ROOT_DIR a été produit par SyntheticPlanningTree"""
+        return (ROOT_DIR / "_data" / SyntheticPlanningTree.MARKER).exists()
+
+    def run(self) -> list:
+        import tempfile
+
+        if not self.is_safe_root():
+            raise RuntimeError(f"{ROOT_DIR} n'est pas un arbre synthétique : bancs d'essai refusés")
+        data_dir = ROOT_DIR / "_data"
+        voyages = load_voyages(data_dir)
+        tarifs = load_json(data_dir / "tarifs_sst.json", {})
+        revenus = load_json(data_dir / "revenus_palettes.json", {})
+        nb = len(self.dates)
+        start, end = self.start, self.end
+
+        def read_all(force_source):
+            for d in self.dates:
+                read_planning_day(d, force_source=force_source)
+
+        def finance():
+            FinanceEngine(voyages, tarifs, revenus).compute_range(start, end)
+
+        def collect(filters=None):
+            analytics_pipeline.configure(voyages, tarifs, revenus).collect(start, end, filters)
+
+        some_sst = load_json(data_dir / "sst.json", [])[:1]
+        countries = {normalize_country(v.get("country", "Belgique")) for v in voyages}
+        sst_filter = {"countries": countries | {"Belgique", "Pays-Bas", "Luxembourg"}, "sst": some_sst, "voyages": [],
+                      "types": ["LIVRAISON", "RAMASSE"]}
+
+        saved_cache = (planning_cache.cache_dir, planning_cache.meta_file, planning_cache.cache_meta)
+        with tempfile.TemporaryDirectory(prefix="ptt-bench-cache-") as tmp:
+            def reset_cache():
+                planning_cache.cache_dir = Path(tmp)
+                planning_cache.meta_file = Path(tmp) / "_cache_meta.json"
+                planning_cache.cache_meta = {"dates": {}, "last_full_refresh": None}
+            try:
+                self.measure(f"read_planning_day source ×{nb}", lambda: read_all(True))
+                self.measure(f"PlanningCache.rebuild ×{nb}", lambda: planning_cache.rebuild(self.dates),
+                             setup=reset_cache)
+                self.measure(f"read_planning_day cache ×{nb}", lambda: read_all(False))
+            finally:
+                planning_cache.cache_dir, planning_cache.meta_file, planning_cache.cache_meta = saved_cache
+
+        def cold():
+            day_store.invalidate()
+            planning_rollups.invalidate()
+
+        def drop_rollups():
+            cold()
+            for year, month in {(d.year, d.month) for d in self.dates}:
+                (PlanningRollups.month_dir(year, month) / PlanningRollups.FILE_NAME).unlink(missing_ok=True)
+
+        self.measure("PlanningRollups.refresh reconstruction", lambda: planning_rollups.refresh(self.dates),
+                     setup=drop_rollups)
+        self.measure("FinanceEngine.compute_range froid", finance, setup=cold)
+        self.measure("FinanceEngine.compute_range chaud", finance)
+        self.measure("AnalyticsPipeline.collect froid", collect, setup=cold)
+        self.measure("AnalyticsPipeline.collect chaud", collect)
+        if some_sst:
+            self.measure(f"AnalyticsPipeline.collect SST {some_sst[0]}", lambda: collect(sst_filter))
+        return self.results
+
+    def format_report(self) -> str:
+        missions = sum(len(day_store.get(d)) for d in self.dates)
+        lines = [f"Bancs d'essai PTT - {ROOT_DIR}",
+                 f"Période : {format_date_display(self.start)} → {format_date_display(self.end)} "
+                 f"({len(self.dates)} jours, {missions} missions) | {self.repeat} passage(s) | "
+                 f"Python {sys.version.split()[0]}",
+                 "-" * 92,
+                 f"  {'Mesure':<45} {'Min ms':>9} {'Méd. ms':>9} {'Max ms':>9} {'Pic Kio':>12}"]
+        for r in self.results:
+            peak = f"{r['peak_kib']:>12,.0f}" if r["peak_kib"] is not None else f"{'-':>12}"
+            lines.append(f"  {r['name'][:45]:<45} {r['min_ms']:>9.1f} {r['median_ms']:>9.1f} "
+                         f"{r['max_ms']:>9.1f} {peak}")
+        return "\n".join(lines)
+
+
+# =============================================================================
+# MODE LIGNE DE COMMANDE (sans interface)
+# =============================================================================
+# Traitements par lot exécutables sans fenêtre (tâches planifiées, serveur) :
+#   python PTT_v0.6.0.py generer --modele "Semaine type" --du 01/01/2025 --au 31/03/2025
+#   python PTT_v0.6.0.py generer-vides --du 01/01/2025 --au 31/01/2025 --jours lun,mar,mer,jeu,ven,sam
+#   python PTT_v0.6.0.py exporter --du 06/01/2025 --au 11/01/2025 --format excel --vue chauffeur
+#   python PTT_v0.6.0.py exporter --du 06/01/2025 --au 11/01/2025 --format pdf --vue chauffeur --par sst
+#   python PTT_v0.6.0.py cache --du 01/01/2025 --au 31/01/2025
+#   python PTT_v0.6.0.py annonces --date 07/01/2025 --mode eml|smtp
+#   python PTT_v0.6.0.py finance --du 01/01/2025 --au 31/01/2025 [--json]
+#   python PTT_v0.6.0.py resumes --du 01/01/2025 --au 31/12/2025 --par mois|semaine [--json]
+#   python PTT_v0.6.0.py synthetique --dossier D:/bench/PTT --du 01/01/2023 --au 31/12/2025
+#   python PTT_v0.6.0.py bench --du 01/01/2025 --au 31/03/2025 [--memoire]   (avec PTT_ROOT_DIR=D:/bench/PTT)
+# Aucune fenêtre Tk n'est créée ; chaque commande retourne 0 si tout s'est bien passé.
+
+_CLI_WEEKDAYS = {"lun": "monday", "mar": "tuesday", "mer": "wednesday", "jeu": "thursday",
+                 "ven": "friday", "sam": "saturday", "dim": "sunday"}
+
+_CLI_EXPORTS = {
+    ("excel", "chauffeur"): (export_planning_excel_par_chauffeur, "xlsx"),
+    ("excel", "heure"): (export_planning_excel_par_heure, "xlsx"),
+    ("excel", "voyage"): (export_planning_excel_par_voyage, "xlsx"),
+    ("pdf", "chauffeur"): (export_planning_pdf_par_chauffeur, "pdf"),
+    ("pdf", "heure"): (export_planning_pdf_par_heure, "pdf"),
+    ("pdf", "voyage"): (export_planning_pdf_par_voyage, "pdf"),
+}
+
+
+def _cli_date(value):
+    import argparse
+    try:
+        return parse_date_input(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _cli_weekdays(value):
+    import argparse
+    keys = []
+    for part in value.split(","):
+        key = _CLI_WEEKDAYS.get(part.strip().lower()[:3])
+        if key is None:
+            raise argparse.ArgumentTypeError(f"Jour inconnu : '{part}' (lun, mar, mer, jeu, ven, sam, dim)")
+        keys.append(key)
+    return keys
+
+
+def _cli_dates(args):
+    """Dates de la plage --du/--au (inclus), filtrées par --jours si présent"""
+    weekdays = set(getattr(args, "jours", None) or WEEKDAY_KEYS)
+    dates = []
+    d = args.du
+    while d <= args.au:
+        if WEEKDAY_KEYS[d.weekday()] in weekdays:
+            dates.append(d)
+        d += timedelta(days=1)
+    return dates
+
+
+def _cli_generate(args):
+    template = load_planning_templates().get(args.modele)
+    if not template:
+        print(f"Modèle inconnu : '{args.modele}'. Modèles disponibles : "
+              f"{', '.join(sorted(load_planning_templates())) or 'aucun'}")
+        return 1
+
+    data_dir = ROOT_DIR / "_data"
+    generator = PlanningGenerator(load_voyages(data_dir), load_json(data_dir / "chauffeurs.json", []),
+                                  load_json(data_dir / "dispo_chauffeurs.json", []))
+    plans = generator.plan(template, args.du, args.au, weekdays=args.jours,
+                           skip_existing=not args.inclure_existants)
+    print(PlanningGenerator.summarize(plans))
+    if args.simulation:
+        return 0
+
+    written = PlanningGenerator.write(plans, template_name=args.modele, max_workers=args.workers)
+    activity_logger.log_action("PLANNING_GENERATE", {
+        "template": args.modele, "start": format_date_internal(args.du), "end": format_date_internal(args.au),
+        "days": written["days"], "missions": written["missions"], "source": "cli",
+    })
+    print(f"\n{written['days']} jour(s) écrit(s), {written['missions']} mission(s) créée(s)")
+    for error in written["errors"]:
+        print(f"  ✗ {error}")
+    return 1 if written["errors"] else 0
+
+
+def _cli_generate_empty(args):
+    created = skipped = 0
+    for d in _cli_dates(args):
+        day_dir = get_planning_day_dir(d)
+        if day_dir.exists():
+            skipped += 1
+        else:
+            day_dir.mkdir(parents=True, exist_ok=True)
+            created += 1
+    activity_logger.log_action("PLANNING_GENERATE", {
+        "start": format_date_internal(args.du), "end": format_date_internal(args.au),
+        "days": created, "missions": 0, "source": "cli",
+    })
+    print(f"{created} jour(s) créé(s), {skipped} jour(s) existai(en)t déjà")
+    return 0
+
+
+def _cli_export(args):
+    export_func, extension = _CLI_EXPORTS[(args.format, args.vue)]
+    if not (EXCEL_AVAILABLE if args.format == "excel" else PDF_AVAILABLE):
+        print(f"Export {args.format} indisponible : module {'openpyxl' if args.format == 'excel' else 'reportlab'} non installé")
+        return 1
+
+    out_dir = Path(args.dossier) if args.dossier else ROOT_DIR / "_export"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    voyages = load_voyages(ROOT_DIR / "_data")
+    if args.format == "pdf":
+        ok, message = export_planning_pdf_batch(args.vue, _cli_dates(args), voyages, out_dir,
+                                                split=args.par, max_workers=args.workers)
+        print(f"{'✓' if ok else '✗'} {message}")
+        return 0 if ok else 1
+
+    errors = 0
+    for d in _cli_dates(args):
+        missions = read_planning_day(d)["missions"]
+        if not missions:
+            continue
+        filename = out_dir / f"planning_{args.vue}_{format_date_internal(d)}.{extension}"
+        ok, message = export_func(missions, voyages, d, str(filename))
+        print(f"{'✓' if ok else '✗'} {message}")
+        errors += 0 if ok else 1
+    return 1 if errors else 0
+
+
+def _cli_finance(args):
+    data_dir = ROOT_DIR / "_data"
+    engine = FinanceEngine(load_voyages(data_dir), load_json(data_dir / "tarifs_sst.json", {}),
+                           load_json(data_dir / "revenus_palettes.json", {}))
+    result = engine.compute_range(args.du, args.au)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=format_date_internal))
+    elif args.du == args.au and result["days"]:
+        print(format_finance_day(result["days"][0]))
+    else:
+        print(format_finance_range(result))
+    return 0
+
+
+def _cli_announce(args):
+    # Comme dans l'interface : les annonces ne concernent que J+1, sauf dérogation explicite
+    tomorrow = date.today() + timedelta(days=1)
+    if args.date != tomorrow and not args.forcer_date:
+        print(f"✗ Les annonces ne peuvent être envoyées que pour J+1 ({format_date_display(tomorrow)}). "
+              f"Utilisez --forcer-date pour le {format_date_display(args.date)}.")
+        return 1
+    engine = AnnouncementEngine()
+    missions = day_store.get(args.date)
+    only = set(args.sst) if args.sst else None
+    announcements = engine.build(args.date, missions, only=only, pending_only=not args.renvoyer)
+    announcements = [a for a in announcements if a["recipients"]]
+    if not announcements:
+        print(f"Aucune annonce à envoyer pour le {format_date_display(args.date)}")
+        return 0
+
+    if args.mode == "eml":
+        out_dir = Path(args.dossier) if args.dossier else ROOT_DIR / "_export" / f"annonces_{format_date_internal(args.date)}"
+        written = engine.write_eml(announcements, out_dir)
+        for announcement, path in written:
+            print(f"✓ {announcement['sst']}: {path}")
+        engine.record([announcement for announcement, _ in written], "eml")
+        return 0
+
+    try:
+        sent, errors = engine.send_smtp(announcements)
+    except (ValueError, OSError) as e:
+        print(f"✗ {e}")
+        return 1
+    engine.record(sent, "smtp")
+    for announcement in sent:
+        print(f"✓ {announcement['sst']}: {', '.join(announcement['recipients'])}")
+    for sst, error in errors:
+        print(f"✗ {sst}: {error}")
+    return 1 if errors else 0
+
+
+def _cli_cache(args):
+    updated = planning_cache.rebuild(_cli_dates(args))
+    print(f"{updated} date(s) mise(s) en cache")
+    return 0
+
+
+def _cli_rollups(args):
+    periods = planning_rollups.summary(args.du, args.au, by=args.par)
+    if args.json:
+        print(json.dumps(dict(periods), ensure_ascii=False, indent=2))
+        return 0
+    print(f"{'Période':<10} {'Jours':>6} {'Missions':>9} {'Pal. liv.':>10} {'Pal. ram.':>10} {'Jours-ch.':>10}")
+    print("-" * 60)
+    for label, agg in periods:
+        print(f"{label:<10} {agg['days']:>6} {agg['missions']:>9} {agg['pal_liv']:>10} "
+              f"{agg['pal_ram']:>10} {agg['driver_days']:>10}")
+        for sst, entry in sorted(agg["by_sst"].items()):
+            print(f"    {sst:<14} {entry['missions']:>9} missions {entry['palettes']:>8} pal. "
+                  f"{entry['driver_days']:>6} jours-ch.")
+    return 0
+
+
+def _cli_synthetic(args):
+    tree = SyntheticPlanningTree(args.dossier, nb_sst=args.sst, nb_voyages=args.voyages,
+                                 nb_chauffeurs=args.chauffeurs, missions_per_day=args.missions,
+                                 seed=args.graine)
+    if not tree.is_safe_target():
+        print(f"✗ {tree.root} n'est ni un dossier vide ni un arbre synthétique (ou c'est le ROOT_DIR "
+              f"courant) : rien n'a été écrit. Choisissez un dossier vide avec --dossier.")
+        return 1
+    started = time_module.perf_counter()
+    # Nouvelle graine ou nouvelle période : repartir de journées vides
+    tree.clear_days()
+    tree.write_reference_data(args.du, args.au)
+    written = tree.write_days(args.du, args.au, max_workers=args.workers)
+    print(f"✓ {tree.root} : {written['days']} jour(s), {written['missions']} mission(s), "
+          f"{args.voyages} voyages, {args.chauffeurs} chauffeurs, {args.sst} SST "
+          f"({time_module.perf_counter() - started:.1f} s)")
+    return 0
+
+
+def _cli_bench(args):
+    if not PlanningBenchmark.is_safe_root():
+        print(f"✗ {ROOT_DIR} n'est pas un arbre synthétique (pas de _data/{SyntheticPlanningTree.MARKER}) : "
+              f"les bancs d'essai réécrivent les résumés mensuels. Générez un arbre avec la commande "
+              f"'synthetique' et pointez PTT_ROOT_DIR dessus.")
+        return 1
+    bench = PlanningBenchmark(args.du, args.au, repeat=args.repetitions, memory=args.memoire)
+    print(f"Bancs d'essai sur {ROOT_DIR} ({len(bench.dates)} jours)…")
+    bench.run()
+    print()
+    print(bench.format_report())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"root": str(ROOT_DIR), "start": format_date_internal(args.du),
+                       "end": format_date_internal(args.au), "repeat": bench.repeat,
+                       "python": sys.version.split()[0], "results": bench.results}, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats enregistrés dans {args.json}")
+    return 0
+
+
+def run_cli(argv) -> int:
+    """Point d'entrée du mode ligne de commande"""
+    import argparse
+    global AUTO_OPEN_EXPORTS
+
+    parser = argparse.ArgumentParser(prog="PTT", description="Planning transport - traitements par lot (sans interface)")
+    sub = parser.add_subparsers(dest="commande", required=True)
+
+    def add_range(p, jours=True):
+        p.add_argument("--du", type=_cli_date, required=True, help="Date de début (JJ/MM/AAAA)")
+        p.add_argument("--au", type=_cli_date, required=True, help="Date de fin incluse (JJ/MM/AAAA)")
+        if jours:
+            p.add_argument("--jours", type=_cli_weekdays, help="Jours de semaine, ex. lun,mar,mer,jeu,ven")
+
+    p = sub.add_parser("generer", help="Générer des plannings à partir d'un modèle de semaine")
+    add_range(p)
+    p.add_argument("--modele", required=True, help="Nom du modèle (voir onglet Admin)")
+    p.add_argument("--simulation", action="store_true", help="Afficher le résumé sans rien écrire")
+    p.add_argument("--inclure-existants", action="store_true", help="Compléter aussi les jours déjà planifiés")
+    p.add_argument("--workers", type=int, default=8, help="Jours écrits en parallèle")
+    p.set_defaults(func=_cli_generate, permission="generate_planning")
+
+    p = sub.add_parser("generer-vides", help="Créer des jours de planning vides")
+    add_range(p)
+    p.set_defaults(func=_cli_generate_empty, permission="generate_planning")
+
+    p = sub.add_parser("exporter", help="Exporter les plannings d'une période (un fichier par jour)")
+    add_range(p)
+    p.add_argument("--format", choices=["excel", "pdf"], default="excel")
+    p.add_argument("--vue", choices=["chauffeur", "heure", "voyage"], default="chauffeur")
+    p.add_argument("--dossier", help="Dossier de sortie (défaut : _export)")
+    p.add_argument("--par", choices=list(PDF_BATCH_SPLITS), default="jour",
+                   help="PDF : un fichier par jour, par SST ou pour toute la période")
+    p.add_argument("--workers", type=int, help="PDF : fichiers rendus en parallèle (défaut : nb de processeurs)")
+    p.set_defaults(func=_cli_export, permission="view_planning")
+
+    p = sub.add_parser("finance", help="Revenus, coûts SST et marge sur une période")
+    add_range(p, jours=False)
+    p.add_argument("--json", action="store_true", help="Résultat détaillé au format JSON")
+    p.set_defaults(func=_cli_finance, permission="view_finance")
+
+    p = sub.add_parser("annonces", help="Annonces SST d'une journée (fichiers .eml ou envoi SMTP)")
+    p.add_argument("--date", type=_cli_date, default=date.today() + timedelta(days=1),
+                   help="Date des missions (défaut : demain)")
+    p.add_argument("--mode", choices=["eml", "smtp"], default="eml")
+    p.add_argument("--sst", nargs="+", help="Limiter à ces SST")
+    p.add_argument("--renvoyer", action="store_true", help="Inclure les SST déjà annoncés")
+    p.add_argument("--dossier", help="Dossier des fichiers .eml (défaut : _export/annonces_<date>)")
+    p.add_argument("--forcer-date", action="store_true",
+                   help="Autoriser une autre date que J+1 (rattrapage, à utiliser avec précaution)")
+    p.set_defaults(func=_cli_announce, permission="send_announcements")
+
+    p = sub.add_parser("cache", help="Reconstruire le cache local des plannings")
+    add_range(p)
+    p.set_defaults(func=_cli_cache, permission="view_planning")
+
+    p = sub.add_parser("resumes", help="Missions, palettes et jours-chauffeur par mois ou par semaine")
+    add_range(p, jours=False)
+    p.add_argument("--par", choices=["mois", "semaine"], default="mois")
+    p.add_argument("--json", action="store_true", help="Résultat détaillé au format JSON")
+    p.set_defaults(func=_cli_rollups, permission="view_analyse")
+
+    p = sub.add_parser("synthetique", help="Générer un ROOT_DIR fictif pour les bancs d'essai")
+    add_range(p, jours=False)
+    p.add_argument("--dossier", required=True,
+                   help="Dossier à remplir : vide, ou arbre synthétique existant (jamais le ROOT_DIR courant)")
+    p.add_argument("--sst", type=int, default=8, help="Nombre de SST")
+    p.add_argument("--voyages", type=int, default=1500, help="Nombre de voyages")
+    p.add_argument("--chauffeurs", type=int, default=2000, help="Nombre de chauffeurs")
+    p.add_argument("--missions", type=int, default=600, help="Missions par jour ouvré (±20 %%)")
+    p.add_argument("--graine", type=int, default=42, help="Graine du tirage (mêmes données à graine égale)")
+    p.add_argument("--workers", type=int, default=8, help="Jours écrits en parallèle")
+    p.set_defaults(func=_cli_synthetic, permission=None)
+
+    p = sub.add_parser("bench", help="Mesurer lecture, cache, finance et analyse sur une période")
+    add_range(p, jours=False)
+    p.add_argument("--repetitions", type=int, default=3, help="Passages par mesure (la médiane est retenue)")
+    p.add_argument("--memoire", action="store_true", help="Mesurer aussi le pic d'allocations (tracemalloc, plus lent)")
+    p.add_argument("--json", help="Enregistrer les résultats dans ce fichier JSON")
+    p.set_defaults(func=_cli_bench, permission=None)
+
+    args = parser.parse_args(argv)
+    if hasattr(args, "au") and args.au < args.du:
+        parser.error("--au précède --du")
+
+    # Pas d'ouverture automatique des fichiers exportés en mode batch
+    AUTO_OPEN_EXPORTS = False
+    init_default_data()
+    # Mêmes droits que l'interface (users_rights.json) ; les commandes synthétiques n'en demandent pas
+    username = getpass.getuser().upper()
+    permissions = resolve_user_rights(ROOT_DIR / "_data", username)["permissions"]
+    if args.permission and not permissions.get(args.permission, False):
+        print(f"✗ Permission refusée : {username} n'a pas le droit '{args.permission}' "
+              f"requis par la commande '{args.commande}'. Contactez un administrateur.")
+        return 1
+    activity_logger.initialize(ROOT_DIR, getpass.getuser())
+    try:
+        with perf_monitor.measure(f"cli.{args.commande}"):
+            return args.func(args)
+    finally:
+        # Fermer la session ouverte par initialize (SESSION_START)
+        activity_logger.log_session_end()
+
+
 if __name__ == "__main__":
+    # Nécessaire pour les processus d'export PDF par lot dans un exécutable figé (Windows)
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+
+    record_startup_timing("imports du module", _STARTUP_T0)
+    _t = time_module.perf_counter()
     init_default_data()
+    record_startup_timing("init_default_data", _t)
+    _t = time_module.perf_counter()
     root = tk.Tk()
+    record_startup_timing("création fenêtre Tk", _t)
     
     if not EXCEL_AVAILABLE:
         print("Note: openpyxl non installé. Export Excel non disponible.")
@@ -12036,5 +15483,9 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Impossible de définir l'icône de la fenêtre: {e}")
     
+    _t = time_module.perf_counter()
     app = TransportPlannerApp(root)
+    record_startup_timing("TransportPlannerApp (données + onglet Planning)", _t)
+    # Rapport affiché une fois la fenêtre prête
+    root.after_idle(print_startup_report)
     root.mainloop()
\ No newline at end of file